@@ -2,9 +2,11 @@
 Module core de l'ocr-service.
 Contient les fonctions pures testables sans démarrer de serveur FastAPI.
 """
+import json
 import os
 import subprocess
-from typing import List
+import urllib.request
+from typing import Callable, List, Optional
 
 from app.utils import ensure_dir
 
@@ -35,6 +37,24 @@ def get_tool_versions() -> dict:
     return out
 
 
+def stream_process(cmd: List[str], on_line: Callable[[str], None],
+                   env: Optional[dict] = None) -> int:
+    """
+    Exécute une commande en lisant sa sortie (stdout + stderr) ligne à ligne,
+    au fil de l'eau.
+
+    :param cmd: Commande.
+    :param on_line: Appelée pour chaque ligne (fin de ligne incluse).
+    :param env: Environnement du processus (None = hérité).
+    :return: Code de retour.
+    """
+    with subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                          text=True, bufsize=1, env=env) as p:
+        for line in p.stdout:
+            on_line(line)
+        return p.wait()
+
+
 def build_ocrmypdf_cmd(
     raw_pdf: str,
     dest: str,
@@ -43,6 +63,10 @@ def build_ocrmypdf_cmd(
     rotate: bool = True,
     deskew: bool = True,
     optimize: int = 1,
+    jobs: Optional[int] = None,
+    pages: Optional[str] = None,
+    tesseract_timeout: Optional[float] = None,
+    verbose: int = 0,
 ) -> List[str]:
     """
     Construit la liste d'arguments pour la commande ocrmypdf.
@@ -53,6 +77,11 @@ def build_ocrmypdf_cmd(
     :param rotate: Activer la correction de rotation des pages.
     :param deskew: Activer la correction d'inclinaison.
     :param optimize: Niveau d'optimisation (0–3).
+    :param jobs: Pages traitées en parallèle (``--jobs``) ; None = un par cœur (défaut ocrmypdf).
+    :param pages: Pages à OCRiser (``--pages``, ex. ``"1-3,7"``) ; None = toutes.
+    :param tesseract_timeout: ``--tesseract-timeout`` ; 0 = aucune page OCRisée
+                              (conversion PDF/A seule) ; None = défaut ocrmypdf.
+    :param verbose: Niveau ``-v`` (1 = messages par page, lus pour la progression).
     :return: Liste de tokens formant la commande shell.
     """
     cmd = ["ocrmypdf", "--output-type", "pdf"]
@@ -62,12 +91,62 @@ def build_ocrmypdf_cmd(
         cmd.append("--deskew")
     if optimize is not None:
         cmd += ["--optimize", str(optimize)]
+    if jobs:
+        cmd += ["--jobs", str(jobs)]
+    if pages:
+        cmd += ["--pages", pages]
+    if tesseract_timeout is not None:
+        cmd += ["--tesseract-timeout", str(tesseract_timeout)]
+    if verbose:
+        cmd += ["-v", str(verbose)]
     if lang:
         cmd += ["-l", lang]
     cmd += [raw_pdf, dest]
     return cmd
 
 
+def build_ocrmypdf_kwargs(
+    *,
+    lang: str = "fra+eng",
+    rotate: bool = True,
+    deskew: bool = True,
+    optimize: int = 1,
+    jobs: Optional[int] = None,
+    pages: Optional[str] = None,
+    tesseract_timeout: Optional[float] = None,
+) -> dict:
+    """
+    Équivalent de ``build_ocrmypdf_cmd`` pour l'API Python (``ocrmypdf.ocr``) :
+    mêmes options, mêmes valeurs par défaut, une clé par option de la ligne de
+    commande (absente quand l'option le serait).
+
+    :param lang: Langue(s) Tesseract, ex: ``"fra+eng"`` → ``language=["fra", "eng"]``.
+    :param rotate: ``rotate_pages``.
+    :param deskew: ``deskew``.
+    :param optimize: ``optimize`` (0–3).
+    :param jobs: ``jobs`` ; None = un par cœur (défaut ocrmypdf).
+    :param pages: ``pages`` (ex. ``"1-3,7"``) ; None = toutes.
+    :param tesseract_timeout: ``tesseract_timeout`` (0 = aucune page OCRisée).
+    :return: Arguments nommés de ``ocrmypdf.ocr(input_file, output_file, **kwargs)``.
+    """
+    kwargs: dict = {"output_type": "pdf", "progress_bar": False}
+    if rotate:
+        kwargs["rotate_pages"] = True
+    if deskew:
+        kwargs["deskew"] = True
+    if optimize is not None:
+        kwargs["optimize"] = int(optimize)
+    if jobs:
+        kwargs["jobs"] = int(jobs)
+    if pages:
+        kwargs["pages"] = pages
+    if tesseract_timeout is not None:
+        kwargs["tesseract_timeout"] = tesseract_timeout
+    if lang:
+        kwargs["language"] = lang.split("+")
+    return kwargs
+
+
 def requeue_running(running_dir: str, queue_dir: str) -> int:
     """
     Déplace tous les jobs en état RUNNING depuis ``running_dir`` vers ``queue_dir``.
@@ -92,3 +171,25 @@ def requeue_running(running_dir: str, queue_dir: str) -> int:
             pass
     return count
 
+
+def notify_callback(url: str, payload: dict, timeout: float = 5.0) -> bool:
+    """
+    Notifie la fin d'un job en POSTant son statut JSON sur ``url`` (best-effort).
+    Un échec n'est pas bloquant : l'orchestrateur retombe sur le polling.
+
+    :param url: URL de callback fournie à la soumission (``callbackUrl``).
+    :param payload: Statut du job (contenu du fichier de métadonnées).
+    :param timeout: Délai maximal de la requête en secondes.
+    :return: True si l'orchestrateur a accepté la notification (2xx).
+    """
+    req = urllib.request.Request(
+        url,
+        data=json.dumps(payload, ensure_ascii=False).encode("utf-8"),
+        headers={"Content-Type": "application/json"},
+        method="POST",
+    )
+    try:
+        with urllib.request.urlopen(req, timeout=timeout) as resp:
+            return 200 <= resp.status < 300
+    except Exception:
+        return False
@@ -0,0 +1,101 @@
+"""
+Budget CPU du service OCR (``OCR_CPU_SCHEDULER``, ``OCR_CPU_BUDGET``).
+
+Sans budget, chaque ocrmypdf lance un worker par cœur et Tesseract ouvre
+ses propres threads OpenMP dans chacun : avec ``SERVICE_CONCURRENCY=2`` sur
+16 cœurs, environ 64 threads se disputent la machine. Le budget répartit les
+cœurs disponibles entre les jobs OCR en cours du service :
+
+- à son démarrage, un job reçoit ``budget // n`` cœurs, où ``n`` compte les
+  jobs en cours plus ceux qui vont démarrer (file non vide, slots libres),
+  dans la limite des cœurs encore libres moins un cœur réservé à chaque
+  autre job possible (``max_jobs``) : la somme des allocations ne dépasse
+  jamais le budget, tant qu'il compte au moins ``max_jobs`` cœurs ;
+- ces cœurs deviennent ``ocrmypdf --jobs`` et ``OMP_THREAD_LIMIT`` (threads
+  Tesseract par page) : une page par cœur, ou plusieurs threads par page
+  quand le document a moins de pages que de cœurs ;
+- l'allocation d'un processus ocrmypdf ne peut plus changer une fois lancé :
+  le rééquilibrage se fait aux démarrages et fins de jobs (de tranches avec
+  ``OCR_SHARD_PAGES``, d'où une granularité fine sur les livres longs).
+"""
+import os
+import threading
+from typing import Dict, Optional, Tuple
+
+
+def available_cores() -> int:
+    """
+    Cœurs utilisables par le service : quota cgroup v2 (``cpu.max``, limite
+    ``cpus`` de Docker) s'il existe, sinon affinité CPU du processus.
+    """
+    try:
+        cores = len(os.sched_getaffinity(0))
+    except (AttributeError, OSError):
+        cores = os.cpu_count() or 1
+    try:
+        with open("/sys/fs/cgroup/cpu.max", encoding="utf-8") as f:
+            quota, period = f.read().split()[:2]
+        if quota != "max":
+            cores = min(cores, max(1, int(int(quota) / int(period))))
+    except (OSError, ValueError):
+        pass
+    return max(1, cores)
+
+
+def split_cores(cores: int, n_pages: Optional[int] = None) -> Tuple[int, int]:
+    """
+    Répartit une allocation entre pages parallèles et threads Tesseract.
+
+    :param cores: Cœurs alloués au job.
+    :param n_pages: Nombre de pages du document, s'il est connu.
+    :return: ``(jobs, threads)`` : ``ocrmypdf --jobs`` et ``OMP_THREAD_LIMIT``.
+    """
+    cores = max(1, cores)
+    if not n_pages or n_pages >= cores:
+        return cores, 1
+    return n_pages, max(1, cores // n_pages)
+
+
+class CpuBudget:
+    """
+    Allocations de cœurs par job en cours.
+
+    :param total: Cœurs du budget.
+    :param max_jobs: Jobs OCR simultanés au plus (``SERVICE_CONCURRENCY``).
+    """
+
+    def __init__(self, total: int, max_jobs: int = 1):
+        self.total = max(1, total)
+        self.max_jobs = max(1, max_jobs)
+        self._lock = threading.Lock()
+        self._active: Dict[str, int] = {}
+
+    def acquire(self, job_id: str, expected_jobs: int = 1) -> int:
+        """
+        Alloue les cœurs d'un job qui démarre.
+
+        :param job_id: Identifiant du job.
+        :param expected_jobs: Jobs attendus en parallèle, celui-ci compris
+                              (en cours + sur le point de démarrer).
+        :return: Nombre de cœurs alloués (au moins 1).
+        """
+        with self._lock:
+            self._active.pop(job_id, None)
+            slots = max(len(self._active) + 1, expected_jobs)
+            free = self.total - sum(self._active.values())
+            # Un cœur gardé pour chaque autre job qui pourrait démarrer avant la fin de celui-ci
+            reserve = max(0, self.max_jobs - len(self._active) - 1)
+            cores = max(1, min(self.total // slots, free - reserve))
+            self._active[job_id] = cores
+            return cores
+
+    def release(self, job_id: str) -> None:
+        """Libère l'allocation d'un job terminé."""
+        with self._lock:
+            self._active.pop(job_id, None)
+
+    def stats(self) -> dict:
+        """Budget, cœurs alloués et allocation par job en cours."""
+        with self._lock:
+            active = dict(self._active)
+        return {"budget": self.total, "allocated": sum(active.values()), "jobs": active}
@@ -0,0 +1,277 @@
+"""
+File d'attente des jobs du service (``QUEUE_BACKEND``).
+
+Le fichier de métadonnées ``<jobId>.json`` reste la source de vérité de l'état
+d'un job (``queue/`` -> ``running/`` -> ``done/`` | ``error/``) ; le backend
+décide seulement de l'ordre de réclamation :
+
+- ``dir`` : parcours de ``queue/`` à chaque réclamation (O(n)), trié par
+  priorité décroissante puis date de soumission. Métadonnées lues une fois
+  puis mises en cache (nom + mtime), cache limité aux fichiers vus au dernier
+  parcours. Convient aux files peu profondes.
+- ``sqlite`` : index SQLite en mode WAL (``priority``, ``enqueued_at``,
+  ``state``) ; réclamation O(log n) dans une transaction ``BEGIN IMMEDIATE``,
+  sûre entre threads et entre processus. La base doit être sur un disque
+  local (le WAL ne fonctionne pas sur un partage réseau).
+
+Dans les deux cas, la réclamation se termine par ``os.replace`` de
+``queue/`` vers ``running/`` : un seul réclamant peut réussir.
+"""
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+from app.utils import atomic_write_json, ensure_dir, read_json
+
+
+class DirQueue:
+    """
+    File d'attente sur répertoire.
+
+    :param queue_dir: Dossier des jobs en attente.
+    :param running_dir: Dossier des jobs réclamés.
+    """
+
+    backend = "dir"
+
+    def __init__(self, queue_dir: str, running_dir: str):
+        self.queue_dir = queue_dir
+        self.running_dir = running_dir
+        self._lock = threading.Lock()
+        self._keys: Dict[str, Tuple[int, Tuple[int, float, str]]] = {}
+
+    def _paths(self, job_id: str) -> Tuple[str, str]:
+        return (os.path.join(self.queue_dir, f"{job_id}.json"),
+                os.path.join(self.running_dir, f"{job_id}.json"))
+
+    def put(self, job_id: str, meta: dict, priority: int = 0) -> bool:
+        """
+        Met un job en file (``priority`` et ``enqueuedAt`` ajoutés aux métadonnées).
+
+        :param job_id: Identifiant du job.
+        :param meta: Métadonnées initiales du job.
+        :param priority: Priorité (la plus haute est réclamée d'abord).
+        :return: False si le job est déjà en file ou en cours.
+        """
+        ensure_dir(self.queue_dir)
+        ensure_dir(self.running_dir)
+        queued, running = self._paths(job_id)
+        if os.path.exists(queued) or os.path.exists(running):
+            return False
+        meta = dict(meta, priority=priority, enqueuedAt=time.time())
+        atomic_write_json(queued, meta)
+        self._index(job_id, meta)
+        return True
+
+    def _index(self, job_id: str, meta: dict) -> None:
+        """Hook des backends indexés (aucun index pour ``dir``)."""
+
+    def _sort_key(self, entry: os.DirEntry) -> Tuple[int, float, str]:
+        mtime = entry.stat().st_mtime_ns
+        with self._lock:
+            cached = self._keys.get(entry.name)
+        if cached is not None and cached[0] == mtime:
+            return cached[1]
+        data = read_json(entry.path) or {}
+        key = (-int(data.get("priority") or 0), float(data.get("enqueuedAt") or mtime / 1e9), entry.name)
+        with self._lock:
+            self._keys[entry.name] = (mtime, key)
+        return key
+
+    def claim(self) -> Optional[str]:
+        """
+        Réclame le job le plus prioritaire (puis le plus ancien).
+
+        :return: Chemin du fichier de métadonnées dans ``running_dir``, ou None.
+        """
+        ensure_dir(self.queue_dir)
+        ensure_dir(self.running_dir)
+        candidates = []
+        with os.scandir(self.queue_dir) as it:
+            for entry in it:
+                if not entry.name.endswith(".json"):
+                    continue
+                try:
+                    candidates.append((self._sort_key(entry), entry.name))
+                except OSError:
+                    continue  # réclamé entre-temps
+        # Clés des jobs sortis de la file par un autre processus : oubliées
+        present = {name for _, name in candidates}
+        with self._lock:
+            for name in [n for n in self._keys if n not in present]:
+                del self._keys[name]
+        for _, name in sorted(candidates):
+            dst = os.path.join(self.running_dir, name)
+            try:
+                os.replace(os.path.join(self.queue_dir, name), dst)
+            except OSError:
+                continue
+            with self._lock:
+                self._keys.pop(name, None)
+            return dst
+        return None
+
+    def cancel(self, job_id: str) -> bool:
+        """
+        Retire un job encore en file. Sûr face à une réclamation concurrente :
+        seul l'un des deux (suppression ou ``os.replace`` vers ``running/``) réussit.
+
+        :return: False si le job n'était plus en file (réclamé ou inconnu).
+        """
+        queued, _ = self._paths(job_id)
+        try:
+            os.remove(queued)
+        except FileNotFoundError:
+            return False
+        with self._lock:
+            self._keys.pop(f"{job_id}.json", None)
+        return True
+
+    def release(self, job_id: str) -> None:
+        """Le job a quitté ``running/`` (DONE ou ERROR)."""
+
+    def recover(self) -> int:
+        """
+        Au démarrage, après la remise en file des jobs RUNNING : resynchronise
+        l'index avec ``queue/``.
+
+        :return: Nombre de jobs en file.
+        """
+        return self.depth()
+
+    def depth(self) -> int:
+        """Nombre de jobs en attente."""
+        if not os.path.isdir(self.queue_dir):
+            return 0
+        return sum(1 for fn in os.listdir(self.queue_dir) if fn.endswith(".json"))
+
+
+class SqliteQueue(DirQueue):
+    """
+    File d'attente indexée par SQLite (WAL). Les fichiers de métadonnées
+    restent dans ``queue_dir``/``running_dir``.
+
+    :param queue_dir: Dossier des jobs en attente.
+    :param running_dir: Dossier des jobs réclamés.
+    :param db_path: Chemin de la base SQLite (disque local).
+    """
+
+    backend = "sqlite"
+
+    _SCHEMA = """
+        CREATE TABLE IF NOT EXISTS jobs (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            job_id TEXT NOT NULL UNIQUE,
+            priority INTEGER NOT NULL DEFAULT 0,
+            enqueued_at REAL NOT NULL,
+            state TEXT NOT NULL DEFAULT 'queued'
+        );
+        CREATE INDEX IF NOT EXISTS jobs_claim ON jobs (state, priority DESC, enqueued_at, seq);
+    """
+
+    def __init__(self, queue_dir: str, running_dir: str, db_path: str):
+        super().__init__(queue_dir, running_dir)
+        self.db_path = db_path
+        self._local = threading.local()
+        conn = self._conn()
+        conn.executescript(self._SCHEMA)
+
+    def _conn(self) -> sqlite3.Connection:
+        # Une connexion par thread ; transactions explicites (isolation_level=None)
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            ensure_dir(os.path.dirname(self.db_path) or ".")
+            conn = sqlite3.connect(self.db_path, timeout=30.0, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _index(self, job_id: str, meta: dict) -> None:
+        self._conn().execute(
+            "INSERT INTO jobs (job_id, priority, enqueued_at, state) VALUES (?, ?, ?, 'queued') "
+            "ON CONFLICT(job_id) DO UPDATE SET priority=excluded.priority, "
+            "enqueued_at=excluded.enqueued_at, state='queued'",
+            (job_id, int(meta.get("priority") or 0), float(meta.get("enqueuedAt") or time.time())),
+        )
+
+    def claim(self) -> Optional[str]:
+        conn = self._conn()
+        while True:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = conn.execute(
+                    "SELECT seq, job_id FROM jobs WHERE state = 'queued' "
+                    "ORDER BY priority DESC, enqueued_at, seq LIMIT 1"
+                ).fetchone()
+                if row is not None:
+                    conn.execute("UPDATE jobs SET state = 'running' WHERE seq = ?", (row[0],))
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+            if row is None:
+                return None
+            src, dst = self._paths(row[1])
+            try:
+                ensure_dir(self.running_dir)
+                os.replace(src, dst)
+                return dst
+            except OSError:
+                # Fichier disparu (job supprimé à la main) : entrée orpheline
+                conn.execute("DELETE FROM jobs WHERE seq = ?", (row[0],))
+
+    def cancel(self, job_id: str) -> bool:
+        cancelled = super().cancel(job_id)
+        if cancelled:
+            self._conn().execute("DELETE FROM jobs WHERE job_id = ? AND state = 'queued'", (job_id,))
+        return cancelled
+
+    def release(self, job_id: str) -> None:
+        self._conn().execute("DELETE FROM jobs WHERE job_id = ?", (job_id,))
+
+    def recover(self) -> int:
+        """
+        Réaligne l'index sur ``queue/`` : jobs RUNNING remis en file (mêmes
+        priorité et rang), fichiers absents de l'index ajoutés (changement de
+        backend), entrées sans fichier supprimées.
+        """
+        ensure_dir(self.queue_dir)
+        conn = self._conn()
+        on_disk = {fn[:-5] for fn in os.listdir(self.queue_dir) if fn.endswith(".json")}
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute("UPDATE jobs SET state = 'queued' WHERE state = 'running'")
+            indexed = {r[0] for r in conn.execute("SELECT job_id FROM jobs")}
+            for job_id in indexed - on_disk:
+                conn.execute("DELETE FROM jobs WHERE job_id = ?", (job_id,))
+            for job_id in sorted(on_disk - indexed):
+                data = read_json(self._paths(job_id)[0]) or {}
+                conn.execute(
+                    "INSERT INTO jobs (job_id, priority, enqueued_at) VALUES (?, ?, ?)",
+                    (job_id, int(data.get("priority") or 0), float(data.get("enqueuedAt") or 0.0)),
+                )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return len(on_disk)
+
+    def depth(self) -> int:
+        return self._conn().execute("SELECT COUNT(*) FROM jobs WHERE state = 'queued'").fetchone()[0]
+
+
+def make_queue(backend: str, queue_dir: str, running_dir: str, db_path: str) -> DirQueue:
+    """
+    Construit la file d'attente du service.
+
+    :param backend: ``dir`` ou ``sqlite``.
+    :raises ValueError: Backend inconnu.
+    """
+    if backend == "dir":
+        return DirQueue(queue_dir, running_dir)
+    if backend == "sqlite":
+        return SqliteQueue(queue_dir, running_dir, db_path)
+    raise ValueError(f"QUEUE_BACKEND inconnu : {backend}")
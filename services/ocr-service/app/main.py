@@ -1,20 +1,68 @@
 """
 Service FastAPI OCR (ocrmypdf + tesseract -> final.pdf).
 """
+import json
 import os
-import subprocess
+import shutil
 import threading
 import time
+from typing import Callable, List, Optional
 
 from fastapi import FastAPI, HTTPException
 from pydantic import BaseModel
 
-from app.core import get_tool_versions, build_ocrmypdf_cmd, requeue_running
+from app.core import (get_tool_versions, build_ocrmypdf_cmd, build_ocrmypdf_kwargs, requeue_running,
+                      notify_callback, stream_process)
+from app.cpu_budget import CpuBudget, available_cores, split_cores
+from app.job_queue import make_queue
+from app.ocr_pool import make_pool
+from app.page_cache import PageCache, assemble, extract_pages, page_keys
+from app.page_classify import classify_pages, page_ranges
+from app.progress import PageProgress
+from app.registry import JobRegistry
+from app.shards import (SHARDS_DIRNAME, FINALIZE_LOCK, shard_id, page_count, plan_shards,
+                        split_pdf, merge_pdfs)
 from app.utils import ensure_dir, atomic_write_json, read_json, now_iso
 
 DATA_DIR = os.environ.get("DATA_DIR", "/data")
 SERVICE_CONCURRENCY = int(os.environ.get("SERVICE_CONCURRENCY", "1"))
 
+# File d'attente : "dir" (parcours de queue/) ou "sqlite" (index WAL, disque local)
+QUEUE_BACKEND = os.environ.get("QUEUE_BACKEND", "dir").lower()
+QUEUE_DB_PATH = os.environ.get("QUEUE_DB_PATH", os.path.join(DATA_DIR, "ocr", "queue.db"))
+
+# Registre en mémoire : jobs terminés (done/error) gardés, les moins récents oubliés (0 = sans limite)
+REGISTRY_MAX_FINISHED = int(os.environ.get("REGISTRY_MAX_FINISHED", "10000"))
+
+# Sharding : livres longs découpés en tranches de pages, OCRisées comme des sous-jobs (0 = désactivé)
+OCR_SHARD_PAGES = int(os.environ.get("OCR_SHARD_PAGES", "0"))
+OCR_SHARD_MIN_PAGES = int(os.environ.get("OCR_SHARD_MIN_PAGES", "100"))
+# Rafraîchissement du heartbeat d'un parent dont des tranches attendent en file
+OCR_SHARD_HEARTBEAT_S = float(os.environ.get("OCR_SHARD_HEARTBEAT_S", "30"))
+
+# Budget CPU : cœurs répartis entre les jobs en cours (ocrmypdf --jobs, OMP_THREAD_LIMIT)
+OCR_CPU_SCHEDULER = os.environ.get("OCR_CPU_SCHEDULER", "true").lower() in ("true", "1", "yes")
+OCR_CPU_BUDGET = int(os.environ.get("OCR_CPU_BUDGET", "0"))  # 0 = cœurs disponibles
+
+CPU = CpuBudget(OCR_CPU_BUDGET or available_cores(), max_jobs=SERVICE_CONCURRENCY)
+
+# Cache OCR par page (clé : contenu de la page + profil OCR) ; vide = désactivé
+OCR_CACHE_DIR = os.environ.get("OCR_CACHE_DIR", "")
+OCR_CACHE_MAX_MB = int(os.environ.get("OCR_CACHE_MAX_MB", "2048"))
+
+# Pré-classification : pages blanches (encrage) ou sans texte (contours) exclues de l'OCR
+OCR_SKIP_TEXTLESS = os.environ.get("OCR_SKIP_TEXTLESS", "false").lower() in ("true", "1", "yes")
+OCR_SKIP_INK_RATIO = float(os.environ.get("OCR_SKIP_INK_RATIO", "0.002"))
+OCR_SKIP_EDGE_RATIO = float(os.environ.get("OCR_SKIP_EDGE_RATIO", "0"))
+
+# Progression : sortie d'ocrmypdf lue en streaming (heartbeat, pagesDone/pagesTotal/ETA)
+OCR_PROGRESS = os.environ.get("OCR_PROGRESS", "true").lower() in ("true", "1", "yes")
+OCR_PROGRESS_INTERVAL_S = float(os.environ.get("OCR_PROGRESS_INTERVAL_S", "2"))
+
+# Exécution d'ocrmypdf : "cli" (un processus par appel) ou "api" (API Python, processus persistants)
+OCR_EXECUTOR = os.environ.get("OCR_EXECUTOR", "cli").lower()
+OCR_WORKER_MAX_JOBS = int(os.environ.get("OCR_WORKER_MAX_JOBS", "50"))
+
 QUEUE_DIR = os.path.join(DATA_DIR, "ocr", "queue")
 RUNNING_DIR = os.path.join(DATA_DIR, "ocr", "running")
 DONE_DIR = os.path.join(DATA_DIR, "ocr", "done")
@@ -26,7 +74,14 @@ app = FastAPI(title="ocr-service")
 @app.get("/info")
 def info():
     """Retourne les métadonnées du service et les versions des outils."""
-    return {"service": "ocr-service", "versions": get_tool_versions()}
+    return {
+        "service": "ocr-service",
+        "versions": get_tool_versions(),
+        "sharding": {"shardPages": OCR_SHARD_PAGES, "minPages": OCR_SHARD_MIN_PAGES},
+        "cpu": dict(CPU.stats(), enabled=OCR_CPU_SCHEDULER),
+        "cache": page_cache().stats() if page_cache() else None,
+        "executor": dict(_pool.stats(), mode="api") if _pool is not None else {"mode": "cli"},
+    }
 
 
 class OcrSubmit(BaseModel):
@@ -38,53 +93,129 @@ class OcrSubmit(BaseModel):
     rotatePages: bool = True
     deskew: bool = True
     optimize: int = 1
+    callbackUrl: Optional[str] = None
+    priority: int = 0
 
 
 @app.post("/jobs/ocr", status_code=202)
 def submit(req: OcrSubmit):
-    """Soumet un job OCR dans la file d'attente."""
-    ensure_dir(QUEUE_DIR)
-    ensure_dir(RUNNING_DIR)
+    """Soumet un job OCR dans la file d'attente (``priority`` : la plus haute d'abord)."""
     ensure_dir(DONE_DIR)
     ensure_dir(ERROR_DIR)
-    job_file = os.path.join(QUEUE_DIR, f"{req.jobId}.json")
-    running_file = os.path.join(RUNNING_DIR, f"{req.jobId}.json")
-    if os.path.exists(job_file) or os.path.exists(running_file):
-        return {"jobId": req.jobId, "statusUrl": f"/jobs/{req.jobId}"}
-    atomic_write_json(job_file, req.model_dump() | {"state": "QUEUED", "updatedAt": now_iso()})
+    meta = req.model_dump(exclude={"priority"}) | {"state": "QUEUED", "updatedAt": now_iso()}
+    job_queue().put(req.jobId, meta, priority=req.priority)
+    job_registry().record(os.path.join(QUEUE_DIR, f"{req.jobId}.json"))
     return {"jobId": req.jobId, "statusUrl": f"/jobs/{req.jobId}"}
 
 
+class StatusBatch(BaseModel):
+    """Corps de la requête POST /jobs/status."""
+    ids: List[str]
+
+
+def find_job(job_id: str) -> Optional[dict]:
+    """Retourne les métadonnées d'un job via le registre en mémoire, ou None."""
+    return job_registry().get(job_id)
+
+
+def batch_status(ids: List[str]) -> dict:
+    """
+    États de plusieurs jobs en une réponse.
+
+    :param ids: Identifiants des jobs (doublons et vides ignorés).
+    :return: ``{"jobs": {jobId: état}, "missing": [jobId inconnus]}``.
+    """
+    jobs, missing = {}, []
+    for job_id in dict.fromkeys(i for i in ids if i):
+        data = find_job(job_id)
+        if data:
+            jobs[job_id] = data
+        else:
+            missing.append(job_id)
+    return {"jobs": jobs, "missing": missing}
+
+
+@app.get("/jobs")
+def status_many(ids: str = ""):
+    """Retourne l'état de plusieurs jobs : ``GET /jobs?ids=a,b,c``."""
+    return batch_status(ids.split(","))
+
+
+@app.post("/jobs/status")
+def status_many_post(req: StatusBatch):
+    """Variante POST de ``GET /jobs?ids=...`` (listes longues)."""
+    return batch_status(req.ids)
+
+
 @app.get("/jobs/{job_id}")
 def status(job_id: str):
     """Retourne l'état courant d'un job OCR."""
-    for d in [QUEUE_DIR, RUNNING_DIR, DONE_DIR, ERROR_DIR]:
-        p = os.path.join(d, f"{job_id}.json")
-        data = read_json(p)
-        if data:
-            return data
+    data = find_job(job_id)
+    if data:
+        return data
     raise HTTPException(status_code=404, detail="job not found")
 
 
+_job_queue = None
+
+
+def job_queue():
+    """File d'attente du service (créée au premier usage selon ``QUEUE_BACKEND``)."""
+    global _job_queue
+    if _job_queue is None:
+        _job_queue = make_queue(QUEUE_BACKEND, QUEUE_DIR, RUNNING_DIR, QUEUE_DB_PATH)
+    return _job_queue
+
+
+_registry = None
+
+
+def job_registry() -> JobRegistry:
+    """Registre en mémoire des jobs (créé au premier usage, reconstruit au démarrage)."""
+    global _registry
+    if _registry is None:
+        _registry = JobRegistry({"queue": QUEUE_DIR, "running": RUNNING_DIR,
+                                 "done": DONE_DIR, "error": ERROR_DIR},
+                                max_finished=REGISTRY_MAX_FINISHED)
+    return _registry
+
+
+_page_cache = None
+
+# Versions des outils relevées au démarrage (profil du cache OCR par page)
+_tool_versions: dict = {}
+
+
+def page_cache() -> Optional[PageCache]:
+    """Cache OCR par page (créé au premier usage), ou None si ``OCR_CACHE_DIR`` est vide."""
+    global _page_cache
+    if _page_cache is None and OCR_CACHE_DIR:
+        _page_cache = PageCache(OCR_CACHE_DIR, OCR_CACHE_MAX_MB * 1024 * 1024)
+    return _page_cache
+
+
+def cache_profile(data: dict) -> str:
+    """Profil OCR d'un job tel qu'il entre dans les clés du cache par page."""
+    profile = {
+        "lang": data.get("lang", "fra+eng"),
+        "rotatePages": bool(data.get("rotatePages", True)),
+        "deskew": bool(data.get("deskew", True)),
+        "optimize": int(data.get("optimize", 1)),
+        "versions": _tool_versions,
+    }
+    return json.dumps(profile, sort_keys=True)
+
+
 def claim_one():
     """
-    Réclame atomiquement un job depuis la file d'attente.
+    Réclame atomiquement le prochain job de la file (priorité puis ordre de soumission).
 
     :return: Chemin du fichier de métadonnées dans RUNNING_DIR, ou None.
     """
-    ensure_dir(QUEUE_DIR)
-    ensure_dir(RUNNING_DIR)
-    for fn in os.listdir(QUEUE_DIR):
-        if not fn.endswith(".json"):
-            continue
-        src = os.path.join(QUEUE_DIR, fn)
-        dst = os.path.join(RUNNING_DIR, fn)
-        try:
-            os.replace(src, dst)
-            return dst
-        except Exception:
-            continue
-    return None
+    path = job_queue().claim()
+    if path:
+        job_registry().record(path)
+    return path
 
 
 def update_state(job_meta_path: str, patch: dict):
@@ -98,13 +229,379 @@ def update_state(job_meta_path: str, patch: dict):
     data.update(patch)
     data["updatedAt"] = now_iso()
     atomic_write_json(job_meta_path, data)
+    job_registry().record(job_meta_path, data)
+
+
+# Valeur de retour de run_job : job découpé, en attente de ses tranches dans RUNNING_DIR
+SHARDED = "SHARDED"
+
+# Paramètres OCR recopiés du parent vers ses tranches
+_OCR_PROFILE = ("lang", "rotatePages", "deskew", "optimize")
+
+_shard_lock = threading.Lock()
+
+
+def shard_plan(data: dict) -> list:
+    """
+    Plages de pages d'un job à découper, ou liste vide (job traité d'un bloc).
+
+    :param data: Métadonnées du job.
+    :return: Plages ``(première, dernière)`` 1-based, au moins deux.
+    """
+    if OCR_SHARD_PAGES <= 0 or data.get("parentId"):
+        return []
+    try:
+        n_pages = page_count(data["rawPdfPath"])
+    except Exception:
+        return []  # illisible pour pikepdf : ocrmypdf rapportera l'erreur
+    if n_pages < max(2, OCR_SHARD_MIN_PAGES):
+        return []
+    ranges = plan_shards(n_pages, OCR_SHARD_PAGES)
+    return ranges if len(ranges) > 1 else []
+
+
+def dispatch_shards(job_meta_path: str, data: dict, ranges: list) -> str:
+    """
+    Découpe raw.pdf et met les tranches en file comme sous-jobs.
+
+    Nouvelle tentative du parent : les tranches DONE (mêmes paramètres OCR,
+    ``final.pdf`` présent) sont conservées, celles en file ou en cours sont
+    laissées telles quelles, les autres sont remises en file. Un ``raw.pdf``
+    régénéré entre-temps (taille ou mtime différents) ou une taille de tranche
+    modifiée invalide tout le découpage : les tranches de l'ancien plan encore
+    en file sont annulées, puis ``shards/`` est vidé. Tant qu'une tranche de
+    l'ancien plan est en cours, le parent échoue (``RuntimeError``) sans rien
+    supprimer ; l'orchestrateur le relancera.
+
+    :param job_meta_path: Fichier de métadonnées du parent (dans RUNNING_DIR).
+    :param data: Métadonnées du parent.
+    :param ranges: Plages de pages (``shard_plan``).
+    :return: ``SHARDED``.
+    :raises RuntimeError: Tranches d'un plan précédent encore en cours.
+    """
+    job_id = data["jobId"]
+    raw_pdf = data["rawPdfPath"]
+    job_dir = os.path.join(data["workDir"], job_id)
+    shards_dir = os.path.join(job_dir, SHARDS_DIRNAME)
+    plan_path = os.path.join(shards_dir, "plan.json")
+
+    st = os.stat(raw_pdf)
+    plan = {"rawSize": st.st_size, "rawMtimeNs": st.st_mtime_ns, "ranges": [list(r) for r in ranges]}
+    previous = read_json(plan_path)
+    if previous != plan:
+        old_ids = [shard_id(job_id, i) for i in range(1, len((previous or {}).get("ranges", [])) + 1)]
+        for sid in old_ids:
+            job_queue().cancel(sid)
+        running = [sid for sid in old_ids if os.path.exists(os.path.join(RUNNING_DIR, f"{sid}.json"))]
+        if running:
+            raise RuntimeError(f"{len(running)} shard(s) of the previous plan still running")
+        shutil.rmtree(shards_dir, ignore_errors=True)
+    ensure_dir(shards_dir)
+    try:
+        os.remove(os.path.join(shards_dir, FINALIZE_LOCK))
+    except FileNotFoundError:
+        pass
+
+    ids = [shard_id(job_id, i) for i in range(1, len(ranges) + 1)]
+    split_pdf(raw_pdf, ranges, [os.path.join(shards_dir, sid, "raw.pdf") for sid in ids])
+    atomic_write_json(plan_path, plan)
+
+    profile = {k: data[k] for k in _OCR_PROFILE if k in data}
+    shards = []
+    for index, (sid, (first, last)) in enumerate(zip(ids, ranges), start=1):
+        prev = find_job(sid) or {}
+        reusable = (prev.get("state") == "DONE"
+                    and all(prev.get(k) == v for k, v in profile.items())
+                    and os.path.exists(os.path.join(shards_dir, sid, "final.pdf")))
+        if not reusable:
+            for stale_dir in (DONE_DIR, ERROR_DIR):
+                try:
+                    os.remove(os.path.join(stale_dir, f"{sid}.json"))
+                except FileNotFoundError:
+                    pass
+            meta = dict(profile, jobId=sid, parentId=job_id, parentDir=job_dir, shardIndex=index,
+                        pages=[first, last], rawPdfPath=os.path.join(shards_dir, sid, "raw.pdf"),
+                        workDir=shards_dir, state="QUEUED", updatedAt=now_iso())
+            if job_queue().put(sid, meta, priority=int(data.get("priority") or 0)):
+                job_registry().record(os.path.join(QUEUE_DIR, f"{sid}.json"))
+        shards.append({"index": index, "jobId": sid, "pages": [first, last],
+                       "state": "DONE" if reusable else (find_job(sid) or {}).get("state", "QUEUED")})
+
+    done = sum(1 for s in shards if s["state"] == "DONE")
+    update_state(job_meta_path, {
+        "message": f"ocr sharded {done}/{len(shards)}",
+        "shards": shards,
+        "shardsDone": done,
+        "shardsTotal": len(shards),
+    })
+    return SHARDED
+
+
+def advance_parent(parent_id: str) -> None:
+    """
+    Fait avancer un job découpé après un changement d'état de l'une de ses
+    tranches : progression par tranche dans l'état du parent, puis, une fois
+    toutes les tranches terminées, assemblage de ``final.pdf`` (ou échec du
+    parent dès qu'une tranche est en ERROR), déplacement vers DONE_DIR ou
+    ERROR_DIR et notification.
+
+    Le verrou ``shards/.finalize`` (création exclusive) garantit qu'un seul
+    worker, toutes machines confondues, termine le parent.
+
+    :param parent_id: Identifiant du job parent.
+    """
+    parent_path = os.path.join(RUNNING_DIR, f"{parent_id}.json")
+    with _shard_lock:
+        parent = read_json(parent_path)
+        if not parent or not parent.get("shards"):
+            return  # déjà terminé, ou relancé sans découpage
+        job_dir = os.path.join(parent["workDir"], parent_id)
+        shards_dir = os.path.join(job_dir, SHARDS_DIRNAME)
+        lock_path = os.path.join(shards_dir, FINALIZE_LOCK)
+        if os.path.exists(lock_path):
+            return
+
+        shards = [dict(s, state=(find_job(s["jobId"]) or {}).get("state", "QUEUED"))
+                  for s in parent["shards"]]
+        done = sum(1 for s in shards if s["state"] == "DONE")
+        failed = [s for s in shards if s["state"] == "ERROR"]
+        with open(os.path.join(job_dir, "ocr.heartbeat"), "w", encoding="utf-8") as hb:
+            hb.write(f"{now_iso()} shards {done}/{len(shards)}\n")
+        progress = {"shards": shards, "shardsDone": done, "shardsTotal": len(shards)}
+        if not failed and done < len(shards):
+            update_state(parent_path, dict(progress, message=f"ocr sharded {done}/{len(shards)}"))
+            return
+        try:
+            fd = os.open(lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        except FileExistsError:
+            return
+        os.close(fd)
+
+    final_tmp = os.path.join(job_dir, "final.tmp.pdf")
+    final_pdf = os.path.join(job_dir, "final.pdf")
+    try:
+        if failed:
+            detail = (find_job(failed[0]["jobId"]) or {}).get("message", "")
+            raise RuntimeError(f"shard {failed[0]['index']} failed: {detail}".rstrip(": "))
+        n_pages = merge_pdfs([os.path.join(shards_dir, s["jobId"], "final.pdf") for s in shards],
+                             final_tmp)
+        os.replace(final_tmp, final_pdf)
+        update_state(parent_path, dict(progress, state="DONE", message="final.pdf ready",
+                                       pages=n_pages, artifacts={"finalPdf": final_pdf}))
+        shutil.rmtree(shards_dir, ignore_errors=True)
+        dst = os.path.join(DONE_DIR, f"{parent_id}.json")
+    except Exception as e:
+        update_state(parent_path, dict(progress, state="ERROR", message=str(e),
+                                       error={"type": type(e).__name__, "detail": str(e)}))
+        dst = os.path.join(ERROR_DIR, f"{parent_id}.json")
+    os.replace(parent_path, dst)
+    job_registry().record(dst)
+    job_queue().release(parent_id)
+    notify_completion(dst)
+
+
+def refresh_sharded_heartbeats() -> int:
+    """
+    Rafraîchit ``ocr.heartbeat`` des parents découpés (dans RUNNING_DIR) dont
+    au moins une tranche attend encore en file : sans cela, des tranches
+    bloquées derrière d'autres jobs au-delà de ``JOB_TIMEOUT_SECONDS`` feraient
+    passer le parent pour périmé côté orchestrateur. Une tranche en cours
+    rafraîchit elle-même le heartbeat du parent ; une tranche bloquée le
+    laisse donc toujours périmer.
+
+    :return: Nombre de heartbeats rafraîchis.
+    """
+    try:
+        names = [fn for fn in os.listdir(RUNNING_DIR) if fn.endswith(".json")]
+    except FileNotFoundError:
+        return 0
+    count = 0
+    for fn in names:
+        parent = read_json(os.path.join(RUNNING_DIR, fn))
+        if not parent or not parent.get("shards") or parent.get("parentId"):
+            continue
+        states = [(find_job(s["jobId"]) or {}).get("state", "QUEUED") for s in parent["shards"]]
+        queued = sum(1 for st in states if st == "QUEUED")
+        if not queued:
+            continue
+        hb_path = os.path.join(parent["workDir"], parent["jobId"], "ocr.heartbeat")
+        try:
+            with open(hb_path, "w", encoding="utf-8") as hb:
+                hb.write(f"{now_iso()} shards queued {queued}/{len(states)}\n")
+            count += 1
+        except OSError:
+            pass
+    return count
+
+
+def shard_heartbeat_loop(stop_event: threading.Event):
+    """
+    Boucle de ``refresh_sharded_heartbeats`` (toutes les ``OCR_SHARD_HEARTBEAT_S``).
+
+    :param stop_event: Événement de signal d'arrêt.
+    """
+    while not stop_event.wait(OCR_SHARD_HEARTBEAT_S):
+        try:
+            refresh_sharded_heartbeats()
+        except Exception:
+            pass
+
+
+def allocate_cpu(job_id: str, n_pages: Optional[int] = None) -> Optional[dict]:
+    """
+    Alloue les cœurs d'un job OCR qui démarre (``OCR_CPU_SCHEDULER``). Les jobs
+    en file comptent comme jobs à venir, dans la limite de ``SERVICE_CONCURRENCY``.
+    L'appelant libère l'allocation avec ``CPU.release(job_id)``.
+
+    :param job_id: Identifiant du job.
+    :param n_pages: Pages à OCRiser, si connu.
+    :return: ``{"cores", "jobs", "threads", "budget"}``, ou None si le budget est désactivé.
+    """
+    if not OCR_CPU_SCHEDULER:
+        return None
+    expected = min(max(1, SERVICE_CONCURRENCY), 1 + job_queue().depth())
+    cores = CPU.acquire(job_id, expected)
+    jobs, threads = split_cores(cores, n_pages)
+    return {"cores": cores, "jobs": jobs, "threads": threads, "budget": CPU.total}
+
+
+def run_ocrmypdf(job_id: str, data: dict, src: str, dest: str, log,
+                 n_pages: Optional[int] = None, pages: Optional[str] = None,
+                 on_progress: Optional[Callable[[dict], None]] = None,
+                 no_ocr: bool = False) -> Optional[dict]:
+    """
+    Exécute ocrmypdf ``src`` -> ``dest`` avec les paramètres OCR du job et son
+    allocation CPU. La sortie est lue en streaming et copiée dans ``ocr.log`` ;
+    avec ``OCR_PROGRESS``, ``on_progress`` reçoit ``pagesDone``/``pagesTotal``/
+    ``etaSeconds`` au plus toutes les ``OCR_PROGRESS_INTERVAL_S`` secondes, tant
+    qu'ocrmypdf produit de la sortie, puis une dernière fois à la fin. En mode
+    ``OCR_EXECUTOR=api``, le même appel passe par l'API Python dans un processus
+    du pool (``build_ocrmypdf_kwargs``) ; ses messages suivent le même chemin.
+
+    :param job_id: Identifiant du job.
+    :param data: Métadonnées du job (``lang``, ``rotatePages``, ``deskew``, ``optimize``).
+    :param src: PDF à OCRiser.
+    :param dest: PDF de sortie.
+    :param log: Fichier ``ocr.log`` ouvert.
+    :param n_pages: Pages à OCRiser, si connu (répartition pages / threads).
+    :param pages: Sélection ``--pages`` (les autres pages sont recopiées sans OCR).
+    :param on_progress: Rappel de progression (heartbeat, état du job).
+    :param no_ocr: Aucune page OCRisée (``--tesseract-timeout 0``, sans rotation
+                   ni redressement) : pages recopiées, sortie PDF/A d'ocrmypdf.
+    :return: Allocation CPU utilisée, ou None.
+    :raises RuntimeError: En cas d'échec ocrmypdf.
+    """
+    progress = None
+    if on_progress is not None and OCR_PROGRESS:
+        if n_pages is None:
+            try:
+                n_pages = page_count(src)
+            except Exception:
+                pass  # total inconnu : pas d'ETA
+    cpu = allocate_cpu(job_id, n_pages)
+    if on_progress is not None and OCR_PROGRESS:
+        progress = PageProgress(n_pages, cpu["jobs"] if cpu else (os.cpu_count() or 1))
+    last = [time.monotonic()]
+
+    def on_line(line: str):
+        log.write(line)
+        if progress is None:
+            return
+        progress.feed(line)
+        now = time.monotonic()
+        if now - last[0] >= OCR_PROGRESS_INTERVAL_S:
+            last[0] = now
+            log.flush()
+            on_progress(progress.snapshot())
+
+    options = dict(
+        lang=data.get("lang", "fra+eng"),
+        rotate=bool(data.get("rotatePages", True)) and not no_ocr,
+        deskew=bool(data.get("deskew", True)) and not no_ocr,
+        optimize=int(data.get("optimize", 1)),
+        jobs=cpu["jobs"] if cpu else None,
+        pages=pages,
+        tesseract_timeout=0 if no_ocr else None,
+    )
+    try:
+        if _pool is not None:
+            kwargs = build_ocrmypdf_kwargs(**options)
+            log.write(f"API: ocrmypdf.ocr({src}, {dest}, **{kwargs})\n")
+            if cpu:
+                log.write(f"CPU: {cpu}\n")
+            report = _pool.run(src, dest, kwargs, threads=cpu["threads"] if cpu else None,
+                               log_path=os.path.splitext(dest)[0] + ".api.log",
+                               on_line=on_line, verbose=progress is not None)
+            log.write(f"WORKER: pid={report['pid']} calls={report['callsInProcess']} "
+                      f"seconds={report['seconds']}\n")
+            rc = report["exitCode"]
+        else:
+            cmd = build_ocrmypdf_cmd(src, dest, verbose=1 if progress is not None else 0, **options)
+            env = dict(os.environ, OMP_THREAD_LIMIT=str(cpu["threads"])) if cpu else None
+            log.write("CMD: " + " ".join(cmd) + "\n")
+            if cpu:
+                log.write(f"CPU: {cpu}\n")
+            rc = stream_process(cmd, on_line, env=env)
+    finally:
+        CPU.release(job_id)
+    if rc != 0:
+        raise RuntimeError(f"ocrmypdf failed rc={rc}")
+    if progress is not None:
+        on_progress(progress.snapshot(finished=True))
+    return cpu
+
+
+def classify(raw_pdf: str, log) -> list:
+    """
+    Pré-classification des pages (``OCR_SKIP_TEXTLESS``).
+
+    :return: Par page : ``"blank"``, ``"textless"`` ou None (à OCRiser) ; liste
+             vide si la pré-classification est désactivée ou le PDF illisible.
+    """
+    if not OCR_SKIP_TEXTLESS:
+        return []
+    try:
+        return classify_pages(raw_pdf, OCR_SKIP_INK_RATIO, OCR_SKIP_EDGE_RATIO)
+    except Exception as e:
+        log.write(f"SKIP: classification disabled for this job ({e})\n")
+        return []
+
+
+def cache_lookup(raw_pdf: str, data: dict, log, skip=frozenset()) -> tuple:
+    """
+    Clés de cache des pages de ``raw_pdf`` et entrées déjà en cache.
+
+    :param skip: Pages (0-based) exclues de l'OCR, non recherchées.
+    :return: ``(clés, chemins)`` alignés sur les pages (chemin None = page à
+             OCRiser ou exclue), ou ``([], [])`` si le cache est désactivé ou le
+             PDF illisible.
+    """
+    cache = page_cache()
+    if cache is None:
+        return [], []
+    try:
+        keys = page_keys(raw_pdf, cache_profile(data))
+    except Exception as e:
+        log.write(f"CACHE: disabled for this job ({e})\n")
+        return [], []
+    wanted = [i for i in range(len(keys)) if i not in skip]
+    cached = [None] * len(keys)
+    for i, path in zip(wanted, cache.lookup([keys[i] for i in wanted])):
+        cached[i] = path
+    return keys, cached
 
 
 def run_job(job_meta_path: str):
     """
     Exécute un job OCR : ocrmypdf sur raw.pdf -> final.pdf (rename atomique).
+    Avec ``OCR_SHARD_PAGES``, un livre assez long est découpé en tranches
+    (``dispatch_shards``) au lieu d'être OCRisé ici. Avec ``OCR_CACHE_DIR``,
+    seules les pages absentes du cache par page passent dans ocrmypdf ; avec
+    ``OCR_SKIP_TEXTLESS``, les pages sans texte attendu sont recopiées sans OCR.
 
     :param job_meta_path: Chemin du fichier de métadonnées (dans RUNNING_DIR).
+    :return: ``SHARDED`` si le job a été découpé (il reste dans RUNNING_DIR
+             jusqu'à l'assemblage), sinon None.
     :raises RuntimeError: En cas d'échec ocrmypdf.
     """
     data = read_json(job_meta_path)
@@ -113,10 +610,6 @@ def run_job(job_meta_path: str):
     job_id = data["jobId"]
     work_dir = data["workDir"]
     raw_pdf = data["rawPdfPath"]
-    lang = data.get("lang", "fra+eng")
-    rotate_pages = bool(data.get("rotatePages", True))
-    deskew = bool(data.get("deskew", True))
-    optimize = int(data.get("optimize", 1))
 
     job_dir = os.path.join(work_dir, job_id)
     log_path = os.path.join(job_dir, "ocr.log")
@@ -132,29 +625,95 @@ def run_job(job_meta_path: str):
             pass
 
     update_state(job_meta_path, {"state": "RUNNING", "message": "ocr running"})
+    if data.get("parentId"):
+        advance_parent(data["parentId"])  # progression : tranche RUNNING
+
+    # Tranche : le heartbeat du parent (surveillé par l'orchestrateur) suit aussi
+    hb_paths = [hb_path]
+    if data.get("parentDir"):
+        hb_paths.append(os.path.join(data["parentDir"], "ocr.heartbeat"))
 
     def heartbeat(msg: str = ""):
-        with open(hb_path, "w", encoding="utf-8") as hb:
-            hb.write(f"{now_iso()} {msg}\n")
+        for path in hb_paths:
+            with open(path, "w", encoding="utf-8") as hb:
+                hb.write(f"{now_iso()} {msg}\n")
+
+    def on_progress(snapshot: dict):
+        # Heartbeat rafraîchi tant qu'ocrmypdf avance (un ocrmypdf bloqué laisse périmer)
+        heartbeat(f"pages {snapshot['pagesDone']}/{snapshot['pagesTotal'] or '?'}")
+        update_state(job_meta_path, snapshot)
 
     with open(log_path, "a", encoding="utf-8") as log:
         try:
             heartbeat("start")
-            cmd = build_ocrmypdf_cmd(
-                raw_pdf, final_tmp,
-                lang=lang, rotate=rotate_pages, deskew=deskew, optimize=optimize,
-            )
-            log.write("CMD: " + " ".join(cmd) + "\n")
-            p = subprocess.run(cmd, capture_output=True, text=True)
-            log.write(p.stdout + "\n" + p.stderr + "\n")
-            if p.returncode != 0:
-                raise RuntimeError(f"ocrmypdf failed rc={p.returncode}")
+            ranges = shard_plan(data)
+            if ranges:
+                log.write(f"SHARDS: {len(ranges)} x {OCR_SHARD_PAGES} pages\n")
+                return dispatch_shards(job_meta_path, data, ranges)
+            classes = classify(raw_pdf, log)
+            skipped = {i for i, c in enumerate(classes) if c}
+            keys, cached = cache_lookup(raw_pdf, data, log, skip=skipped)
+            n_total = len(keys) or len(classes)
+            hits = [i for i, path in enumerate(cached) if path]
+            todo = [i for i in range(n_total) if i not in skipped and not (cached and cached[i])]
+            if skipped:
+                log.write(f"SKIP: {len(skipped)}/{n_total} pages without expected text\n")
+            if keys:
+                log.write(f"CACHE: {len(hits)}/{len(keys) - len(skipped)} pages cached\n")
+            pages = data.get("pages")
+            cpu = None
+            if not n_total:
+                cpu = run_ocrmypdf(job_id, data, raw_pdf, final_tmp, log,
+                                   n_pages=pages[1] - pages[0] + 1 if pages else None,
+                                   on_progress=on_progress)
+            elif not hits:
+                # ocrmypdf sur raw.pdf ; pages exclues recopiées telles quelles (--pages)
+                if todo:
+                    cpu = run_ocrmypdf(job_id, data, raw_pdf, final_tmp, log, n_pages=len(todo),
+                                       pages=page_ranges(todo) if skipped else None,
+                                       on_progress=on_progress)
+                else:
+                    # Aucune page à OCRiser : ocrmypdf sans OCR, pour une sortie PDF/A
+                    cpu = run_ocrmypdf(job_id, data, raw_pdf, final_tmp, log, n_pages=n_total,
+                                       on_progress=on_progress, no_ocr=True)
+                if keys and todo:
+                    page_cache().store_pages(final_tmp, [keys[i] for i in todo], todo)
+            else:
+                # OCR des seules pages absentes du cache, puis réassemblage dans l'ordre
+                misses_pdf = os.path.join(job_dir, "misses.pdf")
+                misses_ocr = os.path.join(job_dir, "misses.ocr.pdf")
+                if todo:
+                    extract_pages(raw_pdf, todo, misses_pdf)
+                    cpu = run_ocrmypdf(job_id, data, misses_pdf, misses_ocr, log, n_pages=len(todo),
+                                       on_progress=on_progress)
+                    page_cache().store_pages(misses_ocr, [keys[i] for i in todo])
+                position = {page: j for j, page in enumerate(todo)}
+                assemble([(cached[i], 0) if cached[i]
+                          else (misses_ocr, position[i]) if i in position
+                          else (raw_pdf, i)
+                          for i in range(n_total)], final_tmp)
+                for tmp in (misses_pdf, misses_ocr):
+                    try:
+                        os.remove(tmp)
+                    except FileNotFoundError:
+                        pass
 
             os.replace(final_tmp, final_pdf)
             update_state(job_meta_path, {
                 "state": "DONE",
                 "message": "final.pdf ready",
                 "artifacts": {"finalPdf": final_pdf},
+                "cpu": cpu,
+                "cache": {
+                    "pages": len(hits) + len(todo),
+                    "hits": len(hits),
+                    "misses": len(todo),
+                    "hitRate": round(len(hits) / (len(hits) + len(todo)), 4) if hits else 0.0,
+                } if keys else None,
+                "skippedPages": {
+                    "blank": sum(1 for c in classes if c == "blank"),
+                    "textless": sum(1 for c in classes if c == "textless"),
+                } if classes else None,
             })
         except Exception as e:
             update_state(job_meta_path, {
@@ -165,6 +724,43 @@ def run_job(job_meta_path: str):
             raise
 
 
+def notify_completion(job_meta_path: str) -> None:
+    """
+    Envoie le statut final d'un job à son ``callbackUrl``, s'il en a un.
+
+    :param job_meta_path: Chemin du fichier de métadonnées (DONE_DIR ou ERROR_DIR).
+    """
+    data = read_json(job_meta_path)
+    if data and data.get("callbackUrl"):
+        notify_callback(data["callbackUrl"], data)
+
+
+def handle_job(job_meta: str) -> None:
+    """
+    Traite un job réclamé : exécution, déplacement vers DONE_DIR ou ERROR_DIR,
+    notification ; pour une tranche, avancement du job parent.
+
+    :param job_meta: Chemin du fichier de métadonnées (dans RUNNING_DIR).
+    """
+    job_id = os.path.basename(job_meta)[:-len(".json")]
+    try:
+        if run_job(job_meta) == SHARDED:
+            # Le parent reste dans RUNNING_DIR ; tranches déjà terminées (reprise) ?
+            advance_parent(job_id)
+            return
+        dst = os.path.join(DONE_DIR, os.path.basename(job_meta))
+        os.replace(job_meta, dst)
+    except Exception:
+        dst = os.path.join(ERROR_DIR, os.path.basename(job_meta))
+        os.replace(job_meta, dst)
+    job_registry().record(dst)
+    job_queue().release(job_id)
+    notify_completion(dst)
+    parent_id = (find_job(job_id) or {}).get("parentId")
+    if parent_id:
+        advance_parent(parent_id)
+
+
 def worker_loop(stop_event: threading.Event):
     """
     Boucle principale du worker OCR.
@@ -176,13 +772,7 @@ def worker_loop(stop_event: threading.Event):
         if not job_meta:
             time.sleep(0.5)
             continue
-        try:
-            run_job(job_meta)
-            dst = os.path.join(DONE_DIR, os.path.basename(job_meta))
-            os.replace(job_meta, dst)
-        except Exception:
-            dst = os.path.join(ERROR_DIR, os.path.basename(job_meta))
-            os.replace(job_meta, dst)
+        handle_job(job_meta)
 
 
 # ---------------------------------------------------------------------------
@@ -191,19 +781,31 @@ def worker_loop(stop_event: threading.Event):
 
 _stop_event = threading.Event()
 _worker_threads = []
+_pool = None
 
 
 @app.on_event("startup")
 def startup():
     """Démarre les workers au lancement du serveur FastAPI."""
+    global _pool
+    _tool_versions.update(get_tool_versions())
     requeue_running(RUNNING_DIR, QUEUE_DIR)
+    job_queue().recover()
+    job_registry().rebuild()
+    _pool = make_pool(OCR_EXECUTOR, max(1, SERVICE_CONCURRENCY), OCR_WORKER_MAX_JOBS)
     for _ in range(max(1, SERVICE_CONCURRENCY)):
         t = threading.Thread(target=worker_loop, args=(_stop_event,), daemon=True)
         t.start()
         _worker_threads.append(t)
+    if OCR_SHARD_PAGES > 0:
+        t = threading.Thread(target=shard_heartbeat_loop, args=(_stop_event,), daemon=True)
+        t.start()
+        _worker_threads.append(t)
 
 
 @app.on_event("shutdown")
 def shutdown():
     """Arrête proprement les workers à l'arrêt du serveur FastAPI."""
     _stop_event.set()
+    if _pool is not None:
+        _pool.shutdown()
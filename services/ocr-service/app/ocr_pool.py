@@ -0,0 +1,206 @@
+"""
+Exécution d'ocrmypdf par son API Python dans des processus persistants (``OCR_EXECUTOR=api``).
+
+En mode ``cli``, chaque appel paie un interpréteur neuf, l'import d'ocrmypdf
+(pikepdf, Pillow, pluggy...) et la découverte des plugins : sur un chapitre de
+20 à 30 pages, c'est une part notable de la durée. Ici, chaque processus du
+pool (``spawn``) importe ocrmypdf une fois au démarrage (``_warm``) puis
+enchaîne les appels ``ocrmypdf.ocr(src, dest, **kwargs)`` ; les arguments
+viennent de ``build_ocrmypdf_kwargs``, pendant exact de ``build_ocrmypdf_cmd``.
+Tesseract et Ghostscript restent des sous-processus lancés par ocrmypdf.
+
+ocrmypdf ne doit pas être appelé deux fois en même temps dans un même
+processus : le pool compte un processus par worker, un appel à la fois.
+Les messages du logger ``ocrmypdf`` sont écrits, préfixés du numéro de page
+comme en ligne de commande, dans un fichier que le parent relit pendant
+l'appel (``ocr.log``, progression). Chaque processus est recyclé après
+``max_jobs_per_worker`` appels ; un processus tué casse le pool, l'appel en
+cours échoue (``WorkerCrashed``) et le pool est recréé.
+"""
+import importlib.util
+import logging
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeout
+from concurrent.futures.process import BrokenProcessPool
+from typing import Callable, Optional
+
+_calls_in_process = 0
+
+
+class WorkerCrashed(RuntimeError):
+    """Le processus fils a disparu en cours d'OCR (OOM, signal)."""
+
+
+class _PageNumberFilter(logging.Filter):
+    """Préfixe ``"   12 "`` des messages rattachés à une page (format de la CLI)."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        pageno = getattr(record, "pageno", None)
+        record.pageprefix = f"{pageno:5d} " if isinstance(pageno, int) else ""
+        return True
+
+
+def _warm() -> None:
+    """Initialisation d'un processus du pool : import d'ocrmypdf (et de ses plugins)."""
+    if importlib.util.find_spec("ocrmypdf") is not None:
+        import ocrmypdf  # noqa: F401
+
+
+def ocr_task(src: str, dest: str, kwargs: dict, threads: Optional[int], log_path: str,
+             verbose: bool = False, ocr: Optional[Callable] = None) -> dict:
+    """
+    Exécuté dans le processus fils : ``ocr(src, dest, **kwargs)``.
+
+    :param kwargs: Arguments de ``build_ocrmypdf_kwargs``.
+    :param threads: ``OMP_THREAD_LIMIT`` de Tesseract (None = inchangé).
+    :param log_path: Fichier recevant les messages du logger ``ocrmypdf``.
+    :param verbose: Messages de niveau DEBUG (équivalent de ``-v 1``).
+    :param ocr: Fonction à appeler (None = ``ocrmypdf.ocr``).
+    :return: Rapport ``{pid, callsInProcess, seconds, exitCode, error}``.
+    """
+    global _calls_in_process
+    _calls_in_process += 1
+    if ocr is None:
+        import ocrmypdf
+        ocr = ocrmypdf.ocr
+    handler = logging.FileHandler(log_path, encoding="utf-8")
+    handler.setFormatter(logging.Formatter("%(pageprefix)s%(message)s"))
+    handler.addFilter(_PageNumberFilter())
+    logger = logging.getLogger("ocrmypdf")
+    logger.setLevel(logging.DEBUG if verbose else logging.INFO)
+    logger.addHandler(handler)
+    previous = os.environ.get("OMP_THREAD_LIMIT")
+    if threads:
+        os.environ["OMP_THREAD_LIMIT"] = str(threads)
+    t0 = time.monotonic()
+    rc, error = 0, None
+    try:
+        rc = int(ocr(src, dest, **kwargs) or 0)
+    except Exception as e:
+        rc = int(getattr(e, "exit_code", 0) or 1)
+        error = f"{type(e).__name__}: {e}"
+        logger.error(error)
+    finally:
+        logger.removeHandler(handler)
+        handler.close()
+        if previous is None:
+            os.environ.pop("OMP_THREAD_LIMIT", None)
+        else:
+            os.environ["OMP_THREAD_LIMIT"] = previous
+    return {
+        "pid": os.getpid(),
+        "callsInProcess": _calls_in_process,
+        "seconds": round(time.monotonic() - t0, 3),
+        "exitCode": rc,
+        "error": error,
+    }
+
+
+def _tail(path: str, pos: int, on_line: Callable[[str], None]) -> int:
+    """Transmet les lignes complètes ajoutées à ``path`` depuis ``pos`` ; nouvelle position."""
+    try:
+        with open(path, "rb") as f:
+            f.seek(pos)
+            chunk = f.read()
+    except FileNotFoundError:
+        return pos
+    end = chunk.rfind(b"\n") + 1
+    for line in chunk[:end].decode("utf-8", errors="replace").splitlines(keepends=True):
+        on_line(line)
+    return pos + end
+
+
+class OcrProcessPool:
+    """
+    Pool de processus ``spawn`` où ocrmypdf reste chargé entre deux appels.
+
+    :param workers: Nombre de processus.
+    :param max_jobs_per_worker: Appels traités avant recyclage d'un processus (0 = jamais).
+    :param ocr: Fonction exécutée à la place d'``ocrmypdf.ocr`` (fonction de
+                module, transmise au processus fils).
+    """
+
+    def __init__(self, workers: int, max_jobs_per_worker: int = 0,
+                 ocr: Optional[Callable] = None):
+        self.workers = max(1, workers)
+        self.max_jobs_per_worker = max(0, max_jobs_per_worker)
+        self.ocr = ocr
+        self.restarts = 0
+        self.calls = 0
+        self._lock = threading.Lock()
+        self._pool = self._new_pool()
+
+    def _new_pool(self) -> ProcessPoolExecutor:
+        return ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_warm,
+            max_tasks_per_child=self.max_jobs_per_worker or None,
+        )
+
+    def run(self, src: str, dest: str, kwargs: dict, *, threads: Optional[int] = None,
+            log_path: str, on_line: Optional[Callable[[str], None]] = None,
+            verbose: bool = False, poll_s: float = 0.5) -> dict:
+        """
+        OCRise ``src`` -> ``dest`` dans un processus du pool et attend la fin.
+        Pendant l'appel, les lignes écrites dans ``log_path`` sont transmises à
+        ``on_line`` (au plus toutes les ``poll_s`` secondes), puis le fichier
+        est supprimé.
+
+        :return: Rapport du processus fils (``exitCode`` != 0 en cas d'échec).
+        :raises WorkerCrashed: Si le processus fils a disparu en cours d'appel.
+        """
+        with self._lock:
+            pool = self._pool
+            self.calls += 1
+        pos = 0
+        try:
+            future = pool.submit(ocr_task, src, dest, kwargs, threads, log_path,
+                                 verbose, self.ocr)
+            while True:
+                try:
+                    report = future.result(timeout=poll_s)
+                    break
+                except FutureTimeout:
+                    if on_line is not None:
+                        pos = _tail(log_path, pos, on_line)
+        except BrokenProcessPool:
+            with self._lock:
+                if self._pool is pool:
+                    self._pool = self._new_pool()
+                    self.restarts += 1
+            pool.shutdown(wait=False, cancel_futures=True)
+            raise WorkerCrashed("ocr worker process died")
+        finally:
+            if on_line is not None:
+                _tail(log_path, pos, on_line)
+            try:
+                os.remove(log_path)
+            except FileNotFoundError:
+                pass
+        return report
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.workers,
+            "maxJobsPerWorker": self.max_jobs_per_worker,
+            "calls": self.calls,
+            "restarts": self.restarts,
+        }
+
+    def shutdown(self) -> None:
+        with self._lock:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+
+
+def make_pool(mode: str, workers: int, max_jobs_per_worker: int) -> Optional[OcrProcessPool]:
+    """
+    Retourne un ``OcrProcessPool`` en mode ``api``, None en mode ``cli`` ou si
+    le module ``ocrmypdf`` n'est pas importable (repli sur la ligne de commande).
+    """
+    if mode == "api" and importlib.util.find_spec("ocrmypdf") is not None:
+        return OcrProcessPool(workers, max_jobs_per_worker)
+    return None
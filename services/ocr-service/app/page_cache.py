@@ -0,0 +1,260 @@
+"""
+Cache du résultat OCR par page (``OCR_CACHE_DIR``).
+
+Logos d'éditeur, pages de crédits, publicités, rééditions avec les mêmes
+scans : d'un livre à l'autre, beaucoup de pages sont identiques octet pour
+octet. Chaque page OCRisée est conservée comme PDF d'une page (image + couche
+texte produite par ocrmypdf), sous une clé qui combine :
+
+- le contenu de la page dans ``raw.pdf`` : flux de contenu, boîte de page,
+  rotation, et pour chaque image le flux encodé et ses paramètres (les pages
+  du prep-service sont des JPEG/PNG embarqués tels quels par img2pdf) ;
+- le profil OCR (langues, rotation, redressement, optimisation, versions des
+  outils).
+
+Le job n'OCRise que les pages absentes du cache, puis assemble ``final.pdf``
+à partir des pages en cache et des pages OCRisées. Éviction LRU par taille :
+chaque lecture rafraîchit le mtime de l'entrée, les plus anciennes sont
+supprimées au-delà du budget. Le cache peut être partagé entre instances
+(écritures ``.tmp`` + rename atomique, LRU porté par le système de fichiers).
+"""
+import hashlib
+import os
+import threading
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from app.shards import copy_catalog
+from app.utils import ensure_dir
+
+# Paramètres d'image pris en compte dans la clé (avec le flux encodé)
+_IMAGE_KEYS = ("/Width", "/Height", "/BitsPerComponent", "/Filter", "/ColorSpace", "/Decode")
+
+
+def _param(value) -> str:
+    import pikepdf
+
+    if isinstance(value, (pikepdf.Name, int, float, bool)):
+        return str(value)
+    if isinstance(value, pikepdf.Array):
+        return "[" + ",".join(_param(v) for v in value) + "]"
+    return type(value).__name__  # objet indirect (profil ICC...) : le flux encodé tranche
+
+
+def page_images(page):
+    """
+    Images référencées directement par une page (nom -> XObject).
+    ``Page.get_images`` depuis pikepdf 10, ``Page.images`` (déprécié) avant.
+    """
+    get_images = getattr(page, "get_images", None)
+    return get_images(recursive=False) if get_images else page.images
+
+
+def _page_digest(page, profile: str) -> str:
+    import pikepdf
+
+    h = hashlib.sha256(profile.encode("utf-8"))
+    h.update(repr([float(x) for x in page.mediabox]).encode())
+    h.update(str(int(page.obj.get("/Rotate", 0))).encode())
+    contents = page.obj.get("/Contents")
+    streams = list(contents) if isinstance(contents, pikepdf.Array) else [contents]
+    for stream in streams:
+        if stream is not None:
+            h.update(stream.read_raw_bytes())
+    for name, image in sorted(page_images(page).items()):
+        h.update(str(name).encode())
+        for key in _IMAGE_KEYS:
+            h.update(f"{key}={_param(image.get(key))};".encode())
+        h.update(image.read_raw_bytes())
+        smask = image.get("/SMask")
+        if smask is not None:
+            h.update(smask.read_raw_bytes())
+    return h.hexdigest()
+
+
+def page_keys(pdf_path: str, profile: str) -> List[str]:
+    """
+    Clés de cache des pages d'un PDF.
+
+    :param pdf_path: PDF source (``raw.pdf``).
+    :param profile: Profil OCR sérialisé (voir ``cache_profile`` dans main).
+    :return: Une clé (SHA-256 hexadécimal) par page, dans l'ordre.
+    """
+    import pikepdf
+
+    with pikepdf.open(pdf_path) as pdf:
+        return [_page_digest(page, profile) for page in pdf.pages]
+
+
+def extract_pages(src: str, indexes: Sequence[int], dest: str) -> None:
+    """
+    Écrit dans ``dest`` les pages ``indexes`` (0-based, dans l'ordre) de ``src``,
+    avec son catalogue et ses métadonnées (une entrée de cache issue d'une
+    sortie ocrmypdf reste PDF/A).
+    """
+    import pikepdf
+
+    with pikepdf.open(src) as pdf:
+        out = pikepdf.new()
+        for i in indexes:
+            out.pages.append(pdf.pages[i])
+        copy_catalog(pdf, out)
+        out.save(dest)
+
+
+def assemble(parts: Sequence[Tuple[str, int]], dest: str) -> int:
+    """
+    Assemble un PDF page par page. Catalogue et métadonnées repris de la
+    première source PDF/A (``/OutputIntents``, sortie ocrmypdf ou entrée de
+    cache), sinon de la première source : ``final.pdf`` est PDF/A qu'il y ait
+    ou non des pages en cache.
+
+    :param parts: ``(pdf, index de page 0-based)`` dans l'ordre de sortie.
+    :param dest: PDF de sortie.
+    :return: Nombre de pages écrites.
+    """
+    import pikepdf
+
+    out = pikepdf.new()
+    opened: Dict[str, "pikepdf.Pdf"] = {}
+    try:
+        for path, index in parts:
+            if path not in opened:
+                opened[path] = pikepdf.open(path)
+            out.pages.append(opened[path].pages[index])
+        sources = list(opened.values())
+        template = next((pdf for pdf in sources if "/OutputIntents" in pdf.Root),
+                        sources[0] if sources else None)
+        if template is not None:
+            copy_catalog(template, out)
+        out.save(dest)
+        return len(out.pages)
+    finally:
+        for pdf in opened.values():
+            pdf.close()
+
+
+class PageCache:
+    """
+    Cache de pages OCRisées sur disque.
+
+    :param root: Répertoire du cache.
+    :param max_bytes: Taille maximale (0 = illimitée).
+    """
+
+    def __init__(self, root: str, max_bytes: int = 0):
+        self.root = root
+        self.max_bytes = max(0, max_bytes)
+        self._lock = threading.Lock()
+        self._size: Optional[int] = None  # calculée au premier ajout
+        self._stats = {"hits": 0, "misses": 0, "stored": 0, "evicted": 0}
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.root, key[:2], f"{key}.pdf")
+
+    def lookup(self, keys: Sequence[str]) -> List[Optional[str]]:
+        """
+        Recherche des pages ; chaque entrée trouvée est marquée récemment utilisée.
+
+        :return: Chemin de l'entrée par clé, ou None (page à OCRiser).
+        """
+        found: List[Optional[str]] = []
+        for key in keys:
+            path = self._path(key)
+            try:
+                os.utime(path)
+            except OSError:
+                path = None
+            found.append(path)
+        with self._lock:
+            self._stats["hits"] += sum(1 for p in found if p)
+            self._stats["misses"] += sum(1 for p in found if not p)
+        return found
+
+    def store_pages(self, ocr_pdf: str, keys: Sequence[str],
+                    indexes: Optional[Sequence[int]] = None) -> int:
+        """
+        Ajoute au cache des pages d'un PDF OCRisé.
+
+        :param ocr_pdf: Sortie d'ocrmypdf.
+        :param keys: Clés des pages, alignées sur ``indexes``.
+        :param indexes: Pages à ajouter (0-based) ; None = toutes, une clé par page.
+        :return: Nombre de pages ajoutées (0 si les pages ne correspondent pas aux clés).
+        """
+        import pikepdf
+
+        added = 0
+        with pikepdf.open(ocr_pdf) as pdf:
+            if indexes is None:
+                indexes = range(len(pdf.pages)) if len(pdf.pages) == len(keys) else []
+            if len(indexes) != len(keys) or any(i >= len(pdf.pages) for i in indexes):
+                return 0
+            for i, key in zip(indexes, keys):
+                page = pdf.pages[i]
+                path = self._path(key)
+                if os.path.exists(path):
+                    continue
+                ensure_dir(os.path.dirname(path))
+                single = pikepdf.new()
+                single.pages.append(page)
+                copy_catalog(pdf, single)  # PDF/A : reste vrai au réassemblage
+                tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+                single.save(tmp)
+                size = os.path.getsize(tmp)
+                os.replace(tmp, path)
+                added += 1
+                with self._lock:
+                    if self._size is not None:
+                        self._size += size
+        with self._lock:
+            self._stats["stored"] += added
+        if added:
+            self._evict()
+        return added
+
+    def _scan(self) -> List[Tuple[float, int, str]]:
+        entries = []
+        if not os.path.isdir(self.root):
+            return entries
+        for sub in os.scandir(self.root):
+            if not sub.is_dir():
+                continue
+            for entry in os.scandir(sub.path):
+                if entry.name.endswith(".pdf"):
+                    try:
+                        st = entry.stat()
+                    except OSError:
+                        continue
+                    entries.append((st.st_mtime, st.st_size, entry.path))
+        return entries
+
+    def _evict(self) -> None:
+        """Supprime les entrées les moins récemment utilisées au-delà de ``max_bytes``."""
+        if not self.max_bytes:
+            return
+        with self._lock:
+            if self._size is not None and self._size <= self.max_bytes:
+                return
+        # Parcours complet : fait foi (autres instances partageant le cache)
+        entries = self._scan()
+        size = sum(e[1] for e in entries)
+        evicted = 0
+        for _, entry_size, path in sorted(entries):
+            if size <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            size -= entry_size
+            evicted += 1
+        with self._lock:
+            self._size = size
+            self._stats["evicted"] += evicted
+
+    def stats(self) -> dict:
+        """Compteurs du service : succès, échecs, taux de succès, ajouts, évictions, taille."""
+        with self._lock:
+            out = dict(self._stats, bytes=self._size, maxBytes=self.max_bytes)
+        lookups = out["hits"] + out["misses"]
+        out["hitRate"] = round(out["hits"] / lookups, 4) if lookups else 0.0
+        return out
@@ -0,0 +1,125 @@
+"""
+Pré-classification des pages sans texte attendu (``OCR_SKIP_TEXTLESS``).
+
+Pages de garde blanches, séparateurs, couvertures et doubles pages d'art
+pleine page : Tesseract y passe autant de temps que sur une page de texte.
+Chaque page de ``raw.pdf`` (une image par page, produite par le prep-service)
+est décodée en petit format — mode brouillon JPEG, côté long de l'ordre de
+``SAMPLE_SIZE`` px — puis mesurée avec NumPy :
+
+- encrage : part des pixels qui s'écartent nettement du fond (médiane) ;
+  sous ``ink_ratio``, la page est ``blank`` ;
+- densité de contours : part des pixels à fort gradient horizontal ou
+  vertical ; le texte (bulles comprises) en produit beaucoup, un aplat ou un
+  dégradé très peu. Sous ``edge_ratio``, la page est ``textless``.
+
+Les pages retenues sont exclues de l'OCR (``ocrmypdf --pages`` ou
+réassemblage) et recopiées telles quelles dans ``final.pdf``. Si aucune page
+n'est à OCRiser, ocrmypdf tourne quand même, sans OCR
+(``--tesseract-timeout 0``), pour que ``final.pdf`` reste PDF/A. Une page
+que l'on ne sait pas décoder, ou qui n'est pas faite d'une seule image, est
+toujours OCRisée.
+"""
+import io
+from typing import List, Optional, Sequence, Tuple
+
+from app.page_cache import page_images
+
+# Côté long de la version réduite analysée
+SAMPLE_SIZE = 512
+
+# Écart au fond (niveaux de gris) d'un pixel « encré »
+_INK_DELTA = 48
+# Gradient d'un pixel de contour
+_EDGE_DELTA = 40
+
+
+def ink_stats(im) -> Tuple[float, float]:
+    """
+    Mesure une page.
+
+    :param im: Image Pillow (tout mode).
+    :return: ``(encrage, densité de contours)``, parts de pixels entre 0 et 1.
+    """
+    import numpy as np
+
+    gray = im.convert("L")
+    if max(gray.size) > SAMPLE_SIZE:
+        gray.thumbnail((SAMPLE_SIZE, SAMPLE_SIZE))
+    a = np.asarray(gray, dtype=np.int16)
+    if a.size == 0:
+        return 0.0, 0.0
+    ink = np.count_nonzero(np.abs(a - int(np.median(a))) > _INK_DELTA) / a.size
+    dx = np.abs(np.diff(a, axis=1)) > _EDGE_DELTA
+    dy = np.abs(np.diff(a, axis=0)) > _EDGE_DELTA
+    edges = (np.count_nonzero(dx) + np.count_nonzero(dy)) / a.size
+    return ink, edges
+
+
+def _page_image(page):
+    """Image unique d'une page décodée en petit format, ou None."""
+    import pikepdf
+    from PIL import Image
+
+    images = list(page_images(page).values())
+    if len(images) != 1:
+        return None
+    xobj = images[0]
+    if xobj.get("/Filter") == pikepdf.Name.DCTDecode:
+        im = Image.open(io.BytesIO(xobj.read_raw_bytes()))
+        im.draft("L", (SAMPLE_SIZE, SAMPLE_SIZE))  # décodage JPEG réduit (1/2 à 1/8)
+        return im
+    return pikepdf.PdfImage(xobj).as_pil_image()
+
+
+def classify_pages(pdf_path: str, ink_ratio: float = 0.002,
+                   edge_ratio: float = 0.0) -> List[Optional[str]]:
+    """
+    Classe les pages d'un PDF.
+
+    :param pdf_path: PDF source (``raw.pdf``).
+    :param ink_ratio: Encrage sous lequel une page est ``blank`` (0 = critère désactivé).
+    :param edge_ratio: Densité de contours sous laquelle une page est ``textless``
+                       (0 = critère désactivé).
+    :return: Par page : ``"blank"``, ``"textless"`` ou None (à OCRiser).
+    """
+    import pikepdf
+
+    out: List[Optional[str]] = []
+    with pikepdf.open(pdf_path) as pdf:
+        for page in pdf.pages:
+            try:
+                im = _page_image(page)
+                stats = ink_stats(im) if im is not None else None
+            except Exception:
+                stats = None
+            if stats is None:
+                out.append(None)
+            elif stats[0] < ink_ratio:
+                out.append("blank")
+            elif stats[1] < edge_ratio:
+                out.append("textless")
+            else:
+                out.append(None)
+    return out
+
+
+def page_ranges(indexes: Sequence[int]) -> str:
+    """
+    Sélection de pages au format ``ocrmypdf --pages`` (1-based).
+
+    :param indexes: Index de pages 0-based, triés.
+    :return: Ex. ``"1-3,5,8-9"``.
+    """
+    parts = []
+    start = prev = None
+    for i in indexes:
+        if prev is not None and i == prev + 1:
+            prev = i
+            continue
+        if start is not None:
+            parts.append(f"{start + 1}" if start == prev else f"{start + 1}-{prev + 1}")
+        start = prev = i
+    if start is not None:
+        parts.append(f"{start + 1}" if start == prev else f"{start + 1}-{prev + 1}")
+    return ",".join(parts)
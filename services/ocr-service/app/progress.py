@@ -0,0 +1,63 @@
+"""
+Progression d'un ocrmypdf en cours, lue dans sa sortie en streaming (``OCR_PROGRESS``).
+
+ocrmypdf préfixe les messages rattachés à une page par le numéro de la page,
+aligné à droite (``"   12 ..."``) ; en mode ``-v 1``, chaque page en produit
+plusieurs (rastérisation, Tesseract...). Les pages sont traitées dans l'ordre
+par ``--jobs`` workers : quand la page de rang ``k`` démarre, environ
+``k - jobs`` pages sont terminées. ``pagesDone`` est cette estimation,
+``etaSeconds`` l'extrapolation du débit observé.
+"""
+import re
+import time
+from typing import Callable, Optional
+
+# Message ocrmypdf rattaché à une page
+_PAGE_LINE = re.compile(r"^\s*(\d+)\s+\S")
+
+
+class PageProgress:
+    """
+    :param total: Pages à OCRiser (None = inconnu).
+    :param jobs: Pages traitées en parallèle (``--jobs``).
+    :param clock: Horloge monotone (injectable pour les tests).
+    """
+
+    def __init__(self, total: Optional[int], jobs: int = 1,
+                 clock: Callable[[], float] = time.monotonic):
+        self.total = total
+        self.jobs = max(1, jobs)
+        self._clock = clock
+        self._start = clock()
+        self._seen = set()
+
+    def feed(self, line: str) -> bool:
+        """
+        Analyse une ligne de sortie.
+
+        :return: True si la ligne signale le démarrage d'une nouvelle page.
+        """
+        m = _PAGE_LINE.match(line)
+        if not m:
+            return False
+        page = int(m.group(1))
+        if page in self._seen or (self.total and len(self._seen) >= self.total):
+            return False
+        self._seen.add(page)
+        return True
+
+    def done(self) -> int:
+        """Pages terminées (estimation)."""
+        return max(0, len(self._seen) - self.jobs)
+
+    def snapshot(self, finished: bool = False) -> dict:
+        """``pagesDone``, ``pagesTotal`` et ``etaSeconds`` (None tant qu'inconnu)."""
+        total = self.total or (len(self._seen) if finished else None)
+        done = total if finished else self.done()
+        eta = None
+        if finished:
+            eta = 0
+        elif total and done:
+            rate = done / max(self._clock() - self._start, 1e-6)
+            eta = round((total - done) / rate)
+        return {"pagesDone": done, "pagesTotal": total, "etaSeconds": eta}
@@ -0,0 +1,131 @@
+"""
+OCR par tranches de pages (``OCR_SHARD_PAGES``).
+
+Un livre de 500 pages occupe un seul worker pendant tout son OCR. En mode
+sharding, le job « parent » découpe ``raw.pdf`` en tranches de pages, met
+chaque tranche en file comme un sous-job ordinaire (même file, même
+réclamation : n'importe quel worker de n'importe quelle machine partageant
+``DATA_DIR`` peut la traiter), puis la dernière tranche terminée déclenche
+l'assemblage des ``final.pdf`` des tranches en un ``final.pdf`` unique.
+Avec ``QUEUE_BACKEND=sqlite``, l'index est local à ``QUEUE_DB_PATH`` : sur
+un disque local, seuls les workers de la machine qui a découpé le job
+réclament ses tranches.
+
+Arborescence d'un job découpé ::
+
+    <workDir>/<jobId>/shards/<jobId>.shard001/raw.pdf     tranche d'entrée
+    <workDir>/<jobId>/shards/<jobId>.shard001/final.pdf   tranche OCRisée
+    <workDir>/<jobId>/shards/.finalize                    verrou d'assemblage
+
+Fonctions pures (découpage, assemblage) : ``pikepdf`` (dépendance d'ocrmypdf).
+"""
+import os
+from typing import List, Tuple
+
+from app.utils import ensure_dir
+
+# Sous-dossier du job parent contenant les tranches
+SHARDS_DIRNAME = "shards"
+
+# Verrou (création exclusive) : une seule tranche déclenche l'assemblage ou l'échec du parent
+FINALIZE_LOCK = ".finalize"
+
+# Entrées du catalogue d'une sortie ocrmypdf (PDF/A par défaut) reprises par les assemblages
+CATALOG_KEYS = ("/OutputIntents", "/Metadata", "/MarkInfo", "/Lang")
+
+
+def shard_id(parent_id: str, index: int) -> str:
+    """Identifiant du sous-job ``index`` (1-based) d'un job parent."""
+    return f"{parent_id}.shard{index:03d}"
+
+
+def page_count(pdf_path: str) -> int:
+    """Nombre de pages d'un PDF."""
+    import pikepdf
+
+    with pikepdf.open(pdf_path) as pdf:
+        return len(pdf.pages)
+
+
+def plan_shards(n_pages: int, shard_pages: int) -> List[Tuple[int, int]]:
+    """
+    Découpe ``n_pages`` pages en tranches d'au plus ``shard_pages`` pages.
+    La dernière tranche, si elle est trop courte (moins de la moitié), est
+    fusionnée avec la précédente.
+
+    :return: Plages ``(première, dernière)`` 1-based inclusives.
+    """
+    if n_pages <= 0 or shard_pages <= 0:
+        return []
+    ranges = [(first, min(first + shard_pages - 1, n_pages))
+              for first in range(1, n_pages + 1, shard_pages)]
+    if len(ranges) > 1 and ranges[-1][1] - ranges[-1][0] + 1 < shard_pages / 2:
+        last = ranges.pop()
+        ranges[-1] = (ranges[-1][0], last[1])
+    return ranges
+
+
+def split_pdf(src: str, ranges: List[Tuple[int, int]], dests: List[str]) -> None:
+    """
+    Écrit chaque plage de pages de ``src`` dans le fichier correspondant de
+    ``dests`` (écriture ``.tmp`` + rename atomique ; fichiers existants conservés,
+    le découpage étant déterministe).
+
+    :param src: PDF source.
+    :param ranges: Plages ``(première, dernière)`` 1-based inclusives.
+    :param dests: Chemins de sortie, un par plage.
+    """
+    import pikepdf
+
+    with pikepdf.open(src) as pdf:
+        for (first, last), dest in zip(ranges, dests):
+            if os.path.exists(dest):
+                continue
+            ensure_dir(os.path.dirname(dest))
+            part = pikepdf.new()
+            part.pages.extend(pdf.pages[first - 1:last])
+            tmp = dest + ".tmp"
+            part.save(tmp)
+            os.replace(tmp, dest)
+
+
+def copy_catalog(src, out) -> None:
+    """
+    Reprend dans ``out`` le profil de sortie et les métadonnées de ``src``
+    (``CATALOG_KEYS`` du catalogue, XMP compris, et dictionnaire ``/Info``) :
+    un PDF reconstruit à partir de ``pikepdf.new()`` reste PDF/A si ``src`` l'est.
+
+    :param src: ``pikepdf.Pdf`` modèle (sortie ocrmypdf).
+    :param out: ``pikepdf.Pdf`` en cours de construction.
+    """
+    for key in CATALOG_KEYS:
+        if key in src.Root:
+            out.Root[key] = out.copy_foreign(src.Root[key])
+    if "/Info" in src.trailer:
+        out.trailer.Info = out.copy_foreign(src.trailer.Info)
+
+
+def merge_pdfs(parts: List[str], dest: str) -> int:
+    """
+    Concatène des PDF dans l'ordre dans ``dest`` (écrit tel quel : l'appelant
+    passe un chemin temporaire puis renomme). Catalogue et métadonnées
+    (PDF/A) repris de la première partie.
+
+    :return: Nombre de pages écrites.
+    """
+    import pikepdf
+
+    out = pikepdf.new()
+    sources = []
+    try:
+        for path in parts:
+            src = pikepdf.open(path)
+            sources.append(src)
+            out.pages.extend(src.pages)
+        if sources:
+            copy_catalog(sources[0], out)
+        out.save(dest)
+        return len(out.pages)
+    finally:
+        for src in sources:
+            src.close()
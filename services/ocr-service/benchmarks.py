@@ -0,0 +1,133 @@
+"""
+Benchmarks de l'ocr-service. Une sous-commande :
+
+``short-jobs`` — débit de jobs courts (chapitres de 20 à 30 pages) selon
+l'exécuteur ocrmypdf : ``cli`` (un processus ``ocrmypdf`` par job) contre
+``api`` (``ocrmypdf.ocr`` dans des processus persistants, ``OCR_EXECUTOR``).
+Génère un PDF synthétique (pages de texte rendues par Pillow), puis exécute
+``jobs`` appels ``run_ocrmypdf`` avec ``workers`` workers concurrents, comme
+``worker_loop``. Un premier tour par worker, non mesuré, démarre les
+processus du pool (le service les garde ensuite en vie).
+
+Produit un rapport JSON. ocrmypdf, Tesseract (langue ``eng``) et Ghostscript
+requis. Non exécuté par la suite de tests ; usage ::
+
+    python benchmarks.py short-jobs --pages 20 30 --jobs 12 --workers 2 --out short.json
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+EXECUTORS = ("cli", "api")
+
+
+def make_pdf(path: str, pages: int, width: int, height: int) -> int:
+    """
+    Crée un PDF de ``pages`` pages de texte (une image par page, comme ``raw.pdf``).
+
+    :return: Taille du fichier en octets.
+    """
+    from PIL import Image, ImageDraw
+
+    images = []
+    for i in range(pages):
+        im = Image.new("L", (width, height), 255)
+        draw = ImageDraw.Draw(im)
+        for row in range(40, height - 40, 28):
+            draw.text((40, row), f"Page {i + 1} line {row // 28} the quick brown fox jumps", fill=0)
+        images.append(im)
+    images[0].save(path, "PDF", resolution=150, save_all=True, append_images=images[1:])
+    return os.path.getsize(path)
+
+
+def run_short_jobs(pdf: str, executor: str, workers: int, jobs: int, tmp: str) -> dict:
+    """
+    Exécute ``jobs`` appels ``run_ocrmypdf`` sur ``pdf`` avec ``workers`` workers.
+    """
+    import app.main as svc
+    from app.ocr_pool import OcrProcessPool
+
+    data = {"lang": "eng", "rotatePages": True, "deskew": True, "optimize": 1}
+    pool = OcrProcessPool(workers) if executor == "api" else None
+    svc._pool = pool
+    threads = ThreadPoolExecutor(max_workers=workers)
+
+    def one(i: int) -> None:
+        dest = os.path.join(tmp, f"{executor}-{workers}-{i}.pdf")
+        with open(os.devnull, "w", encoding="utf-8") as log:
+            svc.run_ocrmypdf(f"bench-{executor}-{i}", data, pdf, dest, log)
+        os.remove(dest)
+
+    try:
+        list(threads.map(one, range(-workers, 0)))
+        t0 = time.perf_counter()
+        list(threads.map(one, range(jobs)))
+        elapsed = time.perf_counter() - t0
+    finally:
+        threads.shutdown()
+        svc._pool = None
+        if pool is not None:
+            pool.shutdown()
+    return {
+        "executor": executor,
+        "workers": workers,
+        "jobs": jobs,
+        "seconds": round(elapsed, 3),
+        "seconds_per_job": round(elapsed / jobs, 3),
+        "jobs_per_min": round(60 * jobs / elapsed, 2),
+    }
+
+
+def bench_short_jobs(args) -> dict:
+    report = {"width": args.width, "height": args.height, "workers": args.workers,
+              "cpu_count": os.cpu_count(), "runs": []}
+    with tempfile.TemporaryDirectory(prefix="ocr-bench-") as tmp:
+        os.environ["DATA_DIR"] = tmp  # file et registre du service hors de /data
+        for pages in args.pages:
+            pdf = os.path.join(tmp, f"chapter-{pages}.pdf")
+            make_pdf(pdf, pages, args.width, args.height)
+            cli = None
+            for executor in EXECUTORS:
+                run = run_short_jobs(pdf, executor, args.workers, args.jobs, tmp)
+                run["pages"] = pages
+                cli = cli or run["jobs_per_min"]
+                run["speedup"] = round(run["jobs_per_min"] / cli, 2)
+                report["runs"].append(run)
+                print(f"{pages:4d} pages  {executor:3s}  {run['seconds_per_job']:7.2f} s/job  "
+                      f"{run['jobs_per_min']:7.2f} jobs/min  x{run['speedup']:5.2f}",
+                      file=sys.stderr)
+    return report
+
+
+def main(argv=None) -> dict:
+    parser = argparse.ArgumentParser(description="Benchmarks de l'ocr-service")
+    sub = parser.add_subparsers(dest="bench", required=True)
+
+    short = sub.add_parser("short-jobs", help="Débit de jobs courts : exécuteur cli contre api")
+    short.add_argument("--pages", type=int, nargs="+", default=[20, 30],
+                       help="Pages par job (un PDF synthétique par valeur)")
+    short.add_argument("--jobs", type=int, default=12, help="Jobs mesurés par exécuteur")
+    short.add_argument("--workers", type=int, default=1, help="Workers concurrents")
+    short.add_argument("--width", type=int, default=1240)
+    short.add_argument("--height", type=int, default=1754)
+    short.add_argument("--out", help="Fichier JSON de sortie (stdout sinon)")
+    args = parser.parse_args(argv)
+
+    report = bench_short_jobs(args)
+    text = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(text)
+    else:
+        print(text)
+    return report
+
+
+if __name__ == "__main__":
+    main()
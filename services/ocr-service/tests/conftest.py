@@ -0,0 +1,31 @@
+"""
+Fixtures partagées des tests du ocr-service.
+"""
+import io
+from unittest.mock import MagicMock
+
+import pytest
+
+
+@pytest.fixture
+def mock_ocrmypdf(mocker):
+    """
+    Remplace ``subprocess.Popen`` (ocrmypdf exécuté en streaming) par un faux
+    processus piloté par une fonction au format de ``subprocess.run`` :
+    ``run(cmd, **kwargs)`` retourne un objet ``returncode``/``stdout``/``stderr``
+    (et crée le fichier de sortie, comme ocrmypdf).
+
+    :return: ``install(run) -> mock`` de ``subprocess.Popen`` (``call_args`` : commande, env).
+    """
+    def install(run):
+        def popen(cmd, **kwargs):
+            res = run(cmd, **kwargs)
+            proc = MagicMock()
+            proc.stdout = io.StringIO((res.stdout or "") + (res.stderr or ""))
+            proc.wait.return_value = res.returncode
+            proc.returncode = res.returncode
+            proc.__enter__.return_value = proc
+            proc.__exit__.return_value = False
+            return proc
+        return mocker.patch("subprocess.Popen", side_effect=popen)
+    return install
@@ -104,6 +104,11 @@ class TestBuildOcrmypdfCmd:
         cmd = build_ocrmypdf_cmd("/in/raw.pdf", "/out/final.pdf", rotate=False)
         assert "--rotate-pages" not in cmd
 
+    def test_tesseract_timeout(self):
+        cmd = build_ocrmypdf_cmd("/in/raw.pdf", "/out/final.pdf", tesseract_timeout=0)
+        assert cmd[cmd.index("--tesseract-timeout") + 1] == "0"
+        assert "--tesseract-timeout" not in build_ocrmypdf_cmd("/in/raw.pdf", "/out/final.pdf")
+
     def test_deskew_desactive(self):
         """Avec deskew=False, --deskew est absent."""
         cmd = build_ocrmypdf_cmd("/in/raw.pdf", "/out/final.pdf", deskew=False)
@@ -121,6 +126,18 @@ class TestBuildOcrmypdfCmd:
         idx = cmd.index("--optimize")
         assert cmd[idx + 1] == "0"
 
+    def test_jobs_passe_a_la_commande(self):
+        """jobs=N ajoute --jobs N ; absent par défaut (un par cœur)."""
+        cmd = build_ocrmypdf_cmd("/in/raw.pdf", "/out/final.pdf", jobs=4)
+        assert cmd[cmd.index("--jobs") + 1] == "4"
+        assert "--jobs" not in build_ocrmypdf_cmd("/in/raw.pdf", "/out/final.pdf")
+
+    def test_selection_de_pages(self):
+        """pages="2-3,5" ajoute --pages ; source et destination restent en fin."""
+        cmd = build_ocrmypdf_cmd("/in/raw.pdf", "/out/final.pdf", pages="2-3,5")
+        assert cmd[cmd.index("--pages") + 1] == "2-3,5"
+        assert cmd[-2:] == ["/in/raw.pdf", "/out/final.pdf"]
+
     def test_source_et_dest_en_fin_de_commande(self):
         """Source et destination sont les deux derniers arguments."""
         cmd = build_ocrmypdf_cmd("/src.pdf", "/dst.pdf")
@@ -188,3 +205,28 @@ class TestRequeuRunning:
         count = requeue_running(str(running_dir), str(queue_dir))
         assert count == 0
 
+
+
+# ---------------------------------------------------------------------------
+# notify_callback
+# ---------------------------------------------------------------------------
+
+class TestNotifyCallback:
+    """POST best-effort du statut vers l'orchestrateur."""
+
+    def test_succes_2xx(self):
+        from app.core import notify_callback
+        resp = MagicMock()
+        resp.status = 202
+        resp.__enter__ = lambda s: s
+        resp.__exit__ = lambda s, *a: False
+        with patch("app.core.urllib.request.urlopen", return_value=resp) as urlopen:
+            assert notify_callback("http://orch/callbacks/ocr", {"jobId": "j1"}) is True
+        req = urlopen.call_args[0][0]
+        assert req.get_method() == "POST"
+        assert b'"jobId"' in req.data
+
+    def test_orchestrateur_injoignable_retourne_false(self):
+        from app.core import notify_callback
+        with patch("app.core.urllib.request.urlopen", side_effect=OSError("refused")):
+            assert notify_callback("http://orch/callbacks/ocr", {"jobId": "j1"}) is False
@@ -0,0 +1,107 @@
+"""
+Tests unitaires du ocr-service — budget CPU (répartition des cœurs entre jobs OCR).
+Aucun outil externe requis (subprocess mocké).
+"""
+import json
+import os
+import sys
+from unittest.mock import MagicMock
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from app.cpu_budget import CpuBudget, available_cores, split_cores
+
+
+class TestCpuBudget:
+
+    def test_job_seul_recoit_tout_le_budget(self):
+        assert CpuBudget(16).acquire("a") == 16
+
+    def test_reequilibrage_aux_demarrages_et_fins(self):
+        budget = CpuBudget(16, max_jobs=3)
+        # Seul : tout le budget moins un cœur par autre job possible
+        assert budget.acquire("a") == 14
+        assert budget.acquire("b") == 1
+        assert budget.acquire("c") == 1
+        budget.release("a")
+        budget.release("b")
+        assert budget.acquire("d") == 8
+        assert budget.stats()["jobs"] == {"c": 1, "d": 8}
+
+    def test_coeurs_deja_alloues_deduits(self):
+        budget = CpuBudget(16, max_jobs=2)
+        assert budget.acquire("a") == 15
+        assert budget.acquire("b") == 1
+        budget.release("a")
+        assert budget.acquire("c") == 8
+
+    def test_somme_jamais_au_dessus_du_budget(self):
+        import random
+
+        rng = random.Random(0)
+        for total, max_jobs in ((16, 4), (8, 8), (5, 2)):
+            budget = CpuBudget(total, max_jobs=max_jobs)
+            running = []
+            for i in range(500):
+                if running and (len(running) == max_jobs or rng.random() < 0.5):
+                    budget.release(running.pop(rng.randrange(len(running))))
+                else:
+                    job = f"j{i}"
+                    budget.acquire(job, expected_jobs=rng.randint(1, max_jobs))
+                    running.append(job)
+                assert budget.stats()["allocated"] <= total
+
+    def test_jobs_attendus_comptes(self):
+        assert CpuBudget(16).acquire("a", expected_jobs=4) == 4
+
+    def test_au_moins_un_coeur(self):
+        budget = CpuBudget(2)
+        for job in "abc":
+            budget.acquire(job)
+        assert budget.acquire("d") == 1
+
+    def test_split_cores(self):
+        assert split_cores(8) == (8, 1)
+        assert split_cores(8, n_pages=100) == (8, 1)
+        assert split_cores(8, n_pages=2) == (2, 4)
+
+    def test_available_cores(self):
+        assert available_cores() >= 1
+
+
+class TestRunJob:
+
+    def test_jobs_et_omp_thread_limit_transmis(self, tmp_path, monkeypatch, mock_ocrmypdf):
+        import app.main as svc
+
+        monkeypatch.setattr(svc, "CPU", CpuBudget(8))
+        monkeypatch.setattr(svc, "OCR_CPU_SCHEDULER", True)
+        monkeypatch.setattr(svc, "SERVICE_CONCURRENCY", 2)
+        monkeypatch.setattr(svc, "_job_queue", MagicMock(depth=MagicMock(return_value=3)))
+        work_dir = str(tmp_path / "work")
+        os.makedirs(os.path.join(work_dir, "job1"))
+        meta_path = str(tmp_path / "job1.json")
+        with open(meta_path, "w", encoding="utf-8") as f:
+            json.dump({"jobId": "job1", "rawPdfPath": "/in/raw.pdf", "workDir": work_dir}, f)
+
+        def fake_run(cmd, **kwargs):
+            with open(cmd[-1], "wb") as out:
+                out.write(b"%PDF-1.4 ocr")
+            return MagicMock(returncode=0, stdout="", stderr="")
+
+        run = mock_ocrmypdf(fake_run)
+        svc.run_job(meta_path)
+
+        cmd, kwargs = run.call_args.args[0], run.call_args.kwargs
+        # 2 jobs attendus (file non vide, SERVICE_CONCURRENCY=2) : 4 cœurs chacun
+        assert cmd[cmd.index("--jobs") + 1] == "4"
+        assert kwargs["env"]["OMP_THREAD_LIMIT"] == "1"
+        with open(meta_path, encoding="utf-8") as f:
+            assert json.load(f)["cpu"]["cores"] == 4
+        assert svc.CPU.stats()["allocated"] == 0
+
+    def test_budget_desactive(self, monkeypatch):
+        import app.main as svc
+
+        monkeypatch.setattr(svc, "OCR_CPU_SCHEDULER", False)
+        assert svc.allocate_cpu("job1") is None
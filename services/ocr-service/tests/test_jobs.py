@@ -31,7 +31,7 @@ def _read_json(path: str) -> dict:
 class TestRunJobOk:
     """Job OCR qui réussit : mock subprocess rc=0, final.pdf créé."""
 
-    def test_state_done_apres_succes(self, tmp_path, mocker):
+    def test_state_done_apres_succes(self, tmp_path, mock_ocrmypdf):
         """Après un run_job réussi, l'état du job est DONE."""
         import app.main as svc
 
@@ -56,7 +56,7 @@ class TestRunJobOk:
             "optimize": 1,
         })
 
-        # Mock subprocess.run : rc=0 + crée final.tmp.pdf
+        # Mock ocrmypdf : rc=0 + crée final.tmp.pdf
         final_tmp = os.path.join(job_dir, "final.tmp.pdf")
 
         def fake_run(cmd, **kwargs):
@@ -69,7 +69,7 @@ class TestRunJobOk:
             m.stderr = ""
             return m
 
-        mocker.patch("subprocess.run", side_effect=fake_run)
+        mock_ocrmypdf(fake_run)
 
         svc.run_job(meta_path)
 
@@ -78,7 +78,7 @@ class TestRunJobOk:
         assert os.path.exists(os.path.join(job_dir, "final.pdf"))
         assert meta["artifacts"]["finalPdf"].endswith("final.pdf")
 
-    def test_final_pdf_existe_apres_succes(self, tmp_path, mocker):
+    def test_final_pdf_existe_apres_succes(self, tmp_path, mock_ocrmypdf):
         """Après succès, final.pdf est bien créé (rename atomique depuis final.tmp.pdf)."""
         import app.main as svc
 
@@ -109,7 +109,7 @@ class TestRunJobOk:
             m.stderr = ""
             return m
 
-        mocker.patch("subprocess.run", side_effect=fake_run)
+        mock_ocrmypdf(fake_run)
         svc.run_job(meta_path)
 
         assert os.path.exists(os.path.join(job_dir, "final.pdf"))
@@ -123,7 +123,7 @@ class TestRunJobOk:
 class TestRunJobError:
     """Job OCR qui échoue : mock subprocess rc!=0."""
 
-    def test_state_error_si_ocrmypdf_echoue(self, tmp_path, mocker):
+    def test_state_error_si_ocrmypdf_echoue(self, tmp_path, mock_ocrmypdf):
         """Si ocrmypdf retourne rc!=0, l'état du job est ERROR."""
         import app.main as svc
 
@@ -150,7 +150,7 @@ class TestRunJobError:
             m.stderr = "ocrmypdf error output\n"
             return m
 
-        mocker.patch("subprocess.run", side_effect=fake_run_fail)
+        mock_ocrmypdf(fake_run_fail)
 
         with pytest.raises(RuntimeError):
             svc.run_job(meta_path)
@@ -160,7 +160,7 @@ class TestRunJobError:
         assert "message" in meta
         assert "ocrmypdf failed" in meta["message"]
 
-    def test_message_erreur_present(self, tmp_path, mocker):
+    def test_message_erreur_present(self, tmp_path, mock_ocrmypdf):
         """Le champ 'error' avec type et détail est présent en cas d'échec."""
         import app.main as svc
 
@@ -180,7 +180,7 @@ class TestRunJobError:
             "workDir": work_dir,
         })
 
-        mocker.patch("subprocess.run", return_value=MagicMock(
+        mock_ocrmypdf(lambda cmd, **kwargs: MagicMock(
             returncode=2, stdout="", stderr="fatal error"
         ))
 
@@ -191,3 +191,87 @@ class TestRunJobError:
         assert "error" in meta
         assert meta["error"]["type"] == "RuntimeError"
 
+
+
+# ---------------------------------------------------------------------------
+# Callback de fin de job
+# ---------------------------------------------------------------------------
+
+class TestNotifyCompletion:
+    """Notification de l'orchestrateur en fin de job (callbackUrl)."""
+
+    def test_callback_envoye_avec_le_statut(self, tmp_path, mocker):
+        import app.main as svc
+
+        meta_path = str(tmp_path / "cbjob.json")
+        _write_job_meta(meta_path, {
+            "jobId": "cbjob",
+            "state": "DONE",
+            "callbackUrl": "http://orchestrator:8080/callbacks/ocr",
+        })
+        notify = mocker.patch.object(svc, "notify_callback", return_value=True)
+
+        svc.notify_completion(meta_path)
+
+        notify.assert_called_once()
+        url, payload = notify.call_args[0]
+        assert url.endswith("/callbacks/ocr")
+        assert payload["state"] == "DONE"
+
+    def test_sans_callback_aucun_appel(self, tmp_path, mocker):
+        import app.main as svc
+
+        meta_path = str(tmp_path / "nocb.json")
+        _write_job_meta(meta_path, {"jobId": "nocb", "state": "ERROR"})
+        notify = mocker.patch.object(svc, "notify_callback")
+
+        svc.notify_completion(meta_path)
+
+        notify.assert_not_called()
+
+
+# ---------------------------------------------------------------------------
+# Statut groupé
+# ---------------------------------------------------------------------------
+
+class TestBatchStatus:
+    """``GET /jobs?ids=...`` / ``POST /jobs/status`` : plusieurs états en une réponse."""
+
+    def test_etats_de_chaque_dossier_et_inconnus(self, tmp_path, mocker):
+        import app.main as svc
+
+        dirs = {}
+        for name in ("queue", "running", "done", "error"):
+            dirs[name] = str(tmp_path / name)
+            mocker.patch.object(svc, f"{name.upper()}_DIR", dirs[name])
+        mocker.patch.object(svc, "_registry", None)
+        _write_job_meta(os.path.join(dirs["queue"], "a.json"), {"jobId": "a", "state": "QUEUED"})
+        _write_job_meta(os.path.join(dirs["running"], "b.json"), {"jobId": "b", "state": "RUNNING"})
+        _write_job_meta(os.path.join(dirs["done"], "c.json"), {"jobId": "c", "state": "DONE"})
+
+        res = svc.status_many("a,b,c,zz,,a")
+
+        assert {k: v["state"] for k, v in res["jobs"].items()} == {"a": "QUEUED", "b": "RUNNING", "c": "DONE"}
+        assert res["missing"] == ["zz"]
+        assert svc.status_many_post(svc.StatusBatch(ids=["c", "zz"])) == {
+            "jobs": {"c": {"jobId": "c", "state": "DONE"}}, "missing": ["zz"],
+        }
+
+
+class TestSubmitPriorite:
+    """``POST /jobs/ocr`` avec ``priority`` : réclamé avant les jobs plus anciens."""
+
+    def test_priorite_reclamee_en_premier(self, tmp_path, monkeypatch):
+        import app.main as svc
+
+        for name in ("queue", "running", "done", "error"):
+            monkeypatch.setattr(svc, f"{name.upper()}_DIR", str(tmp_path / name))
+        monkeypatch.setattr(svc, "_job_queue", None)
+        monkeypatch.setattr(svc, "_registry", None)
+        base = {"rawPdfPath": "/w/raw.pdf", "workDir": "/w"}
+        svc.submit(svc.OcrSubmit(jobId="old", **base))
+        svc.submit(svc.OcrSubmit(jobId="vip", priority=10, **base))
+
+        assert os.path.basename(svc.claim_one()) == "vip.json"
+        assert os.path.basename(svc.claim_one()) == "old.json"
+        assert svc.claim_one() is None
@@ -0,0 +1,204 @@
+"""
+Tests unitaires du ocr-service — exécution d'ocrmypdf par son API Python
+dans des processus persistants (``OCR_EXECUTOR=api``).
+
+ocrmypdf n'est pas requis : le pool reçoit une fonction de ce module à la
+place d'``ocrmypdf.ocr`` (exécutée dans un vrai processus ``spawn``).
+"""
+import json
+import logging
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import pytest
+
+
+def _fake_ocr(src, dest, **kwargs):
+    """``ocrmypdf.ocr`` factice : messages par page, sortie = arguments reçus."""
+    log = logging.getLogger("ocrmypdf")
+    log.info("Start processing")
+    for page in range(1, 4):
+        log.debug("rasterize", extra={"pageno": page})
+    with open(dest, "w", encoding="utf-8") as f:
+        json.dump({"src": src, "kwargs": kwargs, "pid": os.getpid(),
+                   "omp": os.environ.get("OMP_THREAD_LIMIT")}, f)
+    return 0
+
+
+class _PriorOcr(Exception):
+    exit_code = 6
+
+
+def _fail_ocr(src, dest, **kwargs):
+    raise _PriorOcr("page already has text")
+
+
+def _die_ocr(src, dest, **kwargs):
+    os._exit(1)
+
+
+def _read_json(path: str) -> dict:
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+class TestKwargs:
+    """``build_ocrmypdf_kwargs`` : mêmes options que ``build_ocrmypdf_cmd``."""
+
+    def test_defauts(self):
+        from app.core import build_ocrmypdf_kwargs
+
+        assert build_ocrmypdf_kwargs() == {
+            "output_type": "pdf", "progress_bar": False, "rotate_pages": True,
+            "deskew": True, "optimize": 1, "language": ["fra", "eng"],
+        }
+
+    def test_options_desactivees_absentes(self):
+        from app.core import build_ocrmypdf_kwargs
+
+        kwargs = build_ocrmypdf_kwargs(lang="deu", rotate=False, deskew=False, optimize=0,
+                                       jobs=3, pages="1-2,5", tesseract_timeout=0)
+        assert "rotate_pages" not in kwargs and "deskew" not in kwargs
+        assert kwargs["optimize"] == 0
+        assert kwargs["jobs"] == 3
+        assert kwargs["pages"] == "1-2,5"
+        assert kwargs["tesseract_timeout"] == 0
+        assert kwargs["language"] == ["deu"]
+
+
+class TestPool:
+    """``OcrProcessPool`` : processus persistants, recyclage, crash."""
+
+    def test_appel_dans_un_processus_persistant(self, tmp_path):
+        from app.ocr_pool import OcrProcessPool
+
+        pool = OcrProcessPool(1, ocr=_fake_ocr)
+        lines = []
+        try:
+            first = pool.run("in.pdf", str(tmp_path / "a.pdf"), {"jobs": 2}, threads=3,
+                             log_path=str(tmp_path / "a.log"), on_line=lines.append,
+                             verbose=True)
+            second = pool.run("in.pdf", str(tmp_path / "b.pdf"), {},
+                              log_path=str(tmp_path / "b.log"))
+        finally:
+            pool.shutdown()
+
+        assert first["exitCode"] == 0 and first["error"] is None
+        assert first["pid"] != os.getpid()
+        assert second["pid"] == first["pid"]
+        assert second["callsInProcess"] == 2
+        out = _read_json(str(tmp_path / "a.pdf"))
+        assert out["kwargs"] == {"jobs": 2}
+        assert out["omp"] == "3"
+        assert _read_json(str(tmp_path / "b.pdf"))["omp"] != "3"
+        assert lines[0] == "Start processing\n"
+        assert lines[1:] == [f"{p:5d} rasterize\n" for p in range(1, 4)]
+        assert not os.path.exists(tmp_path / "a.log")
+
+    def test_recyclage_apres_n_appels(self, tmp_path):
+        from app.ocr_pool import OcrProcessPool
+
+        pool = OcrProcessPool(1, max_jobs_per_worker=1, ocr=_fake_ocr)
+        try:
+            first = pool.run("in.pdf", str(tmp_path / "a.pdf"), {}, log_path=str(tmp_path / "a.log"))
+            second = pool.run("in.pdf", str(tmp_path / "b.pdf"), {}, log_path=str(tmp_path / "b.log"))
+        finally:
+            pool.shutdown()
+        assert first["pid"] != second["pid"]
+        assert second["callsInProcess"] == 1
+
+    def test_exception_ocrmypdf_code_de_sortie(self, tmp_path):
+        from app.ocr_pool import OcrProcessPool
+
+        pool = OcrProcessPool(1, ocr=_fail_ocr)
+        lines = []
+        try:
+            report = pool.run("in.pdf", str(tmp_path / "a.pdf"), {},
+                              log_path=str(tmp_path / "a.log"), on_line=lines.append)
+        finally:
+            pool.shutdown()
+        assert report["exitCode"] == 6
+        assert report["error"] == "_PriorOcr: page already has text"
+        assert lines == ["_PriorOcr: page already has text\n"]
+
+    def test_processus_tue_pool_recree(self, tmp_path):
+        from app.ocr_pool import OcrProcessPool, WorkerCrashed
+
+        pool = OcrProcessPool(1, ocr=_die_ocr)
+        try:
+            with pytest.raises(WorkerCrashed):
+                pool.run("in.pdf", str(tmp_path / "a.pdf"), {}, log_path=str(tmp_path / "a.log"))
+            assert pool.restarts == 1
+            pool.ocr = _fake_ocr
+            report = pool.run("in.pdf", str(tmp_path / "b.pdf"), {},
+                              log_path=str(tmp_path / "b.log"))
+        finally:
+            pool.shutdown()
+        assert report["callsInProcess"] == 1
+
+    def test_make_pool_repli_cli(self, monkeypatch):
+        import app.ocr_pool as op
+
+        assert op.make_pool("cli", 1, 0) is None
+        monkeypatch.setattr(op.importlib.util, "find_spec", lambda name: None)
+        assert op.make_pool("api", 1, 0) is None
+
+
+class TestRunJob:
+    """``run_job`` en mode ``api`` : même séquence, appel délégué au pool."""
+
+    def _job(self, tmp_path, job_id="apijob"):
+        job_dir = tmp_path / "work" / job_id
+        job_dir.mkdir(parents=True)
+        raw_pdf = job_dir / "raw.pdf"
+        raw_pdf.write_bytes(b"%PDF-1.4 fake")
+        meta_path = str(tmp_path / "work" / f"{job_id}.json")
+        with open(meta_path, "w", encoding="utf-8") as f:
+            json.dump({"jobId": job_id, "rawPdfPath": str(raw_pdf),
+                       "workDir": str(tmp_path / "work"), "lang": "fra", "deskew": False}, f)
+        return meta_path, job_dir
+
+    def test_job_done_via_api(self, tmp_path, monkeypatch):
+        import app.main as svc
+        from app.ocr_pool import OcrProcessPool
+
+        meta_path, job_dir = self._job(tmp_path)
+        pool = OcrProcessPool(1, ocr=_fake_ocr)
+        monkeypatch.setattr(svc, "_pool", pool)
+        try:
+            svc.run_job(meta_path)
+        finally:
+            pool.shutdown()
+
+        meta = _read_json(meta_path)
+        assert meta["state"] == "DONE"
+        out = _read_json(str(job_dir / "final.pdf"))
+        assert out["src"].endswith("raw.pdf")
+        assert out["kwargs"]["language"] == ["fra"]
+        assert "deskew" not in out["kwargs"]
+        assert out["pid"] != os.getpid()
+        log = (job_dir / "ocr.log").read_text(encoding="utf-8")
+        assert "API: ocrmypdf.ocr(" in log
+        assert "    3 rasterize" in log
+        assert "WORKER: pid=" in log
+        assert svc.info()["executor"]["calls"] == 1
+
+    def test_job_error_via_api(self, tmp_path, monkeypatch):
+        import app.main as svc
+        from app.ocr_pool import OcrProcessPool
+
+        meta_path, job_dir = self._job(tmp_path, "apierr")
+        pool = OcrProcessPool(1, ocr=_fail_ocr)
+        monkeypatch.setattr(svc, "_pool", pool)
+        try:
+            with pytest.raises(RuntimeError):
+                svc.run_job(meta_path)
+        finally:
+            pool.shutdown()
+
+        meta = _read_json(meta_path)
+        assert meta["state"] == "ERROR"
+        assert "ocrmypdf failed rc=6" in meta["message"]
+        assert "_PriorOcr" in (job_dir / "ocr.log").read_text(encoding="utf-8")
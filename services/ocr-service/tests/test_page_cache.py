@@ -0,0 +1,182 @@
+"""
+Tests unitaires du ocr-service — cache OCR par page (clés, LRU par taille, réutilisation dans run_job).
+ocrmypdf mocké (fixture mock_ocrmypdf) ; pikepdf, img2pdf et Pillow requis pour fabriquer les PDF de test.
+"""
+import io
+import json
+import os
+import shutil
+import sys
+import time
+from unittest.mock import MagicMock
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import pytest
+
+pikepdf = pytest.importorskip("pikepdf", reason="pikepdf requis pour lire et assembler les PDF")
+img2pdf = pytest.importorskip("img2pdf", reason="img2pdf requis pour fabriquer les PDF de test")
+pytest.importorskip("PIL", reason="pillow requis pour générer des images de test")
+from PIL import Image
+
+from app.page_cache import PageCache, page_keys
+
+
+def _jpeg(shade: int, width: int = 60) -> bytes:
+    buf = io.BytesIO()
+    Image.new("RGB", (width, 80), (shade, shade, shade)).save(buf, format="JPEG")
+    return buf.getvalue()
+
+
+def _make_pdf(path: str, shades) -> str:
+    """Une page JPEG par teinte (largeur 100 + teinte, pour vérifier l'ordre)."""
+    with open(path, "wb") as f:
+        f.write(img2pdf.convert([_jpeg(s, 100 + s) for s in shades]))
+    return path
+
+
+def _mark_pdfa(path: str) -> str:
+    """Ajoute à un PDF le profil de sortie et le XMP PDF/A qu'écrit ocrmypdf."""
+    with pikepdf.open(path, allow_overwriting_input=True) as pdf:
+        pdf.Root.OutputIntents = pdf.make_indirect(pikepdf.Array([pikepdf.Dictionary(
+            Type=pikepdf.Name.OutputIntent, S=pikepdf.Name.GTS_PDFA1,
+            OutputConditionIdentifier="sRGB")]))
+        with pdf.open_metadata(set_pikepdf_as_editor=False) as meta:
+            meta["pdfaid:part"] = "2"
+        pdf.save(path)
+    return path
+
+
+def _is_pdfa(path: str) -> bool:
+    with pikepdf.open(path) as pdf:
+        return ("/OutputIntents" in pdf.Root and "/Metadata" in pdf.Root
+                and pdf.open_metadata().get("pdfaid:part") == "2")
+
+
+def _widths(path: str) -> list:
+    with pikepdf.open(path) as pdf:
+        return [int(round(float(p.mediabox[2]) * 96 / 72)) for p in pdf.pages]
+
+
+class TestKeys:
+
+    def test_pages_identiques_meme_cle_entre_documents(self, tmp_path):
+        a = page_keys(_make_pdf(str(tmp_path / "a.pdf"), [1, 2, 3]), "p")
+        b = page_keys(_make_pdf(str(tmp_path / "b.pdf"), [9, 2, 1]), "p")
+
+        assert len(set(a)) == 3
+        assert b[1] == a[1] and b[2] == a[0] and b[0] not in a
+
+    def test_profil_dans_la_cle(self, tmp_path):
+        pdf = _make_pdf(str(tmp_path / "a.pdf"), [1])
+        assert page_keys(pdf, "fra") != page_keys(pdf, "eng")
+
+
+class TestLru:
+
+    def _store(self, cache, tmp_path, shades, keys):
+        pdf = _make_pdf(str(tmp_path / f"src{keys[0]}.pdf"), shades)
+        return cache.store_pages(pdf, keys)
+
+    def test_hits_misses(self, tmp_path):
+        cache = PageCache(str(tmp_path / "cache"))
+        self._store(cache, tmp_path, [1, 2], ["aa1", "bb2"])
+
+        found = cache.lookup(["aa1", "cc3", "bb2"])
+
+        assert [bool(p) for p in found] == [True, False, True]
+        stats = cache.stats()
+        assert stats["hits"] == 2 and stats["misses"] == 1 and stats["hitRate"] == pytest.approx(0.6667)
+
+    def test_eviction_des_moins_recemment_utilisees(self, tmp_path):
+        cache = PageCache(str(tmp_path / "cache"))
+        self._store(cache, tmp_path, [1, 2, 3], ["aa1", "bb2", "cc3"])
+        entry = os.path.getsize(cache.lookup(["aa1"])[0])
+        old = time.time() - 100
+        for i, key in enumerate(["aa1", "bb2", "cc3"]):
+            os.utime(cache._path(key), (old + i, old + i))
+        cache.lookup(["aa1"])  # relue : la plus récente
+
+        cache.max_bytes = int(entry * 2.5)
+        self._store(cache, tmp_path, [4], ["dd4"])
+
+        assert [bool(p) for p in cache.lookup(["aa1", "bb2", "cc3", "dd4"])] == [True, False, False, True]
+        assert cache.stats()["evicted"] == 2
+
+
+class TestRunJob:
+
+    @pytest.fixture
+    def svc(self, tmp_path, monkeypatch):
+        import app.main as svc
+
+        monkeypatch.setattr(svc, "OCR_CACHE_DIR", str(tmp_path / "cache"))
+        monkeypatch.setattr(svc, "_page_cache", None)
+        monkeypatch.setattr(svc, "OCR_CPU_SCHEDULER", False)
+        return svc
+
+    def _job(self, tmp_path, job_id, shades) -> tuple:
+        work_dir = str(tmp_path / "work")
+        job_dir = os.path.join(work_dir, job_id)
+        os.makedirs(job_dir)
+        raw = _make_pdf(os.path.join(job_dir, "raw.pdf"), shades)
+        meta_path = str(tmp_path / f"{job_id}.json")
+        with open(meta_path, "w", encoding="utf-8") as f:
+            json.dump({"jobId": job_id, "rawPdfPath": raw, "workDir": work_dir}, f)
+        return meta_path, job_dir
+
+    def _fake_ocrmypdf(self, pages_seen=None, pdfa=False):
+        def fake_run(cmd, **kwargs):
+            if pages_seen is not None:
+                pages_seen.append(_widths(cmd[-2]))
+            shutil.copyfile(cmd[-2], cmd[-1])
+            if pdfa:
+                _mark_pdfa(cmd[-1])
+            return MagicMock(returncode=0, stdout="", stderr="")
+        return fake_run
+
+    def _state(self, meta_path) -> dict:
+        with open(meta_path, encoding="utf-8") as f:
+            return json.load(f)
+
+    def test_seules_les_pages_absentes_sont_ocrisees(self, svc, tmp_path, mock_ocrmypdf):
+        seen = []
+        mock_ocrmypdf(self._fake_ocrmypdf(seen))
+        first, _ = self._job(tmp_path, "job1", [1, 2, 3])
+        svc.run_job(first)
+        assert self._state(first)["cache"] == {"pages": 3, "hits": 0, "misses": 3, "hitRate": 0.0}
+
+        second, job_dir = self._job(tmp_path, "job2", [2, 7, 1])
+        svc.run_job(second)
+
+        assert seen == [[101, 102, 103], [107]]
+        assert self._state(second)["cache"]["hits"] == 2
+        assert _widths(os.path.join(job_dir, "final.pdf")) == [102, 107, 101]
+        assert not os.path.exists(os.path.join(job_dir, "misses.pdf"))
+
+    def test_livre_entierement_en_cache_sans_ocrmypdf(self, svc, tmp_path, mock_ocrmypdf):
+        run = mock_ocrmypdf(self._fake_ocrmypdf())
+        svc.run_job(self._job(tmp_path, "job1", [1, 2])[0])
+
+        meta_path, job_dir = self._job(tmp_path, "job2", [2, 1])
+        svc.run_job(meta_path)
+
+        assert run.call_count == 1
+        state = self._state(meta_path)
+        assert state["state"] == "DONE" and state["cache"]["hitRate"] == 1.0
+        assert _widths(os.path.join(job_dir, "final.pdf")) == [102, 101]
+
+    def test_final_pdfa_avec_pages_en_cache(self, svc, tmp_path, mock_ocrmypdf):
+        """Réassemblage (partiel ou total depuis le cache) : catalogue PDF/A d'ocrmypdf conservé."""
+        mock_ocrmypdf(self._fake_ocrmypdf(pdfa=True))
+        svc.run_job(self._job(tmp_path, "job1", [1, 2])[0])
+
+        partial, partial_dir = self._job(tmp_path, "job2", [2, 5])
+        svc.run_job(partial)
+        full, full_dir = self._job(tmp_path, "job3", [1, 2])
+        svc.run_job(full)
+
+        assert self._state(partial)["cache"]["hits"] == 1
+        assert _is_pdfa(os.path.join(partial_dir, "final.pdf"))
+        assert self._state(full)["cache"]["hitRate"] == 1.0
+        assert _is_pdfa(os.path.join(full_dir, "final.pdf"))
@@ -0,0 +1,157 @@
+"""
+Tests unitaires du ocr-service — pré-classification des pages sans texte (encrage, contours).
+ocrmypdf mocké (fixture mock_ocrmypdf) ; numpy, pikepdf, img2pdf et Pillow requis.
+"""
+import io
+import json
+import os
+import shutil
+import sys
+from unittest.mock import MagicMock
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import pytest
+
+pytest.importorskip("numpy", reason="numpy requis pour la pré-classification")
+pikepdf = pytest.importorskip("pikepdf", reason="pikepdf requis pour lire les PDF")
+img2pdf = pytest.importorskip("img2pdf", reason="img2pdf requis pour fabriquer les PDF de test")
+pytest.importorskip("PIL", reason="pillow requis pour générer des images de test")
+from PIL import Image, ImageDraw
+
+from app.page_classify import classify_pages, ink_stats, page_ranges
+
+
+def _blank(size=(600, 900)) -> Image.Image:
+    return Image.new("RGB", size, (250, 250, 248))
+
+
+def _text(size=(600, 900)) -> Image.Image:
+    im = _blank(size)
+    draw = ImageDraw.Draw(im)
+    for y in range(40, size[1] - 40, 24):
+        draw.text((30, y), "LOREM IPSUM DOLOR SIT AMET " * 2, fill=(0, 0, 0))
+    return im
+
+
+def _gradient(size=(600, 900)) -> Image.Image:
+    return Image.linear_gradient("L").resize(size).convert("RGB")
+
+
+def _jpeg(im: Image.Image) -> bytes:
+    buf = io.BytesIO()
+    im.save(buf, format="JPEG", quality=90)
+    return buf.getvalue()
+
+
+def _make_pdf(path: str, images) -> str:
+    with open(path, "wb") as f:
+        f.write(img2pdf.convert([_jpeg(im) for im in images]))
+    return path
+
+
+class TestStats:
+
+    def test_page_blanche_sans_encre(self):
+        ink, edges = ink_stats(_blank())
+        assert ink < 0.002 and edges < 0.001
+
+    def test_page_de_texte_encree_et_contours(self):
+        ink, edges = ink_stats(_text())
+        assert ink > 0.01 and edges > 0.02
+
+    def test_degrade_encre_sans_contours(self):
+        ink, edges = ink_stats(_gradient())
+        assert ink > 0.5 and edges < 0.001
+
+    def test_classification(self, tmp_path):
+        pdf = _make_pdf(str(tmp_path / "raw.pdf"), [_blank(), _text(), _gradient()])
+
+        assert classify_pages(pdf) == ["blank", None, None]
+        assert classify_pages(pdf, edge_ratio=0.005) == ["blank", None, "textless"]
+        assert classify_pages(pdf, ink_ratio=0) == [None, None, None]
+
+    def test_page_ranges(self):
+        assert page_ranges([0, 1, 2, 4, 7, 8]) == "1-3,5,8-9"
+        assert page_ranges([3]) == "4"
+        assert page_ranges([]) == ""
+
+
+class TestRunJob:
+
+    @pytest.fixture
+    def svc(self, monkeypatch):
+        import app.main as svc
+
+        monkeypatch.setattr(svc, "OCR_SKIP_TEXTLESS", True)
+        monkeypatch.setattr(svc, "OCR_CPU_SCHEDULER", False)
+        monkeypatch.setattr(svc, "OCR_CACHE_DIR", "")
+        monkeypatch.setattr(svc, "_page_cache", None)
+        return svc
+
+    def _job(self, tmp_path, images) -> tuple:
+        work_dir = str(tmp_path / "work")
+        job_dir = os.path.join(work_dir, "job1")
+        os.makedirs(job_dir)
+        raw = _make_pdf(os.path.join(job_dir, "raw.pdf"), images)
+        meta_path = str(tmp_path / "job1.json")
+        with open(meta_path, "w", encoding="utf-8") as f:
+            json.dump({"jobId": "job1", "rawPdfPath": raw, "workDir": work_dir}, f)
+        return meta_path, job_dir
+
+    def _run(self, mock_ocrmypdf, pages_seen=None):
+        def fake_run(cmd, **kwargs):
+            if pages_seen is not None:
+                with pikepdf.open(cmd[-2]) as pdf:
+                    pages_seen.append(len(pdf.pages))
+            shutil.copyfile(cmd[-2], cmd[-1])
+            return MagicMock(returncode=0, stdout="", stderr="")
+        return mock_ocrmypdf(fake_run)
+
+    def test_pages_blanches_exclues_via_pages(self, svc, tmp_path, mock_ocrmypdf):
+        run = self._run(mock_ocrmypdf)
+        meta_path, job_dir = self._job(tmp_path, [_blank(), _text(), _text(), _blank()])
+
+        svc.run_job(meta_path)
+
+        cmd = run.call_args.args[0]
+        assert cmd[cmd.index("--pages") + 1] == "2-3"
+        with open(meta_path, encoding="utf-8") as f:
+            state = json.load(f)
+        assert state["skippedPages"] == {"blank": 2, "textless": 0}
+        with pikepdf.open(os.path.join(job_dir, "final.pdf")) as pdf:
+            assert len(pdf.pages) == 4
+
+    def test_livre_sans_texte_ocrmypdf_sans_ocr(self, svc, tmp_path, mock_ocrmypdf):
+        run = self._run(mock_ocrmypdf)
+        meta_path, job_dir = self._job(tmp_path, [_blank(), _blank()])
+
+        svc.run_job(meta_path)
+
+        # Sortie PDF/A d'ocrmypdf, sans OCR ni transformation des pages
+        cmd = run.call_args.args[0]
+        assert cmd[cmd.index("--tesseract-timeout") + 1] == "0"
+        assert "--pages" not in cmd
+        assert "--rotate-pages" not in cmd and "--deskew" not in cmd
+        with pikepdf.open(os.path.join(job_dir, "final.pdf")) as pdf:
+            assert len(pdf.pages) == 2
+
+    def test_combine_avec_le_cache(self, svc, tmp_path, monkeypatch, mock_ocrmypdf):
+        monkeypatch.setattr(svc, "OCR_CACHE_DIR", str(tmp_path / "cache"))
+        seen = []
+        self._run(mock_ocrmypdf, seen)
+        text = _text()
+        meta_path, job_dir = self._job(tmp_path, [text])
+        svc.run_job(meta_path)
+        shutil.rmtree(job_dir)
+
+        meta_path, job_dir = self._job(tmp_path, [_blank(), text, _gradient()])
+        svc.run_job(meta_path)
+
+        # 2e job : page de texte en cache, page blanche exclue, seul le dégradé est OCRisé
+        assert seen == [1, 1]
+        with open(meta_path, encoding="utf-8") as f:
+            state = json.load(f)
+        assert state["cache"]["hits"] == 1 and state["cache"]["misses"] == 1
+        with pikepdf.open(os.path.join(job_dir, "final.pdf")) as pdf:
+            assert len(pdf.pages) == 3
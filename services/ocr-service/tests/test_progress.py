@@ -0,0 +1,104 @@
+"""
+Tests unitaires du ocr-service — progression d'ocrmypdf lue en streaming (pages, ETA, heartbeat).
+ocrmypdf mocké (fixture mock_ocrmypdf).
+"""
+import json
+import os
+import sys
+from unittest.mock import MagicMock
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from app.core import stream_process
+from app.progress import PageProgress
+
+
+class _Clock:
+    def __init__(self):
+        self.t = 0.0
+
+    def __call__(self):
+        return self.t
+
+
+class TestPageProgress:
+
+    def test_pages_terminees_estimees_avec_jobs(self):
+        progress = PageProgress(10, jobs=2)
+        for page in (1, 2, 2, 3, 4):
+            progress.feed(f"    {page} [tesseract] lots of text\n")
+
+        assert progress.done() == 2
+
+    def test_lignes_sans_numero_de_page_ignorees(self):
+        progress = PageProgress(10, jobs=1)
+        assert not progress.feed("Postprocessing...\n")
+        assert not progress.feed("Optimize ratio: 1.20 savings: 16.7%\n")
+        assert progress.feed("   12 page is facing ⇧\n")
+
+    def test_eta_extrapolee(self):
+        clock = _Clock()
+        progress = PageProgress(10, jobs=1, clock=clock)
+        for page in range(1, 4):
+            progress.feed(f"{page:5d} rasterize\n")
+        clock.t = 20.0
+
+        snap = progress.snapshot()
+
+        assert snap == {"pagesDone": 2, "pagesTotal": 10, "etaSeconds": 80}
+
+    def test_fin(self):
+        progress = PageProgress(None, jobs=4)
+        progress.feed("    1 x\n")
+        assert progress.snapshot(finished=True) == {"pagesDone": 1, "pagesTotal": 1, "etaSeconds": 0}
+
+
+class TestStreamProcess:
+
+    def test_lignes_lues_au_fil_de_l_eau(self):
+        lines = []
+        rc = stream_process([sys.executable, "-c", "import sys; print('a'); print('b', file=sys.stderr); sys.exit(3)"],
+                            lines.append)
+
+        assert rc == 3
+        assert sorted(l.strip() for l in lines) == ["a", "b"]
+
+
+class TestRunJob:
+
+    def test_progression_publiee_et_heartbeat_rafraichi(self, tmp_path, monkeypatch, mock_ocrmypdf):
+        import app.main as svc
+
+        monkeypatch.setattr(svc, "OCR_PROGRESS", True)
+        monkeypatch.setattr(svc, "OCR_PROGRESS_INTERVAL_S", 0)
+        monkeypatch.setattr(svc, "OCR_CPU_SCHEDULER", False)
+        work_dir = str(tmp_path / "work")
+        job_dir = os.path.join(work_dir, "job1")
+        os.makedirs(job_dir)
+        meta_path = str(tmp_path / "job1.json")
+        with open(meta_path, "w", encoding="utf-8") as f:
+            json.dump({"jobId": "job1", "rawPdfPath": "/in/raw.pdf", "workDir": work_dir,
+                       "pages": [1, 3]}, f)
+        states = []
+        update_state = svc.update_state
+        monkeypatch.setattr(svc, "update_state",
+                            lambda path, patch: (states.append(dict(patch)), update_state(path, patch)))
+
+        def fake_run(cmd, **kwargs):
+            with open(cmd[-1], "wb") as out:
+                out.write(b"%PDF-1.4 ocr")
+            output = "".join(f"{p:5d} [tesseract] ok\n" for p in (1, 2, 3)) + "Postprocessing...\n"
+            return MagicMock(returncode=0, stdout="", stderr=output)
+
+        run = mock_ocrmypdf(fake_run)
+        svc.run_job(meta_path)
+
+        cmd = run.call_args.args[0]
+        assert cmd[cmd.index("-v") + 1] == "1"
+        progress = [s for s in states if "pagesDone" in s]
+        assert progress[0]["pagesTotal"] == 3
+        assert progress[-1] == {"pagesDone": 3, "pagesTotal": 3, "etaSeconds": 0}
+        with open(os.path.join(job_dir, "ocr.heartbeat"), encoding="utf-8") as f:
+            assert "pages 3/3" in f.read()
+        with open(os.path.join(job_dir, "ocr.log"), encoding="utf-8") as f:
+            assert "Postprocessing" in f.read()
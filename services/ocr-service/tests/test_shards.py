@@ -0,0 +1,234 @@
+"""
+Tests unitaires du ocr-service — OCR par tranches de pages (découpage, sous-jobs, assemblage).
+ocrmypdf mocké (fixture mock_ocrmypdf) ; pikepdf requis pour fabriquer les PDF de test.
+"""
+import os
+import shutil
+import sys
+from unittest.mock import MagicMock
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import pytest
+
+pikepdf = pytest.importorskip("pikepdf", reason="pikepdf requis pour découper et assembler les PDF")
+
+from app.shards import merge_pdfs, page_count, plan_shards, shard_id, split_pdf
+from app.utils import read_json
+
+
+def _make_pdf(path: str, n_pages: int) -> str:
+    """PDF de ``n_pages`` pages vides, largeurs 100, 101, ... (pour vérifier l'ordre)."""
+    pdf = pikepdf.new()
+    for i in range(n_pages):
+        pdf.add_blank_page(page_size=(100 + i, 200))
+    pdf.save(path)
+    return path
+
+
+def _mark_pdfa(path: str) -> str:
+    """Ajoute à un PDF le profil de sortie et le XMP PDF/A qu'écrit ocrmypdf."""
+    with pikepdf.open(path, allow_overwriting_input=True) as pdf:
+        pdf.Root.OutputIntents = pdf.make_indirect(pikepdf.Array([pikepdf.Dictionary(
+            Type=pikepdf.Name.OutputIntent, S=pikepdf.Name.GTS_PDFA1,
+            OutputConditionIdentifier="sRGB")]))
+        with pdf.open_metadata(set_pikepdf_as_editor=False) as meta:
+            meta["pdfaid:part"] = "2"
+            meta["pdfaid:conformance"] = "B"
+        pdf.save(path)
+    return path
+
+
+def _widths(path: str) -> list:
+    with pikepdf.open(path) as pdf:
+        return [int(p.mediabox[2]) for p in pdf.pages]
+
+
+class TestPlan:
+
+    def test_tranches_regulieres(self):
+        assert plan_shards(10, 4) == [(1, 4), (5, 8), (9, 10)]
+
+    def test_derniere_tranche_courte_fusionnee(self):
+        assert plan_shards(9, 4) == [(1, 4), (5, 9)]
+
+    def test_livre_court_ou_desactive(self):
+        assert plan_shards(3, 10) == [(1, 3)]
+        assert plan_shards(50, 0) == []
+
+    def test_split_puis_merge_conserve_l_ordre(self, tmp_path):
+        src = _make_pdf(str(tmp_path / "raw.pdf"), 7)
+        ranges = plan_shards(7, 3)
+        parts = [str(tmp_path / f"{i}.pdf") for i in range(len(ranges))]
+
+        split_pdf(src, ranges, parts)
+        merged = str(tmp_path / "final.pdf")
+
+        assert [page_count(p) for p in parts] == [3, 4]
+        assert merge_pdfs(parts, merged) == 7
+        assert _widths(merged) == _widths(src)
+
+    def test_merge_conserve_pdfa(self, tmp_path):
+        """Catalogue PDF/A (OutputIntents, XMP) des tranches OCRisées repris dans l'assemblage."""
+        parts = [_mark_pdfa(_make_pdf(str(tmp_path / f"{i}.pdf"), 2)) for i in range(2)]
+        merged = str(tmp_path / "final.pdf")
+
+        merge_pdfs(parts, merged)
+
+        with pikepdf.open(merged) as pdf:
+            assert "/OutputIntents" in pdf.Root
+            assert "/Metadata" in pdf.Root
+            assert pdf.open_metadata()["pdfaid:part"] == "2"
+
+
+@pytest.fixture
+def svc(tmp_path, monkeypatch):
+    import app.main as svc
+
+    for name in ("queue", "running", "done", "error"):
+        monkeypatch.setattr(svc, f"{name.upper()}_DIR", str(tmp_path / name))
+    monkeypatch.setattr(svc, "_job_queue", None)
+    monkeypatch.setattr(svc, "_registry", None)
+    monkeypatch.setattr(svc, "OCR_SHARD_PAGES", 4)
+    monkeypatch.setattr(svc, "OCR_SHARD_MIN_PAGES", 8)
+    monkeypatch.setattr(svc, "notify_callback", MagicMock())
+    return svc
+
+
+def _submit(svc, tmp_path, n_pages: int, job_id: str = "book") -> str:
+    work_dir = str(tmp_path / "work")
+    os.makedirs(os.path.join(work_dir, job_id), exist_ok=True)
+    raw = _make_pdf(os.path.join(work_dir, job_id, "raw.pdf"), n_pages)
+    svc.submit(svc.OcrSubmit(jobId=job_id, rawPdfPath=raw, workDir=work_dir,
+                             callbackUrl="http://orch/cb"))
+    return os.path.join(work_dir, job_id)
+
+
+def _fake_ocrmypdf(fail_on: str = ""):
+    """ocrmypdf mocké : recopie l'entrée vers la sortie (ou échoue sur une tranche)."""
+    def fake_run(cmd, **kwargs):
+        src, dest = cmd[-2], cmd[-1]
+        rc = 1 if fail_on and fail_on in src else 0
+        if rc == 0:
+            shutil.copyfile(src, dest)
+        return MagicMock(returncode=rc, stdout="", stderr="")
+    return fake_run
+
+
+def _drain(svc):
+    while True:
+        path = svc.claim_one()
+        if not path:
+            return
+        svc.handle_job(path)
+
+
+class TestShardedJob:
+
+    def test_tranches_ocrisees_puis_assemblees(self, svc, tmp_path, mock_ocrmypdf):
+        job_dir = _submit(svc, tmp_path, 10)
+        run = mock_ocrmypdf(_fake_ocrmypdf())
+
+        svc.handle_job(svc.claim_one())
+
+        parent = svc.find_job("book")
+        assert parent["state"] == "RUNNING"
+        assert parent["shardsTotal"] == 3 and parent["shardsDone"] == 0
+        assert [s["pages"] for s in parent["shards"]] == [[1, 4], [5, 8], [9, 10]]
+        assert svc.job_queue().depth() == 3
+        svc.notify_callback.assert_not_called()
+
+        _drain(svc)
+
+        parent = svc.find_job("book")
+        assert parent["state"] == "DONE"
+        assert parent["shardsDone"] == 3 and parent["pages"] == 10
+        assert all(s["state"] == "DONE" for s in parent["shards"])
+        assert _widths(os.path.join(job_dir, "final.pdf")) == list(range(100, 110))
+        assert os.path.exists(os.path.join(str(tmp_path / "done"), "book.json"))
+        assert not os.path.exists(os.path.join(job_dir, "shards"))
+        assert run.call_count == 3
+        svc.notify_callback.assert_called_once()
+        assert svc.notify_callback.call_args[0][1]["state"] == "DONE"
+
+    def test_livre_court_non_decoupe(self, svc, tmp_path, mock_ocrmypdf):
+        _submit(svc, tmp_path, 6)
+        mock_ocrmypdf(_fake_ocrmypdf())
+
+        svc.handle_job(svc.claim_one())
+
+        assert svc.find_job("book")["state"] == "DONE"
+        assert "shards" not in svc.find_job("book")
+
+    def test_tranche_en_erreur_fait_echouer_le_parent(self, svc, tmp_path, mock_ocrmypdf):
+        _submit(svc, tmp_path, 10)
+        mock_ocrmypdf(_fake_ocrmypdf(fail_on=shard_id("book", 2)))
+
+        svc.handle_job(svc.claim_one())
+        _drain(svc)
+
+        parent = read_json(os.path.join(str(tmp_path / "error"), "book.json"))
+        assert parent["state"] == "ERROR"
+        assert "shard 2 failed" in parent["message"]
+        assert svc.notify_callback.call_count == 1
+
+    def test_nouvelle_tentative_reutilise_les_tranches_terminees(self, svc, tmp_path, mock_ocrmypdf):
+        job_dir = _submit(svc, tmp_path, 10)
+        mock_ocrmypdf(_fake_ocrmypdf(fail_on=shard_id("book", 2)))
+        svc.handle_job(svc.claim_one())
+        _drain(svc)
+
+        run = mock_ocrmypdf(_fake_ocrmypdf())
+        svc.submit(svc.OcrSubmit(jobId="book", rawPdfPath=os.path.join(job_dir, "raw.pdf"),
+                                 workDir=str(tmp_path / "work")))
+        svc.handle_job(svc.claim_one())
+        _drain(svc)
+
+        assert svc.find_job("book")["state"] == "DONE"
+        assert [c.args[0][-2] for c in run.call_args_list] == [
+            os.path.join(job_dir, "shards", shard_id("book", 2), "raw.pdf")]
+
+    def test_heartbeat_parent_rafraichi_tant_que_des_tranches_attendent(self, svc, tmp_path,
+                                                                        mock_ocrmypdf):
+        job_dir = _submit(svc, tmp_path, 10)
+        mock_ocrmypdf(_fake_ocrmypdf())
+        svc.handle_job(svc.claim_one())
+        hb = os.path.join(job_dir, "ocr.heartbeat")
+        os.utime(hb, (0, 0))
+
+        assert svc.refresh_sharded_heartbeats() == 1
+        assert os.path.getmtime(hb) > 0
+        assert "shards queued 3/3" in open(hb, encoding="utf-8").read()
+
+        _drain(svc)
+        assert svc.refresh_sharded_heartbeats() == 0
+
+    def test_nouveau_plan_annule_les_tranches_en_file(self, svc, tmp_path, mock_ocrmypdf):
+        job_dir = _submit(svc, tmp_path, 10)
+        mock_ocrmypdf(_fake_ocrmypdf())
+        svc.handle_job(svc.claim_one())
+        parent_path = os.path.join(str(tmp_path / "running"), "book.json")
+
+        svc.OCR_SHARD_PAGES = 5
+        data = read_json(parent_path)
+        svc.dispatch_shards(parent_path, data, svc.shard_plan(data))
+
+        assert svc.job_queue().depth() == 2
+        assert sorted(os.listdir(os.path.join(job_dir, "shards"))) == [
+            shard_id("book", 1), shard_id("book", 2), "plan.json"]
+        assert page_count(os.path.join(job_dir, "shards", shard_id("book", 2), "raw.pdf")) == 5
+
+    def test_nouveau_plan_refuse_si_une_tranche_tourne(self, svc, tmp_path, mock_ocrmypdf):
+        job_dir = _submit(svc, tmp_path, 10)
+        mock_ocrmypdf(_fake_ocrmypdf())
+        svc.handle_job(svc.claim_one())
+        assert os.path.basename(svc.claim_one()) == f"{shard_id('book', 1)}.json"
+        parent_path = os.path.join(str(tmp_path / "running"), "book.json")
+
+        svc.OCR_SHARD_PAGES = 5
+        data = read_json(parent_path)
+        with pytest.raises(RuntimeError, match="still running"):
+            svc.dispatch_shards(parent_path, data, svc.shard_plan(data))
+
+        assert os.path.exists(os.path.join(job_dir, "shards", shard_id("book", 1), "raw.pdf"))
+        assert svc.job_queue().depth() == 0  # tranches en file de l'ancien plan annulées
@@ -0,0 +1,155 @@
+"""
+Pipeline d'admission asynchrone des fichiers entrants.
+
+Le staging, les contrôles taille/signature et le hash SHA-256 s'exécutent
+dans un pool de threads borné ; les résultats sont déposés dans une file
+« prête » que le tick vide sans jamais attendre. Un gros CBR en cours de
+hash ne bloque donc plus le polling, les soumissions ni la finalisation.
+
+Pré-filtre doublons : chaque fichier reçoit d'abord une empreinte rapide
+(taille + premier/dernier Mio). Si elle correspond à un job déjà indexé, le
+SHA-256 complet est calculé immédiatement pour confirmer le doublon (voie
+« confirmation »). Sinon le fichier est très probablement nouveau et son hash
+complet part dans un pool dédié (voie « hash ») : les re-dépôts sont tranchés
+sans attendre derrière les gros fichiers nouveaux. Le jobKey dérivant du
+SHA-256 complet, la déduplication finale reste faite sur ce hash.
+
+La décision d'admission (doublon, espace disque, création du job) reste
+dans le thread de la boucle : seul lui modifie l'index et ``in_flight``.
+"""
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Iterable, List, Optional
+
+from app.logger import get_logger
+
+_log = get_logger("orchestrator.admission")
+
+
+class AdmissionPipeline:
+    """
+    Pool borné ``staging -> contrôles -> empreinte -> hash`` alimentant une file prête.
+
+    :param stage_fn: Fonction ``src -> dict`` (cf. ``app.main.stage_input``),
+                     exécutée dans les threads du pool.
+    :param hash_fn: Fonction ``dict -> dict`` qui ajoute ``fileHash``
+                    (cf. ``app.main.hash_staged``).
+    :param workers: Nombre de threads du pool de staging/confirmation.
+    :param hash_workers: Nombre de threads du pool de hash complet.
+    :param known_quick_keys: Empreintes rapides des jobs déjà indexés.
+    """
+
+    def __init__(self, stage_fn: Callable[[str], dict], hash_fn: Callable[[dict], dict],
+                 workers: int = 4, hash_workers: int = 2,
+                 known_quick_keys: Optional[Iterable[str]] = None):
+        self._stage_fn = stage_fn
+        self._hash_fn = hash_fn
+        self._pool = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="admission")
+        self._hash_pool = ThreadPoolExecutor(max_workers=max(1, hash_workers), thread_name_prefix="hash")
+        self._ready: "queue.Queue[dict]" = queue.Queue()
+        self._lock = threading.Lock()
+        self._in_progress: set = set()
+        self._known: set = set(known_quick_keys or ())
+        self._prefilter_hits = 0
+        self._prefilter_misses = 0
+        self._hash_bytes = 0
+        self._hash_seconds = 0.0
+
+    def remember(self, quick_key: str) -> None:
+        """Enregistre l'empreinte rapide d'un job indexé (appelé par le tick)."""
+        with self._lock:
+            self._known.add(quick_key)
+
+    def submit(self, src: str) -> bool:
+        """
+        Confie un fichier entrant au pool.
+
+        :param src: Chemin du fichier dans IN_DIR.
+        :return: False si ce fichier est déjà en cours de traitement.
+        """
+        with self._lock:
+            if src in self._in_progress:
+                return False
+            self._in_progress.add(src)
+        self._pool.submit(self._run, src)
+        return True
+
+    def _run(self, src: str) -> None:
+        try:
+            staged = self._stage_fn(src)
+        except Exception as e:
+            _log.error(f"Échec du staging de {src} : {e}", extra={"stage": "INPUT_CHECK"})
+            staged = {"status": "skipped"}
+        if staged.get("status") != "ok":
+            self._publish(src, staged)
+            return
+        with self._lock:
+            hit = staged.get("quickKey") in self._known
+            if hit:
+                self._prefilter_hits += 1
+            else:
+                self._prefilter_misses += 1
+        staged["prefilter"] = "hit" if hit else "miss"
+        if hit:
+            # Doublon probable : confirmer tout de suite par le SHA-256 complet
+            self._hash(src, staged)
+        else:
+            self._hash_pool.submit(self._hash, src, staged)
+
+    def _hash(self, src: str, staged: dict) -> None:
+        try:
+            staged = self._hash_fn(staged)
+        except Exception as e:
+            _log.error(f"Échec du hash de {src} : {e}", extra={"stage": "INPUT_CHECK"})
+            staged = {"status": "skipped"}
+        with self._lock:
+            if staged.get("status") == "ok":
+                self._hash_bytes += staged.get("sizeBytes", 0)
+                self._hash_seconds += staged.get("hashSeconds", 0.0)
+        self._publish(src, staged)
+
+    def _publish(self, src: str, staged: dict) -> None:
+        # Publier avant de libérer le slot : depth() ne sous-compte jamais
+        self._ready.put(staged)
+        with self._lock:
+            self._in_progress.discard(src)
+
+    def drain(self) -> List[dict]:
+        """Retourne (sans bloquer) tous les résultats prêts."""
+        out = []
+        while True:
+            try:
+                out.append(self._ready.get_nowait())
+            except queue.Empty:
+                return out
+
+    def depth(self) -> int:
+        """Nombre de fichiers en file ou en cours dans le pool, plus les résultats non drainés."""
+        with self._lock:
+            return len(self._in_progress) + self._ready.qsize()
+
+    def stats(self) -> dict:
+        """
+        Jauges d'observabilité exposées dans ``/metrics``.
+
+        :return: Dict ``admission_pool_depth``, ``hash_bytes_total``, ``hash_mb_per_s``,
+                 ``prefilter_hits``, ``prefilter_misses``.
+        """
+        with self._lock:
+            in_progress = len(self._in_progress)
+            hashed, seconds = self._hash_bytes, self._hash_seconds
+            hits, misses = self._prefilter_hits, self._prefilter_misses
+        mb_per_s = (hashed / (1024 * 1024)) / seconds if seconds > 0 else 0.0
+        return {
+            "admission_pool_depth": in_progress,
+            "hash_bytes_total": hashed,
+            "hash_mb_per_s": round(mb_per_s, 2),
+            "prefilter_hits": hits,
+            "prefilter_misses": misses,
+        }
+
+    def close(self) -> None:
+        """Arrête les pools (les tâches en cours se terminent)."""
+        self._pool.shutdown(wait=True)
+        self._hash_pool.shutdown(wait=True)
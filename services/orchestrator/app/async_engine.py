@@ -0,0 +1,300 @@
+"""
+Moteur asyncio de l'orchestrateur (``ENGINE=asyncio``).
+
+Alternative à ``process_loop`` : chaque job en vol est une coroutine
+(machine à états PREP -> OCR -> finalisation) et les compteurs
+``can_start_prep``/``can_start_ocr`` du tick sont remplacés par des
+sémaphores par étape (``StageSlots``). Les appels HTTP bloquants (session
+partagée ``app.main.HTTP``) s'exécutent via ``asyncio.to_thread`` : un
+polling lent sur un service ne retarde ni l'autre service, ni l'admission.
+
+Le polling reste groupé (un ``POST /jobs/status`` par service et par cycle)
+et les callbacks des services déclenchent, comme dans le tick, un polling
+immédiat du job notifié (leur contenu n'est jamais appliqué).
+Les transitions sont celles de ``app.main`` (``open_prep_attempt``,
+``apply_ocr_status``...) : état disque (``state.json``) et index identiques,
+on peut basculer d'un moteur à l'autre via ``ENGINE``.
+
+Toutes les mutations de ``in_flight`` et de l'index ont lieu dans le thread
+de la boucle d'événements ; seuls les appels réseau sont délégués.
+"""
+import asyncio
+import time
+from typing import Callable, Dict, Optional, Tuple
+
+import app.main as orch
+from app.logger import get_logger
+
+_log = get_logger("orchestrator.async")
+
+_TERMINAL = ("DONE", "ERROR")
+
+
+class StageSlots:
+    """
+    Sémaphore d'étape dont la capacité est relue dans la configuration
+    (``prep_concurrency``/``ocr_concurrency`` restent modifiables via ``POST /config``).
+    Une capacité de 0 suspend l'étape : les jobs attendent sans être soumis.
+
+    :param config: Configuration courante.
+    :param key: Clé de capacité dans ``config``.
+    """
+
+    def __init__(self, config: dict, key: str):
+        self._config = config
+        self._key = key
+        self._cond = asyncio.Condition()
+        self.in_use = 0
+
+    def capacity(self) -> int:
+        # 0 = étape en pause, comme dans le moteur à ticks
+        return max(0, int(self._config.get(self._key, 1)))
+
+    async def __aenter__(self):
+        async with self._cond:
+            await self._cond.wait_for(lambda: self.in_use < self.capacity())
+            self.in_use += 1
+        return self
+
+    async def __aexit__(self, *exc):
+        async with self._cond:
+            self.in_use -= 1
+            self._cond.notify_all()
+
+    async def refresh(self) -> None:
+        """Réveille les attentes après un changement de capacité."""
+        async with self._cond:
+            self._cond.notify_all()
+
+
+class AsyncEngine:
+    """
+    Orchestrateur asyncio : admission, une coroutine par job, polling groupé par service.
+
+    :param in_flight: Dict des jobs en vol (partagé avec le serveur HTTP).
+    :param index: Index des jobs.
+    :param index_path: Chemin de l'index.
+    :param profile: Profil canonique courant.
+    :param config: Configuration courante.
+    :param watcher: Watcher de découverte (inotify/polling).
+    :param admission: ``AdmissionPipeline`` (staging + hash en arrière-plan).
+    :param pop_callbacks: Fonction renvoyant les notifications reçues
+                          (``OrchestratorState.pop_callbacks``).
+    :param run_janitor: Nettoyage périodique des workdirs (toutes les 600 s).
+    """
+
+    def __init__(self, in_flight: dict, index: dict, index_path: str, profile: dict, config: dict,
+                 watcher=None, admission=None, pop_callbacks: Optional[Callable[[], dict]] = None,
+                 run_janitor: Optional[Callable[[], None]] = None):
+        self.in_flight = in_flight
+        self.index = index
+        self.index_path = index_path
+        self.profile = profile
+        self.config = config
+        self.metrics = config.get("metrics", orch.make_empty_metrics())
+        self.watcher = watcher
+        self.admission = admission
+        self._pop_callbacks = pop_callbacks or dict
+        self._run_janitor = run_janitor
+        self.interval_s = orch.POLL_INTERVAL_MS / 1000.0
+        self.prep_slots = StageSlots(config, "prep_concurrency")
+        self.ocr_slots = StageSlots(config, "ocr_concurrency")
+        self._jobs: Dict[str, asyncio.Task] = {}
+        self._waiters: Dict[Tuple[str, str], asyncio.Future] = {}
+        self._polls: Dict[str, asyncio.Task] = {}
+        self._callbacks: dict = {}
+
+    # -- Cycle principal ---------------------------------------------------
+
+    async def step(self) -> None:
+        """
+        Un cycle du moteur : doublons, admission, callbacks, heartbeats,
+        lancement des coroutines de job et des pollings groupés, métriques.
+        Ne bloque jamais sur un appel réseau.
+        """
+        orch.check_duplicate_decisions(self.index, self.index_path)
+        self._admit()
+
+        self._callbacks.update(self._pop_callbacks())
+        orch.check_stale_jobs(self.in_flight, self.config.get("job_timeout_s", orch.JOB_TIMEOUT_SECONDS))
+        self._release_waiters()
+
+        for job_key in list(self.in_flight):
+            if job_key not in self._jobs:
+                self._jobs[job_key] = asyncio.create_task(self._run_job(job_key))
+        for stage in ("prep", "ocr"):
+            poll = self._polls.get(stage)
+            if (poll is None or poll.done()) and any(s == stage for s, _ in self._waiters):
+                self._polls[stage] = asyncio.create_task(self._poll(stage))
+        await self.prep_slots.refresh()
+        await self.ocr_slots.refresh()
+
+        self.metrics.update(orch.HTTP.stats())
+        orch.write_metrics(self.metrics, self.config.get("index_dir", orch.INDEX_DIR))
+
+    def _admit(self) -> None:
+        admission = self.admission
+        if admission is None:
+            return
+        for staged in admission.drain():
+            orch.admit_staged(staged, self.in_flight, self.index, self.index_path,
+                              self.profile, self.config, self.metrics)
+            if staged.get("quickKey"):
+                admission.remember(staged["quickKey"])
+        free_slots = self.config["max_jobs_in_flight"] - len(self.in_flight) - admission.depth()
+        if free_slots > 0:
+            cap = self.config.get("max_admissions_per_tick", orch.MAX_ADMISSIONS_PER_TICK)
+            budget = min(free_slots, cap) if cap > 0 else free_slots
+            for src in orch.discover_inputs(self.watcher):
+                if budget <= 0:
+                    break
+                if admission.submit(src):
+                    budget -= 1
+        self.metrics.update(admission.stats())
+
+    async def run(self, stop: Optional[asyncio.Event] = None) -> None:
+        """
+        Boucle du moteur jusqu'à ``stop`` (infinie par défaut).
+        Réveil anticipé par le watcher (nouveau fichier, callback).
+        """
+        stop = stop or asyncio.Event()
+        janitor_last_run = 0.0
+        while not stop.is_set():
+            orch.ensure_layout()
+            await self.step()
+            now = time.time()
+            if self._run_janitor is not None and now - janitor_last_run > 600:
+                self._run_janitor()
+                janitor_last_run = now
+            if self.watcher is not None:
+                await asyncio.to_thread(self.watcher.wait, self.interval_s)
+            else:
+                await asyncio.sleep(self.interval_s)
+        for task in list(self._jobs.values()) + list(self._polls.values()):
+            task.cancel()
+
+    # -- Machine à états d'un job -----------------------------------------
+
+    async def _run_job(self, job_key: str) -> None:
+        try:
+            while job_key in self.in_flight:
+                meta = self.in_flight[job_key]
+                stage = meta["stage"]
+                if stage in ("DISCOVERED", "PREP_RETRY"):
+                    async with self.prep_slots:
+                        await self._run_prep(job_key, meta)
+                elif stage in ("PREP_DONE", "OCR_RETRY"):
+                    async with self.ocr_slots:
+                        await self._run_ocr(job_key, meta)
+                else:
+                    _log.warning(f"Étape inattendue {stage}", extra={"jobKey": job_key})
+                    return
+                if job_key in self.in_flight and meta["stage"].endswith("_RETRY"):
+                    # Même cadence de nouvelle tentative que le tick
+                    await asyncio.sleep(self.interval_s)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            _log.error(f"Coroutine de job interrompue : {e}", extra={"jobKey": job_key})
+        finally:
+            self._jobs.pop(job_key, None)
+
+    async def _run_prep(self, job_key: str, meta: dict) -> None:
+        # Une notification restée d'une tentative précédente ne vaut pas pour celle-ci
+        self._callbacks.pop(("prep", job_key), None)
+        if not orch.open_prep_attempt(job_key, meta, self.in_flight, self.index, self.index_path,
+                                      self.config, self.metrics):
+            return
+        try:
+            await asyncio.to_thread(orch.submit_prep, job_key, meta["inputPath"],
+                                    callback_url=orch.callback_url_for(self.config, "prep"))
+        except Exception as e:
+            orch.mark_submit_failed(job_key, meta, "PREP", e)
+            return
+        orch.mark_prep_running(job_key, meta, self.index, self.index_path, self.metrics)
+        st = await self._wait_status("prep", job_key)
+        if st is not None:
+            orch.apply_prep_status(job_key, meta, st, self.index, self.index_path)
+
+    async def _run_ocr(self, job_key: str, meta: dict) -> None:
+        self._callbacks.pop(("ocr", job_key), None)
+        raw_pdf = orch.open_ocr_attempt(job_key, meta, self.in_flight, self.index, self.index_path,
+                                        self.config, self.metrics)
+        if raw_pdf is None:
+            return
+        try:
+            await asyncio.to_thread(orch.submit_ocr, job_key, raw_pdf,
+                                    callback_url=orch.callback_url_for(self.config, "ocr"))
+        except Exception as e:
+            orch.mark_submit_failed(job_key, meta, "OCR", e)
+            return
+        orch.mark_ocr_running(job_key, meta, self.index, self.index_path)
+        st = await self._wait_status("ocr", job_key)
+        if st is not None:
+            orch.apply_ocr_status(job_key, meta, st, self.in_flight, self.index, self.index_path,
+                                  self.config, self.metrics)
+
+    async def _wait_status(self, stage: str, job_key: str) -> Optional[dict]:
+        """
+        Attend le statut terminal (DONE/ERROR) d'un job soumis.
+
+        :return: Statut du service, ou None si le job a quitté ``*_RUNNING``
+                 entre-temps (heartbeat périmé).
+        """
+        fut = asyncio.get_running_loop().create_future()
+        self._waiters[(stage, job_key)] = fut
+        try:
+            return await fut
+        finally:
+            self._waiters.pop((stage, job_key), None)
+
+    def _resolve(self, stage: str, job_key: str, st: Optional[dict]) -> None:
+        fut = self._waiters.get((stage, job_key))
+        if fut is not None and not fut.done():
+            fut.set_result(st)
+
+    def _release_waiters(self) -> None:
+        """Libère les jobs sortis de ``*_RUNNING`` (heartbeat périmé) et purge les callbacks orphelins."""
+        for stage, job_key in list(self._waiters):
+            meta = self.in_flight.get(job_key)
+            if meta is None or meta["stage"] != f"{stage.upper()}_RUNNING":
+                self._resolve(stage, job_key, None)
+        for key in list(self._callbacks):
+            if key[1] not in self.in_flight:
+                del self._callbacks[key]
+
+    # -- Polling groupé par service ---------------------------------------
+
+    async def _poll(self, stage: str) -> None:
+        url = self.config[f"{stage}_url"]
+        running = {
+            job_key: self.in_flight[job_key]
+            for s, job_key in list(self._waiters)
+            if s == stage and job_key in self.in_flight
+        }
+        # in_flight (lastPollAt) n'est modifié que sur la boucle ; seul l'appel HTTP part en thread
+        due = orch.plan_polling(stage, running, self.config, self._callbacks)
+        if not due:
+            return
+        # Callbacks consommés par ce polling (remis en place s'il échoue)
+        consumed = {(stage, k): self._callbacks.pop((stage, k)) for k in due
+                    if (stage, k) in self._callbacks}
+        try:
+            statuses = await asyncio.to_thread(orch.poll_jobs, url, due, stage)
+        except Exception as e:
+            _log.warning(f"Polling {stage} impossible : {e}")
+            for key, received in consumed.items():
+                self._callbacks.setdefault(key, received)
+            return
+        for job_key, st in statuses.items():
+            if st.get("state") in _TERMINAL:
+                self._resolve(stage, job_key, st)
+
+
+def run_async_engine() -> None:
+    """Point d'entrée ``ENGINE=asyncio`` : même initialisation que ``process_loop``."""
+    rt = orch.bootstrap()
+    engine = AsyncEngine(rt["in_flight"], rt["index"], rt["index_path"], rt["profile"], rt["config"],
+                         rt["watcher"], rt["admission"], rt["orch_state"].pop_callbacks,
+                         rt["run_janitor"])
+    asyncio.run(engine.run())
@@ -17,7 +17,8 @@ from app.utils import ensure_dir, atomic_write_json, now_iso
 
 def canonical_profile(prep_info: dict, ocr_info: dict, ocr_lang: str = "fra+eng") -> dict:
     """
-    Construit le profil canonique incluant les versions des outils.
+    Construit le profil canonique incluant les versions des outils et les
+    réglages publiés par le prep-service (``settings`` de ``/info``).
     La langue est normalisée (tokens triés + dédupliqués) pour garantir
     la déterminisme du hash même si l'ordre change.
 
@@ -30,6 +31,12 @@ def canonical_profile(prep_info: dict, ocr_info: dict, ocr_lang: str = "fra+eng"
     lang_tokens = sorted(set(ocr_lang.split("+")))
     normalized_lang = "+".join(lang_tokens)
 
+    prep = {"tools": prep_info.get("versions", {})}
+    # Réglages qui changent les octets du raw.pdf (normalisation des pages) ;
+    # absents quand désactivés, pour garder le profileHash existant
+    if prep_info.get("settings"):
+        prep["settings"] = prep_info["settings"]
+
     return {
         "ocr": {
             "lang": normalized_lang,
@@ -38,9 +45,7 @@ def canonical_profile(prep_info: dict, ocr_info: dict, ocr_lang: str = "fra+eng"
             "optimize": 1,
             "tools": ocr_info.get("versions", {}),
         },
-        "prep": {
-            "tools": prep_info.get("versions", {}),
-        },
+        "prep": prep,
     }
 
 
@@ -132,6 +137,16 @@ def make_empty_metrics() -> dict:
     - input_rejected_size (fichier entrant trop grand)
     - input_rejected_signature (signature ZIP/RAR invalide)
 
+    Jauges (pipeline d'admission, écrasées à chaque tick) :
+    - admission_pool_depth (fichiers en staging/hash)
+    - hash_bytes_total, hash_mb_per_s (débit moyen du hash SHA-256)
+    - prefilter_hits, prefilter_misses (pré-filtre doublons par empreinte rapide)
+
+    Jauges (session HTTP vers les services) :
+    - http_requests_total, http_errors_total
+    - http_connections_opened, http_connection_reuse_pct (keep-alive)
+    - http_latency_ms_avg, http_latency_ms_p95
+
     :return: Dict de métriques initialisé.
     """
     return {
@@ -143,6 +158,17 @@ def make_empty_metrics() -> dict:
         "pdf_invalid": 0,
         "input_rejected_size": 0,
         "input_rejected_signature": 0,
+        "admission_pool_depth": 0,
+        "hash_bytes_total": 0,
+        "hash_mb_per_s": 0.0,
+        "prefilter_hits": 0,
+        "prefilter_misses": 0,
+        "http_requests_total": 0,
+        "http_errors_total": 0,
+        "http_connections_opened": 0,
+        "http_connection_reuse_pct": 0.0,
+        "http_latency_ms_avg": 0.0,
+        "http_latency_ms_p95": 0.0,
         "updatedAt": "",
     }
 
@@ -0,0 +1,140 @@
+"""
+Session HTTP partagée entre l'orchestrateur et les services prep/ocr.
+
+Une seule ``requests.Session`` (keep-alive) remplace les appels nus
+``requests.get/post`` qui ouvraient une connexion TCP par requête et par
+tick. La taille du pool et les timeouts par service sont configurables ;
+``stats()`` expose la réutilisation des connexions et la latence des
+requêtes dans ``/metrics``.
+"""
+import threading
+import time
+from collections import deque
+from typing import Dict, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+# Nombre de latences conservées pour le calcul du p95
+_LATENCY_WINDOW = 512
+
+
+def _counting_pool(base: type, on_new_conn) -> type:
+    """Sous-classe de pool urllib3 qui signale chaque nouvelle connexion TCP."""
+
+    class CountingPool(base):
+        def _new_conn(self):
+            on_new_conn()
+            return super()._new_conn()
+
+    return CountingPool
+
+
+class _CountingAdapter(HTTPAdapter):
+    """``HTTPAdapter`` dont les pools comptent les connexions ouvertes."""
+
+    def __init__(self, on_new_conn, **kwargs):
+        self._on_new_conn = on_new_conn
+        super().__init__(**kwargs)
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": _counting_pool(HTTPConnectionPool, self._on_new_conn),
+            "https": _counting_pool(HTTPSConnectionPool, self._on_new_conn),
+        }
+
+
+class ServiceSession:
+    """
+    Session HTTP poolée, partagée par tous les appels vers les services.
+
+    :param pool_size: Connexions gardées ouvertes par service (``HTTP_POOL_SIZE``).
+    :param timeouts: Timeout en secondes par service (``{"prep": 10, "ocr": 10}``).
+    :param default_timeout: Timeout d'un service absent de ``timeouts``.
+    """
+
+    def __init__(self, pool_size: int = 10, timeouts: Optional[Dict[str, float]] = None,
+                 default_timeout: float = 10.0):
+        self.timeouts = dict(timeouts or {})
+        self.default_timeout = default_timeout
+        self._lock = threading.Lock()
+        self._requests = 0
+        self._errors = 0
+        self._connections = 0
+        self._latency_total_ms = 0.0
+        self._latencies: deque = deque(maxlen=_LATENCY_WINDOW)
+        self._session = requests.Session()
+        adapter = _CountingAdapter(self._count_connection,
+                                   pool_connections=4, pool_maxsize=max(1, pool_size))
+        self._session.mount("http://", adapter)
+        self._session.mount("https://", adapter)
+
+    def _count_connection(self) -> None:
+        with self._lock:
+            self._connections += 1
+
+    def request(self, method: str, service: str, url: str,
+                timeout: Optional[float] = None, **kwargs) -> requests.Response:
+        """
+        Exécute une requête sur la session partagée.
+
+        :param method: Verbe HTTP.
+        :param service: Nom du service (``"prep"``/``"ocr"``), choisit le timeout.
+        :param url: URL complète.
+        :param timeout: Timeout explicite (prioritaire sur celui du service).
+        :return: Réponse ``requests``.
+        :raises requests.RequestException: En cas d'erreur réseau.
+        """
+        if timeout is None:
+            timeout = self.timeouts.get(service, self.default_timeout)
+        t0 = time.perf_counter()
+        ok = False
+        try:
+            r = self._session.request(method, url, timeout=timeout, **kwargs)
+            ok = True
+            return r
+        finally:
+            elapsed_ms = (time.perf_counter() - t0) * 1000
+            with self._lock:
+                self._requests += 1
+                if not ok:
+                    self._errors += 1
+                self._latency_total_ms += elapsed_ms
+                self._latencies.append(elapsed_ms)
+
+    def get(self, service: str, url: str, **kwargs) -> requests.Response:
+        """Raccourci ``request("GET", ...)``."""
+        return self.request("GET", service, url, **kwargs)
+
+    def post(self, service: str, url: str, **kwargs) -> requests.Response:
+        """Raccourci ``request("POST", ...)``."""
+        return self.request("POST", service, url, **kwargs)
+
+    def stats(self) -> dict:
+        """
+        Jauges d'observabilité exposées dans ``/metrics``.
+
+        :return: Dict ``http_requests_total``, ``http_errors_total``,
+                 ``http_connections_opened``, ``http_connection_reuse_pct``,
+                 ``http_latency_ms_avg``, ``http_latency_ms_p95``.
+        """
+        with self._lock:
+            total, errors, conns = self._requests, self._errors, self._connections
+            avg = self._latency_total_ms / total if total else 0.0
+            window = sorted(self._latencies)
+        p95 = window[min(len(window) - 1, int(len(window) * 0.95))] if window else 0.0
+        reuse = 100.0 * (total - conns) / total if total else 0.0
+        return {
+            "http_requests_total": total,
+            "http_errors_total": errors,
+            "http_connections_opened": conns,
+            "http_connection_reuse_pct": round(max(0.0, reuse), 1),
+            "http_latency_ms_avg": round(avg, 2),
+            "http_latency_ms_p95": round(p95, 2),
+        }
+
+    def close(self) -> None:
+        """Ferme les connexions du pool."""
+        self._session.close()
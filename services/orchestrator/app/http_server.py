@@ -2,10 +2,12 @@
 Serveur HTTP minimal (stdlib http.server) pour l'observabilité de l'orchestrateur.
 Endpoints :
   GET  /metrics            -> JSON métriques
-  GET  /jobs               -> JSON liste des jobs (depuis index)
+  GET  /jobs               -> JSON liste des jobs (depuis index SQLite ou JSON)
   GET  /jobs/{jobKey}      -> JSON state.json du job (404 si absent)
   POST /config             -> met à jour la config runtime (thread-safe)
   GET  /config             -> JSON config courante
+  POST /callbacks/{stage}  -> notification de fin de job (stage = prep|ocr) :
+                              réveille la boucle, qui interroge le service
 
 Démarrage en thread daemon via start_http_server().
 """
@@ -13,10 +15,12 @@ import copy
 import json
 import os
 import threading
+import time
 from http.server import BaseHTTPRequestHandler, HTTPServer
 from typing import Optional
 from urllib.parse import urlparse
 
+from app.index_store import get_store
 from app.utils import read_json
 
 
@@ -41,6 +45,7 @@ class OrchestratorState:
         config: dict,
         work_dir: str,
         index_path: str,
+        wake: Optional[threading.Event] = None,
     ):
         self._lock = threading.Lock()
         self._in_flight = in_flight    # référence directe (pas de copie)
@@ -48,6 +53,8 @@ class OrchestratorState:
         self._config = config          # référence directe
         self._work_dir = work_dir
         self._index_path = index_path
+        self._wake = wake or threading.Event()
+        self._callbacks: dict = {}     # (stage, jobId) -> instant de réception
 
     def snapshot_metrics(self) -> dict:
         """Retourne un snapshot thread-safe des métriques courantes."""
@@ -56,25 +63,35 @@ class OrchestratorState:
 
     def snapshot_jobs_list(self) -> list:
         """
-        Retourne un snapshot de la liste des jobs depuis l'index JSON.
-        Lit le fichier d'index sous lock pour éviter une lecture partielle.
+        Retourne un snapshot de la liste des jobs depuis l'index.
+        Index SQLite (``.db``) : requête directe sur les colonnes indexées.
+        Index JSON : lecture du fichier sous lock pour éviter une lecture partielle.
         """
+        if self._index_path.endswith(".db"):
+            entries = get_store(self._index_path).list_jobs()
+        else:
+            with self._lock:
+                idx = read_json(self._index_path) or {"jobs": {}}
+            entries = [
+                dict(entry, jobKey=job_key)
+                for job_key, entry in idx.get("jobs", {}).items()
+            ]
+        jobs = []
         with self._lock:
-            idx = read_json(self._index_path) or {"jobs": {}}
-            jobs = []
-            for job_key, entry in idx.get("jobs", {}).items():
+            for entry in entries:
+                job_key = entry["jobKey"]
                 # Compléter avec les infos in_flight si disponibles
                 inflight = self._in_flight.get(job_key, {})
                 jobs.append({
                     "jobKey": job_key,
-                    "state": entry.get("state", "UNKNOWN"),
-                    "stage": inflight.get("stage", entry.get("state", "")),
+                    "state": entry.get("state") or "UNKNOWN",
+                    "stage": inflight.get("stage", entry.get("state") or ""),
                     "attempt": max(
                         inflight.get("attemptPrep", 0),
                         inflight.get("attemptOcr", 0),
                     ),
-                    "updatedAt": entry.get("updatedAt", ""),
-                    "inputName": entry.get("inputName", ""),
+                    "updatedAt": entry.get("updatedAt") or "",
+                    "inputName": entry.get("inputName") or "",
                     "outPdf": entry.get("outPdf"),
                 })
         return jobs
@@ -90,6 +107,31 @@ class OrchestratorState:
         with self._lock:
             return read_json(state_path)
 
+    def push_callback(self, stage: str, payload: dict) -> bool:
+        """
+        Enregistre la notification de fin d'un job et réveille la boucle.
+        Seul ``jobId`` est retenu : la notification rend le polling du job
+        immédiat, le statut appliqué reste celui renvoyé par le service.
+
+        :param stage: ``"prep"`` ou ``"ocr"``.
+        :param payload: Corps reçu (contient ``jobId``).
+        :return: False si le job n'est pas en cours sur cette étape (ignoré).
+        """
+        job_key = payload["jobId"]
+        with self._lock:
+            meta = self._in_flight.get(job_key)
+            if not isinstance(meta, dict) or meta.get("stage") != f"{stage.upper()}_RUNNING":
+                return False
+            self._callbacks[(stage, job_key)] = time.monotonic()
+        self._wake.set()
+        return True
+
+    def pop_callbacks(self) -> dict:
+        """Retourne puis vide les notifications reçues : ``{(stage, jobId): instant de réception}``."""
+        with self._lock:
+            callbacks, self._callbacks = self._callbacks, {}
+        return callbacks
+
     def snapshot_config(self) -> dict:
         """Retourne un snapshot thread-safe de la config courante."""
         with self._lock:
@@ -99,7 +141,7 @@ class OrchestratorState:
         """
         Applique un patch partiel à la config runtime.
         Clés autorisées : prep_concurrency, ocr_concurrency,
-        job_timeout_s, default_ocr_lang.
+        job_timeout_s, default_ocr_lang, max_admissions_per_tick.
 
         :param patch: Dict partiel avec les champs à modifier.
         :return: Dict des champs effectivement modifiés.
@@ -109,6 +151,7 @@ class OrchestratorState:
             "ocr_concurrency": int,
             "job_timeout_s": int,
             "default_ocr_lang": str,
+            "max_admissions_per_tick": int,
         }
         applied = {}
         with self._lock:
@@ -176,7 +219,27 @@ class _OrchestratorHandler(BaseHTTPRequestHandler):
         parsed = urlparse(self.path)
         path = parsed.path.rstrip("/")
 
-        if path == "/config":
+        if path.startswith("/callbacks/"):
+            stage = path[len("/callbacks/"):]
+            if stage not in ("prep", "ocr"):
+                self._send_error_json(404, f"Étape inconnue : {stage}")
+                return
+            try:
+                length = int(self.headers.get("Content-Length", 0))
+                payload = json.loads(self.rfile.read(length))
+            except (json.JSONDecodeError, ValueError) as e:
+                self._send_error_json(400, f"JSON invalide : {e}")
+                return
+            if not isinstance(payload, dict) or not isinstance(payload.get("jobId"), str) \
+                    or not payload["jobId"]:
+                self._send_error_json(400, "jobId manquant")
+                return
+            if not self.server.state.push_callback(stage, payload):
+                self._send_error_json(409, f"Job non en cours ({stage}) : {payload['jobId']}")
+                return
+            self._send_json(202, {"accepted": True})
+
+        elif path == "/config":
             try:
                 length = int(self.headers.get("Content-Length", 0))
                 body = self.rfile.read(length)
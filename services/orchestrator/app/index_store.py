@@ -0,0 +1,307 @@
+"""
+Index des jobs persisté en SQLite (mode WAL).
+
+Remplace le fichier monolithique ``index/jobs.json`` : chaque transition
+d'état n'écrit plus que les lignes modifiées (upsert), au lieu de réécrire
+tout l'index. Index secondaires sur ``state``, ``inputName``, ``updatedAt``
+et ``quickKey`` (empreinte taille + premier/dernier Mio, pré-filtre doublons).
+
+L'API ``load_index``/``save_index`` de ``app.main`` reste inchangée :
+``index["jobs"]`` est un :class:`JobsTable` (dict) qui mémorise les clés
+écrites ou modifiées en place depuis la dernière sauvegarde.
+"""
+import json
+import os
+import sqlite3
+import threading
+from typing import Dict, Iterable, List, Optional
+
+from app.utils import ensure_dir, read_json
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    job_key    TEXT PRIMARY KEY,
+    state      TEXT,
+    input_name TEXT,
+    out_pdf    TEXT,
+    updated_at TEXT,
+    quick_key  TEXT,
+    data       TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_state ON jobs(state);
+CREATE INDEX IF NOT EXISTS idx_jobs_input_name ON jobs(input_name);
+CREATE INDEX IF NOT EXISTS idx_jobs_updated_at ON jobs(updated_at);
+"""
+
+_QUICK_KEY_INDEX = "CREATE INDEX IF NOT EXISTS idx_jobs_quick_key ON jobs(quick_key)"
+
+
+# ---------------------------------------------------------------------------
+# JobsTable — dict avec suivi des clés modifiées
+# ---------------------------------------------------------------------------
+
+def _snapshot(entry) -> str:
+    """Forme canonique d'une entrée, comparée pour détecter une mutation en place."""
+    return json.dumps(entry, sort_keys=True, ensure_ascii=False, default=str)
+
+
+class JobsTable(dict):
+    """
+    Dict ``jobKey -> entrée d'index`` qui mémorise les clés « sales » et
+    les clés supprimées depuis la dernière sauvegarde.
+
+    Toute clé écrite (``table[k] = ...``, ``update``, ``setdefault``) est
+    marquée sale. Une lecture (``table[k]``, ``get``) ne marque rien mais
+    photographie l'entrée (JSON) à son premier accès : l'orchestrateur la
+    mute en place, et ``pop_dirty`` ne retient que les entrées lues dont le
+    contenu a changé. Les parcours en lecture seule (décisions de doublons,
+    lookups) n'entraînent ainsi aucun upsert. ``del``, ``pop``, ``popitem``
+    et ``clear`` marquent la clé comme supprimée.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._dirty: set = set()
+        self._deleted: set = set()
+        self._read: Dict[str, str] = {}
+
+    def _touch(self, key) -> None:
+        self._dirty.add(key)
+        self._deleted.discard(key)
+
+    def __getitem__(self, key):
+        value = super().__getitem__(key)
+        if key not in self._read and key not in self._dirty:
+            self._read[key] = _snapshot(value)
+        return value
+
+    def get(self, key, default=None):
+        if key in self:
+            return self[key]
+        return default
+
+    def __setitem__(self, key, value):
+        super().__setitem__(key, value)
+        self._touch(key)
+
+    def setdefault(self, key, default=None):
+        if key not in self:
+            self[key] = default
+        return self[key]
+
+    def update(self, *args, **kwargs):
+        for key, value in dict(*args, **kwargs).items():
+            self[key] = value
+
+    def __delitem__(self, key):
+        super().__delitem__(key)
+        self._dirty.discard(key)
+        self._deleted.add(key)
+
+    def pop(self, key, *default):
+        if key not in self:
+            return super().pop(key, *default)
+        value = super().pop(key)
+        self._dirty.discard(key)
+        self._deleted.add(key)
+        return value
+
+    def popitem(self):
+        key, value = super().popitem()
+        self._dirty.discard(key)
+        self._deleted.add(key)
+        return key, value
+
+    def clear(self):
+        self._deleted.update(self.keys())
+        self._dirty = set()
+        self._read = {}
+        super().clear()
+
+    def pop_dirty(self) -> List[str]:
+        """
+        Retourne puis réinitialise la liste des clés modifiées : clés écrites,
+        et clés lues dont l'entrée diffère de sa photographie.
+        """
+        dirty = {k for k in self._dirty if k in self}
+        for k, before in self._read.items():
+            if k not in dirty and k in self and _snapshot(dict.__getitem__(self, k)) != before:
+                dirty.add(k)
+        self._dirty = set()
+        self._read = {}
+        return list(dirty)
+
+    def pop_deleted(self) -> List[str]:
+        """Retourne puis réinitialise la liste des clés supprimées."""
+        deleted = [k for k in self._deleted if k not in self]
+        self._deleted = set()
+        return deleted
+
+
+# ---------------------------------------------------------------------------
+# IndexStore
+# ---------------------------------------------------------------------------
+
+class IndexStore:
+    """
+    Accès SQLite à l'index des jobs.
+
+    Une connexion unique par instance, protégée par un lock : la boucle
+    principale écrit, le serveur HTTP lit depuis un autre thread.
+    """
+
+    def __init__(self, path: str):
+        ensure_dir(os.path.dirname(path) or ".")
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        columns = {r[1] for r in self._conn.execute("PRAGMA table_info(jobs)")}
+        if "quick_key" not in columns:
+            # Base créée avant le pré-filtre doublons
+            self._conn.execute("ALTER TABLE jobs ADD COLUMN quick_key TEXT")
+        self._conn.execute(_QUICK_KEY_INDEX)
+
+    def close(self) -> None:
+        """Ferme la connexion SQLite."""
+        with self._lock:
+            self._conn.close()
+
+    def count(self) -> int:
+        """Retourne le nombre de jobs indexés."""
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM jobs").fetchone()[0]
+
+    def upsert_many(self, entries: Iterable[dict]) -> int:
+        """
+        Insère ou met à jour des entrées d'index dans une seule transaction.
+
+        :param entries: Entrées d'index (doivent contenir ``jobKey``).
+        :return: Nombre de lignes écrites.
+        """
+        rows = [
+            (
+                e["jobKey"],
+                e.get("state"),
+                e.get("inputName"),
+                e.get("outPdf"),
+                e.get("updatedAt"),
+                e.get("quickKey"),
+                json.dumps(e, ensure_ascii=False),
+            )
+            for e in entries
+        ]
+        if not rows:
+            return 0
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                self._conn.executemany(
+                    "INSERT INTO jobs (job_key, state, input_name, out_pdf, updated_at, quick_key, data) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?) "
+                    "ON CONFLICT(job_key) DO UPDATE SET "
+                    "state=excluded.state, input_name=excluded.input_name, "
+                    "out_pdf=excluded.out_pdf, updated_at=excluded.updated_at, "
+                    "quick_key=excluded.quick_key, data=excluded.data",
+                    rows,
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return len(rows)
+
+    def delete_many(self, job_keys: Iterable[str]) -> int:
+        """
+        Supprime des entrées d'index dans une seule transaction.
+
+        :param job_keys: Clés des jobs à supprimer.
+        :return: Nombre de lignes supprimées.
+        """
+        rows = [(k,) for k in job_keys]
+        if not rows:
+            return 0
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                cur = self._conn.executemany("DELETE FROM jobs WHERE job_key = ?", rows)
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return cur.rowcount
+
+    def get(self, job_key: str) -> Optional[dict]:
+        """Retourne l'entrée d'index d'un job, ou None."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT data FROM jobs WHERE job_key = ?", (job_key,)
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def load_all(self) -> Dict[str, dict]:
+        """Charge toutes les entrées : ``{jobKey: entrée}``."""
+        with self._lock:
+            rows = self._conn.execute("SELECT job_key, data FROM jobs").fetchall()
+        return {k: json.loads(d) for k, d in rows}
+
+    def list_jobs(self, state: Optional[str] = None) -> List[dict]:
+        """
+        Liste les jobs (colonnes indexées uniquement, sans décoder ``data``).
+
+        :param state: Filtre optionnel sur l'état.
+        :return: Liste de dicts ``jobKey``, ``state``, ``inputName``, ``outPdf``, ``updatedAt``.
+        """
+        sql = "SELECT job_key, state, input_name, out_pdf, updated_at FROM jobs"
+        params: tuple = ()
+        if state is not None:
+            sql += " WHERE state = ?"
+            params = (state,)
+        sql += " ORDER BY updated_at"
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        return [
+            {"jobKey": k, "state": s, "inputName": n, "outPdf": o, "updatedAt": u}
+            for k, s, n, o, u in rows
+        ]
+
+
+_stores: Dict[str, IndexStore] = {}
+_stores_lock = threading.Lock()
+
+
+def get_store(path: str) -> IndexStore:
+    """Retourne l'``IndexStore`` partagé associé à ``path`` (créé au besoin)."""
+    with _stores_lock:
+        store = _stores.get(path)
+        if store is None:
+            store = IndexStore(path)
+            _stores[path] = store
+        return store
+
+
+# ---------------------------------------------------------------------------
+# Migration jobs.json -> SQLite
+# ---------------------------------------------------------------------------
+
+def migrate_json_index(json_path: str, store: IndexStore) -> int:
+    """
+    Importe un ``jobs.json`` existant dans le store SQLite (one-shot).
+    Le fichier JSON est ensuite renommé en ``jobs.json.migrated``.
+
+    :param json_path: Chemin du fichier ``jobs.json`` historique.
+    :param store: Store SQLite de destination.
+    :return: Nombre d'entrées importées (0 si aucun fichier).
+    """
+    data = read_json(json_path)
+    if data is None:
+        return 0
+    entries = []
+    for job_key, entry in (data.get("jobs") or {}).items():
+        entries.append(dict(entry, jobKey=entry.get("jobKey") or job_key))
+    count = store.upsert_many(entries)
+    os.replace(json_path, json_path + ".migrated")
+    return count
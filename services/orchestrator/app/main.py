@@ -8,7 +8,8 @@ import os
 import time
 import shutil
 import threading
-import requests
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
 
 from app.core import (
     canonical_profile,
@@ -25,6 +26,7 @@ from app.utils import (
     atomic_write_json,
     read_json,
     sha256_file,
+    quick_fingerprint,
     now_iso,
     validate_pdf,
     check_disk_space,
@@ -32,7 +34,11 @@ from app.utils import (
     check_file_signature,
     cleanup_old_workdirs,
 )
+from app.admission import AdmissionPipeline
+from app.http_client import ServiceSession
+from app.index_store import JobsTable, get_store, migrate_json_index
 from app.logger import get_logger
+from app.watcher import make_watcher, scan_inputs
 from app.http_server import OrchestratorState, start_http_server
 
 _log = get_logger("orchestrator")
@@ -55,6 +61,8 @@ PREP_URL = os.environ.get("PREP_URL", "http://prep-service:8080")
 OCR_URL = os.environ.get("OCR_URL", "http://ocr-service:8080")
 
 POLL_INTERVAL_MS = int(os.environ.get("POLL_INTERVAL_MS", "1000"))
+# Découverte des entrées : "auto" (inotify, polling sur montage réseau), "inotify" ou "poll"
+DISCOVERY_MODE = os.environ.get("DISCOVERY_MODE", "auto")
 PREP_CONCURRENCY = int(os.environ.get("PREP_CONCURRENCY", "2"))
 OCR_CONCURRENCY = int(os.environ.get("OCR_CONCURRENCY", "1"))
 MAX_JOBS_IN_FLIGHT = int(os.environ.get("MAX_JOBS_IN_FLIGHT", "3"))
@@ -71,6 +79,32 @@ DISK_FREE_FACTOR = float(os.environ.get("DISK_FREE_FACTOR", "2.0"))
 # Hardening entrée (E)
 MAX_INPUT_SIZE_MB = float(os.environ.get("MAX_INPUT_SIZE_MB", "500"))
 
+# Admission par lot : 0 = remplir toute la capacité libre en un tick, 1 = historique
+MAX_ADMISSIONS_PER_TICK = int(os.environ.get("MAX_ADMISSIONS_PER_TICK", "0"))
+ADMISSION_WORKERS = int(os.environ.get("ADMISSION_WORKERS", "4"))
+# Threads dédiés au SHA-256 complet des fichiers sans correspondance au pré-filtre
+HASH_WORKERS = int(os.environ.get("HASH_WORKERS", "2"))
+
+# Index des jobs : "sqlite" (défaut, upserts par ligne) ou "json" (historique)
+INDEX_BACKEND = os.environ.get("INDEX_BACKEND", "sqlite").lower()
+
+# Callbacks de fin de job : URL de l'orchestrateur vue des services (vide = polling seul)
+CALLBACK_BASE_URL = os.environ.get("CALLBACK_BASE_URL", "")
+CALLBACK_FALLBACK_S = int(os.environ.get("CALLBACK_FALLBACK_S", "30"))
+
+# Moteur : "tick" (boucle séquentielle historique) ou "asyncio" (machines à états par job)
+ENGINE = os.environ.get("ENGINE", "tick").lower()
+
+# Session HTTP partagée vers les services : connexions keep-alive par service, timeouts (s)
+HTTP_POOL_SIZE = int(os.environ.get("HTTP_POOL_SIZE", "10"))
+PREP_HTTP_TIMEOUT_S = float(os.environ.get("PREP_HTTP_TIMEOUT_S", "10"))
+OCR_HTTP_TIMEOUT_S = float(os.environ.get("OCR_HTTP_TIMEOUT_S", "10"))
+
+HTTP = ServiceSession(
+    pool_size=HTTP_POOL_SIZE,
+    timeouts={"prep": PREP_HTTP_TIMEOUT_S, "ocr": OCR_HTTP_TIMEOUT_S},
+)
+
 # Observabilité HTTP (C)
 ORCHESTRATOR_HTTP_PORT = int(os.environ.get("ORCHESTRATOR_HTTP_PORT", "8080"))
 ORCHESTRATOR_HTTP_BIND = os.environ.get("ORCHESTRATOR_HTTP_BIND", "0.0.0.0")
@@ -86,15 +120,16 @@ def ensure_layout():
         ensure_dir(d)
 
 
-def get_service_info(url: str) -> dict:
+def get_service_info(url: str, service: str = "") -> dict:
     """
     Récupère les informations d'un service (GET /info).
 
     :param url: URL de base du service.
+    :param service: Nom du service pour la session HTTP (``"prep"``/``"ocr"``).
     :return: Dict JSON retourné par /info, ou dict minimal en cas d'erreur.
     """
     try:
-        return requests.get(url + "/info", timeout=5).json()
+        return HTTP.get(service, url + "/info", timeout=5).json()
     except Exception:
         return {"service": url, "versions": {"unknown": "unknown"}}
 
@@ -143,16 +178,50 @@ def load_index():
     """
     Charge l'index des jobs depuis le disque.
 
+    Backend ``sqlite`` : ouvre ``index/jobs.db`` (WAL) et y migre une seule
+    fois un ``jobs.json`` historique s'il existe encore.
+    Backend ``json`` : lit ``index/jobs.json``.
+
     :return: Tuple ``(index_dict, index_path)``.
     """
     ensure_dir(INDEX_DIR)
-    p = os.path.join(INDEX_DIR, "jobs.json")
-    return (read_json(p) or {"jobs": {}}), p
+    json_path = os.path.join(INDEX_DIR, "jobs.json")
+    if INDEX_BACKEND == "json":
+        return (read_json(json_path) or {"jobs": {}}), json_path
+
+    db_path = os.path.join(INDEX_DIR, "jobs.db")
+    store = get_store(db_path)
+    if os.path.exists(json_path):
+        migrated = migrate_json_index(json_path, store)
+        _log.info(f"Index jobs.json migré vers SQLite : {migrated} entrée(s)")
+    jobs = JobsTable(store.load_all())
+    jobs.pop_dirty()
+    return {"jobs": jobs}, db_path
 
 
 def save_index(index, path):
-    """Persiste l'index des jobs sur le disque."""
-    atomic_write_json(path, index)
+    """
+    Persiste l'index des jobs sur le disque.
+
+    Backend SQLite (``path`` en ``.db``) : upsert des seules entrées modifiées
+    et suppression des entrées retirées depuis la dernière sauvegarde.
+    Backend JSON : réécriture complète.
+    """
+    if not path.endswith(".db"):
+        atomic_write_json(path, index)
+        return
+    jobs = index["jobs"]
+    store = get_store(path)
+    if isinstance(jobs, JobsTable):
+        keys, deleted = jobs.pop_dirty(), jobs.pop_deleted()
+    else:
+        keys, deleted = list(jobs), []
+    entries = []
+    for k in keys:
+        entry = dict.get(jobs, k)
+        entries.append(dict(entry, jobKey=entry.get("jobKey") or k))
+    store.delete_many(deleted)
+    store.upsert_many(entries)
 
 
 def output_path_for(input_name: str, job_key: str) -> str:
@@ -167,17 +236,17 @@ def output_path_for(input_name: str, job_key: str) -> str:
     return os.path.join(OUT_DIR, f"{base_name(input_name)}__job-{job_key}.pdf")
 
 
-def discover_inputs():
+def discover_inputs(watcher=None):
     """
-    Générateur qui liste les fichiers .cbz/.cbr dans IN_DIR (ignore .part).
+    Liste les fichiers .cbz/.cbr à admettre depuis IN_DIR (ignore .part).
 
-    :return: Générateur de chemins absolus.
+    :param watcher: Watcher de découverte (``app.watcher``). Si None,
+                    parcourt IN_DIR par ``os.listdir``.
+    :return: Liste de chemins absolus.
     """
-    for fn in os.listdir(IN_DIR):
-        lfn = fn.lower()
-        if not (lfn.endswith(".cbz") or lfn.endswith(".cbr")):
-            continue
-        yield os.path.join(IN_DIR, fn)
+    if watcher is not None:
+        return watcher.pending()
+    return scan_inputs(IN_DIR)
 
 
 # ---------------------------------------------------------------------------
@@ -289,63 +358,293 @@ def check_duplicate_decisions(index: dict, index_path: str):
 # Soumission + polling HTTP
 # ---------------------------------------------------------------------------
 
-def submit_prep(job_key: str, input_path: str):
+def submit_prep(job_key: str, input_path: str, callback_url: Optional[str] = None):
     """
     Soumet un job de préparation au prep-service.
 
     :param job_key: Identifiant du job.
     :param input_path: Chemin du fichier d'entrée.
+    :param callback_url: URL notifiée par le service en fin de job (optionnelle).
     :raises RuntimeError: Si le service répond avec un code d'erreur.
     """
-    r = requests.post(
-        PREP_URL + "/jobs/prep",
-        json={"jobId": job_key, "inputPath": input_path, "workDir": WORK_DIR},
-        timeout=10,
-    )
+    payload = {"jobId": job_key, "inputPath": input_path, "workDir": WORK_DIR}
+    if callback_url:
+        payload["callbackUrl"] = callback_url
+    r = HTTP.post("prep", PREP_URL + "/jobs/prep", json=payload)
     if r.status_code not in (200, 202):
         raise RuntimeError(f"prep submit failed: {r.status_code} {r.text}")
 
 
-def submit_ocr(job_key: str, raw_pdf: str):
+def submit_ocr(job_key: str, raw_pdf: str, callback_url: Optional[str] = None):
     """
     Soumet un job OCR à l'ocr-service.
 
     :param job_key: Identifiant du job.
     :param raw_pdf: Chemin du raw.pdf produit par le prep-service.
+    :param callback_url: URL notifiée par le service en fin de job (optionnelle).
     :raises RuntimeError: Si le service répond avec un code d'erreur.
     """
-    r = requests.post(
-        OCR_URL + "/jobs/ocr",
-        json={
-            "jobId": job_key,
-            "rawPdfPath": raw_pdf,
-            "workDir": WORK_DIR,
-            "lang": OCR_LANG,
-            "rotatePages": True,
-            "deskew": True,
-            "optimize": 1,
-        },
-        timeout=10,
-    )
+    payload = {
+        "jobId": job_key,
+        "rawPdfPath": raw_pdf,
+        "workDir": WORK_DIR,
+        "lang": OCR_LANG,
+        "rotatePages": True,
+        "deskew": True,
+        "optimize": 1,
+    }
+    if callback_url:
+        payload["callbackUrl"] = callback_url
+    r = HTTP.post("ocr", OCR_URL + "/jobs/ocr", json=payload)
     if r.status_code not in (200, 202):
         raise RuntimeError(f"ocr submit failed: {r.status_code} {r.text}")
 
 
-def poll_job(url: str, job_key: str) -> dict:
+def poll_job(url: str, job_key: str, service: str = "") -> dict:
     """
     Interroge l'état d'un job sur un service.
 
     :param url: URL de base du service.
     :param job_key: Identifiant du job.
+    :param service: Nom du service (timeout de la session HTTP).
     :return: Dict JSON de l'état du job.
     :raises RuntimeError: Si le service répond avec un code d'erreur.
     """
-    r = requests.get(url + f"/jobs/{job_key}", timeout=10)
+    r = HTTP.get(service, url + f"/jobs/{job_key}")
     if r.status_code != 200:
         raise RuntimeError(f"job status failed: {r.status_code} {r.text}")
     return r.json()
 
 
+def poll_jobs(url: str, job_keys: List[str], service: str = "") -> Dict[str, dict]:
+    """
+    Interroge l'état de plusieurs jobs en une seule requête (``POST /jobs/status``).
+    Repli sur ``poll_job`` job par job si le service ne connaît pas l'endpoint groupé.
+
+    :param url: URL de base du service.
+    :param job_keys: Identifiants des jobs.
+    :param service: Nom du service (timeout de la session HTTP).
+    :return: Dict ``jobKey -> état`` (jobs inconnus du service absents).
+    :raises RuntimeError: Si le service répond avec un code d'erreur.
+    """
+    if not job_keys:
+        return {}
+    r = HTTP.post(service, url + "/jobs/status", json={"ids": list(job_keys)})
+    if r.status_code in (404, 405):
+        # Service antérieur à l'endpoint groupé
+        out = {}
+        for job_key in job_keys:
+            try:
+                out[job_key] = poll_job(url, job_key, service)
+            except Exception:
+                pass
+        return out
+    if r.status_code != 200:
+        raise RuntimeError(f"batch job status failed: {r.status_code} {r.text}")
+    return r.json().get("jobs") or {}
+
+
+def callback_url_for(config: dict, stage: str) -> Optional[str]:
+    """
+    URL de callback transmise aux services pour ``stage`` (``"prep"``/``"ocr"``).
+
+    :return: ``<callback_base_url>/callbacks/<stage>``, ou None si désactivé.
+    """
+    base = config.get("callback_base_url", CALLBACK_BASE_URL)
+    return f"{base.rstrip('/')}/callbacks/{stage}" if base else None
+
+
+def plan_polling(stage: str, running: Dict[str, dict], config: dict,
+                 callbacks: dict) -> List[str]:
+    """
+    Jobs en cours d'une étape dont le polling est dû ; leur ``lastPollAt`` est
+    mis à jour. Un callback reçu ne porte pas le statut : il rend seulement le
+    polling de son job immédiat (le corps de la notification n'est jamais
+    appliqué). Callbacks actifs : sans notification, le polling n'est qu'un
+    filet de sécurité, limité aux jobs sans nouvelles depuis
+    ``callback_fallback_s`` secondes.
+    Sans appel réseau : à exécuter dans le thread propriétaire d'``in_flight``.
+
+    :param stage: ``"prep"`` ou ``"ocr"``.
+    :param running: Entrées ``in_flight`` de l'étape.
+    :param config: Configuration courante.
+    :param callbacks: Notifications reçues ``{(stage, jobId): instant de réception}``.
+    :return: jobKeys à interroger.
+    """
+    due = []
+    callbacks_on = bool(callback_url_for(config, stage))
+    overdue_s = config.get("callback_fallback_s", CALLBACK_FALLBACK_S)
+    now = time.monotonic()
+    for job_key, meta in running.items():
+        if ((stage, job_key) in callbacks or not callbacks_on
+                or now - meta.get("lastPollAt", 0.0) >= overdue_s):
+            due.append(job_key)
+            meta["lastPollAt"] = now
+    return due
+
+
+def job_statuses(url: str, stage: str, running: Dict[str, dict], config: dict,
+                 callbacks: dict) -> Dict[str, dict]:
+    """
+    Statuts des jobs en cours d'une étape : un seul appel groupé pour les jobs
+    dont le polling est dû (``plan_polling``).
+
+    :param url: URL de base du service.
+    :param stage: ``"prep"`` ou ``"ocr"``.
+    :param running: Entrées ``in_flight`` de l'étape (``lastPollAt`` mis à jour).
+    :param config: Configuration courante.
+    :param callbacks: Notifications reçues ``{(stage, jobId): instant de réception}``.
+    :return: Dict ``jobKey -> statut`` ; un job absent n'a pas de nouvelles ce tick.
+    """
+    due = plan_polling(stage, running, config, callbacks)
+    if not due:
+        return {}
+    try:
+        return poll_jobs(url, due, stage)
+    except Exception:
+        return {}  # service indisponible : nouvel essai au tick suivant
+
+
+# ---------------------------------------------------------------------------
+# Admission des entrées
+# ---------------------------------------------------------------------------
+
+def _reject_to_error(staging_path: str) -> None:
+    """Déplace un fichier refusé vers ERROR_DIR (erreurs ignorées)."""
+    try:
+        move_atomic(staging_path, os.path.join(ERROR_DIR, os.path.basename(staging_path)))
+    except Exception:
+        pass
+
+
+def stage_input(src: str, work_dir: str, max_input_size_mb: float) -> dict:
+    """
+    Déplace un fichier entrant en staging, vérifie taille et signature, puis
+    calcule son empreinte rapide (taille + premier/dernier Mio).
+    Le SHA-256 complet est calculé séparément par ``hash_staged``.
+    Sans effet sur l'index ni sur ``in_flight`` : exécutable en parallèle.
+
+    :param src: Chemin du fichier dans IN_DIR.
+    :param work_dir: Répertoire de travail (staging sous ``_staging/``).
+    :param max_input_size_mb: Taille maximale acceptée (Mo).
+    :return: Dict ``status`` (``"ok"``, ``"skipped"``, ``"input_rejected_size"``,
+             ``"input_rejected_signature"``) + ``originalName``, ``stagingPath``,
+             ``sizeBytes``, ``quickKey`` si ``status == "ok"``.
+    """
+    ts = time.strftime("%Y%m%d-%H%M%S", time.gmtime())
+    original_name = os.path.basename(src)
+    staging_path = os.path.join(work_dir, "_staging", ts + "_" + original_name)
+    ensure_dir(os.path.dirname(staging_path))
+    try:
+        move_atomic(src, staging_path)
+    except Exception:
+        return {"status": "skipped"}
+
+    # E1 — Vérification taille fichier
+    if not check_input_size(staging_path, max_input_size_mb):
+        _log.warning("Fichier trop grand, rejeté", extra={"stage": "INPUT_CHECK"})
+        _reject_to_error(staging_path)
+        return {"status": "input_rejected_size"}
+
+    # E2 — Vérification signature ZIP/RAR
+    if not check_file_signature(staging_path):
+        _log.warning("Signature invalide, rejeté", extra={"stage": "INPUT_CHECK"})
+        _reject_to_error(staging_path)
+        return {"status": "input_rejected_signature"}
+
+    return {
+        "status": "ok",
+        "originalName": original_name,
+        "stagingPath": staging_path,
+        "sizeBytes": os.path.getsize(staging_path),
+        "quickKey": quick_fingerprint(staging_path),
+    }
+
+
+def hash_staged(staged: dict) -> dict:
+    """
+    Complète un résultat de ``stage_input`` avec le SHA-256 complet
+    (``fileHash``) et la durée du hash (``hashSeconds``).
+
+    :param staged: Dict retourné par ``stage_input`` (modifié en place).
+    :return: Le même dict.
+    """
+    if staged.get("status") == "ok" and "fileHash" not in staged:
+        t0 = time.monotonic()
+        staged["fileHash"] = sha256_file(staged["stagingPath"])
+        staged["hashSeconds"] = time.monotonic() - t0
+    return staged
+
+
+def admit_staged(staged: dict, in_flight: dict, index: dict, index_path: str,
+                 profile: dict, config: dict, metrics: dict) -> bool:
+    """
+    Admet un fichier préparé par ``stage_input`` : contrôle disque, doublon,
+    création du job (state.json, index, ``in_flight``).
+    Doit s'exécuter dans le thread de la boucle (mutation de l'état partagé).
+
+    :return: True si un nouveau job a été créé.
+    """
+    status = staged["status"]
+    if status != "ok":
+        if status != "skipped":
+            update_metrics(metrics, status)
+        return False
+
+    staging_path = staged["stagingPath"]
+    original_name = staged["originalName"]
+    file_hash = hash_staged(staged)["fileHash"]
+    profile_hash, job_key = make_job_key(file_hash, profile)
+
+    # B4 — Vérification espace disque avant PREP
+    if not check_disk_space(config["work_dir"], staged["sizeBytes"], config.get("disk_free_factor", DISK_FREE_FACTOR)):
+        _log.error("Espace disque insuffisant", extra={"stage": "DISK_CHECK"})
+        _reject_to_error(staging_path)
+        update_metrics(metrics, "disk_error")
+        return False
+
+    existing = index["jobs"].get(job_key)
+    if existing:
+        if staged.get("quickKey") and not existing.get("quickKey"):
+            # Entrée antérieure au pré-filtre : compléter son empreinte rapide
+            index["jobs"][job_key]["quickKey"] = staged["quickKey"]
+            save_index(index, index_path)
+        write_duplicate_report(job_key, staging_path, existing, profile)
+        return False
+
+    jdir = job_dir(job_key)
+    ensure_dir(jdir)
+    input_path = os.path.join(jdir, original_name)
+    move_atomic(staging_path, input_path)
+
+    update_state(job_key, {
+        "state": "DISCOVERED",
+        "profile": profile,
+        "fileHash": file_hash,
+        "profileHash": profile_hash,
+        "input": {"name": original_name, "path": input_path},
+    })
+    index["jobs"][job_key] = {
+        "jobKey": job_key,
+        "state": "DISCOVERED",
+        "inputName": original_name,
+        "outPdf": None,
+        "updatedAt": now_iso(),
+        "quickKey": staged.get("quickKey"),
+        "sizeBytes": staged["sizeBytes"],
+    }
+    save_index(index, index_path)
+    in_flight[job_key] = {
+        "stage": "DISCOVERED",
+        "inputName": original_name,
+        "inputPath": input_path,
+        "attemptPrep": 0,
+        "attemptOcr": 0,
+    }
+    update_metrics(metrics, "queued")
+    return True
+
+
 # ---------------------------------------------------------------------------
 # Heartbeat-check
 # ---------------------------------------------------------------------------
@@ -380,15 +679,157 @@ def check_stale_jobs(in_flight: dict, timeout_s: int):
                 meta["stage"] = "OCR_RETRY"
 
 
+# ---------------------------------------------------------------------------
+# Transitions d'un job (partagées par process_tick et le moteur asyncio)
+# ---------------------------------------------------------------------------
+
+def open_prep_attempt(job_key: str, meta: dict, in_flight: dict, index: dict, index_path: str,
+                      config: dict, metrics: dict) -> bool:
+    """
+    Ouvre une tentative PREP : passe le job en ERROR si ``max_attempts_prep``
+    est atteint (entrée déplacée vers ERROR_DIR), sinon incrémente le compteur.
+
+    :return: True si le job peut être soumis au prep-service.
+    """
+    if meta["attemptPrep"] >= config["max_attempts_prep"]:
+        update_state(job_key, {"state": "ERROR", "step": "PREP", "message": "max attempts reached"})
+        index["jobs"][job_key]["state"] = "ERROR_PREP"
+        save_index(index, index_path)
+        try:
+            move_atomic(meta["inputPath"], os.path.join(ERROR_DIR, os.path.basename(meta["inputPath"])))
+        except Exception:
+            pass
+        del in_flight[job_key]
+        update_metrics(metrics, "error")
+        return False
+    meta["attemptPrep"] += 1
+    update_state(job_key, {"state": "PREP_SUBMITTED", "step": "PREP", "attempt": meta["attemptPrep"]})
+    return True
+
+
+def mark_prep_running(job_key: str, meta: dict, index: dict, index_path: str, metrics: dict) -> None:
+    """Enregistre la soumission réussie d'un job au prep-service."""
+    meta["lastPollAt"] = time.monotonic()
+    meta["stage"] = "PREP_RUNNING"
+    index["jobs"][job_key]["state"] = "PREP_RUNNING"
+    save_index(index, index_path)
+    update_metrics(metrics, "running")
+
+
+def open_ocr_attempt(job_key: str, meta: dict, in_flight: dict, index: dict, index_path: str,
+                     config: dict, metrics: dict) -> Optional[str]:
+    """
+    Ouvre une tentative OCR : passe le job en ERROR si ``max_attempts_ocr``
+    est atteint, sinon incrémente le compteur.
+
+    :return: Chemin du raw.pdf à soumettre, ou None si le job est abandonné.
+    """
+    if meta["attemptOcr"] >= config["max_attempts_ocr"]:
+        update_state(job_key, {"state": "ERROR", "step": "OCR", "message": "max attempts reached"})
+        index["jobs"][job_key]["state"] = "ERROR_OCR"
+        save_index(index, index_path)
+        del in_flight[job_key]
+        update_metrics(metrics, "error")
+        return None
+    meta["attemptOcr"] += 1
+    raw_pdf = meta.get("rawPdf") or os.path.join(job_dir(job_key), "raw.pdf")
+    update_state(job_key, {"state": "OCR_SUBMITTED", "step": "OCR", "attempt": meta["attemptOcr"], "rawPdf": raw_pdf})
+    return raw_pdf
+
+
+def mark_ocr_running(job_key: str, meta: dict, index: dict, index_path: str) -> None:
+    """Enregistre la soumission réussie d'un job à l'ocr-service."""
+    meta["lastPollAt"] = time.monotonic()
+    meta["stage"] = "OCR_RUNNING"
+    index["jobs"][job_key]["state"] = "OCR_RUNNING"
+    save_index(index, index_path)
+
+
+def mark_submit_failed(job_key: str, meta: dict, step: str, error: Exception) -> None:
+    """Soumission refusée ou service injoignable : le job repasse en ``<step>_RETRY``."""
+    update_state(job_key, {"state": "ERROR", "step": step, "message": str(error)})
+    meta["stage"] = f"{step}_RETRY"
+
+
+def apply_prep_status(job_key: str, meta: dict, st: dict, index: dict, index_path: str) -> None:
+    """
+    Applique le statut renvoyé par le prep-service (DONE/ERROR ; autres états ignorés).
+
+    :param st: Statut du job renvoyé par le polling.
+    """
+    if st.get("state") == "DONE":
+        # Chemin déduit du job, jamais du statut reçu (artefacts non fiables)
+        raw_pdf = os.path.join(job_dir(job_key), "raw.pdf")
+        update_state(job_key, {"state": "PREP_DONE", "step": "PREP", "rawPdf": raw_pdf})
+        meta["rawPdf"] = raw_pdf
+        meta["stage"] = "PREP_DONE"
+        index["jobs"][job_key]["state"] = "PREP_DONE"
+        save_index(index, index_path)
+    elif st.get("state") == "ERROR":
+        update_state(job_key, {"state": "PREP_ERROR", "step": "PREP", "message": st.get("message")})
+        meta["stage"] = "PREP_RETRY"
+
+
+def apply_ocr_status(job_key: str, meta: dict, st: dict, in_flight: dict, index: dict,
+                     index_path: str, config: dict, metrics: dict) -> None:
+    """
+    Applique le statut renvoyé par l'ocr-service. Sur DONE : validation du
+    PDF final, déplacement vers OUT_DIR, archivage de l'entrée et sortie de
+    ``in_flight``.
+
+    :param st: Statut du job renvoyé par le polling.
+    """
+    if st.get("state") == "DONE":
+        final_pdf = os.path.join(job_dir(job_key), "final.pdf")
+
+        # B3 — Validation PDF avant move vers /out
+        min_pdf = config.get("min_pdf_size_bytes", MIN_PDF_SIZE_BYTES)
+        if not validate_pdf(final_pdf, min_size_bytes=min_pdf):
+            _log.error("PDF final invalide", extra={"jobKey": job_key, "stage": "OCR_FINALIZE"})
+            update_state(job_key, {"state": "OCR_ERROR", "step": "OCR", "message": "pdf_invalid"})
+            meta["stage"] = "OCR_RETRY"
+            update_metrics(metrics, "pdf_invalid")
+            return
+
+        out_pdf = output_path_for(meta["inputName"], job_key)
+        ensure_dir(OUT_DIR)
+        move_atomic(final_pdf, out_pdf)
+        _log.info("Job terminé", extra={"jobKey": job_key, "stage": "DONE"})
+        update_state(job_key, {"state": "DONE", "step": "OCR", "finalPdf": out_pdf})
+        index["jobs"][job_key]["state"] = "DONE"
+        index["jobs"][job_key]["outPdf"] = out_pdf
+        save_index(index, index_path)
+
+        # B5 — Nettoyage workdir immédiat si KEEP_WORK_DIR_DAYS=0
+        keep_days = config.get("keep_work_dir_days", KEEP_WORK_DIR_DAYS)
+        if keep_days == 0:
+            try:
+                shutil.rmtree(job_dir(job_key), ignore_errors=True)
+            except Exception:
+                pass
+
+        try:
+            ensure_dir(ARCHIVE_DIR)
+            move_atomic(meta["inputPath"], os.path.join(ARCHIVE_DIR, os.path.basename(meta["inputPath"])))
+        except Exception:
+            pass
+        del in_flight[job_key]
+        update_metrics(metrics, "done")
+    elif st.get("state") == "ERROR":
+        update_state(job_key, {"state": "OCR_ERROR", "step": "OCR", "message": st.get("message")})
+        meta["stage"] = "OCR_RETRY"
+
+
 # ---------------------------------------------------------------------------
 # Tick (logique principale d'un cycle, sans sleep — testable unitairement)
 # ---------------------------------------------------------------------------
 
-def process_tick(in_flight: dict, index: dict, index_path: str, profile: dict, config: dict):
+def process_tick(in_flight: dict, index: dict, index_path: str, profile: dict, config: dict,
+                 watcher=None, admission=None, callbacks: Optional[dict] = None):
     """
     Exécute un cycle complet de l'orchestrateur :
     1. Décisions doublons
-    2. Découverte de nouveaux fichiers (si capacité)
+    2. Découverte et admission par lot de nouveaux fichiers (selon capacité libre)
     3. Planification des soumissions PREP
     4. Polling des jobs PREP
     5. Planification des soumissions OCR
@@ -404,96 +845,58 @@ def process_tick(in_flight: dict, index: dict, index_path: str, profile: dict, c
                    ``prep_url``, ``ocr_url``, ``work_dir``, ``max_jobs_in_flight``,
                    ``prep_concurrency``, ``ocr_concurrency``,
                    ``max_attempts_prep``, ``max_attempts_ocr``,
-                   ``job_timeout_s``, ``index_dir``, ``metrics``.
+                   ``job_timeout_s``, ``index_dir``, ``metrics``,
+                   ``max_admissions_per_tick``, ``admission_workers``.
+    :param watcher: Watcher de découverte optionnel (inotify/polling).
+    :param admission: ``AdmissionPipeline`` optionnel. Si fourni, staging et hash
+                      tournent en arrière-plan et le tick ne fait que drainer la
+                      file prête ; sinon le lot est traité de façon bloquante.
+    :param callbacks: Notifications de fin de job reçues depuis le tick précédent
+                      (``{(stage, jobId): instant de réception}``) ; rendent
+                      immédiat le polling de ces jobs.
     """
     metrics: dict = config.get("metrics", make_empty_metrics())
+    callbacks = dict(callbacks or {})
 
     check_duplicate_decisions(index, index_path)
 
-    # -- Découverte --
-    if len(in_flight) < config["max_jobs_in_flight"]:
-        for src in list(discover_inputs()):
-            ts = time.strftime("%Y%m%d-%H%M%S", time.gmtime())
-            original_name = os.path.basename(src)
-            staging_path = os.path.join(config["work_dir"], "_staging", ts + "_" + original_name)
-            ensure_dir(os.path.dirname(staging_path))
-            try:
-                move_atomic(src, staging_path)
-            except Exception:
-                continue
-
-            # E1 — Vérification taille fichier
-            if not check_input_size(staging_path, config.get("max_input_size_mb", MAX_INPUT_SIZE_MB)):
-                _log.warning("Fichier trop grand, rejeté", extra={"stage": "INPUT_CHECK"})
-                err_dst = os.path.join(ERROR_DIR, os.path.basename(staging_path))
-                try:
-                    move_atomic(staging_path, err_dst)
-                except Exception:
-                    pass
-                update_metrics(metrics, "input_rejected_size")
-                continue
-
-            # E2 — Vérification signature ZIP/RAR
-            if not check_file_signature(staging_path):
-                _log.warning("Signature invalide, rejeté", extra={"stage": "INPUT_CHECK"})
-                err_dst = os.path.join(ERROR_DIR, os.path.basename(staging_path))
-                try:
-                    move_atomic(staging_path, err_dst)
-                except Exception:
-                    pass
-                update_metrics(metrics, "input_rejected_signature")
-                continue
-
-            file_hash = sha256_file(staging_path)
-            _, job_key = make_job_key(file_hash, profile)
-
-            # B4 — Vérification espace disque avant PREP
-            input_size = os.path.getsize(staging_path)
-            if not check_disk_space(config["work_dir"], input_size, config.get("disk_free_factor", DISK_FREE_FACTOR)):
-                _log.error("Espace disque insuffisant", extra={"stage": "DISK_CHECK"})
-                err_dst = os.path.join(ERROR_DIR, os.path.basename(staging_path))
-                try:
-                    move_atomic(staging_path, err_dst)
-                except Exception:
-                    pass
-                update_metrics(metrics, "disk_error")
-                continue
-
-            existing = index["jobs"].get(job_key)
-            if existing:
-                write_duplicate_report(job_key, staging_path, existing, profile)
-                continue
-
-            jdir = job_dir(job_key)
-            ensure_dir(jdir)
-            input_path = os.path.join(jdir, original_name)
-            move_atomic(staging_path, input_path)
-
-            profile_hash, _ = make_job_key(file_hash, profile)
-            update_state(job_key, {
-                "state": "DISCOVERED",
-                "profile": profile,
-                "fileHash": file_hash,
-                "profileHash": profile_hash,
-                "input": {"name": original_name, "path": input_path},
-            })
-            index["jobs"][job_key] = {
-                "jobKey": job_key,
-                "state": "DISCOVERED",
-                "inputName": original_name,
-                "outPdf": None,
-                "updatedAt": now_iso(),
-            }
-            save_index(index, index_path)
-            in_flight[job_key] = {
-                "stage": "DISCOVERED",
-                "inputName": original_name,
-                "inputPath": input_path,
-                "attemptPrep": 0,
-                "attemptOcr": 0,
-            }
-            update_metrics(metrics, "queued")
-            break  # un fichier par tick
+    # -- Découverte (admission par lot, bornée par la capacité libre) --
+    if admission is not None:
+        # Pipeline asynchrone : admettre les fichiers déjà hachés, puis alimenter le pool
+        for staged in admission.drain():
+            admit_staged(staged, in_flight, index, index_path, profile, config, metrics)
+            if staged.get("quickKey"):
+                admission.remember(staged["quickKey"])
+        free_slots = config["max_jobs_in_flight"] - len(in_flight) - admission.depth()
+    else:
+        free_slots = config["max_jobs_in_flight"] - len(in_flight)
+    if free_slots > 0:
+        cap = config.get("max_admissions_per_tick", MAX_ADMISSIONS_PER_TICK)
+        budget = min(free_slots, cap) if cap > 0 else free_slots
+        max_input_mb = config.get("max_input_size_mb", MAX_INPUT_SIZE_MB)
+        if admission is not None:
+            for src in discover_inputs(watcher):
+                if budget <= 0:
+                    break
+                if admission.submit(src):
+                    budget -= 1
+        else:
+            candidates = list(discover_inputs(watcher))[:budget]
+            workers = max(1, min(len(candidates), config.get("admission_workers", ADMISSION_WORKERS)))
+            if len(candidates) > 1 and workers > 1:
+                with ThreadPoolExecutor(max_workers=workers) as pool:
+                    staged_list = list(pool.map(
+                        lambda src: hash_staged(stage_input(src, config["work_dir"], max_input_mb)),
+                        candidates,
+                    ))
+            else:
+                staged_list = [
+                    hash_staged(stage_input(src, config["work_dir"], max_input_mb)) for src in candidates
+                ]
+            for staged in staged_list:
+                admit_staged(staged, in_flight, index, index_path, profile, config, metrics)
+    if admission is not None:
+        metrics.update(admission.stats())
 
     # -- Planification PREP --
     running_prep = sum(1 for j in in_flight.values() if j["stage"] == "PREP_RUNNING")
@@ -502,46 +905,26 @@ def process_tick(in_flight: dict, index: dict, index_path: str, profile: dict, c
         if can_start_prep <= 0:
             break
         if meta["stage"] in ("DISCOVERED", "PREP_RETRY"):
-            if meta["attemptPrep"] >= config["max_attempts_prep"]:
-                update_state(job_key, {"state": "ERROR", "step": "PREP", "message": "max attempts reached"})
-                index["jobs"][job_key]["state"] = "ERROR_PREP"
-                save_index(index, index_path)
-                try:
-                    move_atomic(meta["inputPath"], os.path.join(ERROR_DIR, os.path.basename(meta["inputPath"])))
-                except Exception:
-                    pass
-                del in_flight[job_key]
-                update_metrics(metrics, "error")
+            # Une notification restée d'une tentative précédente ne vaut pas pour celle-ci
+            callbacks.pop(("prep", job_key), None)
+            if not open_prep_attempt(job_key, meta, in_flight, index, index_path, config, metrics):
                 continue
-            meta["attemptPrep"] += 1
-            update_state(job_key, {"state": "PREP_SUBMITTED", "step": "PREP", "attempt": meta["attemptPrep"]})
             try:
-                submit_prep(job_key, meta["inputPath"])
-                meta["stage"] = "PREP_RUNNING"
-                index["jobs"][job_key]["state"] = "PREP_RUNNING"
-                save_index(index, index_path)
-                update_metrics(metrics, "running")
+                submit_prep(job_key, meta["inputPath"], callback_url=callback_url_for(config, "prep"))
+                mark_prep_running(job_key, meta, index, index_path, metrics)
                 can_start_prep -= 1
             except Exception as e:
-                update_state(job_key, {"state": "ERROR", "step": "PREP", "message": str(e)})
-                meta["stage"] = "PREP_RETRY"
-
-    # -- Polling PREP --
-    for job_key, meta in list(in_flight.items()):
-        if meta["stage"] != "PREP_RUNNING":
+                mark_submit_failed(job_key, meta, "PREP", e)
+
+    # -- Polling PREP (un appel groupé par tick) --
+    running = {k: m for k, m in in_flight.items() if m["stage"] == "PREP_RUNNING"}
+    statuses = job_statuses(config["prep_url"], "prep", running, config, callbacks)
+    for job_key, meta in running.items():
+        st = statuses.get(job_key)
+        if st is None:
             continue
         try:
-            st = poll_job(config["prep_url"], job_key)
-            if st.get("state") == "DONE":
-                raw_pdf = st.get("artifacts", {}).get("rawPdf") or os.path.join(job_dir(job_key), "raw.pdf")
-                update_state(job_key, {"state": "PREP_DONE", "step": "PREP", "rawPdf": raw_pdf})
-                meta["rawPdf"] = raw_pdf
-                meta["stage"] = "PREP_DONE"
-                index["jobs"][job_key]["state"] = "PREP_DONE"
-                save_index(index, index_path)
-            elif st.get("state") == "ERROR":
-                update_state(job_key, {"state": "PREP_ERROR", "step": "PREP", "message": st.get("message")})
-                meta["stage"] = "PREP_RETRY"
+            apply_prep_status(job_key, meta, st, index, index_path)
         except Exception:
             pass
 
@@ -552,71 +935,26 @@ def process_tick(in_flight: dict, index: dict, index_path: str, profile: dict, c
         if can_start_ocr <= 0:
             break
         if meta["stage"] in ("PREP_DONE", "OCR_RETRY"):
-            if meta["attemptOcr"] >= config["max_attempts_ocr"]:
-                update_state(job_key, {"state": "ERROR", "step": "OCR", "message": "max attempts reached"})
-                index["jobs"][job_key]["state"] = "ERROR_OCR"
-                save_index(index, index_path)
-                del in_flight[job_key]
-                update_metrics(metrics, "error")
+            callbacks.pop(("ocr", job_key), None)
+            raw_pdf = open_ocr_attempt(job_key, meta, in_flight, index, index_path, config, metrics)
+            if raw_pdf is None:
                 continue
-            meta["attemptOcr"] += 1
-            raw_pdf = meta.get("rawPdf") or os.path.join(job_dir(job_key), "raw.pdf")
-            update_state(job_key, {"state": "OCR_SUBMITTED", "step": "OCR", "attempt": meta["attemptOcr"], "rawPdf": raw_pdf})
             try:
-                submit_ocr(job_key, raw_pdf)
-                meta["stage"] = "OCR_RUNNING"
-                index["jobs"][job_key]["state"] = "OCR_RUNNING"
-                save_index(index, index_path)
+                submit_ocr(job_key, raw_pdf, callback_url=callback_url_for(config, "ocr"))
+                mark_ocr_running(job_key, meta, index, index_path)
                 can_start_ocr -= 1
             except Exception as e:
-                update_state(job_key, {"state": "ERROR", "step": "OCR", "message": str(e)})
-                meta["stage"] = "OCR_RETRY"
-
-    # -- Polling OCR + finalisation --
-    for job_key, meta in list(in_flight.items()):
-        if meta["stage"] != "OCR_RUNNING":
+                mark_submit_failed(job_key, meta, "OCR", e)
+
+    # -- Polling OCR + finalisation (un appel groupé par tick) --
+    running = {k: m for k, m in in_flight.items() if m["stage"] == "OCR_RUNNING"}
+    statuses = job_statuses(config["ocr_url"], "ocr", running, config, callbacks)
+    for job_key, meta in running.items():
+        st = statuses.get(job_key)
+        if st is None:
             continue
         try:
-            st = poll_job(config["ocr_url"], job_key)
-            if st.get("state") == "DONE":
-                final_pdf = st.get("artifacts", {}).get("finalPdf") or os.path.join(job_dir(job_key), "final.pdf")
-
-                # B3 — Validation PDF avant move vers /out
-                min_pdf = config.get("min_pdf_size_bytes", MIN_PDF_SIZE_BYTES)
-                if not validate_pdf(final_pdf, min_size_bytes=min_pdf):
-                    _log.error("PDF final invalide", extra={"jobKey": job_key, "stage": "OCR_FINALIZE"})
-                    update_state(job_key, {"state": "OCR_ERROR", "step": "OCR", "message": "pdf_invalid"})
-                    meta["stage"] = "OCR_RETRY"
-                    update_metrics(metrics, "pdf_invalid")
-                    continue
-
-                out_pdf = output_path_for(meta["inputName"], job_key)
-                ensure_dir(OUT_DIR)
-                move_atomic(final_pdf, out_pdf)
-                _log.info("Job terminé", extra={"jobKey": job_key, "stage": "DONE"})
-                update_state(job_key, {"state": "DONE", "step": "OCR", "finalPdf": out_pdf})
-                index["jobs"][job_key]["state"] = "DONE"
-                index["jobs"][job_key]["outPdf"] = out_pdf
-                save_index(index, index_path)
-
-                # B5 — Nettoyage workdir immédiat si KEEP_WORK_DIR_DAYS=0
-                keep_days = config.get("keep_work_dir_days", KEEP_WORK_DIR_DAYS)
-                if keep_days == 0:
-                    try:
-                        shutil.rmtree(job_dir(job_key), ignore_errors=True)
-                    except Exception:
-                        pass
-
-                try:
-                    ensure_dir(ARCHIVE_DIR)
-                    move_atomic(meta["inputPath"], os.path.join(ARCHIVE_DIR, os.path.basename(meta["inputPath"])))
-                except Exception:
-                    pass
-                del in_flight[job_key]
-                update_metrics(metrics, "done")
-            elif st.get("state") == "ERROR":
-                update_state(job_key, {"state": "OCR_ERROR", "step": "OCR", "message": st.get("message")})
-                meta["stage"] = "OCR_RETRY"
+            apply_ocr_status(job_key, meta, st, in_flight, index, index_path, config, metrics)
         except Exception:
             pass
 
@@ -624,6 +962,7 @@ def process_tick(in_flight: dict, index: dict, index_path: str, profile: dict, c
     check_stale_jobs(in_flight, config.get("job_timeout_s", JOB_TIMEOUT_SECONDS))
 
     # -- Métriques --
+    metrics.update(HTTP.stats())
     write_metrics(metrics, config.get("index_dir", INDEX_DIR))
 
 
@@ -631,17 +970,19 @@ def process_tick(in_flight: dict, index: dict, index_path: str, profile: dict, c
 # Boucle principale
 # ---------------------------------------------------------------------------
 
-def process_loop():
+def bootstrap() -> dict:
     """
-    Boucle principale de l'orchestrateur.
-    Initialise le layout, récupère les infos de services,
-    puis appelle ``process_tick`` en boucle infinie.
-    Démarre également le serveur HTTP d'observabilité et le janitor workdir.
+    Initialisation commune aux deux moteurs (``ENGINE=tick``/``asyncio``) :
+    layout, profil canonique, index, configuration, serveur HTTP
+    d'observabilité, watcher de découverte et pipeline d'admission.
+
+    :return: Dict ``profile``, ``index``, ``index_path``, ``in_flight``, ``metrics``,
+             ``config``, ``orch_state``, ``watcher``, ``admission``, ``run_janitor``.
     """
     ensure_layout()
-    _log.info("Orchestrateur démarré")
-    prep_info = get_service_info(PREP_URL)
-    ocr_info = get_service_info(OCR_URL)
+    _log.info(f"Orchestrateur démarré (moteur {ENGINE})")
+    prep_info = get_service_info(PREP_URL, "prep")
+    ocr_info = get_service_info(OCR_URL, "ocr")
     profile = canonical_profile(prep_info, ocr_info, OCR_LANG)
 
     index, index_path = load_index()
@@ -666,15 +1007,24 @@ def process_loop():
         "disk_free_factor": DISK_FREE_FACTOR,
         # Hardening
         "max_input_size_mb": MAX_INPUT_SIZE_MB,
+        # Admission
+        "max_admissions_per_tick": MAX_ADMISSIONS_PER_TICK,
+        "admission_workers": ADMISSION_WORKERS,
+        # Callbacks
+        "callback_base_url": CALLBACK_BASE_URL,
+        "callback_fallback_s": CALLBACK_FALLBACK_S,
     }
 
     # Démarrage serveur HTTP observabilité (C)
+    # Réveil de la boucle : nouveau fichier (inotify) ou callback d'un service
+    wake = threading.Event()
     orch_state = OrchestratorState(
         in_flight=in_flight,
         metrics=metrics,
         config=config,
         work_dir=WORK_DIR,
         index_path=index_path,
+        wake=wake,
     )
     try:
         start_http_server(orch_state, port=ORCHESTRATOR_HTTP_PORT, bind=ORCHESTRATOR_HTTP_BIND)
@@ -682,10 +1032,8 @@ def process_loop():
     except Exception as e:
         _log.warning(f"Impossible de démarrer le serveur HTTP : {e}")
 
-    # Janitor workdir périodique (B5) — toutes les 600s
-    _janitor_last_run = [0.0]
-
-    def _run_janitor():
+    # Janitor workdir périodique (B5)
+    def run_janitor():
         keep_days = config.get("keep_work_dir_days", KEEP_WORK_DIR_DAYS)
         if keep_days > 0:
             running_keys = set(in_flight.keys())
@@ -693,18 +1041,59 @@ def process_loop():
             if deleted:
                 _log.info(f"Janitor : {deleted} workdir(s) supprimé(s)")
 
+    watcher = make_watcher(IN_DIR, DISCOVERY_MODE, wake)
+    _log.info(f"Découverte des entrées : {watcher.mode}")
+    admission = AdmissionPipeline(
+        lambda src: stage_input(src, WORK_DIR, config.get("max_input_size_mb", MAX_INPUT_SIZE_MB)),
+        hash_staged,
+        workers=ADMISSION_WORKERS,
+        hash_workers=HASH_WORKERS,
+        known_quick_keys={e["quickKey"] for e in index["jobs"].values() if e.get("quickKey")},
+    )
+
+    return {
+        "profile": profile,
+        "index": index,
+        "index_path": index_path,
+        "in_flight": in_flight,
+        "metrics": metrics,
+        "config": config,
+        "orch_state": orch_state,
+        "watcher": watcher,
+        "admission": admission,
+        "run_janitor": run_janitor,
+    }
+
+
+def process_loop():
+    """
+    Boucle principale de l'orchestrateur (moteur ``tick``).
+    Initialise le runtime (cf. ``bootstrap``), puis appelle ``process_tick``
+    en boucle infinie et le janitor workdir toutes les 600 secondes.
+    """
+    rt = bootstrap()
+    watcher = rt["watcher"]
+    janitor_last_run = 0.0
+
     while True:
         ensure_layout()
-        process_tick(in_flight, index, index_path, profile, config)
+        process_tick(rt["in_flight"], rt["index"], rt["index_path"], rt["profile"], rt["config"],
+                     watcher, rt["admission"], rt["orch_state"].pop_callbacks())
 
         # Janitor workdir toutes les 600 secondes
         now = time.time()
-        if now - _janitor_last_run[0] > 600:
-            _run_janitor()
-            _janitor_last_run[0] = now
+        if now - janitor_last_run > 600:
+            rt["run_janitor"]()
+            janitor_last_run = now
 
-        time.sleep(POLL_INTERVAL_MS / 1000.0)
+        # Réveil anticipé dès qu'un fichier arrive (inotify) ou qu'un job se termine
+        # (callback), sinon un intervalle
+        watcher.wait(POLL_INTERVAL_MS / 1000.0)
 
 
 if __name__ == "__main__":
-    process_loop()
+    if ENGINE == "asyncio":
+        from app.async_engine import run_async_engine
+        run_async_engine()
+    else:
+        process_loop()
@@ -30,6 +30,24 @@ def sha256_file(path: str, chunk_size: int = 1024 * 1024) -> str:
             h.update(b)
     return h.hexdigest()
 
+def quick_fingerprint(path: str, edge_bytes: int = 1024 * 1024) -> str:
+    """
+    Empreinte rapide d'un fichier : taille + SHA-256 du premier et du dernier Mio.
+    Lit au plus ``2 * edge_bytes`` octets quel que soit la taille du fichier.
+
+    :param path: Chemin du fichier.
+    :param edge_bytes: Nombre d'octets lus en tête et en queue.
+    :return: Chaîne ``"<taille>:<sha256 hex>"``.
+    """
+    size = os.path.getsize(path)
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        h.update(f.read(edge_bytes))
+        if size > edge_bytes:
+            f.seek(max(edge_bytes, size - edge_bytes))
+            h.update(f.read(edge_bytes))
+    return f"{size}:{h.hexdigest()}"
+
 _num_re = re.compile(r"(\d+)")
 
 def natural_key(s: str):
@@ -0,0 +1,256 @@
+"""
+Découverte des fichiers entrants (.cbz/.cbr) dans le dossier ``in/``.
+
+Deux backends :
+- ``InotifyWatcher`` : événementiel (Linux, inotify via ctypes). Réagit à
+  ``IN_CLOSE_WRITE``/``IN_MOVED_TO`` ; ne rescane le dossier qu'au démarrage
+  et en cas de débordement de la file noyau.
+- ``PollingWatcher`` : ``os.listdir`` à chaque appel (historique). Utilisé en
+  repli pour les montages réseau (NFS/CIFS), où inotify ne voit pas les
+  écritures faites par d'autres machines.
+
+``make_watcher`` choisit le backend selon ``DISCOVERY_MODE`` (auto/inotify/poll).
+"""
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import sys
+import threading
+from typing import List, Optional
+
+from app.logger import get_logger
+
+_log = get_logger("orchestrator.watcher")
+
+INPUT_EXTENSIONS = (".cbz", ".cbr")
+
+# Types de systèmes de fichiers réseau pour lesquels inotify est aveugle
+_NETWORK_FS = {"nfs", "nfs4", "cifs", "smb3", "smbfs", "9p", "fuse.sshfs", "ceph", "glusterfs"}
+
+# Constantes inotify (linux/inotify.h)
+_IN_CLOSE_WRITE = 0x00000008
+_IN_MOVED_TO = 0x00000080
+_IN_Q_OVERFLOW = 0x00004000
+_IN_IGNORED = 0x00008000
+_EVENT_HEADER = struct.Struct("iIII")
+
+
+def is_input_file(name: str) -> bool:
+    """Retourne True si ``name`` est une archive de BD acceptée (.cbz/.cbr)."""
+    return name.lower().endswith(INPUT_EXTENSIONS)
+
+
+def scan_inputs(in_dir: str) -> List[str]:
+    """
+    Liste les fichiers .cbz/.cbr présents dans ``in_dir`` (ignore .part).
+
+    :param in_dir: Dossier à parcourir.
+    :return: Liste de chemins absolus.
+    """
+    return [os.path.join(in_dir, fn) for fn in os.listdir(in_dir) if is_input_file(fn)]
+
+
+def filesystem_type(path: str) -> Optional[str]:
+    """
+    Retourne le type de système de fichiers qui contient ``path``
+    d'après ``/proc/mounts`` (point de montage le plus long), ou None.
+    """
+    try:
+        with open("/proc/mounts", "r", encoding="utf-8") as f:
+            mounts = [line.split() for line in f]
+    except OSError:
+        return None
+    real = os.path.realpath(path)
+    best, best_type = "", None
+    for parts in mounts:
+        if len(parts) < 3:
+            continue
+        mnt = parts[1]
+        if (real == mnt or real.startswith(mnt.rstrip("/") + "/")) and len(mnt) >= len(best):
+            best, best_type = mnt, parts[2]
+    return best_type
+
+
+# ---------------------------------------------------------------------------
+# PollingWatcher
+# ---------------------------------------------------------------------------
+
+class PollingWatcher:
+    """
+    Découverte par ``os.listdir`` à chaque appel de ``pending()``.
+
+    :param in_dir: Dossier surveillé.
+    :param wake: Événement de réveil partagé (ex. callbacks des services).
+    """
+
+    mode = "poll"
+
+    def __init__(self, in_dir: str, wake: Optional[threading.Event] = None):
+        self.in_dir = in_dir
+        self._event = wake or threading.Event()
+
+    def pending(self) -> List[str]:
+        """Retourne les fichiers entrants présents dans ``in_dir``."""
+        return scan_inputs(self.in_dir)
+
+    def wait(self, timeout: float) -> bool:
+        """
+        Attend ``timeout`` secondes ou un réveil externe (``wake``).
+
+        :return: True si réveillé avant l'échéance.
+        """
+        woke = self._event.wait(timeout)
+        self._event.clear()
+        return woke
+
+    def close(self) -> None:
+        pass
+
+
+# ---------------------------------------------------------------------------
+# InotifyWatcher
+# ---------------------------------------------------------------------------
+
+class InotifyWatcher:
+    """
+    Découverte événementielle via inotify (ctypes, sans dépendance).
+
+    Un thread daemon lit les événements et alimente un ensemble ordonné de
+    chemins en attente. ``pending()`` ne renvoie que les chemins encore
+    présents : un fichier déplacé hors de ``in/`` par l'orchestrateur
+    disparaît de lui-même, un fichier non admis (capacité pleine) reste
+    en attente pour le tick suivant.
+    """
+
+    mode = "inotify"
+
+    def __init__(self, in_dir: str, wake: Optional[threading.Event] = None):
+        if not sys.platform.startswith("linux"):
+            raise OSError("inotify indisponible sur cette plateforme")
+        self.in_dir = in_dir
+        self._libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self._fd = self._libc.inotify_init1(os.O_CLOEXEC | os.O_NONBLOCK)
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 a échoué")
+        self._lock = threading.Lock()
+        self._pending: dict = {}
+        self._event = wake or threading.Event()
+        self._stop = threading.Event()
+        self._add_watch()
+        self._rescan()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _add_watch(self) -> None:
+        wd = self._libc.inotify_add_watch(
+            self._fd, os.fsencode(self.in_dir), _IN_CLOSE_WRITE | _IN_MOVED_TO
+        )
+        if wd < 0:
+            raise OSError(ctypes.get_errno(), f"inotify_add_watch a échoué sur {self.in_dir}")
+
+    def _push(self, path: str) -> None:
+        with self._lock:
+            self._pending[path] = None
+        self._event.set()
+
+    def _rescan(self) -> None:
+        try:
+            for path in scan_inputs(self.in_dir):
+                self._push(path)
+        except OSError:
+            pass
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                ready, _, _ = select.select([self._fd], [], [], 0.5)
+                if not ready:
+                    continue
+                buf = os.read(self._fd, 64 * 1024)
+            except (OSError, ValueError):
+                if self._stop.is_set():
+                    return
+                continue
+            self._handle(buf)
+
+    def _handle(self, buf: bytes) -> None:
+        off = 0
+        while off + _EVENT_HEADER.size <= len(buf):
+            _, mask, _, length = _EVENT_HEADER.unpack_from(buf, off)
+            raw_name = buf[off + _EVENT_HEADER.size: off + _EVENT_HEADER.size + length]
+            off += _EVENT_HEADER.size + length
+            if mask & _IN_Q_OVERFLOW:
+                _log.warning("File inotify saturée, rescan complet de in/")
+                self._rescan()
+                continue
+            if mask & _IN_IGNORED:
+                # Dossier supprimé/recréé : réarmer la surveillance
+                try:
+                    os.makedirs(self.in_dir, exist_ok=True)
+                    self._add_watch()
+                    self._rescan()
+                except OSError as e:
+                    _log.warning(f"Réarmement inotify impossible : {e}")
+                continue
+            name = os.fsdecode(raw_name.rstrip(b"\0"))
+            if name and is_input_file(name):
+                self._push(os.path.join(self.in_dir, name))
+
+    def pending(self) -> List[str]:
+        """Retourne les fichiers signalés encore présents dans ``in_dir``."""
+        with self._lock:
+            for path in list(self._pending):
+                if not os.path.exists(path):
+                    del self._pending[path]
+            return list(self._pending)
+
+    def wait(self, timeout: float) -> bool:
+        """
+        Attend un nouvel événement fichier, un réveil externe (``wake``)
+        ou ``timeout`` secondes.
+
+        :return: True si réveillé avant l'échéance.
+        """
+        woke = self._event.wait(timeout)
+        self._event.clear()
+        return woke
+
+    def close(self) -> None:
+        """Arrête le thread lecteur et ferme le descripteur inotify."""
+        self._stop.set()
+        self._thread.join(timeout=2)
+        try:
+            os.close(self._fd)
+        except OSError:
+            pass
+
+
+# ---------------------------------------------------------------------------
+# Fabrique
+# ---------------------------------------------------------------------------
+
+def make_watcher(in_dir: str, mode: str = "auto", wake: Optional[threading.Event] = None):
+    """
+    Construit le watcher de découverte.
+
+    :param in_dir: Dossier surveillé.
+    :param mode: ``"inotify"``, ``"poll"`` ou ``"auto"`` (inotify sauf sur
+                 montage réseau ou si inotify est indisponible).
+    :param wake: Événement de réveil partagé avec d'autres sources (callbacks).
+    :return: Instance ``InotifyWatcher`` ou ``PollingWatcher``.
+    """
+    mode = (mode or "auto").lower()
+    if mode == "poll":
+        return PollingWatcher(in_dir, wake)
+    if mode == "auto" and filesystem_type(in_dir) in _NETWORK_FS:
+        _log.info("Dossier in/ sur montage réseau : découverte par polling")
+        return PollingWatcher(in_dir, wake)
+    try:
+        return InotifyWatcher(in_dir, wake)
+    except (OSError, AttributeError) as e:
+        if mode == "inotify":
+            raise
+        _log.warning(f"inotify indisponible ({e}), repli sur le polling")
+        return PollingWatcher(in_dir, wake)
@@ -0,0 +1,216 @@
+"""
+Tests du pipeline d'admission asynchrone (pool borné + file prête)
+et du pré-filtre doublons par empreinte rapide.
+"""
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import pytest
+from unittest.mock import patch
+
+from app.admission import AdmissionPipeline
+from app.utils import quick_fingerprint
+
+
+def _drain_all(pipeline, expected: int, timeout: float = 3.0) -> list:
+    out = []
+    deadline = time.time() + timeout
+    while len(out) < expected and time.time() < deadline:
+        out += pipeline.drain()
+        time.sleep(0.01)
+    return out
+
+
+def _ok_stage(src):
+    return {"status": "ok", "src": src, "quickKey": "q-" + os.path.basename(src),
+            "sizeBytes": 2 * 1024 * 1024}
+
+
+def _fake_hash(staged):
+    staged["fileHash"] = "h-" + staged["src"]
+    staged["hashSeconds"] = 0.5
+    return staged
+
+
+class TestAdmissionPipeline:
+
+    def test_resultats_dans_la_file_prete(self):
+        p = AdmissionPipeline(_ok_stage, _fake_hash, workers=2)
+        try:
+            assert p.submit("/in/a.cbz")
+            assert p.submit("/in/b.cbz")
+            results = _drain_all(p, 2)
+            assert sorted(r["src"] for r in results) == ["/in/a.cbz", "/in/b.cbz"]
+            assert all("fileHash" in r for r in results)
+            stats = p.stats()
+            assert stats["hash_bytes_total"] == 4 * 1024 * 1024
+            assert stats["hash_mb_per_s"] == 4.0
+        finally:
+            p.close()
+
+    def test_doublon_en_cours_refuse(self):
+        gate = threading.Event()
+
+        def slow(src):
+            gate.wait(3)
+            return {"status": "skipped"}
+
+        p = AdmissionPipeline(slow, _fake_hash, workers=1)
+        try:
+            assert p.submit("/in/a.cbz") is True
+            assert p.submit("/in/a.cbz") is False
+            assert p.depth() == 1
+            assert p.stats()["admission_pool_depth"] == 1
+            gate.set()
+            _drain_all(p, 1)
+            assert p.depth() == 0
+        finally:
+            gate.set()
+            p.close()
+
+    def test_exception_convertie_en_skipped(self):
+        def boom(src):
+            raise OSError("disque")
+
+        p = AdmissionPipeline(boom, _fake_hash, workers=1)
+        try:
+            p.submit("/in/a.cbz")
+            assert _drain_all(p, 1) == [{"status": "skipped"}]
+        finally:
+            p.close()
+
+
+class TestPrefiltre:
+
+    def test_empreinte_connue_est_un_hit(self):
+        p = AdmissionPipeline(_ok_stage, _fake_hash, known_quick_keys={"q-old.cbz"})
+        try:
+            p.submit("/in/old.cbz")
+            p.submit("/in/new.cbz")
+            results = {r["src"]: r for r in _drain_all(p, 2)}
+            assert results["/in/old.cbz"]["prefilter"] == "hit"
+            assert results["/in/new.cbz"]["prefilter"] == "miss"
+            assert p.stats()["prefilter_hits"] == 1
+            assert p.stats()["prefilter_misses"] == 1
+        finally:
+            p.close()
+
+    def test_hit_ne_passe_pas_par_le_pool_de_hash(self):
+        """Un hit est confirmé immédiatement même si le pool de hash est saturé."""
+        gate = threading.Event()
+
+        def hash_fn(staged):
+            if staged["prefilter"] == "miss":
+                gate.wait(3)
+            return _fake_hash(staged)
+
+        p = AdmissionPipeline(_ok_stage, hash_fn, workers=2, hash_workers=1,
+                              known_quick_keys={"q-dup.cbz"})
+        try:
+            p.submit("/in/big.cbz")
+            p.submit("/in/dup.cbz")
+            first = _drain_all(p, 1)
+            assert [r["src"] for r in first] == ["/in/dup.cbz"]
+        finally:
+            gate.set()
+            p.close()
+
+    def test_remember_rend_l_empreinte_connue(self):
+        p = AdmissionPipeline(_ok_stage, _fake_hash)
+        try:
+            p.remember("q-a.cbz")
+            p.submit("/in/a.cbz")
+            assert _drain_all(p, 1)[0]["prefilter"] == "hit"
+        finally:
+            p.close()
+
+
+class TestQuickFingerprint:
+
+    def test_meme_tete_queue_taille_differente(self, tmp_path):
+        a = tmp_path / "a.cbz"
+        b = tmp_path / "b.cbz"
+        a.write_bytes(b"x" * 100)
+        b.write_bytes(b"x" * 101)
+        assert quick_fingerprint(str(a)) != quick_fingerprint(str(b))
+
+    def test_milieu_ignore(self, tmp_path):
+        """Seuls le début et la fin sont lus : un octet modifié au milieu ne change pas l'empreinte."""
+        edge = 16
+        a = tmp_path / "a.cbz"
+        b = tmp_path / "b.cbz"
+        a.write_bytes(b"H" * edge + b"m" * 50 + b"T" * edge)
+        b.write_bytes(b"H" * edge + b"M" * 50 + b"T" * edge)
+        assert quick_fingerprint(str(a), edge) == quick_fingerprint(str(b), edge)
+
+
+class TestProcessTickAvecPipeline:
+
+    def _pipeline(self, orch, config, **kwargs):
+        return AdmissionPipeline(
+            lambda src: orch.stage_input(src, config["work_dir"], 500), orch.hash_staged,
+            workers=2, **kwargs,
+        )
+
+    def test_tick_ne_bloque_pas_et_admet_au_tick_suivant(self, tmp_path, monkeypatch):
+        import app.main as orch
+        from tests.test_orchestrator import _make_config, _setup_dirs, _patch_dirs, _drop_inputs
+
+        _setup_dirs(tmp_path)
+        _patch_dirs(orch, monkeypatch, tmp_path)
+        _drop_inputs(tmp_path, 3)
+        config = _make_config(tmp_path)
+        pipeline = self._pipeline(orch, config)
+        index, in_flight = {"jobs": {}}, {}
+        index_path = str(tmp_path / "index" / "jobs.json")
+        profile = {"ocr": {}, "prep": {}}
+        try:
+            with patch.object(orch, "submit_prep"), patch.object(orch, "poll_jobs", return_value={}):
+                orch.process_tick(in_flight, index, index_path, profile, config, admission=pipeline)
+                assert config["metrics"]["queued"] == 0
+                deadline = time.time() + 3
+                while pipeline._ready.qsize() < 3 and time.time() < deadline:
+                    time.sleep(0.01)
+                orch.process_tick(in_flight, index, index_path, profile, config, admission=pipeline)
+        finally:
+            pipeline.close()
+
+        assert len(in_flight) == 3
+        assert config["metrics"]["queued"] == 3
+        assert config["metrics"]["prefilter_misses"] == 3
+        assert all(e["quickKey"] for e in index["jobs"].values())
+
+    def test_redepot_detecte_par_prefiltre_puis_doublon(self, tmp_path, monkeypatch):
+        import app.main as orch
+        from tests.test_orchestrator import _make_config, _setup_dirs, _patch_dirs, _drop_inputs
+
+        _setup_dirs(tmp_path)
+        _patch_dirs(orch, monkeypatch, tmp_path)
+        _drop_inputs(tmp_path, 1)
+        config = _make_config(tmp_path)
+        index, in_flight = {"jobs": {}}, {}
+        index_path = str(tmp_path / "index" / "jobs.json")
+        profile = {"ocr": {}, "prep": {}}
+
+        with patch.object(orch, "submit_prep"), patch.object(orch, "poll_jobs", return_value={}):
+            orch.process_tick(in_flight, index, index_path, profile, config)
+        known = {e["quickKey"] for e in index["jobs"].values()}
+
+        _drop_inputs(tmp_path, 1)
+        pipeline = self._pipeline(orch, config, known_quick_keys=known)
+        try:
+            with patch.object(orch, "submit_prep"), patch.object(orch, "poll_jobs", return_value={}):
+                orch.process_tick(in_flight, index, index_path, profile, config, admission=pipeline)
+                deadline = time.time() + 3
+                while pipeline._ready.qsize() < 1 and time.time() < deadline:
+                    time.sleep(0.01)
+                orch.process_tick(in_flight, index, index_path, profile, config, admission=pipeline)
+        finally:
+            pipeline.close()
+
+        assert config["metrics"]["prefilter_hits"] == 1
+        assert len(list((tmp_path / "reports" / "duplicates").iterdir())) == 1
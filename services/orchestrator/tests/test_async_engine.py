@@ -0,0 +1,209 @@
+"""
+Tests du moteur asyncio (``ENGINE=asyncio``) : cycle de vie d'un job,
+sémaphores par étape, polling non bloquant. HTTP entièrement mocké.
+"""
+import asyncio
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import pytest
+from unittest.mock import patch
+
+import app.main as orch
+from app.async_engine import AsyncEngine
+
+
+@pytest.fixture
+def env(tmp_path, monkeypatch):
+    for name in ("in", "out", "work", "error", "archive", "hold/duplicates", "reports/duplicates", "index"):
+        (tmp_path / name).mkdir(parents=True, exist_ok=True)
+    monkeypatch.setattr(orch, "IN_DIR", str(tmp_path / "in"))
+    monkeypatch.setattr(orch, "WORK_DIR", str(tmp_path / "work"))
+    monkeypatch.setattr(orch, "OUT_DIR", str(tmp_path / "out"))
+    monkeypatch.setattr(orch, "ERROR_DIR", str(tmp_path / "error"))
+    monkeypatch.setattr(orch, "ARCHIVE_DIR", str(tmp_path / "archive"))
+    monkeypatch.setattr(orch, "HOLD_DUP_DIR", str(tmp_path / "hold" / "duplicates"))
+    monkeypatch.setattr(orch, "DUP_REPORTS_DIR", str(tmp_path / "reports" / "duplicates"))
+    monkeypatch.setattr(orch, "INDEX_DIR", str(tmp_path / "index"))
+    monkeypatch.setattr(orch, "POLL_INTERVAL_MS", 10)
+    return tmp_path
+
+
+def _config(tmp_path) -> dict:
+    return {
+        "prep_url": "http://mock-prep:8080",
+        "ocr_url": "http://mock-ocr:8080",
+        "work_dir": str(tmp_path / "work"),
+        "max_jobs_in_flight": 3,
+        "prep_concurrency": 1,
+        "ocr_concurrency": 1,
+        "max_attempts_prep": 3,
+        "max_attempts_ocr": 3,
+        "job_timeout_s": 600,
+        "index_dir": str(tmp_path / "index"),
+        "metrics": orch.make_empty_metrics(),
+        "keep_work_dir_days": 7,
+        "min_pdf_size_bytes": 0,
+        "callback_base_url": "",
+    }
+
+
+def _add_job(tmp_path, in_flight, index, job_key):
+    jdir = tmp_path / "work" / job_key
+    jdir.mkdir(parents=True, exist_ok=True)
+    (jdir / "in.cbz").write_bytes(b"PK\x03\x04")
+    index["jobs"][job_key] = {"jobKey": job_key, "state": "DISCOVERED", "inputName": f"{job_key}.cbz"}
+    in_flight[job_key] = {
+        "stage": "DISCOVERED", "inputName": f"{job_key}.cbz", "inputPath": str(jdir / "in.cbz"),
+        "attemptPrep": 0, "attemptOcr": 0,
+    }
+
+
+async def _drive(engine, until, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        await engine.step()
+        if until():
+            return True
+        await asyncio.sleep(0.01)
+    return False
+
+
+class TestCycleDeVie:
+
+    def test_job_complet_prep_ocr_finalisation(self, env):
+        in_flight, index = {}, {"jobs": {}}
+        _add_job(env, in_flight, index, "k1")
+        config = _config(env)
+        engine = AsyncEngine(in_flight, index, str(env / "index" / "jobs.json"), {}, config)
+
+        def fake_submit_ocr(job_key, raw_pdf, callback_url=None):
+            (env / "work" / job_key / "final.pdf").write_bytes(b"%PDF-1.4 ok")
+
+        def fake_poll(url, keys, service=""):
+            return {k: {"state": "DONE"} for k in keys}
+
+        with patch.object(orch, "submit_prep"), \
+                patch.object(orch, "submit_ocr", side_effect=fake_submit_ocr), \
+                patch.object(orch, "poll_jobs", side_effect=fake_poll), \
+                patch.object(orch, "validate_pdf", return_value=True):
+            assert asyncio.run(_drive(engine, lambda: not in_flight))
+
+        assert index["jobs"]["k1"]["state"] == "DONE"
+        assert os.path.exists(index["jobs"]["k1"]["outPdf"])
+        assert config["metrics"]["done"] == 1
+
+
+class TestSemaphores:
+
+    def test_concurrence_prep_bornee(self, env):
+        in_flight, index = {}, {"jobs": {}}
+        for k in ("k1", "k2", "k3"):
+            _add_job(env, in_flight, index, k)
+        config = _config(env)
+        config["prep_concurrency"] = 2
+        engine = AsyncEngine(in_flight, index, str(env / "index" / "jobs.json"), {}, config)
+
+        async def scenario():
+            await _drive(engine, lambda: submit.call_count >= 2, timeout=1.0)
+            for _ in range(5):
+                await engine.step()
+            return engine.prep_slots.in_use
+
+        with patch.object(orch, "submit_prep") as submit, \
+                patch.object(orch, "poll_jobs", return_value={}):
+            in_use = asyncio.run(scenario())
+
+        running = [k for k, m in in_flight.items() if m["stage"] == "PREP_RUNNING"]
+        assert submit.call_count == 2
+        assert len(running) == 2
+        assert in_use == 2
+
+    def test_concurrence_zero_suspend_l_etape(self, env):
+        in_flight, index = {}, {"jobs": {}}
+        _add_job(env, in_flight, index, "k1")
+        config = _config(env)
+        config["prep_concurrency"] = 0
+        engine = AsyncEngine(in_flight, index, str(env / "index" / "jobs.json"), {}, config)
+
+        async def scenario():
+            for _ in range(5):
+                await engine.step()
+                await asyncio.sleep(0.01)
+            paused = submit.call_count
+            config["prep_concurrency"] = 1  # reprise via POST /config
+            await _drive(engine, lambda: submit.call_count == 1, timeout=1.0)
+            return paused
+
+        with patch.object(orch, "submit_prep") as submit, \
+                patch.object(orch, "poll_jobs", return_value={}):
+            assert asyncio.run(scenario()) == 0
+
+        assert submit.call_count == 1
+        assert in_flight["k1"]["stage"] == "PREP_RUNNING"
+
+    def test_polling_lent_ne_bloque_pas_le_cycle(self, env):
+        in_flight, index = {}, {"jobs": {}}
+        _add_job(env, in_flight, index, "k1")
+        config = _config(env)
+        engine = AsyncEngine(in_flight, index, str(env / "index" / "jobs.json"), {}, config)
+        release = threading.Event()
+
+        def slow_poll(url, keys, service=""):
+            release.wait(5)
+            return {}
+
+        async def scenario():
+            await _drive(engine, lambda: in_flight["k1"]["stage"] == "PREP_RUNNING")
+            await engine.step()  # lance le polling lent
+            t0 = time.monotonic()
+            for _ in range(5):
+                await engine.step()
+            elapsed = time.monotonic() - t0
+            release.set()
+            return elapsed
+
+        with patch.object(orch, "submit_prep"), patch.object(orch, "poll_jobs", side_effect=slow_poll):
+            assert asyncio.run(scenario()) < 1.0
+
+
+class _ThreadRecordingMeta(dict):
+    """Entrée ``in_flight`` qui note le thread de chaque écriture de ``lastPollAt``."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.writers = set()
+
+    def __setitem__(self, key, value):
+        if key == "lastPollAt":
+            self.writers.add(threading.get_ident())
+        super().__setitem__(key, value)
+
+
+class TestPolling:
+
+    def test_in_flight_modifie_sur_la_boucle_http_en_thread(self, env):
+        in_flight, index = {}, {"jobs": {}}
+        _add_job(env, in_flight, index, "k1")
+        in_flight["k1"] = meta = _ThreadRecordingMeta(in_flight["k1"])
+        config = _config(env)
+        engine = AsyncEngine(in_flight, index, str(env / "index" / "jobs.json"), {}, config)
+        http_threads = []
+
+        def fake_poll(url, keys, service=""):
+            http_threads.append(threading.get_ident())
+            return {}
+
+        async def scenario():
+            await _drive(engine, lambda: http_threads, timeout=2.0)
+            return threading.get_ident()
+
+        with patch.object(orch, "submit_prep"), patch.object(orch, "poll_jobs", side_effect=fake_poll):
+            loop_thread = asyncio.run(scenario())
+
+        assert meta.writers == {loop_thread}
+        assert http_threads and loop_thread not in http_threads
@@ -78,6 +78,27 @@ class TestCanonicalProfile:
 
         assert stable_json(profile_v1) != stable_json(profile_v2)
 
+    def test_profil_change_si_reglages_prep_changent(self):
+        """Les réglages de normalisation publiés par le prep-service entrent dans le hash."""
+        prep_info, ocr_info = self._make_infos()
+        base = canonical_profile(prep_info, ocr_info)
+        norm_a = dict(prep_info, settings={"normalize": {"jpegQuality": 92, "grayscale": False}})
+        norm_b = dict(prep_info, settings={"normalize": {"jpegQuality": 92, "grayscale": True}})
+
+        profile_a = canonical_profile(norm_a, ocr_info)
+        profile_b = canonical_profile(norm_b, ocr_info)
+
+        assert profile_a["prep"]["settings"]["normalize"]["jpegQuality"] == 92
+        assert len({stable_json(base), stable_json(profile_a), stable_json(profile_b)}) == 3
+
+    def test_reglages_vides_profil_inchange(self):
+        """Normalisation désactivée (settings vide) : profil identique à l'ancien."""
+        prep_info, ocr_info = self._make_infos()
+
+        profile = canonical_profile(dict(prep_info, settings={}), ocr_info)
+
+        assert stable_json(profile) == stable_json(canonical_profile(prep_info, ocr_info))
+
 
 # ---------------------------------------------------------------------------
 # make_job_key
@@ -0,0 +1,74 @@
+"""
+Tests de la session HTTP partagée : keep-alive, timeouts par service, stats.
+"""
+import json
+import os
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import pytest
+import requests
+from unittest.mock import patch
+
+from app.http_client import ServiceSession
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        body = json.dumps({"state": "RUNNING"}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    srv = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    t = threading.Thread(target=srv.serve_forever, daemon=True)
+    t.start()
+    yield f"http://127.0.0.1:{srv.server_address[1]}"
+    srv.shutdown()
+    srv.server_close()
+
+
+class TestServiceSession:
+
+    def test_connexion_reutilisee_entre_requetes(self, server):
+        http = ServiceSession(pool_size=2)
+        try:
+            for _ in range(5):
+                assert http.get("prep", server + "/jobs/x").json() == {"state": "RUNNING"}
+            stats = http.stats()
+        finally:
+            http.close()
+        assert stats["http_requests_total"] == 5
+        assert stats["http_connections_opened"] == 1
+        assert stats["http_connection_reuse_pct"] == 80.0
+        assert stats["http_latency_ms_p95"] >= stats["http_latency_ms_avg"] > 0
+
+    def test_timeout_par_service(self):
+        http = ServiceSession(timeouts={"ocr": 42.0}, default_timeout=7.0)
+        with patch.object(http._session, "request") as req:
+            http.post("ocr", "http://ocr/jobs/ocr", json={})
+            http.get("prep", "http://prep/info")
+            http.get("ocr", "http://ocr/info", timeout=5)
+        assert [c.kwargs["timeout"] for c in req.call_args_list] == [42.0, 7.0, 5]
+
+    def test_erreur_reseau_comptee(self):
+        http = ServiceSession()
+        with patch.object(http._session, "request", side_effect=requests.ConnectionError("down")):
+            with pytest.raises(requests.ConnectionError):
+                http.get("prep", "http://prep/info")
+        stats = http.stats()
+        assert stats["http_requests_total"] == 1
+        assert stats["http_errors_total"] == 1
@@ -234,3 +234,83 @@ class TestRouteInconnue:
         except urllib.error.HTTPError as e:
             assert e.code == 404
 
+
+
+class TestGetJobsSqlite:
+
+    def test_jobs_lus_depuis_index_sqlite(self, tmp_path):
+        """Avec un index .db, GET /jobs interroge directement SQLite."""
+        from app.index_store import get_store
+
+        db_path = str(tmp_path / "jobs.db")
+        get_store(db_path).upsert_many([{
+            "jobKey": "k__db",
+            "state": "PREP_RUNNING",
+            "inputName": "vol1.cbz",
+            "outPdf": None,
+            "updatedAt": "2026-01-01T00:00:00Z",
+        }])
+        state = OrchestratorState(
+            in_flight={"k__db": {"stage": "PREP_RUNNING", "attemptPrep": 2, "attemptOcr": 0}},
+            metrics=make_empty_metrics(),
+            config={},
+            work_dir=str(tmp_path / "work"),
+            index_path=db_path,
+        )
+        jobs = state.snapshot_jobs_list()
+        assert len(jobs) == 1
+        assert jobs[0]["inputName"] == "vol1.cbz"
+        assert jobs[0]["attempt"] == 2
+
+
+# ---------------------------------------------------------------------------
+# Tests POST /callbacks/{stage}
+# ---------------------------------------------------------------------------
+
+class TestPostCallbacks:
+
+    def test_callback_enregistre_et_reveille(self, tmp_path):
+        wake = threading.Event()
+        state = OrchestratorState(
+            in_flight={"k1": {"stage": "PREP_RUNNING"}}, metrics=make_empty_metrics(), config={},
+            work_dir=str(tmp_path / "work"), index_path=str(tmp_path / "jobs.json"), wake=wake,
+        )
+        server = start_http_server(state, port=0, bind="127.0.0.1")
+        try:
+            status, data = _post(server, "/callbacks/prep", {
+                "jobId": "k1", "state": "DONE", "artifacts": {"rawPdf": "/etc/passwd"},
+            })
+        finally:
+            server.shutdown()
+        assert status == 202
+        assert wake.is_set()
+        # Seul le jobId est retenu : le statut viendra du polling
+        assert list(state.pop_callbacks()) == [("prep", "k1")]
+        assert state.pop_callbacks() == {}
+
+    def test_job_non_en_cours_refuse(self, tmp_path):
+        wake = threading.Event()
+        state = OrchestratorState(
+            in_flight={"k1": {"stage": "OCR_RUNNING"}, "k2": {"stage": "PREP_RETRY"}},
+            metrics=make_empty_metrics(), config={},
+            work_dir=str(tmp_path / "work"), index_path=str(tmp_path / "jobs.json"), wake=wake,
+        )
+        server = start_http_server(state, port=0, bind="127.0.0.1")
+        try:
+            statuses = [
+                _post(server, "/callbacks/prep", {"jobId": job_id, "state": "DONE"})[0]
+                for job_id in ("k1", "k2", "inconnu")
+            ]
+        finally:
+            server.shutdown()
+        assert statuses == [409, 409, 409]
+        assert not wake.is_set()
+        assert state.pop_callbacks() == {}
+
+    def test_etape_inconnue_404(self, http_server):
+        status, _ = _post(http_server, "/callbacks/zip", {"jobId": "k1"})
+        assert status == 404
+
+    def test_job_id_manquant_400(self, http_server):
+        status, _ = _post(http_server, "/callbacks/ocr", {"state": "DONE"})
+        assert status == 400
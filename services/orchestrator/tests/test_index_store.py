@@ -0,0 +1,206 @@
+"""
+Tests de l'index des jobs SQLite :
+suivi des clés modifiées, upserts, migration jobs.json, load_index/save_index.
+"""
+import json
+import os
+import sqlite3
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import pytest
+
+from app.index_store import IndexStore, JobsTable, migrate_json_index
+
+
+def _entry(job_key: str, state: str = "DISCOVERED", name: str = "comic.cbz") -> dict:
+    return {
+        "jobKey": job_key,
+        "state": state,
+        "inputName": name,
+        "outPdf": None,
+        "updatedAt": "2026-01-01T00:00:00Z",
+    }
+
+
+# ---------------------------------------------------------------------------
+# JobsTable
+# ---------------------------------------------------------------------------
+
+class TestJobsTable:
+
+    def test_setitem_marque_sale(self):
+        t = JobsTable()
+        t["a"] = _entry("a")
+        assert t.pop_dirty() == ["a"]
+        assert t.pop_dirty() == []
+
+    def test_mutation_apres_lecture_marque_sale(self):
+        t = JobsTable({"a": _entry("a"), "b": _entry("b"), "c": _entry("c")})
+        t.pop_dirty()
+        t.get("a")["state"] = "DONE"
+        t["b"]["state"] = "DONE"
+        assert t.get("absent") is None
+        assert sorted(t.pop_dirty()) == ["a", "b"]
+
+    def test_lecture_seule_ne_marque_rien(self):
+        t = JobsTable({"a": _entry("a"), "b": _entry("b")})
+        t.pop_dirty()
+        for k in list(t):
+            assert t[k]["state"] == "DISCOVERED" and t.get(k) is not None
+        assert t.pop_dirty() == []
+
+    def test_mutation_annulee_non_ecrite(self):
+        t = JobsTable({"a": _entry("a")})
+        t.pop_dirty()
+        t["a"]["state"] = "DONE"
+        t["a"]["state"] = "DISCOVERED"
+        assert t.pop_dirty() == []
+        t["a"]["state"] = "DONE"  # photographie reprise après la sauvegarde
+        assert t.pop_dirty() == ["a"]
+
+    def test_suppressions_suivies(self):
+        t = JobsTable({"a": _entry("a"), "b": _entry("b"), "c": _entry("c")})
+        t.pop_dirty()
+        del t["a"]
+        t.pop("b")
+        t.pop("absent", None)
+        t["c"]["state"] = "DONE"
+        t["a"] = _entry("a")
+        assert t.pop_deleted() == ["b"]
+        assert sorted(t.pop_dirty()) == ["a", "c"]
+        t.clear()
+        assert sorted(t.pop_deleted()) == ["a", "c"]
+        assert t.pop_dirty() == []
+
+
+# ---------------------------------------------------------------------------
+# IndexStore
+# ---------------------------------------------------------------------------
+
+class TestIndexStore:
+
+    def test_mode_wal_active(self, tmp_path):
+        IndexStore(str(tmp_path / "jobs.db"))
+        conn = sqlite3.connect(str(tmp_path / "jobs.db"))
+        assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+
+    def test_upsert_puis_relecture(self, tmp_path):
+        store = IndexStore(str(tmp_path / "jobs.db"))
+        store.upsert_many([_entry("a"), _entry("b")])
+        store.upsert_many([dict(_entry("a"), state="DONE", outPdf="/out/a.pdf")])
+        assert store.count() == 2
+        assert store.get("a")["state"] == "DONE"
+        assert store.load_all()["a"]["outPdf"] == "/out/a.pdf"
+
+    def test_list_jobs_filtre_par_etat(self, tmp_path):
+        store = IndexStore(str(tmp_path / "jobs.db"))
+        store.upsert_many([_entry("a", "DONE"), _entry("b", "PREP_RUNNING")])
+        rows = store.list_jobs(state="DONE")
+        assert [r["jobKey"] for r in rows] == ["a"]
+
+    def test_index_secondaires_crees(self, tmp_path):
+        IndexStore(str(tmp_path / "jobs.db"))
+        conn = sqlite3.connect(str(tmp_path / "jobs.db"))
+        names = {r[0] for r in conn.execute("SELECT name FROM sqlite_master WHERE type='index'")}
+        assert {"idx_jobs_state", "idx_jobs_input_name", "idx_jobs_updated_at"} <= names
+
+
+# ---------------------------------------------------------------------------
+# Migration
+# ---------------------------------------------------------------------------
+
+class TestMigration:
+
+    def test_migration_importe_et_renomme(self, tmp_path):
+        json_path = tmp_path / "jobs.json"
+        json_path.write_text(json.dumps({"jobs": {"a": _entry("a", "DONE"), "b": {"state": "ERROR_OCR"}}}))
+        store = IndexStore(str(tmp_path / "jobs.db"))
+
+        assert migrate_json_index(str(json_path), store) == 2
+        assert not json_path.exists()
+        assert (tmp_path / "jobs.json.migrated").exists()
+        assert store.get("b")["jobKey"] == "b"
+
+    def test_migration_sans_fichier(self, tmp_path):
+        store = IndexStore(str(tmp_path / "jobs.db"))
+        assert migrate_json_index(str(tmp_path / "absent.json"), store) == 0
+
+
+# ---------------------------------------------------------------------------
+# load_index / save_index
+# ---------------------------------------------------------------------------
+
+class TestLoadSaveIndex:
+
+    def test_save_puis_load_sqlite(self, tmp_path, monkeypatch):
+        import app.main as orch
+        monkeypatch.setattr(orch, "INDEX_DIR", str(tmp_path / "index"))
+        monkeypatch.setattr(orch, "INDEX_BACKEND", "sqlite")
+
+        index, path = orch.load_index()
+        assert path.endswith("jobs.db")
+        index["jobs"]["k1"] = _entry("k1")
+        orch.save_index(index, path)
+        index["jobs"]["k1"]["state"] = "DONE"
+        orch.save_index(index, path)
+
+        reloaded, _ = orch.load_index()
+        assert reloaded["jobs"]["k1"]["state"] == "DONE"
+
+    def test_save_supprime_et_persiste_mutation_apres_get(self, tmp_path, monkeypatch):
+        import app.main as orch
+        monkeypatch.setattr(orch, "INDEX_DIR", str(tmp_path / "index"))
+        monkeypatch.setattr(orch, "INDEX_BACKEND", "sqlite")
+
+        index, path = orch.load_index()
+        index["jobs"]["k1"] = _entry("k1")
+        index["jobs"]["k2"] = _entry("k2")
+        orch.save_index(index, path)
+        index["jobs"].get("k1")["state"] = "DONE"
+        del index["jobs"]["k2"]
+        orch.save_index(index, path)
+
+        reloaded, _ = orch.load_index()
+        assert reloaded["jobs"]["k1"]["state"] == "DONE"
+        assert "k2" not in reloaded["jobs"]
+
+    def test_lectures_sans_upsert(self, tmp_path, monkeypatch, mocker):
+        import app.main as orch
+        from app.index_store import get_store
+        monkeypatch.setattr(orch, "INDEX_DIR", str(tmp_path / "index"))
+        monkeypatch.setattr(orch, "INDEX_BACKEND", "sqlite")
+
+        index, path = orch.load_index()
+        index["jobs"]["k1"] = _entry("k1")
+        orch.save_index(index, path)
+        upsert = mocker.spy(get_store(path), "upsert_many")
+        assert index["jobs"]["k1"]["state"] == "DISCOVERED"
+        orch.save_index(index, path)
+
+        assert list(upsert.call_args.args[0]) == []
+
+    def test_load_migre_jobs_json_existant(self, tmp_path, monkeypatch):
+        import app.main as orch
+        index_dir = tmp_path / "index"
+        index_dir.mkdir()
+        (index_dir / "jobs.json").write_text(json.dumps({"jobs": {"old": _entry("old", "DONE")}}))
+        monkeypatch.setattr(orch, "INDEX_DIR", str(index_dir))
+        monkeypatch.setattr(orch, "INDEX_BACKEND", "sqlite")
+
+        index, _ = orch.load_index()
+        assert index["jobs"].get("old")["state"] == "DONE"
+        assert not (index_dir / "jobs.json").exists()
+
+    def test_backend_json_conserve(self, tmp_path, monkeypatch):
+        import app.main as orch
+        monkeypatch.setattr(orch, "INDEX_DIR", str(tmp_path / "index"))
+        monkeypatch.setattr(orch, "INDEX_BACKEND", "json")
+
+        index, path = orch.load_index()
+        assert path.endswith("jobs.json")
+        index["jobs"]["k1"] = _entry("k1")
+        orch.save_index(index, path)
+        with open(path, "r", encoding="utf-8") as f:
+            assert "k1" in json.load(f)["jobs"]
@@ -259,3 +259,224 @@ class TestCheckStaleJobs:
 
         assert in_flight[job_key]["stage"] == "DISCOVERED"
 
+
+
+# ---------------------------------------------------------------------------
+# Admission par lot
+# ---------------------------------------------------------------------------
+
+def _patch_dirs(orch, monkeypatch, tmp_path):
+    """Redirige tous les répertoires globaux de l'orchestrateur vers tmp_path."""
+    monkeypatch.setattr(orch, "IN_DIR", str(tmp_path / "in"))
+    monkeypatch.setattr(orch, "WORK_DIR", str(tmp_path / "work"))
+    monkeypatch.setattr(orch, "OUT_DIR", str(tmp_path / "out"))
+    monkeypatch.setattr(orch, "ERROR_DIR", str(tmp_path / "error"))
+    monkeypatch.setattr(orch, "ARCHIVE_DIR", str(tmp_path / "archive"))
+    monkeypatch.setattr(orch, "HOLD_DUP_DIR", str(tmp_path / "hold" / "duplicates"))
+    monkeypatch.setattr(orch, "DUP_REPORTS_DIR", str(tmp_path / "reports" / "duplicates"))
+    monkeypatch.setattr(orch, "INDEX_DIR", str(tmp_path / "index"))
+
+
+def _drop_inputs(tmp_path, count: int):
+    """Dépose ``count`` CBZ distincts (signature ZIP valide) dans in/."""
+    for i in range(count):
+        (tmp_path / "in" / f"chap{i:03d}.cbz").write_bytes(b"\x50\x4B\x03\x04" + bytes([i]) * 64)
+
+
+class TestAdmissionParLot:
+    """Vérifications de l'admission de plusieurs fichiers par tick."""
+
+    def _tick(self, orch, tmp_path, config):
+        with patch.object(orch, "submit_prep"), patch.object(orch, "poll_jobs", return_value={}):
+            index = {"jobs": {}}
+            in_flight = {}
+            orch.process_tick(in_flight, index, str(tmp_path / "index" / "jobs.json"),
+                              {"ocr": {}, "prep": {}}, config)
+        return in_flight, index
+
+    def test_remplit_toute_la_capacite_en_un_tick(self, tmp_path, monkeypatch):
+        import app.main as orch
+        _setup_dirs(tmp_path)
+        _patch_dirs(orch, monkeypatch, tmp_path)
+        _drop_inputs(tmp_path, 5)
+
+        config = _make_config(tmp_path)
+        config["max_jobs_in_flight"] = 4
+        in_flight, index = self._tick(orch, tmp_path, config)
+
+        assert len(in_flight) == 4
+        assert len(index["jobs"]) == 4
+        assert config["metrics"]["queued"] == 4
+        assert len(list((tmp_path / "in").iterdir())) == 1
+
+    def test_plafond_par_tick_respecte(self, tmp_path, monkeypatch):
+        import app.main as orch
+        _setup_dirs(tmp_path)
+        _patch_dirs(orch, monkeypatch, tmp_path)
+        _drop_inputs(tmp_path, 5)
+
+        config = _make_config(tmp_path)
+        config["max_jobs_in_flight"] = 10
+        config["max_admissions_per_tick"] = 2
+        in_flight, _ = self._tick(orch, tmp_path, config)
+
+        assert len(in_flight) == 2
+
+    def test_rejets_comptabilises_sans_consommer_de_job(self, tmp_path, monkeypatch):
+        import app.main as orch
+        _setup_dirs(tmp_path)
+        _patch_dirs(orch, monkeypatch, tmp_path)
+        _drop_inputs(tmp_path, 1)
+        (tmp_path / "in" / "faux.cbz").write_bytes(b"pas une archive")
+
+        config = _make_config(tmp_path)
+        in_flight, _ = self._tick(orch, tmp_path, config)
+
+        assert len(in_flight) == 1
+        assert config["metrics"]["input_rejected_signature"] == 1
+        assert len(list((tmp_path / "error").iterdir())) == 1
+
+
+# ---------------------------------------------------------------------------
+# Callbacks de fin de job
+# ---------------------------------------------------------------------------
+
+class TestJobStatusCallbacks:
+    """Choix entre notification reçue et polling de secours."""
+
+    def test_callback_recu_declenche_le_polling(self, tmp_path):
+        import app.main as orch
+        config = _make_config(tmp_path)
+        config["callback_base_url"] = "http://orchestrator:8080"
+        running = {"k1": {"stage": "PREP_RUNNING", "lastPollAt": time.monotonic()},
+                   "k2": {"stage": "PREP_RUNNING", "lastPollAt": time.monotonic()}}
+        with patch.object(orch, "poll_jobs", return_value={"k1": {"state": "RUNNING"}}) as poll:
+            st = orch.job_statuses("http://prep", "prep", running, config,
+                                   {("prep", "k1"): time.monotonic()})
+        # Le statut vient du service, pas de la notification
+        assert st == {"k1": {"state": "RUNNING"}}
+        poll.assert_called_once_with("http://prep", ["k1"], "prep")
+
+    def test_sans_callback_polling_differe(self, tmp_path):
+        import app.main as orch
+        config = _make_config(tmp_path)
+        config["callback_base_url"] = "http://orchestrator:8080"
+        config["callback_fallback_s"] = 30
+        running = {"k1": {"stage": "PREP_RUNNING", "lastPollAt": time.monotonic()}}
+        with patch.object(orch, "poll_jobs") as poll:
+            assert orch.job_statuses("http://prep", "prep", running, config, {}) == {}
+        poll.assert_not_called()
+
+    def test_callback_en_retard_declenche_le_polling(self, tmp_path):
+        import app.main as orch
+        config = _make_config(tmp_path)
+        config["callback_base_url"] = "http://orchestrator:8080"
+        config["callback_fallback_s"] = 30
+        running = {"k1": {"stage": "PREP_RUNNING", "lastPollAt": time.monotonic() - 60}}
+        with patch.object(orch, "poll_jobs", return_value={"k1": {"state": "RUNNING"}}) as poll:
+            st = orch.job_statuses("http://prep", "prep", running, config, {})
+        assert st == {"k1": {"state": "RUNNING"}}
+        poll.assert_called_once_with("http://prep", ["k1"], "prep")
+
+    def test_callbacks_desactives_polling_a_chaque_tick(self, tmp_path):
+        import app.main as orch
+        config = _make_config(tmp_path)
+        config["callback_base_url"] = ""
+        running = {"k1": {"stage": "OCR_RUNNING", "lastPollAt": time.monotonic()}}
+        with patch.object(orch, "poll_jobs", return_value={"k1": {"state": "RUNNING"}}) as poll:
+            orch.job_statuses("http://ocr", "ocr", running, config, {})
+        poll.assert_called_once()
+
+    def test_callback_d_une_tentative_precedente_ignore(self, tmp_path, monkeypatch):
+        import app.main as orch
+        _setup_dirs(tmp_path)
+        _patch_dirs(orch, monkeypatch, tmp_path)
+        config = _make_config(tmp_path)
+        config["callback_base_url"] = "http://orchestrator:8080"
+        config["callback_fallback_s"] = 30
+        (tmp_path / "work" / "k1").mkdir()
+        in_flight = {"k1": {"stage": "PREP_RETRY", "attemptPrep": 1,
+                            "inputPath": str(tmp_path / "in" / "k1.cbz")}}
+        index = {"jobs": {"k1": {"jobKey": "k1", "state": "PREP_RETRY"}}}
+        with patch.object(orch, "submit_prep") as submit, \
+                patch.object(orch, "apply_prep_status") as apply, \
+                patch.object(orch, "poll_jobs", return_value={}) as poll:
+            orch.process_tick(in_flight, index, str(tmp_path / "index" / "jobs.json"),
+                              {"ocr": {}, "prep": {}}, config,
+                              callbacks={("prep", "k1"): time.monotonic()})
+        submit.assert_called_once()
+        poll.assert_not_called()
+        apply.assert_not_called()
+        assert in_flight["k1"]["stage"] == "PREP_RUNNING"
+        assert in_flight["k1"]["attemptPrep"] == 2
+
+    def test_chemins_d_artefacts_du_statut_ignores(self, tmp_path, monkeypatch):
+        import app.main as orch
+        _setup_dirs(tmp_path)
+        _patch_dirs(orch, monkeypatch, tmp_path)
+        config = _make_config(tmp_path)
+        jdir = tmp_path / "work" / "k1"
+        jdir.mkdir()
+        (jdir / "in.cbz").write_bytes(b"PK\x03\x04")
+        (jdir / "final.pdf").write_bytes(b"%PDF-1.4 ok")
+        victim = tmp_path / "secret.txt"
+        victim.write_text("ne pas déplacer")
+        in_flight = {"k1": {"stage": "OCR_RUNNING", "inputName": "k1.cbz",
+                            "inputPath": str(jdir / "in.cbz")}}
+        index = {"jobs": {"k1": {"jobKey": "k1", "state": "OCR_RUNNING"}}}
+
+        with patch.object(orch, "validate_pdf", return_value=True):
+            orch.apply_ocr_status("k1", in_flight["k1"],
+                                  {"state": "DONE", "artifacts": {"finalPdf": str(victim)}},
+                                  in_flight, index, str(tmp_path / "index" / "jobs.json"),
+                                  config, config["metrics"])
+
+        assert victim.exists()
+        assert index["jobs"]["k1"]["state"] == "DONE"
+        with open(index["jobs"]["k1"]["outPdf"], "rb") as f:
+            assert f.read() == b"%PDF-1.4 ok"
+
+    def test_url_callback_par_etape(self, tmp_path):
+        import app.main as orch
+        config = {"callback_base_url": "http://orchestrator:8080/"}
+        assert orch.callback_url_for(config, "ocr") == "http://orchestrator:8080/callbacks/ocr"
+        assert orch.callback_url_for({"callback_base_url": ""}, "ocr") is None
+
+
+class TestPollingGroupe:
+    """Un seul appel de statut par service et par tick."""
+
+    def _response(self, status_code, body=None):
+        r = MagicMock(status_code=status_code, text="")
+        r.json.return_value = body or {}
+        return r
+
+    def test_un_seul_appel_pour_tous_les_jobs(self, tmp_path):
+        import app.main as orch
+        config = _make_config(tmp_path)
+        config["callback_base_url"] = ""
+        running = {k: {"stage": "PREP_RUNNING"} for k in ("k1", "k2", "k3")}
+        body = {"jobs": {"k1": {"state": "DONE"}, "k2": {"state": "RUNNING"}}, "missing": ["k3"]}
+        with patch.object(orch.HTTP, "post", return_value=self._response(200, body)) as post, \
+                patch.object(orch.HTTP, "get") as get:
+            st = orch.job_statuses("http://prep", "prep", running, config, {})
+        assert st == body["jobs"]
+        post.assert_called_once()
+        assert post.call_args.kwargs["json"] == {"ids": ["k1", "k2", "k3"]}
+        get.assert_not_called()
+
+    def test_repli_job_par_job_si_endpoint_absent(self):
+        import app.main as orch
+        with patch.object(orch.HTTP, "post", return_value=self._response(405)), \
+                patch.object(orch, "poll_job", side_effect=[{"state": "DONE"}, RuntimeError("404")]):
+            st = orch.poll_jobs("http://prep", ["k1", "k2"])
+        assert st == {"k1": {"state": "DONE"}}
+
+    def test_service_indisponible_aucun_statut(self, tmp_path):
+        import app.main as orch
+        config = _make_config(tmp_path)
+        config["callback_base_url"] = ""
+        running = {"k1": {"stage": "OCR_RUNNING"}}
+        with patch.object(orch.HTTP, "post", side_effect=ConnectionError("down")):
+            assert orch.job_statuses("http://ocr", "ocr", running, config, {}) == {}
+        assert "lastPollAt" in running["k1"]
@@ -0,0 +1,111 @@
+"""
+Tests de la découverte des entrées : polling, inotify (Linux), fabrique.
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import pytest
+
+from app.watcher import PollingWatcher, InotifyWatcher, make_watcher, is_input_file
+
+linux_only = pytest.mark.skipif(not sys.platform.startswith("linux"), reason="inotify Linux uniquement")
+
+
+def _wait_for(predicate, timeout=3.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.02)
+    return False
+
+
+class TestIsInputFile:
+
+    def test_extensions_acceptees(self):
+        assert is_input_file("a.cbz")
+        assert is_input_file("B.CBR")
+        assert not is_input_file("a.cbz.part")
+        assert not is_input_file("notes.txt")
+
+
+class TestPollingWatcher:
+
+    def test_liste_uniquement_cbz_cbr(self, tmp_path):
+        (tmp_path / "a.cbz").write_bytes(b"x")
+        (tmp_path / "b.cbr").write_bytes(b"x")
+        (tmp_path / "c.part").write_bytes(b"x")
+        names = sorted(os.path.basename(p) for p in PollingWatcher(str(tmp_path)).pending())
+        assert names == ["a.cbz", "b.cbr"]
+
+
+@linux_only
+class TestInotifyWatcher:
+
+    def test_fichier_existant_au_demarrage(self, tmp_path):
+        (tmp_path / "deja.cbz").write_bytes(b"x")
+        w = InotifyWatcher(str(tmp_path))
+        try:
+            assert [os.path.basename(p) for p in w.pending()] == ["deja.cbz"]
+        finally:
+            w.close()
+
+    def test_close_write_et_moved_to_detectes(self, tmp_path):
+        in_dir = tmp_path / "in"
+        in_dir.mkdir()
+        w = InotifyWatcher(str(in_dir))
+        try:
+            (in_dir / "ecrit.cbz").write_bytes(b"x")
+            src = tmp_path / "ailleurs.cbr"
+            src.write_bytes(b"x")
+            os.replace(str(src), str(in_dir / "deplace.cbr"))
+            (in_dir / "ignore.txt").write_bytes(b"x")
+
+            assert _wait_for(lambda: len(w.pending()) == 2)
+            names = sorted(os.path.basename(p) for p in w.pending())
+            assert names == ["deplace.cbr", "ecrit.cbz"]
+        finally:
+            w.close()
+
+    def test_fichier_retire_disparait_des_pending(self, tmp_path):
+        w = InotifyWatcher(str(tmp_path))
+        try:
+            (tmp_path / "a.cbz").write_bytes(b"x")
+            assert _wait_for(lambda: len(w.pending()) == 1)
+            os.remove(str(tmp_path / "a.cbz"))
+            assert w.pending() == []
+        finally:
+            w.close()
+
+    def test_wait_reveille_sur_evenement(self, tmp_path):
+        w = InotifyWatcher(str(tmp_path))
+        try:
+            w.pending()
+            (tmp_path / "a.cbz").write_bytes(b"x")
+            assert w.wait(3.0) is True
+        finally:
+            w.close()
+
+
+class TestMakeWatcher:
+
+    def test_mode_poll(self, tmp_path):
+        assert make_watcher(str(tmp_path), "poll").mode == "poll"
+
+    def test_montage_reseau_force_polling(self, tmp_path, monkeypatch):
+        import app.watcher as watcher
+        monkeypatch.setattr(watcher, "filesystem_type", lambda p: "nfs4")
+        assert make_watcher(str(tmp_path), "auto").mode == "poll"
+
+    @linux_only
+    def test_mode_auto_local_inotify(self, tmp_path, monkeypatch):
+        import app.watcher as watcher
+        monkeypatch.setattr(watcher, "filesystem_type", lambda p: "ext4")
+        w = make_watcher(str(tmp_path), "auto")
+        try:
+            assert w.mode == "inotify"
+        finally:
+            w.close()
@@ -2,12 +2,17 @@
 Module core du prep-service.
 Contient les fonctions pures testables sans démarrer de serveur FastAPI.
 """
+import json
 import os
 import subprocess
-from typing import List
+import urllib.request
+import zipfile
+from typing import Iterable, List, Optional
 
 import img2pdf
 
+from app.pdf_stream import StreamingPdfWriter
+
 # Extensions d'images supportées
 IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png", ".webp", ".tif", ".tiff", ".bmp"}
 
@@ -15,6 +20,13 @@ IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png", ".webp", ".tif", ".tiff", ".bmp"}
 _PARASITES = {"thumbs.db", ".ds_store", "desktop.ini"}
 _PARASITE_DIRS = {"__macosx"}
 
+# Erreurs du chemin ZIP en streaming qui justifient un repli sur 7z
+ZIP_FALLBACK_ERRORS = (zipfile.BadZipFile, zipfile.LargeZipFile, NotImplementedError)
+
+
+class NoImagesError(ValueError):
+    """L'archive ne contient aucune image : aucun PDF à générer."""
+
 
 def filter_images(root: str) -> List[str]:
     """
@@ -61,23 +73,141 @@ def list_and_sort_images(root: str) -> List[str]:
     return sort_images(filter_images(root))
 
 
-def images_to_pdf(images: List[str], dest_path: str) -> None:
+def is_image_member(name: str) -> bool:
     """
-    Convertit une liste d'images en un fichier PDF via img2pdf.
-    Écrit d'abord dans un fichier temporaire ``dest_path + '.tmp'``,
-    puis effectue un rename atomique vers ``dest_path``.
+    Indique si un membre d'archive (chemin relatif, séparateur ``/``) est une
+    image à retenir : mêmes règles que ``filter_images`` (extension image,
+    ni fichier parasite, ni dossier ``__MACOSX``).
 
-    :param images: Liste ordonnée de chemins d'images.
+    :param name: Nom du membre dans l'archive.
+    :return: True si le membre doit devenir une page.
+    """
+    parts = [p for p in name.replace("\\", "/").split("/") if p]
+    if not parts or any(d.lower() in _PARASITE_DIRS for d in parts[:-1]):
+        return False
+    fn = parts[-1]
+    if fn.lower() in _PARASITES:
+        return False
+    return os.path.splitext(fn)[1].lower() in IMAGE_EXTENSIONS
+
+
+def list_zip_images(zf: zipfile.ZipFile) -> List[zipfile.ZipInfo]:
+    """
+    Liste les membres images d'une archive ZIP, triés comme ``sort_images``
+    (tri naturel sur le nom de fichier).
+
+    :param zf: Archive ZIP ouverte.
+    :return: Liste ordonnée de ``ZipInfo``.
+    :raises NotImplementedError: Si une image est chiffrée (repli 7z).
+    """
+    from app.utils import natural_key
+    members = [m for m in zf.infolist() if not m.is_dir() and is_image_member(m.filename)]
+    if any(m.flag_bits & 0x1 for m in members):
+        raise NotImplementedError("archive ZIP chiffrée")
+    return sorted(members, key=lambda m: natural_key(os.path.basename(m.filename.rstrip("/"))))
+
+
+def parse_7z_listing(output: str) -> List[dict]:
+    """
+    Analyse la sortie de ``7z l -slt`` : un bloc ``Clé = valeur`` par membre,
+    après la ligne ``----------`` (l'en-tête décrit l'archive elle-même).
+
+    :param output: Sortie standard de ``7z l -slt``.
+    :return: Liste de ``{"path", "size", "folder"}``.
+    """
+    entries: List[dict] = []
+    _, sep, body = output.partition("\n----------\n")
+    if not sep:
+        return entries
+    for block in body.split("\n\n"):
+        fields = {}
+        for line in block.splitlines():
+            key, eq, value = line.partition(" = ")
+            if eq:
+                fields[key.strip()] = value
+        if "Path" not in fields:
+            continue
+        size = fields.get("Size", "")
+        entries.append({
+            "path": fields["Path"],
+            "size": int(size) if size.isdigit() else 0,
+            "folder": fields.get("Folder") == "+" or "D" in fields.get("Attributes", "").split(" ")[0],
+        })
+    return entries
+
+
+def list_archive_members(archive_path: str) -> List[dict]:
+    """
+    Liste les membres d'une archive (CBR, CBZ, CB7...) sans l'extraire.
+
+    :param archive_path: Chemin de l'archive.
+    :return: Membres au format de ``parse_7z_listing``.
+    :raises RuntimeError: Si ``7z l`` échoue.
+    """
+    p = subprocess.run(["7z", "l", "-slt", archive_path], capture_output=True, text=True)
+    if p.returncode != 0:
+        raise RuntimeError(f"7z list failed rc={p.returncode}")
+    return parse_7z_listing(p.stdout)
+
+
+def image_manifest(entries: List[dict]) -> List[dict]:
+    """
+    Retient les membres à extraire : fichiers images selon ``is_image_member``
+    (sans ``__MACOSX``, ``thumbs.db``, NFO, archives imbriquées...).
+
+    :param entries: Membres listés par ``list_archive_members``.
+    :return: Sous-liste des membres images, dans l'ordre de l'archive.
+    """
+    return [e for e in entries if not e["folder"] and is_image_member(e["path"])]
+
+
+def zip_images_to_pdf(archive_path: str, dest_path: str, streaming: bool = False,
+                      normalizer=None) -> int:
+    """
+    Génère un PDF directement depuis les images d'une archive ZIP (CBZ),
+    sans extraction sur disque. Écriture atomique comme ``images_to_pdf``.
+
+    :param archive_path: Chemin de l'archive ZIP.
     :param dest_path: Chemin de destination du PDF généré.
-    :raises ValueError: Si la liste d'images est vide.
-    :raises RuntimeError: Si img2pdf échoue.
+    :param streaming: True : chaque membre est lu puis écrit avant le suivant
+                      (une page en mémoire) ; False : toutes les pages sont
+                      lues puis passées à ``img2pdf.convert``.
+    :param normalizer: ``app.normalize.Normalizer`` optionnel appliqué aux pages.
+    :return: Nombre de pages écrites.
+    :raises NoImagesError: Si l'archive ne contient aucune image.
+    :raises zipfile.BadZipFile: Si l'archive est illisible (repli 7z côté appelant).
     """
-    if not images:
-        raise ValueError("La liste d'images est vide, impossible de générer un PDF.")
+    with zipfile.ZipFile(archive_path) as zf:
+        members = list_zip_images(zf)
+        if not members:
+            raise NoImagesError("Aucune image dans l'archive, impossible de générer un PDF.")
+        if streaming:
+            _write_pdf((zf.read(m) for m in members), dest_path, True, normalizer)
+        else:
+            _write_pdf([zf.read(m) for m in members], dest_path, False, normalizer)
+    return len(members)
+
+
+def _write_pdf(images: Iterable, dest_path: str, streaming: bool = False, normalizer=None) -> None:
+    """
+    Écrit le PDF dans ``dest_path + '.tmp'`` puis rename atomique.
+    ``streaming`` : ``StreamingPdfWriter`` page par page, sinon ``img2pdf.convert``.
+    ``normalizer`` : pages normalisées au fil de l'eau avant écriture.
+    """
+    if normalizer is not None:
+        images = normalizer.apply(images)
+        if not streaming:
+            images = list(images)
     tmp_path = dest_path + ".tmp"
     try:
         with open(tmp_path, "wb") as f:
-            f.write(img2pdf.convert(images))
+            if streaming:
+                writer = StreamingPdfWriter(f)
+                for image in images:
+                    writer.add_image(image)
+                writer.close()
+            else:
+                f.write(img2pdf.convert(images))
         os.replace(tmp_path, dest_path)
     except Exception:
         try:
@@ -87,6 +217,99 @@ def images_to_pdf(images: List[str], dest_path: str) -> None:
         raise
 
 
+def images_to_pdf(images: List[str], dest_path: str, streaming: bool = False,
+                  normalizer=None) -> None:
+    """
+    Convertit une liste d'images en un fichier PDF via img2pdf.
+    Écrit d'abord dans un fichier temporaire ``dest_path + '.tmp'``,
+    puis effectue un rename atomique vers ``dest_path``.
+
+    :param images: Liste ordonnée de chemins d'images.
+    :param dest_path: Chemin de destination du PDF généré.
+    :param streaming: True : écriture page par page (mémoire bornée à une page,
+                      cf. ``app.pdf_stream``) ; False : ``img2pdf.convert`` en un bloc.
+    :param normalizer: ``app.normalize.Normalizer`` optionnel appliqué aux pages.
+    :raises ValueError: Si la liste d'images est vide.
+    :raises RuntimeError: Si img2pdf échoue.
+    """
+    if not images:
+        raise ValueError("La liste d'images est vide, impossible de générer un PDF.")
+    _write_pdf(images, dest_path, streaming, normalizer)
+
+
+EXTRACT_MANIFEST_VERSION = 1
+
+
+def sha256_from_job_id(job_id: str) -> Optional[str]:
+    """
+    SHA-256 de l'archive porté par l'identifiant de job de l'orchestrateur
+    (``<sha256 du fichier>__<hash du profil>``), sans relire l'archive.
+
+    :return: Empreinte hexadécimale, ou None si l'identifiant n'a pas ce format.
+    """
+    head = job_id.split("__", 1)[0].lower()
+    if len(head) == 64 and all(c in "0123456789abcdef" for c in head):
+        return head
+    return None
+
+
+def build_extract_manifest(archive_path: str, pages_dir: str, images: List[str],
+                           sha256: Optional[str] = None) -> dict:
+    """
+    Manifeste d'une extraction terminée : identité de l'archive et pages obtenues.
+    L'archive n'est pas relue : son SHA-256 est celui calculé par l'orchestrateur
+    (``sha256_from_job_id``), s'il est connu.
+
+    :param archive_path: Archive extraite.
+    :param pages_dir: Dossier d'extraction.
+    :param images: Pages retenues (ordre de ``list_and_sort_images``).
+    :param sha256: SHA-256 connu de l'archive (None = non enregistré).
+    :return: ``{"version", "archive": {path, size, mtimeNs, sha256}, "pages": [{path, size}]}``,
+             chemins de pages relatifs à ``pages_dir``.
+    """
+    st = os.stat(archive_path)
+    return {
+        "version": EXTRACT_MANIFEST_VERSION,
+        "archive": {"path": archive_path, "size": st.st_size, "mtimeNs": st.st_mtime_ns,
+                    "sha256": sha256},
+        "pages": [{"path": os.path.relpath(p, pages_dir), "size": os.path.getsize(p)} for p in images],
+    }
+
+
+def verify_extract_manifest(manifest: dict, archive_path: str, pages_dir: str) -> List[str]:
+    """
+    Vérifie qu'une extraction précédente est réutilisable : même archive
+    (taille, puis mtime ou à défaut SHA-256, calculé seulement dans ce cas et
+    si le manifeste en porte un) et pages présentes à la bonne taille.
+
+    :param manifest: Manifeste lu sur disque (``build_extract_manifest``).
+    :param archive_path: Archive du job courant.
+    :param pages_dir: Dossier d'extraction.
+    :return: Chemins absolus des pages dans l'ordre, ou liste vide si le
+             manifeste ne correspond pas.
+    """
+    try:
+        if manifest.get("version") != EXTRACT_MANIFEST_VERSION or not manifest.get("pages"):
+            return []
+        recorded = manifest["archive"]
+        st = os.stat(archive_path)
+        if st.st_size != recorded["size"]:
+            return []
+        if st.st_mtime_ns != recorded["mtimeNs"]:
+            from app.utils import sha256_file
+            if not recorded.get("sha256") or sha256_file(archive_path) != recorded["sha256"]:
+                return []
+        images = []
+        for page in manifest["pages"]:
+            path = os.path.join(pages_dir, page["path"])
+            if os.path.getsize(path) != page["size"]:
+                return []
+            images.append(path)
+        return images
+    except (OSError, KeyError, TypeError):
+        return []
+
+
 def get_tool_versions() -> dict:
     """
     Récupère les versions des outils externes (7z, img2pdf).
@@ -104,3 +327,25 @@ def get_tool_versions() -> dict:
     out["img2pdf"] = getattr(img2pdf, "__version__", "unknown")
     return out
 
+
+def notify_callback(url: str, payload: dict, timeout: float = 5.0) -> bool:
+    """
+    Notifie la fin d'un job en POSTant son statut JSON sur ``url`` (best-effort).
+    Un échec n'est pas bloquant : l'orchestrateur retombe sur le polling.
+
+    :param url: URL de callback fournie à la soumission (``callbackUrl``).
+    :param payload: Statut du job (contenu du fichier de métadonnées).
+    :param timeout: Délai maximal de la requête en secondes.
+    :return: True si l'orchestrateur a accepté la notification (2xx).
+    """
+    req = urllib.request.Request(
+        url,
+        data=json.dumps(payload, ensure_ascii=False).encode("utf-8"),
+        headers={"Content-Type": "application/json"},
+        method="POST",
+    )
+    try:
+        with urllib.request.urlopen(req, timeout=timeout) as resp:
+            return 200 <= resp.status < 300
+    except Exception:
+        return False
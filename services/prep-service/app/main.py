@@ -2,32 +2,98 @@
 Service FastAPI de préparation (extraction CBZ/CBR + génération raw.pdf).
 Pipeline : 7z extract -> list images -> img2pdf -> raw.pdf atomique.
 """
+import json
 import os
 import subprocess
 import threading
 import time
+import zipfile
+from typing import List, Optional
 
 from fastapi import FastAPI, HTTPException
 from pydantic import BaseModel
 
-from app.core import get_tool_versions, list_and_sort_images, images_to_pdf
+from app.core import (
+    ZIP_FALLBACK_ERRORS,
+    NoImagesError,
+    build_extract_manifest,
+    get_tool_versions,
+    image_manifest,
+    images_to_pdf,
+    list_and_sort_images,
+    list_archive_members,
+    notify_callback,
+    sha256_from_job_id,
+    verify_extract_manifest,
+    zip_images_to_pdf,
+)
+from app.job_queue import make_queue
+from app.normalize import Normalizer
+from app.registry import JobRegistry
+from app.scratch import ScratchSpace, estimate_need
 from app.utils import ensure_dir, atomic_write_json, read_json, now_iso
+from app.worker_pool import WorkerCrashed, make_pool
 
 DATA_DIR = os.environ.get("DATA_DIR", "/data")
 SERVICE_CONCURRENCY = int(os.environ.get("SERVICE_CONCURRENCY", "1"))
+# CBZ (ZIP) : pages lues directement dans l'archive, sans passer par pages/ ; 7z en repli
+ZIP_STREAMING = os.environ.get("PREP_ZIP_STREAMING", "true").lower() in ("true", "1", "yes")
+# Écriture du raw.pdf : "stream" (page par page, mémoire ~ une page) ou "memory" (img2pdf.convert)
+PDF_WRITER = os.environ.get("PREP_PDF_WRITER", "stream").lower()
+# Extraction 7z : lister l'archive puis n'extraire que les pages (sinon archive complète)
+SELECTIVE_EXTRACT = os.environ.get("PREP_SELECTIVE_EXTRACT", "true").lower() in ("true", "1", "yes")
+# Normalisation des pages : réduction au-delà des plafonds, PNG/TIFF/BMP -> JPEG
+NORMALIZE = os.environ.get("PREP_NORMALIZE", "false").lower() in ("true", "1", "yes")
+NORMALIZE_MAX_MPX = float(os.environ.get("PREP_NORMALIZE_MAX_MPX", "24"))
+NORMALIZE_MAX_DPI = float(os.environ.get("PREP_NORMALIZE_MAX_DPI", "300"))
+NORMALIZE_JPEG_QUALITY = int(os.environ.get("PREP_NORMALIZE_JPEG_QUALITY", "92"))
+NORMALIZE_LOSSLESS_TO_JPEG = os.environ.get("PREP_NORMALIZE_LOSSLESS_TO_JPEG", "true").lower() in ("true", "1", "yes")
+NORMALIZE_WORKERS = int(os.environ.get("PREP_NORMALIZE_WORKERS", "0"))
+# Pages RGB sans couleur effective stockées en niveaux de gris 8 bits
+GRAYSCALE = os.environ.get("PREP_GRAYSCALE", "false").lower() in ("true", "1", "yes")
+GRAYSCALE_TOLERANCE = int(os.environ.get("PREP_GRAYSCALE_TOLERANCE", "16"))
+GRAYSCALE_MAX_COLOR_RATIO = float(os.environ.get("PREP_GRAYSCALE_MAX_COLOR_RATIO", "0.005"))
+# Reprise après crash/retry : pages/ réutilisé si le manifeste d'extraction est vérifié
+RESUME = os.environ.get("PREP_RESUME", "true").lower() in ("true", "1", "yes")
+# Scratch local (tmpfs/NVMe) pour pages/ et raw.tmp.pdf ; vide = tout sur WORK_DIR
+SCRATCH_DIR = os.environ.get("PREP_SCRATCH_DIR", "")
+SCRATCH_BUDGET_MB = int(os.environ.get("PREP_SCRATCH_BUDGET_MB", "0"))
+# Exécution de run_job : "thread" (dans le worker) ou "process" (pool de processus recyclés)
+EXECUTOR = os.environ.get("PREP_EXECUTOR", "thread").lower()
+WORKER_MAX_JOBS = int(os.environ.get("PREP_WORKER_MAX_JOBS", "50"))
+
+# File d'attente : "dir" (parcours de queue/) ou "sqlite" (index WAL, disque local)
+QUEUE_BACKEND = os.environ.get("QUEUE_BACKEND", "dir").lower()
+QUEUE_DB_PATH = os.environ.get("QUEUE_DB_PATH", os.path.join(DATA_DIR, "prep", "queue.db"))
+
+# Registre en mémoire : jobs terminés (done/error) gardés, les moins récents oubliés (0 = sans limite)
+REGISTRY_MAX_FINISHED = int(os.environ.get("REGISTRY_MAX_FINISHED", "10000"))
 
 QUEUE_DIR = os.path.join(DATA_DIR, "prep", "queue")
 RUNNING_DIR = os.path.join(DATA_DIR, "prep", "running")
 DONE_DIR = os.path.join(DATA_DIR, "prep", "done")
 ERROR_DIR = os.path.join(DATA_DIR, "prep", "error")
 
+SCRATCH = ScratchSpace(SCRATCH_DIR, SCRATCH_BUDGET_MB * 1024 * 1024)
+
 app = FastAPI(title="prep-service")
 
 
 @app.get("/info")
 def info():
-    """Retourne les métadonnées du service et les versions des outils."""
-    return {"service": "prep-service", "versions": get_tool_versions()}
+    """
+    Retourne les métadonnées du service, les versions des outils et, sous
+    ``settings``, les réglages qui modifient les octets du raw.pdf
+    (``PREP_NORMALIZE*``, ``PREP_GRAYSCALE*``) : l'orchestrateur les intègre au
+    profil canonique. Vide quand la normalisation est désactivée.
+    """
+    executor = {"mode": EXECUTOR}
+    if _pool is not None:
+        executor.update(_pool.stats())
+    norm = make_normalizer()
+    settings = {"normalize": norm.settings()} if norm is not None else {}
+    return {"service": "prep-service", "versions": get_tool_versions(), "settings": settings,
+            "executor": executor}
 
 
 class PrepSubmit(BaseModel):
@@ -35,44 +101,80 @@ class PrepSubmit(BaseModel):
     jobId: str
     inputPath: str
     workDir: str
+    callbackUrl: Optional[str] = None
+    priority: int = 0
 
 
 @app.post("/jobs/prep", status_code=202)
 def submit(req: PrepSubmit):
-    """Soumet un job de préparation dans la file d'attente."""
-    ensure_dir(QUEUE_DIR)
-    ensure_dir(RUNNING_DIR)
+    """Soumet un job de préparation dans la file d'attente (``priority`` : la plus haute d'abord)."""
     ensure_dir(DONE_DIR)
     ensure_dir(ERROR_DIR)
-    job_file = os.path.join(QUEUE_DIR, f"{req.jobId}.json")
-    running_file = os.path.join(RUNNING_DIR, f"{req.jobId}.json")
-    if os.path.exists(job_file) or os.path.exists(running_file):
-        return {"jobId": req.jobId, "statusUrl": f"/jobs/{req.jobId}"}
-    atomic_write_json(job_file, {
+    job_queue().put(req.jobId, {
         "jobId": req.jobId,
         "inputPath": req.inputPath,
         "workDir": req.workDir,
+        "callbackUrl": req.callbackUrl,
         "state": "QUEUED",
         "updatedAt": now_iso(),
-    })
+    }, priority=req.priority)
+    job_registry().record(os.path.join(QUEUE_DIR, f"{req.jobId}.json"))
     return {"jobId": req.jobId, "statusUrl": f"/jobs/{req.jobId}"}
 
 
+class StatusBatch(BaseModel):
+    """Corps de la requête POST /jobs/status."""
+    ids: List[str]
+
+
+def find_job(job_id: str) -> Optional[dict]:
+    """Retourne les métadonnées d'un job via le registre en mémoire, ou None."""
+    return job_registry().get(job_id)
+
+
+def batch_status(ids: List[str]) -> dict:
+    """
+    États de plusieurs jobs en une réponse.
+
+    :param ids: Identifiants des jobs (doublons et vides ignorés).
+    :return: ``{"jobs": {jobId: état}, "missing": [jobId inconnus]}``.
+    """
+    jobs, missing = {}, []
+    for job_id in dict.fromkeys(i for i in ids if i):
+        data = find_job(job_id)
+        if data:
+            jobs[job_id] = data
+        else:
+            missing.append(job_id)
+    return {"jobs": jobs, "missing": missing}
+
+
+@app.get("/jobs")
+def status_many(ids: str = ""):
+    """Retourne l'état de plusieurs jobs : ``GET /jobs?ids=a,b,c``."""
+    return batch_status(ids.split(","))
+
+
+@app.post("/jobs/status")
+def status_many_post(req: StatusBatch):
+    """Variante POST de ``GET /jobs?ids=...`` (listes longues)."""
+    return batch_status(req.ids)
+
+
 @app.get("/jobs/{job_id}")
 def status(job_id: str):
     """Retourne l'état courant d'un job de préparation."""
-    for d in [QUEUE_DIR, RUNNING_DIR, DONE_DIR, ERROR_DIR]:
-        p = os.path.join(d, f"{job_id}.json")
-        data = read_json(p)
-        if data:
-            return data
+    data = find_job(job_id)
+    if data:
+        return data
     raise HTTPException(status_code=404, detail="job not found")
 
 
 def requeue_running_on_startup():
     """
     Au démarrage, replace les jobs RUNNING dans la file d'attente.
-    Politique recalcul complet : aucun artefact existant n'est réutilisé.
+    Politique recalcul complet, sauf les pages extraites dont le manifeste est
+    vérifié par ``run_job`` (``PREP_RESUME``).
     """
     ensure_dir(QUEUE_DIR)
     ensure_dir(RUNNING_DIR)
@@ -87,25 +189,40 @@ def requeue_running_on_startup():
             pass
 
 
+_job_queue = None
+
+
+def job_queue():
+    """File d'attente du service (créée au premier usage selon ``QUEUE_BACKEND``)."""
+    global _job_queue
+    if _job_queue is None:
+        _job_queue = make_queue(QUEUE_BACKEND, QUEUE_DIR, RUNNING_DIR, QUEUE_DB_PATH)
+    return _job_queue
+
+
+_registry = None
+
+
+def job_registry() -> JobRegistry:
+    """Registre en mémoire des jobs (créé au premier usage, reconstruit au démarrage)."""
+    global _registry
+    if _registry is None:
+        _registry = JobRegistry({"queue": QUEUE_DIR, "running": RUNNING_DIR,
+                                 "done": DONE_DIR, "error": ERROR_DIR},
+                                max_finished=REGISTRY_MAX_FINISHED)
+    return _registry
+
+
 def claim_one():
     """
-    Réclame atomiquement un job depuis la file d'attente.
+    Réclame atomiquement le prochain job de la file (priorité puis ordre de soumission).
 
     :return: Chemin du fichier de métadonnées dans RUNNING_DIR, ou None.
     """
-    ensure_dir(QUEUE_DIR)
-    ensure_dir(RUNNING_DIR)
-    for fn in os.listdir(QUEUE_DIR):
-        if not fn.endswith(".json"):
-            continue
-        src = os.path.join(QUEUE_DIR, fn)
-        dst = os.path.join(RUNNING_DIR, fn)
-        try:
-            os.replace(src, dst)
-            return dst
-        except Exception:
-            continue
-    return None
+    path = job_queue().claim()
+    if path:
+        job_registry().record(path)
+    return path
 
 
 def update_state(job_meta_path: str, patch: dict):
@@ -119,13 +236,90 @@ def update_state(job_meta_path: str, patch: dict):
     data.update(patch)
     data["updatedAt"] = now_iso()
     atomic_write_json(job_meta_path, data)
+    job_registry().record(job_meta_path, data)
 
 
-def run_job(job_meta_path: str):
+def select_members(input_path: str, log) -> Optional[List[dict]]:
     """
-    Exécute un job de préparation : extraction 7z + génération raw.pdf.
+    Liste l'archive (``7z l -slt``) et retient les membres images.
+
+    :param input_path: Chemin de l'archive.
+    :param log: Fichier ``prep.log`` ouvert.
+    :return: Manifeste des pages à extraire, ou None si le listing a échoué
+             (l'appelant extrait alors l'archive complète).
+    """
+    try:
+        entries = list_archive_members(input_path)
+    except Exception as e:
+        log.write(f"7z l: listing impossible ({e}), extraction complète\n")
+        return None
+    if not entries:
+        log.write("7z l: aucun membre listé, extraction complète\n")
+        return None
+    manifest = image_manifest(entries)
+    skipped = sum(e["size"] for e in entries if not e["folder"]) - sum(m["size"] for m in manifest)
+    log.write(f"7z l: {len(manifest)}/{len(entries)} membres retenus, {skipped} octets non extraits\n")
+    return manifest
+
+
+def make_normalizer() -> Optional[Normalizer]:
+    """
+    Normaliseur d'un job selon la configuration, ou None si ni ``PREP_NORMALIZE``
+    ni ``PREP_GRAYSCALE`` ne sont activés (``PREP_GRAYSCALE`` seul : conversion
+    en niveaux de gris uniquement, ni réduction ni ré-encodage).
+    """
+    if not NORMALIZE and not GRAYSCALE:
+        return None
+    return Normalizer(
+        max_pixels=int(NORMALIZE_MAX_MPX * 1_000_000) if NORMALIZE else 0,
+        max_dpi=NORMALIZE_MAX_DPI if NORMALIZE else 0,
+        jpeg_quality=NORMALIZE_JPEG_QUALITY,
+        lossless_to_jpeg=NORMALIZE and NORMALIZE_LOSSLESS_TO_JPEG,
+        workers=NORMALIZE_WORKERS,
+        grayscale=GRAYSCALE,
+        gray_tolerance=GRAYSCALE_TOLERANCE,
+        gray_max_color_ratio=GRAYSCALE_MAX_COLOR_RATIO,
+    )
+
+
+def load_resumable_pages(manifest_path: str, input_path: str, pages_dir: str) -> List[str]:
+    """
+    Pages réutilisables d'une tentative précédente (``PREP_RESUME``).
+
+    :param manifest_path: ``extract.manifest.json`` du job.
+    :param input_path: Archive du job courant.
+    :param pages_dir: Dossier ``pages/`` du job (volume partagé).
+    :return: Pages dans l'ordre, ou liste vide (manifeste absent, illisible ou
+             ne correspondant plus à l'archive ou aux fichiers).
+    """
+    if not RESUME:
+        return []
+    try:
+        manifest = read_json(manifest_path)
+    except ValueError:
+        return []
+    if not manifest:
+        return []
+    return verify_extract_manifest(manifest, input_path, pages_dir)
+
+
+def run_job(job_meta_path: str, scratch_dir: Optional[str] = None):
+    """
+    Exécute un job de préparation : génération raw.pdf depuis l'archive.
+    Archive ZIP (CBZ) : lecture directe des pages avec ``zipfile``.
+    Sinon (CBR, ZIP illisible ou chiffré) : extraction 7z dans ``pages/``,
+    limitée aux membres images si le listing de l'archive a réussi.
+    Avec ``scratch_dir`` (réservé par ``execute_job``, ``PREP_SCRATCH_DIR``),
+    ``pages/`` et ``raw.tmp.pdf`` sont sur le scratch local ; seul le
+    ``raw.pdf`` final est écrit dans le répertoire partagé.
+    Avec ``PREP_RESUME``, une extraction 7z complète laisse un manifeste
+    (``extract.manifest.json``) : une nouvelle tentative réutilise ``pages/``
+    si l'archive et les fichiers correspondent, sans relancer 7z.
+    Avec ``PREP_NORMALIZE``, les pages passent par ``Normalizer`` (statistiques
+    sous ``normalize`` dans l'état DONE).
 
     :param job_meta_path: Chemin du fichier de métadonnées (dans RUNNING_DIR).
+    :param scratch_dir: Répertoire local réservé pour les intermédiaires (None = volume partagé).
     :raises RuntimeError: En cas d'échec 7z ou d'absence d'images.
     """
     data = read_json(job_meta_path)
@@ -135,17 +329,29 @@ def run_job(job_meta_path: str):
     work_dir = data["workDir"]
     input_path = data["inputPath"]
     job_dir = os.path.join(work_dir, job_id)
-    pages_dir = os.path.join(job_dir, "pages")
     log_path = os.path.join(job_dir, "prep.log")
     hb_path = os.path.join(job_dir, "prep.heartbeat")
 
     ensure_dir(job_dir)
     import shutil as _sh
-    _sh.rmtree(pages_dir, ignore_errors=True)
+    # Reprise : pages d'une extraction 7z terminée, vérifiées par leur manifeste
+    manifest_path = os.path.join(job_dir, "extract.manifest.json")
+    resumed = load_resumable_pages(manifest_path, input_path, os.path.join(job_dir, "pages"))
+    if resumed:
+        scratch_dir = None  # pages reprises depuis le volume partagé
+    else:
+        _sh.rmtree(os.path.join(job_dir, "pages"), ignore_errors=True)
+        try:
+            os.remove(manifest_path)
+        except FileNotFoundError:
+            pass
+    tmp_root = scratch_dir or job_dir
+    pages_dir = os.path.join(tmp_root, "pages")
     ensure_dir(pages_dir)
-    raw_tmp = os.path.join(job_dir, "raw.tmp.pdf")
+    raw_tmp = os.path.join(tmp_root, "raw.tmp.pdf")
+    shared_tmp = os.path.join(job_dir, "raw.tmp.pdf")
     raw_pdf = os.path.join(job_dir, "raw.pdf")
-    for p in [raw_tmp, raw_pdf, log_path]:
+    for p in [shared_tmp, raw_pdf, log_path]:
         try:
             os.remove(p)
         except FileNotFoundError:
@@ -160,34 +366,139 @@ def run_job(job_meta_path: str):
     with open(log_path, "a", encoding="utf-8") as log:
         try:
             heartbeat("start")
-            cmd = ["7z", "x", "-y", f"-o{pages_dir}", input_path]
-            log.write("CMD: " + " ".join(cmd) + "\n")
-            p = subprocess.run(cmd, capture_output=True, text=True)
-            log.write(p.stdout + "\n" + p.stderr + "\n")
-            if p.returncode != 0:
-                raise RuntimeError(f"7z failed rc={p.returncode}")
-
-            heartbeat("listing_images")
-            images = list_and_sort_images(pages_dir)
-            if not images:
-                raise RuntimeError("no images found after extraction")
-
-            update_state(job_meta_path, {"message": f"building pdf ({len(images)} pages)"})
-            heartbeat("img2pdf")
-            images_to_pdf(images, raw_tmp)
-            os.replace(raw_tmp, raw_pdf)
+            normalizer = make_normalizer()
+            if scratch_dir:
+                log.write(f"SCRATCH: intermédiaires dans {scratch_dir}\n")
+            elif SCRATCH.enabled:
+                log.write("SCRATCH: budget insuffisant, intermédiaires sur le volume partagé\n")
+            streamed = False
+            if resumed:
+                log.write(f"REPRISE: {len(resumed)} pages déjà extraites (manifeste vérifié), 7z ignoré\n")
+            elif ZIP_STREAMING and zipfile.is_zipfile(input_path):
+                try:
+                    update_state(job_meta_path, {"message": "building pdf from zip"})
+                    heartbeat("zip_stream")
+                    count = zip_images_to_pdf(input_path, raw_tmp, streaming=PDF_WRITER == "stream",
+                                              normalizer=normalizer)
+                    log.write(f"ZIP: {count} pages lues sans extraction\n")
+                    streamed = True
+                except NoImagesError:
+                    raise RuntimeError("no images found after extraction")
+                except ZIP_FALLBACK_ERRORS as e:
+                    log.write(f"ZIP: lecture directe impossible ({e}), repli 7z\n")
+
+            if resumed:
+                images = resumed
+                update_state(job_meta_path, {"message": f"building pdf ({len(images)} pages, resumed)"})
+                heartbeat("img2pdf")
+                images_to_pdf(images, raw_tmp, streaming=PDF_WRITER == "stream", normalizer=normalizer)
+            elif not streamed:
+                cmd = ["7z", "x", "-y", f"-o{pages_dir}", input_path]
+                manifest = select_members(input_path, log) if SELECTIVE_EXTRACT else None
+                if manifest is not None:
+                    if not manifest:
+                        raise RuntimeError("no images found after extraction")
+                    list_path = os.path.join(job_dir, "extract.lst")
+                    with open(list_path, "w", encoding="utf-8") as lst:
+                        lst.write("".join(m["path"] + "\n" for m in manifest))
+                    # -spd : noms pris littéralement (pas de jokers) ; liste en UTF-8
+                    cmd = ["7z", "x", "-y", "-spd", "-scsUTF-8", f"-o{pages_dir}", input_path, f"@{list_path}"]
+                log.write("CMD: " + " ".join(cmd) + "\n")
+                p = subprocess.run(cmd, capture_output=True, text=True)
+                log.write(p.stdout + "\n" + p.stderr + "\n")
+                if p.returncode != 0:
+                    raise RuntimeError(f"7z failed rc={p.returncode}")
+
+                heartbeat("listing_images")
+                images = list_and_sort_images(pages_dir)
+                if not images:
+                    raise RuntimeError("no images found after extraction")
+                if RESUME and not scratch_dir:
+                    # Point de reprise : écrit seulement après une extraction complète
+                    atomic_write_json(manifest_path, build_extract_manifest(
+                        input_path, pages_dir, images, sha256=sha256_from_job_id(job_id)))
+
+                update_state(job_meta_path, {"message": f"building pdf ({len(images)} pages)"})
+                heartbeat("img2pdf")
+                images_to_pdf(images, raw_tmp, streaming=PDF_WRITER == "stream", normalizer=normalizer)
+            if raw_tmp != shared_tmp:
+                # Copie vers le volume partagé, puis rename atomique sur ce volume
+                heartbeat("publish")
+                _sh.move(raw_tmp, shared_tmp)
+            os.replace(shared_tmp, raw_pdf)
+            done = {"state": "DONE", "message": "raw.pdf ready", "artifacts": {"rawPdf": raw_pdf}}
+            if resumed:
+                done["resumedPages"] = len(resumed)
+            if normalizer is not None:
+                done["normalize"] = normalizer.stats()
+                log.write("NORMALIZE: " + json.dumps(done["normalize"]) + "\n")
+            update_state(job_meta_path, done)
+        except Exception as e:
             update_state(job_meta_path, {
-                "state": "DONE",
-                "message": "raw.pdf ready",
-                "artifacts": {"rawPdf": raw_pdf},
+                "state": "ERROR",
+                "message": str(e),
+                "error": {"type": type(e).__name__, "detail": str(e)},
             })
-        except Exception as e:
+            raise
+
+
+def notify_completion(job_meta_path: str) -> None:
+    """
+    Envoie le statut final d'un job à son ``callbackUrl``, s'il en a un.
+
+    :param job_meta_path: Chemin du fichier de métadonnées (DONE_DIR ou ERROR_DIR).
+    """
+    data = read_json(job_meta_path)
+    if data and data.get("callbackUrl"):
+        notify_callback(data["callbackUrl"], data)
+
+
+def reserve_scratch(job_meta_path: str) -> Optional[str]:
+    """
+    Réserve le scratch local d'un job qui démarre (``PREP_SCRATCH_DIR``), dans
+    le processus du service : les réservations des jobs en cours sont vues
+    quel que soit ``PREP_EXECUTOR``. Pas de réservation pour une reprise
+    possible (manifeste présent : pages sur le volume partagé).
+
+    :return: Répertoire local du job, ou None (volume partagé).
+    """
+    data = read_json(job_meta_path)
+    if not data or not SCRATCH.enabled:
+        return None
+    manifest_path = os.path.join(data["workDir"], data["jobId"], "extract.manifest.json")
+    if RESUME and os.path.exists(manifest_path):
+        return None
+    return SCRATCH.acquire(data["jobId"], estimate_need(data["inputPath"]))
+
+
+def execute_job(job_meta_path: str):
+    """
+    Exécute ``run_job`` selon ``PREP_EXECUTOR`` : dans le thread courant, ou
+    dans un processus du pool (rapport du processus conservé sous ``worker``).
+    Le scratch local est réservé ici et libéré à la fin, dans les deux modes.
+
+    :param job_meta_path: Chemin du fichier de métadonnées (dans RUNNING_DIR).
+    :raises Exception: Erreur du job, ou ``WorkerCrashed`` si le processus a disparu.
+    """
+    job_id = os.path.basename(job_meta_path)[:-len(".json")]
+    scratch_dir = reserve_scratch(job_meta_path)
+    try:
+        if _pool is None:
+            run_job(job_meta_path, scratch_dir)
+            return
+        try:
+            report = _pool.run(run_job, job_meta_path, scratch_dir)
+        except WorkerCrashed as e:
+            # Le fils n'a pas pu écrire son état final : le parent le fait à sa place
             update_state(job_meta_path, {
                 "state": "ERROR",
                 "message": str(e),
                 "error": {"type": type(e).__name__, "detail": str(e)},
             })
             raise
+        update_state(job_meta_path, {"worker": report})
+    finally:
+        SCRATCH.release(job_id)
 
 
 def worker_loop(stop_event: threading.Event):
@@ -202,12 +513,15 @@ def worker_loop(stop_event: threading.Event):
             time.sleep(0.5)
             continue
         try:
-            run_job(job_meta)
+            execute_job(job_meta)
             dst = os.path.join(DONE_DIR, os.path.basename(job_meta))
             os.replace(job_meta, dst)
         except Exception:
             dst = os.path.join(ERROR_DIR, os.path.basename(job_meta))
             os.replace(job_meta, dst)
+        job_registry().record(dst)
+        job_queue().release(os.path.basename(job_meta)[:-len(".json")])
+        notify_completion(dst)
 
 
 # ---------------------------------------------------------------------------
@@ -216,12 +530,18 @@ def worker_loop(stop_event: threading.Event):
 
 _stop_event = threading.Event()
 _worker_threads = []
+_pool = None
 
 
 @app.on_event("startup")
 def startup():
     """Démarre les workers au lancement du serveur FastAPI."""
+    global _pool
     requeue_running_on_startup()
+    job_queue().recover()
+    job_registry().rebuild()
+    SCRATCH.purge()
+    _pool = make_pool(EXECUTOR, max(1, SERVICE_CONCURRENCY), WORKER_MAX_JOBS)
     for _ in range(max(1, SERVICE_CONCURRENCY)):
         t = threading.Thread(target=worker_loop, args=(_stop_event,), daemon=True)
         t.start()
@@ -232,3 +552,5 @@ def startup():
 def shutdown():
     """Arrête proprement les workers à l'arrêt du serveur FastAPI."""
     _stop_event.set()
+    if _pool is not None:
+        _pool.shutdown()
@@ -0,0 +1,247 @@
+"""
+Normalisation des pages avant assemblage du raw.pdf (``PREP_NORMALIZE``).
+
+Les scans très grands (6000×9000 px) passent tels quels dans le PDF, puis
+ocrmypdf les rastérise et les OCRise en pleine résolution. Cette étape :
+
+- réduit les pages au-delà d'un plafond en pixels (``max_pixels``) ou en DPI
+  (``max_dpi``), en conservant la taille physique de la page (DPI ajusté) ;
+- ré-encode les pages sans perte (PNG, TIFF, BMP) en JPEG haute qualité ;
+- convertit en niveaux de gris 8 bits les pages RGB sans couleur effective
+  (``grayscale``, test de chroma vectorisé avec NumPy) : un tiers du volume
+  d'image, assemblage et rastérisation OCR plus rapides. Un JPEG déjà dans les
+  limites n'est jamais décodé puis ré-encodé pour cela (génération JPEG de
+  plus) : ``jpegtran -grayscale`` retire les composantes de chroma sans perte,
+  et sans jpegtran la page reste intacte. Les pages réduites ou ré-encodées
+  de toute façon payent une seule génération JPEG (``jpeg_quality``) ;
+- laisse intactes les pages déjà dans les limites et non concernées par le
+  ré-encodage : un JPEG conforme reste en passthrough img2pdf, octet pour octet.
+
+Les pages sont traitées en parallèle (Pillow relâche le GIL pendant le
+décodage, le redimensionnement et l'encodage) avec une fenêtre bornée :
+l'ordre est conservé et la mémoire reste de l'ordre de quelques pages,
+compatible avec l'écriture en streaming.
+"""
+import io
+import os
+import shutil
+import subprocess
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterable, Iterator, Optional, Tuple, Union
+
+# DPI supposé par img2pdf quand l'image n'en déclare pas
+_DEFAULT_DPI = 96.0
+
+_LOSSLESS = {"PNG", "TIFF", "BMP"}
+_JPEG_MODES = {"RGB", "L"}
+
+# Test de chroma sur une version réduite au-delà de cette taille (mémoire et temps bornés)
+_GRAY_SAMPLE_PIXELS = 2_000_000
+
+Page = Union[str, bytes]
+
+
+def jpeg_to_gray_lossless(raw: bytes, timeout: float = 30.0) -> Optional[bytes]:
+    """
+    Convertit un JPEG en niveaux de gris sans nouvelle génération de
+    compression (``jpegtran -grayscale`` : composante de luminance conservée
+    telle quelle, chroma supprimée ; métadonnées et DPI recopiés).
+
+    :param raw: Contenu du JPEG d'origine.
+    :param timeout: Délai maximal de jpegtran en secondes.
+    :return: Les octets du JPEG gris, ou None si jpegtran est absent ou échoue.
+    """
+    exe = shutil.which("jpegtran")
+    if exe is None:
+        return None
+    try:
+        p = subprocess.run([exe, "-grayscale", "-copy", "all"], input=raw,
+                           capture_output=True, timeout=timeout)
+    except (OSError, subprocess.TimeoutExpired):
+        return None
+    if p.returncode != 0 or not p.stdout:
+        return None
+    return p.stdout
+
+
+def is_grayscale(im, tolerance: int = 16, max_color_ratio: float = 0.005) -> bool:
+    """
+    Indique si une image RGB/palette ne contient pas de couleur effective.
+
+    La chroma d'un pixel est ``max(R, G, B) - min(R, G, B)`` ; la page est
+    considérée grise si la part de pixels dont la chroma dépasse
+    ``tolerance`` reste sous ``max_color_ratio`` (bruit JPEG, poussière).
+    Les grandes pages sont testées sur une version réduite.
+
+    :param im: Image Pillow ouverte.
+    :param tolerance: Chroma maximale d'un pixel « gris » (0-255).
+    :param max_color_ratio: Part maximale de pixels colorés.
+    :return: True si la page peut être stockée en niveaux de gris.
+    """
+    import numpy as np
+
+    rgb = im if im.mode == "RGB" else im.convert("RGB")
+    pixels = rgb.width * rgb.height
+    if pixels > _GRAY_SAMPLE_PIXELS:
+        rgb = rgb.reduce(int((pixels / _GRAY_SAMPLE_PIXELS) ** 0.5) + 1)
+    a = np.asarray(rgb, dtype=np.int16)
+    chroma = a.max(axis=2) - a.min(axis=2)
+    return np.count_nonzero(chroma > tolerance) <= max_color_ratio * chroma.size
+
+
+class Normalizer:
+    """
+    Étape de normalisation d'un job (statistiques cumulées par instance).
+
+    :param max_pixels: Plafond largeur × hauteur (0 = aucun).
+    :param max_dpi: Plafond de résolution déclarée (0 = aucun).
+    :param jpeg_quality: Qualité JPEG des pages ré-encodées.
+    :param lossless_to_jpeg: Ré-encoder en JPEG les pages PNG/TIFF/BMP.
+    :param workers: Threads de traitement (0 = nombre de cœurs).
+    :param grayscale: Convertir en niveaux de gris les pages sans couleur.
+    :param gray_tolerance: Voir ``is_grayscale``.
+    :param gray_max_color_ratio: Voir ``is_grayscale``.
+    """
+
+    def __init__(self, max_pixels: int = 0, max_dpi: float = 0, jpeg_quality: int = 92,
+                 lossless_to_jpeg: bool = True, workers: int = 0, grayscale: bool = False,
+                 gray_tolerance: int = 16, gray_max_color_ratio: float = 0.005):
+        self.max_pixels = max(0, max_pixels)
+        self.max_dpi = max(0.0, max_dpi)
+        self.jpeg_quality = jpeg_quality
+        self.lossless_to_jpeg = lossless_to_jpeg
+        self.workers = workers or os.cpu_count() or 1
+        self.grayscale = grayscale
+        self.gray_tolerance = gray_tolerance
+        self.gray_max_color_ratio = gray_max_color_ratio
+        self._lock = threading.Lock()
+        self._stats = {"pages": 0, "resized": 0, "reencoded": 0, "grayscale": 0,
+                       "bytesIn": 0, "bytesOut": 0, "pageSeconds": 0.0}
+
+    def settings(self) -> dict:
+        """
+        Paramètres qui déterminent les octets produits (``workers`` exclu) :
+        publiés par ``/info`` pour entrer dans le profil canonique.
+        """
+        return {"maxPixels": self.max_pixels, "maxDpi": self.max_dpi,
+                "jpegQuality": self.jpeg_quality, "losslessToJpeg": self.lossless_to_jpeg,
+                "grayscale": self.grayscale, "grayTolerance": self.gray_tolerance,
+                "grayMaxColorRatio": self.gray_max_color_ratio}
+
+    def stats(self) -> dict:
+        """Statistiques du job : pages modifiées, octets économisés, temps cumulé."""
+        with self._lock:
+            out = dict(self._stats)
+        out["bytesSaved"] = out["bytesIn"] - out["bytesOut"]
+        out["pageSeconds"] = round(out["pageSeconds"], 3)
+        return out
+
+    def _record(self, size_in: int, size_out: int, elapsed: float, resized=False, reencoded=False,
+                grayscale=False):
+        with self._lock:
+            s = self._stats
+            s["pages"] += 1
+            s["resized"] += int(resized)
+            s["reencoded"] += int(reencoded)
+            s["grayscale"] += int(grayscale)
+            s["bytesIn"] += size_in
+            s["bytesOut"] += size_out
+            s["pageSeconds"] += elapsed
+
+    def scale_for(self, width: int, height: int, dpi: Optional[Tuple[float, float]]) -> float:
+        """Facteur de réduction (≤ 1) imposé par les plafonds pixels et DPI."""
+        scale = 1.0
+        if self.max_pixels and width * height > self.max_pixels:
+            scale = (self.max_pixels / float(width * height)) ** 0.5
+        if self.max_dpi and dpi and max(dpi) > self.max_dpi:
+            scale = min(scale, self.max_dpi / float(max(dpi)))
+        return scale
+
+    def page(self, image: Page) -> Page:
+        """
+        Normalise une page.
+
+        :param image: Chemin ou contenu brut de l'image.
+        :return: L'objet d'origine si la page est laissée intacte, sinon les
+                 octets de la page ré-encodée.
+        """
+        from PIL import Image
+
+        t0 = time.perf_counter()
+        if isinstance(image, str):
+            with open(image, "rb") as f:
+                raw = f.read()
+        else:
+            raw = image
+        try:
+            im = Image.open(io.BytesIO(raw))
+        except (OSError, ValueError):
+            # Illisible pour Pillow : img2pdf décidera (erreur explicite du job)
+            self._record(len(raw), len(raw), time.perf_counter() - t0)
+            return image
+        with im:
+            fmt = im.format
+            dpi = im.info.get("dpi")
+            scale = self.scale_for(im.width, im.height, dpi)
+            transparent = "A" in im.mode or "transparency" in im.info
+            reencode = (self.lossless_to_jpeg and fmt in _LOSSLESS and not transparent
+                        and im.mode in _JPEG_MODES | {"P"})
+            single = getattr(im, "n_frames", 1) == 1
+            gray = (self.grayscale and single and not transparent and im.mode in ("RGB", "P")
+                    and is_grayscale(im, self.gray_tolerance, self.gray_max_color_ratio))
+            if gray and fmt == "JPEG" and scale >= 1.0:
+                # JPEG dans les limites : conversion sans perte ou page intacte
+                data = jpeg_to_gray_lossless(raw)
+                if data is None or len(data) >= len(raw):
+                    self._record(len(raw), len(raw), time.perf_counter() - t0)
+                    return image
+                self._record(len(raw), len(data), time.perf_counter() - t0, grayscale=True)
+                return data
+            if not single or (scale >= 1.0 and not reencode and not gray):
+                self._record(len(raw), len(raw), time.perf_counter() - t0)
+                return image
+            if gray:
+                out = im.convert("L")
+            else:
+                out = im.convert("RGB") if im.mode == "P" else im.copy()
+        if scale < 1.0:
+            out = out.resize((max(1, round(out.width * scale)), max(1, round(out.height * scale))),
+                             Image.LANCZOS)
+        # Taille physique conservée : le DPI suit la réduction
+        base = dpi or (_DEFAULT_DPI, _DEFAULT_DPI)
+        new_dpi = (base[0] * scale, base[1] * scale)
+        to_jpeg = out.mode in _JPEG_MODES and (reencode or fmt not in _LOSSLESS)
+        buf = io.BytesIO()
+        if to_jpeg:
+            out.save(buf, format="JPEG", quality=self.jpeg_quality, dpi=new_dpi)
+        else:
+            out.save(buf, format="PNG", dpi=new_dpi)
+        data = buf.getvalue()
+        if scale >= 1.0 and len(data) >= len(raw):
+            # Ré-encodage sans gain : la page d'origine est conservée
+            self._record(len(raw), len(raw), time.perf_counter() - t0)
+            return image
+        self._record(len(raw), len(data), time.perf_counter() - t0,
+                     resized=scale < 1.0, reencoded=to_jpeg and fmt in _LOSSLESS, grayscale=gray)
+        return data
+
+    def apply(self, images: Iterable[Page]) -> Iterator[Page]:
+        """
+        Normalise une suite de pages en parallèle, dans l'ordre d'entrée.
+        Au plus ``2 × workers`` pages sont en cours à un instant donné.
+        """
+        if self.workers <= 1:
+            for image in images:
+                yield self.page(image)
+            return
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="normalize") as ex:
+            pending: deque = deque()
+            for image in images:
+                pending.append(ex.submit(self.page, image))
+                if len(pending) >= 2 * self.workers:
+                    yield pending.popleft().result()
+            while pending:
+                yield pending.popleft().result()
@@ -0,0 +1,247 @@
+"""
+Écriture de PDF image par image (mode « stream » du prep-service).
+
+``img2pdf.convert`` charge toutes les pages puis produit le PDF complet en
+un seul ``bytes`` : la mémoire d'un worker croît avec la taille de l'archive.
+``StreamingPdfWriter`` réutilise l'analyse d'image d'img2pdf
+(``img2pdf.read_images`` : passthrough JPEG/JPEG2000, données PNG, CCITT...)
+et la mise en page par défaut (taille de page issue du DPI, image centrée),
+mais écrit chaque page dans le fichier dès qu'elle est lue. Seuls les
+offsets des objets sont conservés : le pic mémoire reste de l'ordre d'une page.
+
+Le dictionnaire d'image reprend celui de ``img2pdf.pdfdoc.add_imagepage``.
+``read_images`` (tuple de 12 valeurs) et ``find_scale`` sont des fonctions
+internes d'img2pdf, sans garantie d'API : la version est épinglée
+(``IMG2PDF_SERIES``, requirements.txt et Dockerfile) et le test de parité
+avec ``img2pdf.convert`` échoue explicitement sur une autre série.
+"""
+import hashlib
+from typing import BinaryIO, List, Optional
+
+import img2pdf
+
+# Série d'img2pdf dont read_images/find_scale sont reproduits ici
+IMG2PDF_SERIES = "0.6."
+
+_CATALOG = 1
+_PAGES = 2
+
+# Limite PDF (200 pouces) au-delà de laquelle img2pdf applique /UserUnit
+_MAX_PAGE_PT = 14400.0
+
+
+def _fmt(value) -> str:
+    """Sérialise une valeur Python en syntaxe PDF."""
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, int):
+        return str(value)
+    if isinstance(value, float):
+        return ("%0.4f" % value).rstrip("0").rstrip(".")
+    if isinstance(value, _Raw):
+        return value.text
+    if isinstance(value, (list, tuple)):
+        return "[" + " ".join(_fmt(v) for v in value) + "]"
+    if isinstance(value, dict):
+        return "<<" + "".join(f" /{k} {_fmt(v)}" for k, v in value.items()) + " >>"
+    raise TypeError(f"valeur PDF non supportée : {value!r}")
+
+
+class _Raw:
+    """Fragment PDF déjà sérialisé (nom, référence, chaîne hexadécimale)."""
+
+    def __init__(self, text: str):
+        self.text = text
+
+
+def _name(n: str) -> _Raw:
+    return _Raw("/" + n)
+
+
+def _ref(num: int) -> _Raw:
+    return _Raw(f"{num} 0 R")
+
+
+class StreamingPdfWriter:
+    """
+    Écrit un PDF d'images page par page dans un flux binaire.
+
+    Usage ::
+
+        with open(path, "wb") as f:
+            w = StreamingPdfWriter(f)
+            for image in images:
+                w.add_image(image)
+            w.close()
+
+    :param out: Flux binaire de sortie (ouvert en écriture).
+    """
+
+    def __init__(self, out: BinaryIO):
+        self._out = out
+        self._pos = 0
+        self._offsets: dict = {}
+        self._next = _PAGES + 1
+        self._kids: List[int] = []
+        self._digest = hashlib.md5()
+        # En-tête 1.7 : couvre JPX (1.5), SMask/JBIG2 (1.4) et /UserUnit (1.6)
+        self._write(b"%PDF-1.7\n%\xe2\xe3\xcf\xd3\n")
+
+    @property
+    def page_count(self) -> int:
+        return len(self._kids)
+
+    # -- Bas niveau --------------------------------------------------------
+
+    def _write(self, data: bytes) -> None:
+        self._out.write(data)
+        self._pos += len(data)
+
+    def _alloc(self) -> int:
+        num = self._next
+        self._next += 1
+        return num
+
+    def _obj(self, num: int, attrs: dict, stream: Optional[bytes] = None) -> None:
+        self._offsets[num] = self._pos
+        if stream is not None:
+            attrs = dict(attrs, Length=len(stream))
+        self._write(f"{num} 0 obj\n{_fmt(attrs)}\n".encode("ascii"))
+        if stream is not None:
+            self._write(b"stream\n")
+            self._write(stream)
+            self._write(b"\nendstream\n")
+            self._digest.update(stream[:4096])
+        self._write(b"endobj\n")
+
+    # -- Pages -------------------------------------------------------------
+
+    def add_image(self, image) -> int:
+        """
+        Ajoute une image (chemin ou ``bytes``) ; une page par trame.
+
+        :param image: Chemin de fichier ou contenu brut de l'image.
+        :return: Nombre de pages ajoutées.
+        """
+        if isinstance(image, str):
+            with open(image, "rb") as f:
+                rawdata = f.read()
+        else:
+            rawdata = image
+        added = 0
+        for (color, ndpi, imgformat, imgdata, smaskdata, width, height,
+             palette, inverted, depth, rotation, iccp) in img2pdf.read_images(rawdata, None):
+            self._add_page(color, ndpi, imgformat, imgdata, smaskdata, width, height,
+                           palette, inverted, depth, rotation, iccp)
+            added += 1
+        return added
+
+    def _colorspace(self, color, palette, iccp):
+        cs = color.name
+        if cs in ("1", "L", "LA"):
+            space, components = _name("DeviceGray"), 1
+        elif cs in ("RGB", "RGBA"):
+            space, components = _name("DeviceRGB"), 3
+        elif cs in ("CMYK", "CMYK;I"):
+            space, components = _name("DeviceCMYK"), 4
+        elif cs == "P":
+            space = [_name("Indexed"), _name("DeviceRGB"), len(palette) // 3 - 1,
+                     _Raw("<" + bytes(palette).hex() + ">")]
+            components = None
+        else:
+            raise img2pdf.UnsupportedColorspaceError(f"unsupported color space: {cs}")
+        if iccp is not None:
+            if components is None:
+                raise ValueError("Cannot have Palette images with ICC profile")
+            icc_num = self._alloc()
+            self._obj(icc_num, {"Alternate": space, "N": components}, iccp)
+            space = [_name("ICCBased"), _ref(icc_num)]
+        return space
+
+    def _add_page(self, color, ndpi, imgformat, imgdata, smaskdata, width, height,
+                  palette, inverted, depth, rotation, iccp) -> None:
+        fmt = imgformat.name
+        image = {"Type": _name("XObject"), "Subtype": _name("Image")}
+        if fmt == "JPEG":
+            image["Filter"] = _name("DCTDecode")
+        elif fmt == "JPEG2000":
+            image["Filter"] = _name("JPXDecode")
+        elif fmt == "CCITTGroup4":
+            image["Filter"] = [_name("CCITTFaxDecode")]
+        elif fmt == "JBIG2":
+            image["Filter"] = _name("JBIG2Decode")
+        else:
+            image["Filter"] = _name("FlateDecode")
+        image["Width"] = width
+        image["Height"] = height
+        if not (color.name == "RGBA" and fmt == "JPEG2000"):
+            image["ColorSpace"] = self._colorspace(color, palette, iccp)
+        image["BitsPerComponent"] = depth
+        if color.name == "CMYK;I":
+            image["Decode"] = [1, 0, 1, 0, 1, 0, 1, 0]
+        if fmt == "CCITTGroup4":
+            image["DecodeParms"] = [{"K": -1, "BlackIs1": not inverted,
+                                     "Columns": width, "Rows": height}]
+        elif fmt == "PNG":
+            if smaskdata is not None:
+                smask_num = self._alloc()
+                self._obj(smask_num, {
+                    "Type": _name("XObject"), "Subtype": _name("Image"),
+                    "Filter": _name("FlateDecode"), "Width": width, "Height": height,
+                    "ColorSpace": _name("DeviceGray"), "BitsPerComponent": depth,
+                    "DecodeParms": {"Predictor": 15, "Colors": 1, "Columns": width,
+                                    "BitsPerComponent": depth},
+                }, smaskdata)
+                image["SMask"] = _ref(smask_num)
+            colors = 1 if color.name in ("P", "1", "L", "LA") else 3
+            image["DecodeParms"] = {"Predictor": 15, "Colors": colors, "Columns": width,
+                                    "BitsPerComponent": depth}
+        image_num = self._alloc()
+        self._obj(image_num, image, imgdata)
+
+        # Mise en page par défaut d'img2pdf : taille de page = taille de l'image au DPI
+        page_w = img_w = 72.0 * width / ndpi[0]
+        page_h = img_h = 72.0 * height / ndpi[1]
+        userunit = None
+        if page_w > _MAX_PAGE_PT or page_h > _MAX_PAGE_PT:
+            userunit = img2pdf.find_scale(page_w, page_h)
+            page_w, page_h = page_w / userunit, page_h / userunit
+            img_w, img_h = img_w / userunit, img_h / userunit
+        content = ("q\n%0.4f 0 0 %0.4f %0.4f %0.4f cm\n/Im0 Do\nQ"
+                   % (img_w, img_h, (page_w - img_w) / 2.0, (page_h - img_h) / 2.0)).encode("ascii")
+        content_num = self._alloc()
+        self._obj(content_num, {}, content)
+
+        page = {
+            "Type": _name("Page"),
+            "Parent": _ref(_PAGES),
+            "MediaBox": [0, 0, page_w, page_h],
+            "Resources": {"XObject": {"Im0": _ref(image_num)}},
+            "Contents": _ref(content_num),
+        }
+        if rotation:
+            page["Rotate"] = rotation
+        if userunit is not None:
+            page["UserUnit"] = userunit
+        page_num = self._alloc()
+        self._obj(page_num, page)
+        self._kids.append(page_num)
+
+    # -- Fin de document ---------------------------------------------------
+
+    def close(self) -> None:
+        """Écrit l'arbre des pages, le catalogue, la table xref et le trailer."""
+        if not self._kids:
+            raise ValueError("Aucune page, impossible de générer un PDF.")
+        self._obj(_PAGES, {"Type": _name("Pages"), "Kids": [_ref(k) for k in self._kids],
+                           "Count": len(self._kids)})
+        self._obj(_CATALOG, {"Type": _name("Catalog"), "Pages": _ref(_PAGES)})
+        xref_pos = self._pos
+        size = self._next
+        lines = [f"xref\n0 {size}\n", "0000000000 65535 f \n"]
+        for num in range(1, size):
+            lines.append("%010d 00000 n \n" % self._offsets[num])
+        doc_id = _Raw("<" + self._digest.hexdigest() + ">")
+        trailer = {"Size": size, "Root": _ref(_CATALOG), "ID": [doc_id, doc_id]}
+        lines.append(f"trailer\n{_fmt(trailer)}\nstartxref\n{xref_pos}\n%%EOF\n")
+        self._write("".join(lines).encode("ascii"))
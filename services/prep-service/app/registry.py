@@ -0,0 +1,168 @@
+"""
+Registre en mémoire des jobs du service : job id -> emplacement (``queue``,
+``running``, ``done``, ``error``) et dernier état connu.
+
+``GET /jobs/{id}`` ne sonde plus les quatre dossiers avec ``read_json`` : une
+recherche dans le dictionnaire, puis un ``stat`` du fichier pour valider le
+cache (inode + mtime ; ``atomic_write_json`` remplace le fichier à chaque
+écriture). Le fichier n'est relu que s'il a changé, par exemple quand
+``run_job`` tourne dans un autre processus (``PREP_EXECUTOR=process``).
+
+Le registre est alimenté par ``submit``, la réclamation, ``update_state`` et les
+déplacements vers ``done/``/``error/``, et reconstruit au démarrage à partir des
+noms de fichiers (contenu chargé à la première lecture). Un job inconnu ou
+déplacé hors du service est recherché sur disque comme auparavant.
+
+Les jobs en file ou en cours restent toujours connus ; au-delà de
+``max_finished`` jobs terminés (``done``/``error``), les moins récemment
+enregistrés ou lus sont oubliés (LRU) et, si on les redemande, retrouvés sur
+disque. ``counts()`` ne compte alors que les jobs terminés encore en mémoire.
+"""
+import os
+import threading
+from collections import OrderedDict
+from itertools import islice
+from typing import Dict, List, Optional, Tuple
+
+from app.utils import read_json
+
+LOCATIONS = ("queue", "running", "done", "error")
+FINISHED = ("done", "error")
+
+
+class JobRegistry:
+    """
+    :param dirs: Dossiers par emplacement (clés de ``LOCATIONS``).
+    :param max_finished: Jobs terminés gardés en mémoire (0 = sans limite).
+    """
+
+    def __init__(self, dirs: Dict[str, str], max_finished: int = 10000):
+        self.dirs = dict(dirs)
+        self.max_finished = max(0, max_finished)
+        self._by_dir = {os.path.normpath(d): loc for loc, d in self.dirs.items()}
+        self._lock = threading.Lock()
+        # job id -> [emplacement, état (None = non chargé), (inode, mtime_ns)],
+        # du moins récemment utilisé au plus récent
+        self._jobs: "OrderedDict[str, List]" = OrderedDict()
+        self._finished = 0
+
+    def __len__(self) -> int:
+        return len(self._jobs)
+
+    def _path(self, location: str, job_id: str) -> str:
+        return os.path.join(self.dirs[location], f"{job_id}.json")
+
+    def _put(self, job_id: str, entry: List) -> None:
+        """Insère ou remplace une entrée (sous verrou), puis borne les jobs terminés."""
+        previous = self._jobs.pop(job_id, None)
+        if previous is not None and previous[0] in FINISHED:
+            self._finished -= 1
+        self._jobs[job_id] = entry
+        if entry[0] in FINISHED:
+            self._finished += 1
+        excess = self._finished - self.max_finished
+        if self.max_finished and excess > 0:
+            oldest = (k for k, e in self._jobs.items() if e[0] in FINISHED)
+            for k in list(islice(oldest, excess)):
+                del self._jobs[k]
+            self._finished -= excess
+
+    def _drop(self, job_id: str) -> None:
+        """Oublie un job (sous verrou)."""
+        entry = self._jobs.pop(job_id, None)
+        if entry is not None and entry[0] in FINISHED:
+            self._finished -= 1
+
+    def rebuild(self) -> int:
+        """
+        Reconstruit le registre depuis le disque (noms de fichiers seulement).
+        En cas de doublon, l'ordre de ``LOCATIONS`` l'emporte, comme pour la
+        recherche sur disque : un job resoumis (même ``jobId``) est en file ou
+        en cours, son ancien fichier ``error/`` ou ``done/`` est périmé.
+
+        :return: Nombre de jobs connus.
+        """
+        jobs: Dict[str, List] = {}
+        for loc in reversed(LOCATIONS):
+            d = self.dirs[loc]
+            if not os.path.isdir(d):
+                continue
+            for fn in os.listdir(d):
+                if fn.endswith(".json"):
+                    jobs[fn[:-5]] = [loc, None, None]
+        with self._lock:
+            self._jobs = OrderedDict()
+            self._finished = 0
+            for job_id, entry in jobs.items():
+                self._put(job_id, entry)
+            return len(self._jobs)
+
+    def record(self, path: str, data: Optional[dict] = None) -> None:
+        """
+        Enregistre l'emplacement actuel d'un fichier de job (après écriture ou déplacement).
+
+        :param path: Chemin du fichier ``<jobId>.json``.
+        :param data: Contenu écrit, s'il est connu (sinon relu à la demande).
+        """
+        loc = self._by_dir.get(os.path.normpath(os.path.dirname(path)))
+        if loc is None:
+            return
+        job_id = os.path.basename(path)[:-len(".json")]
+        stamp = None
+        if data is not None:
+            try:
+                st = os.stat(path)
+                stamp = (st.st_ino, st.st_mtime_ns)
+            except OSError:
+                data = None
+        with self._lock:
+            self._put(job_id, [loc, data, stamp])
+
+    def get(self, job_id: str) -> Optional[dict]:
+        """
+        État courant d'un job.
+
+        :return: Métadonnées du job, ou None s'il est inconnu.
+        """
+        with self._lock:
+            entry = self._jobs.get(job_id)
+            if entry is not None:
+                self._jobs.move_to_end(job_id)
+                entry = list(entry)
+        if entry is not None:
+            loc, data, stamp = entry
+            path = self._path(loc, job_id)
+            try:
+                st = os.stat(path)
+            except OSError:
+                st = None
+            if st is not None:
+                current: Tuple[int, int] = (st.st_ino, st.st_mtime_ns)
+                if data is not None and current == stamp:
+                    return data
+                data = read_json(path)
+                if data:
+                    with self._lock:
+                        self._put(job_id, [loc, data, current])
+                    return data
+        return self._probe(job_id)
+
+    def _probe(self, job_id: str) -> Optional[dict]:
+        """Recherche sur disque (job inconnu ou déplacé par un autre processus)."""
+        for loc in LOCATIONS:
+            path = self._path(loc, job_id)
+            data = read_json(path)
+            if data:
+                self.record(path, data)
+                return data
+        with self._lock:
+            self._drop(job_id)
+        return None
+
+    def counts(self) -> Dict[str, int]:
+        """Nombre de jobs par emplacement."""
+        out = {loc: 0 for loc in LOCATIONS}
+        with self._lock:
+            for loc, _, _ in self._jobs.values():
+                out[loc] += 1
+        return out
@@ -0,0 +1,106 @@
+"""
+Espace de travail local (tmpfs, NVMe) pour les intermédiaires d'un job de préparation.
+
+``pages/`` et ``raw.tmp.pdf`` sont écrits puis relus plusieurs fois : sur un
+``WORK_DIR`` monté en réseau (NFS), ces allers-retours dominent la durée du
+job. Avec ``PREP_SCRATCH_DIR``, ils vivent dans ``<scratch>/<jobId>/`` et seul
+le ``raw.pdf`` terminé est recopié dans le répertoire partagé du job.
+
+Un job n'obtient l'espace local que si son besoin estimé tient dans le budget
+(``PREP_SCRATCH_BUDGET_MB``, réservations des jobs en cours déduites) et dans
+l'espace libre du volume, lui aussi diminué des réservations en cours (les
+jobs qui viennent de réserver n'ont encore rien écrit) ; sinon il travaille
+sur le volume partagé, comme sans scratch.
+
+Les réservations vivent dans le processus du service : ``execute_job`` réserve
+avant de lancer ``run_job`` (thread ou processus du pool) et libère après, le
+répertoire choisi est passé en argument à ``run_job``.
+"""
+import os
+import shutil
+import threading
+from typing import Dict, Optional
+
+from app.utils import ensure_dir
+
+
+class ScratchSpace:
+    """
+    Réservations d'espace local par job.
+
+    :param root: Répertoire local ("" = désactivé).
+    :param budget_bytes: Budget total réservable (0 = limité par l'espace libre seul).
+    """
+
+    def __init__(self, root: str, budget_bytes: int = 0):
+        self.root = root
+        # Sous-dossier dédié : la purge au démarrage ne touche jamais le reste du volume
+        self.base = os.path.join(root, "prep-jobs") if root else ""
+        self.budget_bytes = max(0, budget_bytes)
+        self._lock = threading.Lock()
+        self._reserved: Dict[str, int] = {}
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.root)
+
+    def reserved_bytes(self) -> int:
+        with self._lock:
+            return sum(self._reserved.values())
+
+    def acquire(self, job_id: str, need_bytes: int) -> Optional[str]:
+        """
+        Réserve l'espace d'un job et crée son répertoire local (vidé).
+
+        :param job_id: Identifiant du job.
+        :param need_bytes: Besoin estimé (pages extraites + PDF temporaire).
+        :return: Répertoire local du job, ou None (repli sur le volume partagé).
+        """
+        if not self.enabled:
+            return None
+        with self._lock:
+            used = sum(v for k, v in self._reserved.items() if k != job_id)
+            if self.budget_bytes and used + need_bytes > self.budget_bytes:
+                return None
+            try:
+                ensure_dir(self.base)
+                free = shutil.disk_usage(self.base).free
+            except OSError:
+                return None
+            # Les jobs réservés écrivent encore : leur réservation est déduite de l'espace libre
+            if need_bytes > free - used:
+                return None
+            self._reserved[job_id] = need_bytes
+        path = os.path.join(self.base, job_id)
+        shutil.rmtree(path, ignore_errors=True)
+        ensure_dir(path)
+        return path
+
+    def release(self, job_id: str) -> None:
+        """Supprime le répertoire local du job et libère sa réservation."""
+        with self._lock:
+            held = self._reserved.pop(job_id, None)
+        if held is not None:
+            shutil.rmtree(os.path.join(self.base, job_id), ignore_errors=True)
+
+    def purge(self) -> None:
+        """Au démarrage : supprime les répertoires laissés par un arrêt brutal."""
+        if not self.enabled or not os.path.isdir(self.base):
+            return
+        for name in os.listdir(self.base):
+            shutil.rmtree(os.path.join(self.base, name), ignore_errors=True)
+
+
+def estimate_need(input_path: str, factor: float = 2.0) -> int:
+    """
+    Besoin d'espace estimé d'un job : pages extraites (≈ taille de l'archive,
+    les images sont déjà compressées) plus le PDF temporaire (idem).
+
+    :param input_path: Archive d'entrée.
+    :param factor: Multiplicateur appliqué à la taille de l'archive.
+    :return: Octets.
+    """
+    try:
+        return int(os.path.getsize(input_path) * factor)
+    except OSError:
+        return 0
@@ -0,0 +1,108 @@
+"""
+Exécution des jobs de préparation dans des processus dédiés (``PREP_EXECUTOR=process``).
+
+Les threads ``worker_loop`` restent les propriétaires de la file d'attente
+(réclamation, déplacement DONE/ERROR, callback) ; seul ``run_job`` est
+délégué à un processus du pool. Le processus fils écrit ``prep.heartbeat``
+et l'état du job dans les mêmes fichiers qu'en mode thread (contrat
+inchangé pour l'orchestrateur) et renvoie au parent un rapport d'exécution
+(pid, jobs traités, pic RSS, durée).
+
+Chaque processus est recyclé après ``max_jobs_per_worker`` jobs : les
+fragments laissés par Pillow/img2pdf sur de grosses archives sont rendus
+au système au lieu de s'accumuler. Un processus tué (OOM, signal) casse
+le pool : le job en cours passe en erreur et le pool est recréé.
+"""
+import multiprocessing
+import os
+import resource
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Callable, Optional
+
+_jobs_in_process = 0
+
+
+class WorkerCrashed(RuntimeError):
+    """Le processus fils a disparu en cours de job (OOM, signal)."""
+
+
+def run_in_worker(fn: Callable[..., None], job_meta_path: str, *args) -> dict:
+    """
+    Exécuté dans le processus fils : lance ``fn(job_meta_path, *args)`` et mesure.
+
+    :return: Rapport d'exécution ``{pid, jobsInProcess, seconds, maxRssMb}``.
+    """
+    global _jobs_in_process
+    _jobs_in_process += 1
+    t0 = time.monotonic()
+    fn(job_meta_path, *args)
+    return {
+        "pid": os.getpid(),
+        "jobsInProcess": _jobs_in_process,
+        "seconds": round(time.monotonic() - t0, 3),
+        "maxRssMb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+    }
+
+
+class JobProcessPool:
+    """
+    Pool de processus ``spawn`` avec recyclage et reconstruction après crash.
+
+    :param workers: Nombre de processus.
+    :param max_jobs_per_worker: Jobs traités avant recyclage d'un processus (0 = jamais).
+    """
+
+    def __init__(self, workers: int, max_jobs_per_worker: int = 0):
+        self.workers = max(1, workers)
+        self.max_jobs_per_worker = max(0, max_jobs_per_worker)
+        self.restarts = 0
+        self._lock = threading.Lock()
+        self._pool = self._new_pool()
+
+    def _new_pool(self) -> ProcessPoolExecutor:
+        return ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            max_tasks_per_child=self.max_jobs_per_worker or None,
+        )
+
+    def run(self, fn: Callable[..., None], job_meta_path: str, *args) -> dict:
+        """
+        Exécute ``fn(job_meta_path, *args)`` dans un processus du pool et attend la fin.
+        Les exceptions levées par ``fn`` sont propagées telles quelles.
+
+        :return: Rapport d'exécution du processus fils.
+        :raises WorkerCrashed: Si le processus fils a disparu en cours de job.
+        """
+        with self._lock:
+            pool = self._pool
+        try:
+            return pool.submit(run_in_worker, fn, job_meta_path, *args).result()
+        except BrokenProcessPool:
+            with self._lock:
+                if self._pool is pool:
+                    self._pool = self._new_pool()
+                    self.restarts += 1
+            pool.shutdown(wait=False, cancel_futures=True)
+            raise WorkerCrashed("prep worker process died")
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.workers,
+            "maxJobsPerWorker": self.max_jobs_per_worker,
+            "restarts": self.restarts,
+        }
+
+    def shutdown(self) -> None:
+        with self._lock:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+
+
+def make_pool(mode: str, workers: int, max_jobs_per_worker: int) -> Optional[JobProcessPool]:
+    """Retourne un ``JobProcessPool`` en mode ``process``, None en mode ``thread``."""
+    if mode == "process":
+        return JobProcessPool(workers, max_jobs_per_worker)
+    return None
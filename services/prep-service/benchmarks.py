@@ -0,0 +1,218 @@
+"""
+Benchmarks du prep-service. Deux sous-commandes :
+
+``memory`` — écriture du raw.pdf en mode ``memory`` (``img2pdf.convert``)
+contre le mode ``stream`` (``StreamingPdfWriter``). Génère des CBZ
+synthétiques (pages JPEG bruitées, donc peu compressibles), puis convertit
+chaque archive dans un processus neuf par mode pour mesurer le pic de
+mémoire résidente (``ru_maxrss``), le pic d'allocations Python
+(``tracemalloc``) et la durée.
+
+``scaling`` — débit (jobs/s) de ``run_job`` selon le nombre de workers,
+exécuteur ``thread`` contre ``process`` (``PREP_EXECUTOR``). Pages WEBP par
+défaut : décodées par Pillow puis recompressées, c'est le cas limité par le
+CPU (les JPEG sont recopiés tels quels).
+
+Produit un rapport JSON. Outils externes non requis (chemin ZIP direct,
+sans 7z). Non exécuté par la suite de tests ; usage ::
+
+    python benchmarks.py memory --pages 200 --width 1600 --height 2400 --out bench.json
+    python benchmarks.py scaling --workers 1 2 4 8 --jobs 16 --out scaling.json
+"""
+import argparse
+import io
+import shutil
+import json
+import multiprocessing
+import os
+import resource
+import sys
+import tempfile
+import time
+import tracemalloc
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+MODES = ("memory", "stream")
+EXECUTORS = ("thread", "process")
+
+
+def make_cbz(path: str, pages: int, width: int, height: int, quality: int = 90,
+             fmt: str = "JPEG") -> int:
+    """
+    Crée un CBZ de ``pages`` images bruitées (taille proche d'un scan réel).
+
+    :param fmt: Format Pillow des pages (``JPEG``, ``WEBP``, ``PNG``...).
+    :return: Taille de l'archive en octets.
+    """
+    from PIL import Image
+
+    ext = {"JPEG": "jpg"}.get(fmt.upper(), fmt.lower())
+    with zipfile.ZipFile(path, "w", compression=zipfile.ZIP_STORED) as zf:
+        for i in range(pages):
+            noise = Image.effect_noise((width, height), 64 + i % 32).convert("RGB")
+            buf = io.BytesIO()
+            noise.save(buf, format=fmt.upper(), quality=quality)
+            zf.writestr(f"{i + 1:04d}.{ext}", buf.getvalue())
+    return os.path.getsize(path)
+
+
+def _convert(archive: str, dest: str, mode: str, queue) -> None:
+    """Exécuté dans un processus fils : une conversion, mesures de mémoire."""
+    from app.core import zip_images_to_pdf
+
+    base_rss_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    pages = zip_images_to_pdf(archive, dest, streaming=(mode == "stream"))
+    elapsed = time.perf_counter() - t0
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    rss_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    queue.put({
+        "mode": mode,
+        "pages": pages,
+        "seconds": round(elapsed, 3),
+        "peak_rss_mb": round(rss_kb / 1024, 1),
+        "peak_rss_delta_mb": round((rss_kb - base_rss_kb) / 1024, 1),
+        "peak_python_alloc_mb": round(peak / (1024 * 1024), 1),
+        "pdf_mb": round(os.path.getsize(dest) / (1024 * 1024), 1),
+    })
+
+
+def run_mode(archive: str, mode: str, work_dir: str) -> dict:
+    """Lance une conversion dans un processus neuf (``spawn``) et retourne ses mesures."""
+    ctx = multiprocessing.get_context("spawn")
+    queue = ctx.Queue()
+    dest = os.path.join(work_dir, f"raw-{mode}.pdf")
+    proc = ctx.Process(target=_convert, args=(archive, dest, mode, queue))
+    proc.start()
+    result = queue.get()
+    proc.join()
+    os.remove(dest)
+    return result
+
+
+def bench_memory(args) -> dict:
+    report = {"width": args.width, "height": args.height, "runs": []}
+    with tempfile.TemporaryDirectory(prefix="prep-bench-") as tmp:
+        for pages in args.pages:
+            archive = os.path.join(tmp, f"synthetic-{pages}.cbz")
+            size = make_cbz(archive, pages, args.width, args.height)
+            for _ in range(args.repeat):
+                for mode in MODES:
+                    run = run_mode(archive, mode, tmp)
+                    run["archive_mb"] = round(size / (1024 * 1024), 1)
+                    report["runs"].append(run)
+                    print(f"{pages:5d} pages  {mode:6s}  rss={run['peak_rss_mb']:8.1f} Mo  "
+                          f"alloc={run['peak_python_alloc_mb']:8.1f} Mo  {run['seconds']:6.2f} s",
+                          file=sys.stderr)
+    return report
+
+
+def _warmup(_job_meta_path: str) -> None:
+    """Tâche vide : démarre les processus du pool avant la mesure."""
+
+
+def _make_jobs(tmp: str, archive: str, count: int, tag: str) -> list:
+    from app.utils import atomic_write_json, ensure_dir
+
+    ensure_dir(os.path.join(tmp, "running"))
+    work_dir = os.path.join(tmp, f"work-{tag}")
+    shutil.rmtree(work_dir, ignore_errors=True)
+    metas = []
+    for i in range(count):
+        meta = os.path.join(tmp, "running", f"{tag}-{i}.json")
+        atomic_write_json(meta, {"jobId": f"{tag}-{i}", "inputPath": archive, "workDir": work_dir})
+        metas.append(meta)
+    return metas
+
+
+def run_scaling(archive: str, executor: str, workers: int, jobs: int, tmp: str) -> dict:
+    """
+    Exécute ``jobs`` jobs ``run_job`` avec ``workers`` workers concurrents,
+    comme ``worker_loop`` (un thread par worker, délégation au pool en mode process).
+    """
+    from app.main import run_job
+    from app.worker_pool import JobProcessPool
+
+    metas = _make_jobs(tmp, archive, jobs, f"{executor}-{workers}")
+    pool = JobProcessPool(workers) if executor == "process" else None
+    threads = ThreadPoolExecutor(max_workers=workers)
+    try:
+        if pool is not None:
+            list(threads.map(lambda m: pool.run(_warmup, m), metas[:workers]))
+            run = lambda m: pool.run(run_job, m)  # noqa: E731
+        else:
+            run = run_job
+        t0 = time.perf_counter()
+        list(threads.map(run, metas))
+        elapsed = time.perf_counter() - t0
+    finally:
+        threads.shutdown()
+        if pool is not None:
+            pool.shutdown()
+    return {
+        "executor": executor,
+        "workers": workers,
+        "jobs": jobs,
+        "seconds": round(elapsed, 3),
+        "jobs_per_s": round(jobs / elapsed, 3),
+    }
+
+
+def bench_scaling(args) -> dict:
+    report = {"width": args.width, "height": args.height, "pages": args.pages,
+              "format": args.format, "cpu_count": os.cpu_count(), "runs": []}
+    with tempfile.TemporaryDirectory(prefix="prep-bench-") as tmp:
+        archive = os.path.join(tmp, "synthetic.cbz")
+        make_cbz(archive, args.pages, args.width, args.height, fmt=args.format)
+        baseline = {}
+        for executor in EXECUTORS:
+            for workers in args.workers:
+                run = run_scaling(archive, executor, workers, args.jobs, tmp)
+                baseline.setdefault(executor, run["jobs_per_s"])
+                run["speedup"] = round(run["jobs_per_s"] / baseline[executor], 2)
+                report["runs"].append(run)
+                print(f"{executor:7s}  {workers:3d} workers  {run['jobs_per_s']:7.2f} jobs/s  "
+                      f"x{run['speedup']:5.2f}", file=sys.stderr)
+    return report
+
+
+def main(argv=None) -> dict:
+    parser = argparse.ArgumentParser(description="Benchmarks du prep-service")
+    sub = parser.add_subparsers(dest="bench", required=True)
+
+    mem = sub.add_parser("memory", help="Pic mémoire : écriture memory contre stream")
+    mem.add_argument("--pages", type=int, nargs="+", default=[50, 200],
+                     help="Nombre de pages par archive synthétique")
+    mem.add_argument("--repeat", type=int, default=1, help="Répétitions par mode")
+
+    scal = sub.add_parser("scaling", help="Débit selon le nombre de workers, thread contre process")
+    scal.add_argument("--workers", type=int, nargs="+",
+                      default=sorted({1, 2, 4, os.cpu_count() or 1}),
+                      help="Nombres de workers à mesurer")
+    scal.add_argument("--jobs", type=int, default=16, help="Jobs par mesure")
+    scal.add_argument("--pages", type=int, default=10, help="Pages par archive")
+    scal.add_argument("--format", default="WEBP", help="Format des pages (WEBP, PNG, JPEG)")
+
+    for p, (w, h) in ((mem, (1600, 2400)), (scal, (1200, 1800))):
+        p.add_argument("--width", type=int, default=w)
+        p.add_argument("--height", type=int, default=h)
+        p.add_argument("--out", help="Fichier JSON de sortie (stdout sinon)")
+    args = parser.parse_args(argv)
+
+    report = bench_memory(args) if args.bench == "memory" else bench_scaling(args)
+    text = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(text)
+    else:
+        print(text)
+    return report
+
+
+if __name__ == "__main__":
+    main()
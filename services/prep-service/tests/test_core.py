@@ -2,14 +2,22 @@
 Tests unitaires du prep-service — tri naturel, filtrage images, génération PDF.
 Aucun outil externe requis (7z non invoqué).
 """
+import io
 import os
 import sys
+import zipfile
 
 # Permettre l'import du package app depuis le dossier service
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
 
 import pytest
-from app.core import filter_images, sort_images, images_to_pdf
+from unittest.mock import MagicMock, patch
+from app.core import (
+    filter_images, sort_images, images_to_pdf, image_manifest, is_image_member,
+    list_zip_images, parse_7z_listing, zip_images_to_pdf,
+    build_extract_manifest, sha256_from_job_id, verify_extract_manifest,
+)
+from app.pdf_stream import StreamingPdfWriter
 
 
 # ---------------------------------------------------------------------------
@@ -167,3 +175,219 @@ class TestImagesToPdf:
         with pytest.raises(Exception):
             images_to_pdf([bad_file], dest)
 
+
+
+# ---------------------------------------------------------------------------
+# CBZ : lecture directe depuis l'archive ZIP (sans extraction)
+# ---------------------------------------------------------------------------
+
+def _png_bytes(color) -> bytes:
+    from PIL import Image
+    buf = io.BytesIO()
+    Image.new("RGB", (10, 10), color=color).save(buf, format="PNG")
+    return buf.getvalue()
+
+
+class TestZipImages:
+    """Filtrage, tri et conversion PDF des pages lues dans un CBZ."""
+
+    def test_filtre_membres_comme_filter_images(self):
+        assert is_image_member("chap1/001.jpg")
+        assert is_image_member("002.PNG")
+        assert not is_image_member("__MACOSX/chap1/._001.jpg")
+        assert not is_image_member("chap1/Thumbs.db")
+        assert not is_image_member("ComicInfo.xml")
+        assert not is_image_member("chap1/")
+
+    def test_tri_naturel_des_membres(self, tmp_path):
+        archive = str(tmp_path / "a.cbz")
+        with zipfile.ZipFile(archive, "w") as zf:
+            for name in ["10.jpg", "2.jpg", "1.jpg", "info.txt"]:
+                zf.writestr(name, b"x")
+        with zipfile.ZipFile(archive) as zf:
+            assert [m.filename for m in list_zip_images(zf)] == ["1.jpg", "2.jpg", "10.jpg"]
+
+    def test_pdf_depuis_zip_sans_dossier_pages(self, tmp_path):
+        pytest.importorskip("PIL", reason="pillow requis pour générer des images de test")
+        archive = str(tmp_path / "a.cbz")
+        with zipfile.ZipFile(archive, "w") as zf:
+            zf.writestr("p2.png", _png_bytes((0, 128, 0)))
+            zf.writestr("p1.png", _png_bytes((128, 0, 0)))
+            zf.writestr("__MACOSX/._p1.png", b"parasite")
+        dest = str(tmp_path / "raw.pdf")
+
+        assert zip_images_to_pdf(archive, dest) == 2
+        with open(dest, "rb") as f:
+            assert f.read(4) == b"%PDF"
+        assert sorted(os.listdir(tmp_path)) == ["a.cbz", "raw.pdf"]
+
+    def test_zip_sans_image_leve_noimageserror(self, tmp_path):
+        from app.core import NoImagesError
+
+        archive = str(tmp_path / "a.cbz")
+        with zipfile.ZipFile(archive, "w") as zf:
+            zf.writestr("readme.txt", b"x")
+        with pytest.raises(NoImagesError):
+            zip_images_to_pdf(archive, str(tmp_path / "raw.pdf"))
+
+
+# ---------------------------------------------------------------------------
+# Écriture PDF en streaming (page par page)
+# ---------------------------------------------------------------------------
+
+class TestArchiveListing:
+    """Analyse de ``7z l -slt`` et manifeste des pages à extraire."""
+
+    SLT = (
+        "7-Zip [64] 16.02\n\nListing archive: a.cbr\n\n--\nPath = a.cbr\nType = Rar\n\n"
+        "----------\n"
+        "Path = Scans\nSize = 0\nAttributes = D....\n\n"
+        "Path = Scans/002.png\nSize = 20\nAttributes = ....A\n\n"
+        "Path = Scans/Thumbs.db\nSize = 7\nAttributes = ....A\n\n"
+        "Path = Scans/001.jpg\nSize = 10\nAttributes = ....A\n"
+    )
+
+    def test_parse_ignore_en_tete_archive(self):
+        entries = parse_7z_listing(self.SLT)
+        assert [e["path"] for e in entries] == ["Scans", "Scans/002.png", "Scans/Thumbs.db", "Scans/001.jpg"]
+        assert entries[0]["folder"] and not entries[1]["folder"]
+        assert entries[1]["size"] == 20
+
+    def test_manifeste_images_seulement(self):
+        manifest = image_manifest(parse_7z_listing(self.SLT))
+        assert [m["path"] for m in manifest] == ["Scans/002.png", "Scans/001.jpg"]
+
+    def test_sortie_sans_separateur(self):
+        assert parse_7z_listing("ERROR: a.cbr: Can not open the file as archive") == []
+
+
+class TestStreamingPdfWriter:
+    """Le mode stream produit les mêmes pages qu'img2pdf.convert."""
+
+    def _pages(self, data: bytes):
+        pikepdf = pytest.importorskip("pikepdf")
+        pdf = pikepdf.open(io.BytesIO(data))
+        return [
+            pikepdf.PdfImage(page.Resources.XObject.Im0).as_pil_image().tobytes()
+            for page in pdf.pages
+        ]
+
+    def test_pages_identiques_a_img2pdf(self):
+        pytest.importorskip("PIL", reason="pillow requis pour générer des images de test")
+        import img2pdf
+        from PIL import Image
+        from app.pdf_stream import IMG2PDF_SERIES
+
+        assert img2pdf.__version__.startswith(IMG2PDF_SERIES), (
+            f"img2pdf {img2pdf.__version__} installé, StreamingPdfWriter suit la série "
+            f"{IMG2PDF_SERIES}x (read_images/find_scale internes) : vérifier puis épingler"
+        )
+        images = []
+        for mode, fmt in [("RGB", "JPEG"), ("RGBA", "PNG"), ("L", "PNG"), ("P", "PNG")]:
+            buf = io.BytesIO()
+            img = Image.new("RGB", (12, 7), color=(200, 30, 90)).convert(mode)
+            img.save(buf, format=fmt)
+            images.append(buf.getvalue())
+
+        out = io.BytesIO()
+        writer = StreamingPdfWriter(out)
+        for data in images:
+            writer.add_image(data)
+        writer.close()
+
+        assert writer.page_count == 4
+        assert self._pages(out.getvalue()) == self._pages(img2pdf.convert(images))
+
+    def test_document_sans_page_leve_valuerror(self):
+        with pytest.raises(ValueError):
+            StreamingPdfWriter(io.BytesIO()).close()
+
+    def test_images_to_pdf_mode_stream(self, tmp_path):
+        pytest.importorskip("PIL", reason="pillow requis pour générer des images de test")
+        from PIL import Image
+
+        paths = []
+        for i in range(3):
+            path = str(tmp_path / f"p{i}.png")
+            Image.new("RGB", (10, 10), color=(i * 60, 0, 0)).save(path)
+            paths.append(path)
+        dest = str(tmp_path / "raw.pdf")
+
+        images_to_pdf(paths, dest, streaming=True)
+
+        with open(dest, "rb") as f:
+            assert len(self._pages(f.read())) == 3
+        assert not os.path.exists(dest + ".tmp")
+
+
+# ---------------------------------------------------------------------------
+# Manifeste d'extraction (PREP_RESUME)
+# ---------------------------------------------------------------------------
+
+class TestExtractManifest:
+    SHA = "ab" * 32
+
+    def _extraction(self, tmp_path):
+        archive = tmp_path / "in.cbr"
+        archive.write_bytes(b"archive")
+        pages = tmp_path / "pages"
+        pages.mkdir()
+        (pages / "1.png").write_bytes(b"png")
+        return str(archive), str(pages), [str(pages / "1.png")]
+
+    def test_sha256_lu_dans_le_job_id(self):
+        assert sha256_from_job_id(f"{self.SHA}__cd12") == self.SHA
+        assert sha256_from_job_id("job1") is None
+
+    def test_archive_non_relue(self, tmp_path, mocker):
+        archive, pages, images = self._extraction(tmp_path)
+        hashed = mocker.patch("app.utils.sha256_file")
+
+        manifest = build_extract_manifest(archive, pages, images, sha256=self.SHA)
+
+        hashed.assert_not_called()
+        assert manifest["archive"]["sha256"] == self.SHA
+        assert verify_extract_manifest(manifest, archive, pages) == images
+        hashed.assert_not_called()  # même mtime : pas de hachage
+
+    def test_mtime_different_sans_empreinte_reextraction(self, tmp_path):
+        archive, pages, images = self._extraction(tmp_path)
+        manifest = build_extract_manifest(archive, pages, images)
+        os.utime(archive, ns=(0, 0))
+
+        assert verify_extract_manifest(manifest, archive, pages) == []
+
+    def test_mtime_different_empreinte_identique(self, tmp_path):
+        import hashlib
+
+        archive, pages, images = self._extraction(tmp_path)
+        manifest = build_extract_manifest(archive, pages, images,
+                                          sha256=hashlib.sha256(b"archive").hexdigest())
+        os.utime(archive, ns=(0, 0))
+
+        assert verify_extract_manifest(manifest, archive, pages) == images
+
+
+# ---------------------------------------------------------------------------
+# notify_callback
+# ---------------------------------------------------------------------------
+
+class TestNotifyCallback:
+    """POST best-effort du statut vers l'orchestrateur."""
+
+    def test_succes_2xx(self):
+        from app.core import notify_callback
+        resp = MagicMock()
+        resp.status = 202
+        resp.__enter__ = lambda s: s
+        resp.__exit__ = lambda s, *a: False
+        with patch("app.core.urllib.request.urlopen", return_value=resp) as urlopen:
+            assert notify_callback("http://orch/callbacks/prep", {"jobId": "j1"}) is True
+        req = urlopen.call_args[0][0]
+        assert req.get_method() == "POST"
+        assert b'"jobId"' in req.data
+
+    def test_orchestrateur_injoignable_retourne_false(self):
+        from app.core import notify_callback
+        with patch("app.core.urllib.request.urlopen", side_effect=OSError("refused")):
+            assert notify_callback("http://orch/callbacks/prep", {"jobId": "j1"}) is False
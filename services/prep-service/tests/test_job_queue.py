@@ -0,0 +1,175 @@
+"""
+Tests de la file d'attente des jobs (backends ``dir`` et ``sqlite``) :
+ordre FIFO, priorités, réclamation atomique entre threads et processus.
+"""
+import multiprocessing
+import os
+import sys
+import threading
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import pytest
+
+from app.job_queue import DirQueue, SqliteQueue, make_queue
+
+
+def _make(backend: str, tmp_path):
+    return make_queue(backend, str(tmp_path / "queue"), str(tmp_path / "running"),
+                      str(tmp_path / "queue.db"))
+
+
+def _claim_all(queue) -> list:
+    out = []
+    while True:
+        path = queue.claim()
+        if path is None:
+            return out
+        out.append(os.path.basename(path)[:-5])
+
+
+def _claim_in_process(dirs, result):
+    """Exécuté dans un processus fils : vide la file SQLite partagée."""
+    queue = SqliteQueue(*dirs)
+    result.extend(_claim_all(queue))
+
+
+@pytest.fixture(params=["dir", "sqlite"])
+def backend(request):
+    return request.param
+
+
+class TestOrdre:
+
+    def test_fifo_par_date_de_soumission(self, tmp_path, backend):
+        queue = _make(backend, tmp_path)
+        for job_id in ("c", "a", "b"):
+            assert queue.put(job_id, {"jobId": job_id})
+
+        assert _claim_all(queue) == ["c", "a", "b"]
+
+    def test_priorite_puis_fifo(self, tmp_path, backend):
+        queue = _make(backend, tmp_path)
+        queue.put("low", {"jobId": "low"}, priority=-1)
+        queue.put("n1", {"jobId": "n1"})
+        queue.put("urgent", {"jobId": "urgent"}, priority=5)
+        queue.put("n2", {"jobId": "n2"})
+
+        assert _claim_all(queue) == ["urgent", "n1", "n2", "low"]
+
+    def test_doublon_refuse(self, tmp_path, backend):
+        queue = _make(backend, tmp_path)
+        assert queue.put("a", {"jobId": "a"})
+        assert not queue.put("a", {"jobId": "a"})
+        queue.claim()
+        assert not queue.put("a", {"jobId": "a"})  # en cours
+        assert queue.depth() == 0
+
+    def test_annulation_d_un_job_en_file(self, tmp_path, backend):
+        queue = _make(backend, tmp_path)
+        queue.put("a", {"jobId": "a"})
+        queue.put("b", {"jobId": "b"})
+
+        assert queue.cancel("a")
+        assert not queue.cancel("a")
+        assert queue.depth() == 1
+        assert _claim_all(queue) == ["b"]
+        assert not queue.cancel("b")  # déjà réclamé
+
+    def test_metadonnees_conservees(self, tmp_path, backend):
+        from app.utils import read_json
+
+        queue = _make(backend, tmp_path)
+        queue.put("a", {"jobId": "a", "state": "QUEUED"}, priority=3)
+        data = read_json(queue.claim())
+        assert data["state"] == "QUEUED" and data["priority"] == 3 and data["enqueuedAt"] > 0
+
+
+class TestCacheDir:
+
+    def test_cles_des_jobs_reclames_ailleurs_oubliees(self, tmp_path):
+        queue = _make("dir", tmp_path)
+        other = _make("dir", tmp_path)  # autre processus partageant queue/
+        for job_id in ("a", "b", "c"):
+            queue.put(job_id, {"jobId": job_id})
+        queue.claim()
+        assert set(queue._keys) == {"b.json", "c.json"}
+
+        assert _claim_all(other) == ["b", "c"]
+        assert queue.claim() is None
+        assert queue._keys == {}
+
+
+class TestReclamationConcurrente:
+
+    def test_threads_sans_double_reclamation(self, tmp_path, backend):
+        queue = _make(backend, tmp_path)
+        ids = [f"j{i:03d}" for i in range(60)]
+        for job_id in ids:
+            queue.put(job_id, {"jobId": job_id})
+        claimed, lock = [], threading.Lock()
+
+        def worker():
+            got = _claim_all(queue)
+            with lock:
+                claimed.extend(got)
+
+        threads = [threading.Thread(target=worker) for _ in range(6)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        assert sorted(claimed) == ids
+
+    def test_processus_sans_double_reclamation(self, tmp_path):
+        dirs = (str(tmp_path / "queue"), str(tmp_path / "running"), str(tmp_path / "queue.db"))
+        queue = SqliteQueue(*dirs)
+        ids = [f"j{i:03d}" for i in range(40)]
+        for job_id in ids:
+            queue.put(job_id, {"jobId": job_id})
+
+        ctx = multiprocessing.get_context("spawn")
+        with ctx.Manager() as manager:
+            result = manager.list()
+            procs = [ctx.Process(target=_claim_in_process, args=(dirs, result)) for _ in range(3)]
+            for p in procs:
+                p.start()
+            for p in procs:
+                p.join(30)
+            claimed = list(result)
+
+        assert sorted(claimed) == ids
+
+
+class TestSqliteRecover:
+
+    def test_running_remis_en_file_et_fichiers_indexes(self, tmp_path):
+        from app.utils import atomic_write_json
+
+        queue = _make("sqlite", tmp_path)
+        queue.put("a", {"jobId": "a"}, priority=1)
+        queue.put("b", {"jobId": "b"})
+        running = queue.claim()
+        # Redémarrage : le service remet running/ dans queue/, un fichier arrive hors index
+        os.replace(running, str(tmp_path / "queue" / "a.json"))
+        atomic_write_json(str(tmp_path / "queue" / "old.json"), {"jobId": "old"})
+        queue.release("gone")
+
+        restarted = _make("sqlite", tmp_path)
+        assert restarted.recover() == 3
+        assert _claim_all(restarted) == ["a", "old", "b"]
+
+    def test_entree_sans_fichier_ignoree(self, tmp_path):
+        queue = _make("sqlite", tmp_path)
+        queue.put("a", {"jobId": "a"})
+        queue.put("b", {"jobId": "b"})
+        os.remove(str(tmp_path / "queue" / "a.json"))
+
+        assert _claim_all(queue) == ["b"]
+
+
+def test_backend_inconnu(tmp_path):
+    with pytest.raises(ValueError):
+        _make("redis", tmp_path)
+    assert isinstance(_make("dir", tmp_path), DirQueue)
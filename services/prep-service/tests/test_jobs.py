@@ -0,0 +1,550 @@
+"""
+Tests unitaires du prep-service — exécution de jobs (7z mocké).
+Aucun outil externe requis.
+"""
+import io
+import json
+import os
+import sys
+import zipfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import pytest
+
+
+def _write_job_meta(path: str, data: dict):
+    """Écrit un fichier de métadonnées JSON pour un job."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f)
+
+
+def _read_json(path: str) -> dict:
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _make_cbz(path: str, pages: int = 2):
+    pytest.importorskip("PIL", reason="pillow requis pour générer des images de test")
+    from PIL import Image
+    with zipfile.ZipFile(path, "w") as zf:
+        for i in range(pages):
+            buf = io.BytesIO()
+            Image.new("RGB", (10, 10), color=(i * 40, 0, 0)).save(buf, format="PNG")
+            zf.writestr(f"{i + 1:03d}.png", buf.getvalue())
+
+
+def _job(tmp_path, input_path: str) -> str:
+    work_dir = str(tmp_path / "work")
+    meta_path = str(tmp_path / "running" / "job1.json")
+    _write_job_meta(meta_path, {"jobId": "job1", "inputPath": input_path, "workDir": work_dir})
+    return meta_path
+
+
+class TestRunJobZip:
+    """CBZ au format ZIP : pages lues directement, 7z non invoqué."""
+
+    def test_cbz_sans_7z_ni_pages(self, tmp_path, mocker):
+        import app.main as svc
+
+        cbz = str(tmp_path / "in.cbz")
+        _make_cbz(cbz, pages=3)
+        meta_path = _job(tmp_path, cbz)
+        run = mocker.patch.object(svc.subprocess, "run")
+
+        svc.run_job(meta_path)
+
+        run.assert_not_called()
+        data = _read_json(meta_path)
+        assert data["state"] == "DONE"
+        assert os.path.exists(data["artifacts"]["rawPdf"])
+        assert os.listdir(str(tmp_path / "work" / "job1" / "pages")) == []
+
+    def test_archive_non_zip_repli_7z(self, tmp_path, mocker):
+        import app.main as svc
+
+        cbr = str(tmp_path / "in.cbr")
+        with open(cbr, "wb") as f:
+            f.write(b"Rar!\x1a\x07\x00 fake")
+        meta_path = _job(tmp_path, cbr)
+        run = mocker.patch.object(svc.subprocess, "run",
+                                  return_value=mocker.Mock(returncode=2, stdout="", stderr="boom"))
+
+        with pytest.raises(RuntimeError, match="7z failed"):
+            svc.run_job(meta_path)
+
+        assert run.call_args[0][0][:2] == ["7z", "x"]
+        assert _read_json(meta_path)["state"] == "ERROR"
+
+    def test_zip_chiffre_repli_7z(self, tmp_path, mocker):
+        import app.main as svc
+
+        cbz = str(tmp_path / "in.cbz")
+        _make_cbz(cbz)
+        mocker.patch.object(svc, "zip_images_to_pdf", side_effect=NotImplementedError("archive ZIP chiffrée"))
+        run = mocker.patch.object(svc.subprocess, "run",
+                                  return_value=mocker.Mock(returncode=2, stdout="", stderr=""))
+
+        with pytest.raises(RuntimeError):
+            svc.run_job(_job(tmp_path, cbz))
+
+        # Listing en échec (rc=2) : extraction complète
+        assert [c[0][0][:2] for c in run.call_args_list] == [["7z", "l"], ["7z", "x"]]
+        assert "@" not in run.call_args[0][0][-1]
+
+
+    def test_archive_sans_image_erreur_dediee(self, tmp_path, mocker):
+        import app.main as svc
+
+        cbz = str(tmp_path / "in.cbz")
+        with zipfile.ZipFile(cbz, "w") as zf:
+            zf.writestr("readme.txt", b"x")
+        run = mocker.patch.object(svc.subprocess, "run")
+
+        with pytest.raises(RuntimeError, match="no images found"):
+            svc.run_job(_job(tmp_path, cbz))
+        run.assert_not_called()
+
+    def test_autre_valueerror_message_conserve(self, tmp_path, mocker):
+        import app.main as svc
+
+        cbz = str(tmp_path / "in.cbz")
+        _make_cbz(cbz)
+        mocker.patch.object(svc, "zip_images_to_pdf",
+                            side_effect=ValueError("Cannot have Palette images with ICC profile"))
+        meta_path = _job(tmp_path, cbz)
+
+        with pytest.raises(ValueError, match="Palette"):
+            svc.run_job(meta_path)
+        data = _read_json(meta_path)
+        assert data["state"] == "ERROR"
+        assert "Palette" in data["message"]
+
+
+class TestScratch:
+    """PREP_SCRATCH_DIR : intermédiaires sur le scratch local, raw.pdf seul sur le volume partagé."""
+
+    def test_intermediaires_sur_scratch(self, tmp_path, monkeypatch, mocker):
+        import app.main as svc
+        from app.scratch import ScratchSpace
+
+        scratch = ScratchSpace(str(tmp_path / "scratch"))
+        monkeypatch.setattr(svc, "SCRATCH", scratch)
+        seen = {}
+        real = svc.zip_images_to_pdf
+
+        def spy(archive, dest, **kwargs):
+            seen["dest"] = dest
+            return real(archive, dest, **kwargs)
+
+        mocker.patch.object(svc, "zip_images_to_pdf", side_effect=spy)
+        cbz = str(tmp_path / "in.cbz")
+        _make_cbz(cbz)
+        meta_path = _job(tmp_path, cbz)
+
+        svc.execute_job(meta_path)
+
+        assert seen["dest"].startswith(scratch.base)
+        job_dir = tmp_path / "work" / "job1"
+        assert sorted(os.listdir(str(job_dir))) == ["prep.heartbeat", "prep.log", "raw.pdf"]
+        assert os.listdir(scratch.base) == []
+        assert scratch.reserved_bytes() == 0
+
+    def test_budget_depasse_repli_volume_partage(self, tmp_path, monkeypatch):
+        import app.main as svc
+        from app.scratch import ScratchSpace
+
+        scratch = ScratchSpace(str(tmp_path / "scratch"), budget_bytes=10)
+        monkeypatch.setattr(svc, "SCRATCH", scratch)
+        cbz = str(tmp_path / "in.cbz")
+        _make_cbz(cbz)
+        meta_path = _job(tmp_path, cbz)
+
+        svc.execute_job(meta_path)
+
+        assert _read_json(meta_path)["state"] == "DONE"
+        assert os.path.isdir(str(tmp_path / "work" / "job1" / "pages"))
+        with open(str(tmp_path / "work" / "job1" / "prep.log"), encoding="utf-8") as f:
+            assert "budget insuffisant" in f.read()
+
+    def test_reservations_bornees_par_le_budget(self, tmp_path):
+        from app.scratch import ScratchSpace
+
+        scratch = ScratchSpace(str(tmp_path / "scratch"), budget_bytes=100)
+        assert scratch.acquire("a", 60)
+        assert scratch.acquire("b", 60) is None
+        scratch.release("a")
+        assert scratch.acquire("b", 60)
+        assert not os.path.exists(os.path.join(scratch.base, "a"))
+
+    def test_espace_libre_diminue_des_reservations(self, tmp_path, mocker):
+        """Sans budget : deux jobs qui réservent avant d'écrire ne dépassent pas l'espace libre."""
+        import app.scratch as scratch_mod
+
+        mocker.patch.object(scratch_mod.shutil, "disk_usage",
+                            return_value=mocker.Mock(free=100))
+        scratch = scratch_mod.ScratchSpace(str(tmp_path / "scratch"))
+        assert scratch.acquire("a", 60)
+        assert scratch.acquire("b", 60) is None
+        assert scratch.acquire("c", 40)
+
+    def test_reservation_dans_le_parent_en_mode_process(self, tmp_path, monkeypatch):
+        """PREP_EXECUTOR=process : le budget est tenu par le service, le fils reçoit le répertoire."""
+        import app.main as svc
+        from app.scratch import ScratchSpace
+        from app.worker_pool import JobProcessPool
+
+        scratch = ScratchSpace(str(tmp_path / "scratch"), budget_bytes=100)
+        monkeypatch.setattr(svc, "SCRATCH", scratch)
+        cbz = str(tmp_path / "in.cbz")
+        with open(cbz, "wb") as f:
+            f.write(b"x" * 20)  # besoin estimé : 40 octets
+        meta_path = _job(tmp_path, cbz)
+        pool = JobProcessPool(1)
+        monkeypatch.setattr(svc, "_pool", pool)
+        monkeypatch.setattr(svc, "run_job", _record_scratch)
+        try:
+            svc.execute_job(meta_path)
+            first = _read_json(meta_path)["scratchDir"]
+            assert scratch.acquire("other", 70)  # budget restant : 30 octets
+            svc.execute_job(meta_path)
+            second = _read_json(meta_path)["scratchDir"]
+        finally:
+            pool.shutdown()
+
+        assert first == os.path.join(scratch.base, "job1")
+        assert second is None
+        assert scratch.reserved_bytes() == 70
+
+
+_SLT = """
+7-Zip [64] 16.02
+
+--
+Path = /in/in.cbr
+Type = Rar
+
+----------
+Path = __MACOSX/._001.jpg
+Folder = -
+Size = 4096
+
+Path = chap1
+Folder = +
+Size = 0
+
+Path = chap1/001.jpg
+Folder = -
+Size = 1000
+
+Path = chap1/release.nfo
+Folder = -
+Size = 500
+
+Path = chap1/covers.zip
+Folder = -
+Size = 90000
+
+"""
+
+
+class TestSelectiveExtract:
+    """CBR : listing 7z puis extraction des seuls membres images."""
+
+    def _run(self, tmp_path, mocker, listing_rc=0, stdout=_SLT):
+        import app.main as svc
+
+        cbr = str(tmp_path / "in.cbr")
+        with open(cbr, "wb") as f:
+            f.write(b"Rar!\x1a\x07\x00 fake")
+        meta_path = _job(tmp_path, cbr)
+
+        def fake_run(cmd, **kwargs):
+            if cmd[1] == "l":
+                return mocker.Mock(returncode=listing_rc, stdout=stdout, stderr="")
+            return mocker.Mock(returncode=2, stdout="", stderr="stop")
+
+        run = mocker.patch.object(svc.subprocess, "run", side_effect=fake_run)
+        with pytest.raises(RuntimeError) as exc:
+            svc.run_job(meta_path)
+        return run, exc.value
+
+    def test_extraction_limitee_aux_images(self, tmp_path, mocker):
+        run, _ = self._run(tmp_path, mocker)
+
+        cmd = run.call_args[0][0]
+        assert cmd[:2] == ["7z", "x"] and "-spd" in cmd
+        list_path = cmd[-1][1:]
+        with open(list_path, encoding="utf-8") as f:
+            assert f.read().splitlines() == ["chap1/001.jpg"]
+
+    def test_aucune_image_sans_extraction(self, tmp_path, mocker):
+        slt = _SLT.split("Path = chap1/001.jpg")[0]
+        run, err = self._run(tmp_path, mocker, stdout=slt)
+
+        assert "no images" in str(err)
+        assert [c[0][0][1] for c in run.call_args_list] == ["l"]
+
+    def test_listing_en_echec_extraction_complete(self, tmp_path, mocker):
+        run, err = self._run(tmp_path, mocker, listing_rc=2)
+
+        assert "7z failed" in str(err)
+        assert not run.call_args[0][0][-1].startswith("@")
+
+
+class TestResume:
+    """PREP_RESUME : une nouvelle tentative réutilise pages/ si le manifeste est vérifié."""
+
+    def _fake_7z(self, mocker, calls):
+        pytest.importorskip("PIL", reason="pillow requis pour générer des images de test")
+        from PIL import Image
+
+        def fake_run(cmd, **kwargs):
+            calls.append(cmd[1])
+            if cmd[1] == "l":
+                return mocker.Mock(returncode=2, stdout="", stderr="")
+            out_dir = next(a[2:] for a in cmd if a.startswith("-o"))
+            os.makedirs(out_dir, exist_ok=True)
+            for i in range(2):
+                Image.new("RGB", (8, 8), (i * 90, 0, 0)).save(os.path.join(out_dir, f"{i + 1}.png"))
+            return mocker.Mock(returncode=0, stdout="", stderr="")
+
+        return fake_run
+
+    def _cbr(self, tmp_path) -> str:
+        cbr = str(tmp_path / "in.cbr")
+        with open(cbr, "wb") as f:
+            f.write(b"Rar!\x1a\x07\x00 fake")
+        return cbr
+
+    def test_retry_sans_reextraction(self, tmp_path, mocker):
+        import app.main as svc
+
+        calls = []
+        mocker.patch.object(svc.subprocess, "run", side_effect=self._fake_7z(mocker, calls))
+        meta_path = _job(tmp_path, self._cbr(tmp_path))
+        real = svc.images_to_pdf
+        mocker.patch.object(svc, "images_to_pdf", side_effect=RuntimeError("crash img2pdf"))
+        with pytest.raises(RuntimeError):
+            svc.run_job(meta_path)
+        assert os.path.exists(str(tmp_path / "work" / "job1" / "extract.manifest.json"))
+
+        svc.images_to_pdf.side_effect = real
+        svc.run_job(meta_path)
+
+        assert calls.count("x") == 1
+        data = _read_json(meta_path)
+        assert data["state"] == "DONE" and data["resumedPages"] == 2
+
+    def test_archive_modifiee_reextraction(self, tmp_path, mocker):
+        import app.main as svc
+
+        calls = []
+        mocker.patch.object(svc.subprocess, "run", side_effect=self._fake_7z(mocker, calls))
+        cbr = self._cbr(tmp_path)
+        meta_path = _job(tmp_path, cbr)
+        svc.run_job(meta_path)
+        with open(cbr, "ab") as f:
+            f.write(b"more")
+
+        svc.run_job(meta_path)
+
+        assert calls.count("x") == 2
+        assert "resumedPages" not in _read_json(meta_path)
+
+    def test_page_tronquee_reextraction(self, tmp_path, mocker):
+        import app.main as svc
+
+        calls = []
+        mocker.patch.object(svc.subprocess, "run", side_effect=self._fake_7z(mocker, calls))
+        meta_path = _job(tmp_path, self._cbr(tmp_path))
+        svc.run_job(meta_path)
+        with open(str(tmp_path / "work" / "job1" / "pages" / "2.png"), "wb") as f:
+            f.write(b"x")
+
+        svc.run_job(meta_path)
+
+        assert calls.count("x") == 2
+
+    def test_reprise_desactivee(self, tmp_path, mocker, monkeypatch):
+        import app.main as svc
+
+        monkeypatch.setattr(svc, "RESUME", False)
+        calls = []
+        mocker.patch.object(svc.subprocess, "run", side_effect=self._fake_7z(mocker, calls))
+        meta_path = _job(tmp_path, self._cbr(tmp_path))
+        svc.run_job(meta_path)
+        svc.run_job(meta_path)
+
+        assert calls.count("x") == 2
+        assert not os.path.exists(str(tmp_path / "work" / "job1" / "extract.manifest.json"))
+
+
+def _die(job_meta_path: str, scratch_dir=None):
+    """Simule un processus fils tué en cours de job (OOM)."""
+    os._exit(9)
+
+
+def _noop(job_meta_path: str):
+    pass
+
+
+def _record_scratch(job_meta_path: str, scratch_dir=None):
+    """Exécuté dans le processus fils : note le répertoire scratch reçu du parent."""
+    from app.utils import atomic_write_json, read_json
+
+    atomic_write_json(job_meta_path, dict(read_json(job_meta_path), scratchDir=scratch_dir))
+
+
+class TestProcessPool:
+    """PREP_EXECUTOR=process : run_job dans des processus spawn recyclés."""
+
+    def test_job_execute_dans_un_processus(self, tmp_path, monkeypatch):
+        import app.main as svc
+        from app.worker_pool import JobProcessPool
+
+        cbz = str(tmp_path / "in.cbz")
+        _make_cbz(cbz, pages=2)
+        meta_path = _job(tmp_path, cbz)
+        pool = JobProcessPool(1, max_jobs_per_worker=5)
+        monkeypatch.setattr(svc, "_pool", pool)
+        try:
+            svc.execute_job(meta_path)
+        finally:
+            pool.shutdown()
+
+        data = _read_json(meta_path)
+        assert data["state"] == "DONE"
+        assert os.path.exists(data["artifacts"]["rawPdf"])
+        assert data["worker"]["pid"] != os.getpid()
+        assert data["worker"]["jobsInProcess"] == 1
+
+    def test_recyclage_apres_n_jobs(self, tmp_path):
+        from app.worker_pool import JobProcessPool
+
+        pool = JobProcessPool(1, max_jobs_per_worker=1)
+        try:
+            first = pool.run(_noop, "a")
+            second = pool.run(_noop, "b")
+        finally:
+            pool.shutdown()
+        assert first["pid"] != second["pid"]
+        assert second["jobsInProcess"] == 1
+
+    def test_processus_tue_job_en_erreur_et_pool_recree(self, tmp_path, monkeypatch):
+        import app.main as svc
+        from app.worker_pool import JobProcessPool, WorkerCrashed
+
+        meta_path = _job(tmp_path, str(tmp_path / "in.cbz"))
+        pool = JobProcessPool(1)
+        monkeypatch.setattr(svc, "_pool", pool)
+        monkeypatch.setattr(svc, "run_job", _die)
+        try:
+            with pytest.raises(WorkerCrashed):
+                svc.execute_job(meta_path)
+            assert pool.restarts == 1
+            assert pool.run(_noop, "x")["jobsInProcess"] == 1
+        finally:
+            pool.shutdown()
+
+        data = _read_json(meta_path)
+        assert data["state"] == "ERROR"
+        assert data["error"]["type"] == "WorkerCrashed"
+
+
+# ---------------------------------------------------------------------------
+# Callback de fin de job
+# ---------------------------------------------------------------------------
+
+class TestNotifyCompletion:
+    """Notification de l'orchestrateur en fin de job (callbackUrl)."""
+
+    def test_callback_envoye_avec_le_statut(self, tmp_path, mocker):
+        import app.main as svc
+
+        meta_path = str(tmp_path / "cbjob.json")
+        _write_job_meta(meta_path, {
+            "jobId": "cbjob",
+            "state": "DONE",
+            "callbackUrl": "http://orchestrator:8080/callbacks/prep",
+        })
+        notify = mocker.patch.object(svc, "notify_callback", return_value=True)
+
+        svc.notify_completion(meta_path)
+
+        notify.assert_called_once()
+        url, payload = notify.call_args[0]
+        assert url.endswith("/callbacks/prep")
+        assert payload["state"] == "DONE"
+
+    def test_sans_callback_aucun_appel(self, tmp_path, mocker):
+        import app.main as svc
+
+        meta_path = str(tmp_path / "nocb.json")
+        _write_job_meta(meta_path, {"jobId": "nocb", "state": "ERROR"})
+        notify = mocker.patch.object(svc, "notify_callback")
+
+        svc.notify_completion(meta_path)
+
+        notify.assert_not_called()
+
+
+# ---------------------------------------------------------------------------
+# Statut groupé
+# ---------------------------------------------------------------------------
+
+class TestBatchStatus:
+    """``GET /jobs?ids=...`` / ``POST /jobs/status`` : plusieurs états en une réponse."""
+
+    def _dirs(self, tmp_path, mocker):
+        import app.main as svc
+
+        dirs = {}
+        for name in ("queue", "running", "done", "error"):
+            dirs[name] = str(tmp_path / name)
+            mocker.patch.object(svc, f"{name.upper()}_DIR", dirs[name])
+        mocker.patch.object(svc, "_registry", None)
+        return svc, dirs
+
+    def test_etats_de_chaque_dossier_et_inconnus(self, tmp_path, mocker):
+        svc, dirs = self._dirs(tmp_path, mocker)
+        _write_job_meta(os.path.join(dirs["queue"], "a.json"), {"jobId": "a", "state": "QUEUED"})
+        _write_job_meta(os.path.join(dirs["running"], "b.json"), {"jobId": "b", "state": "RUNNING"})
+        _write_job_meta(os.path.join(dirs["done"], "c.json"), {"jobId": "c", "state": "DONE"})
+        _write_job_meta(os.path.join(dirs["error"], "d.json"), {"jobId": "d", "state": "ERROR"})
+
+        res = svc.status_many("a,b,c,d,zz,,a")
+
+        assert {k: v["state"] for k, v in res["jobs"].items()} == {
+            "a": "QUEUED", "b": "RUNNING", "c": "DONE", "d": "ERROR",
+        }
+        assert res["missing"] == ["zz"]
+        assert svc.status_many_post(svc.StatusBatch(ids=["c", "zz"])) == {
+            "jobs": {"c": {"jobId": "c", "state": "DONE"}}, "missing": ["zz"],
+        }
+
+    def test_ids_vides(self, tmp_path, mocker):
+        svc, _ = self._dirs(tmp_path, mocker)
+
+        assert svc.status_many() == {"jobs": {}, "missing": []}
+        assert svc.status_many("") == {"jobs": {}, "missing": []}
+        assert svc.status_many_post(svc.StatusBatch(ids=[])) == {"jobs": {}, "missing": []}
+
+
+class TestSubmitPriorite:
+    """``POST /jobs/prep`` avec ``priority`` : réclamé avant les jobs plus anciens."""
+
+    def test_priorite_reclamee_en_premier(self, tmp_path, monkeypatch):
+        import app.main as svc
+
+        for name in ("queue", "running", "done", "error"):
+            monkeypatch.setattr(svc, f"{name.upper()}_DIR", str(tmp_path / name))
+        monkeypatch.setattr(svc, "_job_queue", None)
+        monkeypatch.setattr(svc, "_registry", None)
+        svc.submit(svc.PrepSubmit(jobId="old", inputPath="/in/a.cbz", workDir="/w"))
+        svc.submit(svc.PrepSubmit(jobId="vip", inputPath="/in/b.cbz", workDir="/w", priority=10))
+
+        assert os.path.basename(svc.claim_one()) == "vip.json"
+        assert os.path.basename(svc.claim_one()) == "old.json"
+        assert svc.claim_one() is None
@@ -0,0 +1,246 @@
+"""
+Tests unitaires du prep-service — normalisation des pages (réduction, ré-encodage JPEG).
+Aucun outil externe requis (Pillow pour générer les images).
+"""
+import io
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import pytest
+
+pytest.importorskip("PIL", reason="pillow requis pour générer des images de test")
+from PIL import Image
+
+import app.normalize as normalize
+from app.normalize import Normalizer, is_grayscale, jpeg_to_gray_lossless
+
+
+def _image_bytes(size, fmt="PNG", mode="RGB", color=(200, 10, 10), **save) -> bytes:
+    buf = io.BytesIO()
+    Image.new(mode, size, color=color if mode != "L" else 128).save(buf, format=fmt, **save)
+    return buf.getvalue()
+
+
+def _open(data: bytes) -> Image.Image:
+    return Image.open(io.BytesIO(data))
+
+
+class TestPage:
+
+    def test_jpeg_dans_les_limites_intact(self):
+        data = _image_bytes((100, 150), fmt="JPEG")
+        norm = Normalizer(max_pixels=1_000_000, max_dpi=300)
+
+        assert norm.page(data) is data
+        assert norm.stats()["resized"] == 0
+
+    def test_png_surdimensionne_reduit_et_reencode(self):
+        data = _image_bytes((400, 600), dpi=(600, 600))
+        norm = Normalizer(max_pixels=60_000)
+
+        out = _open(norm.page(data))
+
+        assert out.format == "JPEG"
+        assert out.width * out.height <= 60_000 * 1.01
+        # Taille physique conservée : 400 px à 600 dpi = 200 px à 300 dpi
+        assert out.info["dpi"][0] == pytest.approx(600 * out.width / 400, abs=1)
+        stats = norm.stats()
+        assert stats["resized"] == 1 and stats["reencoded"] == 1
+
+    def test_plafond_dpi(self):
+        data = _image_bytes((400, 400), fmt="JPEG", dpi=(600, 600))
+        norm = Normalizer(max_dpi=300)
+
+        out = _open(norm.page(data))
+
+        assert out.size == (200, 200)
+        assert out.info["dpi"][0] == pytest.approx(300, abs=1)
+
+    def test_png_dans_les_limites_converti_en_jpeg(self, tmp_path):
+        path = str(tmp_path / "p.png")
+        Image.effect_noise((300, 300), 40).convert("RGB").save(path)
+        norm = Normalizer(max_pixels=10_000_000)
+
+        out = norm.page(path)
+
+        assert _open(out).format == "JPEG"
+        assert norm.stats()["bytesSaved"] > 0
+
+    def test_png_transparent_intact(self):
+        data = _image_bytes((50, 50), mode="RGBA", color=(1, 2, 3, 100))
+        assert Normalizer(max_pixels=10_000_000).page(data) is data
+
+    def test_reencodage_desactive(self):
+        data = _image_bytes((50, 50))
+        assert Normalizer(lossless_to_jpeg=False).page(data) is data
+
+    def test_image_illisible_laissee_a_img2pdf(self):
+        assert Normalizer().page(b"not an image") == b"not an image"
+
+
+class TestGrayscale:
+
+    def _gray_rgb(self, size=(120, 80)) -> Image.Image:
+        return Image.effect_noise(size, 50).convert("RGB")
+
+    def test_detection_chroma(self):
+        gray = self._gray_rgb()
+        assert is_grayscale(gray)
+        colored = gray.copy()
+        colored.paste((255, 0, 0), (0, 0, 30, 30))
+        assert not is_grayscale(colored)
+
+    def test_bruit_sous_le_seuil_toleré(self):
+        im = self._gray_rgb()
+        im.putpixel((0, 0), (255, 0, 0))  # 1 pixel sur 9600
+        assert is_grayscale(im, max_color_ratio=0.001)
+        assert not is_grayscale(im, max_color_ratio=0.0)
+
+    def test_grande_page_testee_sur_echantillon(self):
+        im = Image.new("RGB", (2000, 1500), (90, 90, 90))
+        assert is_grayscale(im)
+
+    def _gray_jpeg(self, size=(120, 80)) -> bytes:
+        buf = io.BytesIO()
+        self._gray_rgb(size).save(buf, format="JPEG", quality=95)
+        return buf.getvalue()
+
+    def test_page_grise_stockee_en_8_bits(self):
+        buf = io.BytesIO()
+        self._gray_rgb().save(buf, format="PNG")
+        norm = Normalizer(lossless_to_jpeg=False, grayscale=True)
+
+        out = _open(norm.page(buf.getvalue()))
+
+        assert out.mode == "L" and out.format == "PNG"  # source sans perte : reste sans perte
+        assert norm.stats()["grayscale"] == 1
+
+    def test_jpeg_dans_les_limites_sans_jpegtran_intact(self, monkeypatch):
+        """Pas de décodage + ré-encodage JPEG (génération de plus) pour le seul passage en gris."""
+        monkeypatch.setattr(normalize, "jpeg_to_gray_lossless", lambda raw: None)
+        data = self._gray_jpeg()
+        norm = Normalizer(grayscale=True)
+
+        assert norm.page(data) is data
+        assert norm.stats()["grayscale"] == 0
+
+    def test_jpeg_dans_les_limites_converti_sans_perte(self, monkeypatch):
+        buf = io.BytesIO()
+        Image.new("L", (120, 80), 128).save(buf, format="JPEG")
+        lossless = buf.getvalue()
+        monkeypatch.setattr(normalize, "jpeg_to_gray_lossless", lambda raw: lossless)
+        norm = Normalizer(grayscale=True)
+
+        assert norm.page(self._gray_jpeg()) is lossless
+        assert norm.stats()["grayscale"] == 1
+
+    def test_jpeg_reduit_passe_en_gris(self, monkeypatch):
+        """Page réduite : une seule génération JPEG, directement en 8 bits."""
+        monkeypatch.setattr(normalize, "jpeg_to_gray_lossless",
+                            lambda raw: pytest.fail("jpegtran inutile sur une page réduite"))
+        norm = Normalizer(max_pixels=2000, grayscale=True)
+
+        out = _open(norm.page(self._gray_jpeg()))
+
+        assert out.mode == "L" and out.format == "JPEG"
+        assert out.width * out.height <= 2000 * 1.05
+
+    def test_jpegtran_appele_sans_perte(self, mocker):
+        mocker.patch("app.normalize.shutil.which", return_value="/usr/bin/jpegtran")
+        run = mocker.patch("app.normalize.subprocess.run",
+                           return_value=mocker.Mock(returncode=0, stdout=b"gray"))
+
+        assert jpeg_to_gray_lossless(b"jpeg") == b"gray"
+        assert run.call_args.args[0] == ["/usr/bin/jpegtran", "-grayscale", "-copy", "all"]
+        assert run.call_args.kwargs["input"] == b"jpeg"
+
+    def test_jpegtran_absent_ou_en_echec(self, mocker):
+        mocker.patch("app.normalize.shutil.which", return_value=None)
+        assert jpeg_to_gray_lossless(b"jpeg") is None
+        mocker.patch("app.normalize.shutil.which", return_value="/usr/bin/jpegtran")
+        mocker.patch("app.normalize.subprocess.run", return_value=mocker.Mock(returncode=1, stdout=b""))
+        assert jpeg_to_gray_lossless(b"jpeg") is None
+
+    def test_page_couleur_intacte(self):
+        data = _image_bytes((60, 60), fmt="JPEG")
+        norm = Normalizer(grayscale=True)
+
+        assert norm.page(data) is data
+        assert norm.stats()["grayscale"] == 0
+
+
+class TestApply:
+
+    def test_ordre_conserve_en_parallele(self):
+        pages = [_image_bytes((60, 40 + i), fmt="JPEG") for i in range(12)]
+        norm = Normalizer(max_pixels=1000, workers=4)
+
+        out = list(norm.apply(iter(pages)))
+
+        heights = [_open(p).height for p in out]
+        assert heights == sorted(heights)
+        assert norm.stats()["pages"] == 12
+
+
+class TestRunJob:
+
+    def test_statistiques_dans_l_etat_du_job(self, tmp_path, monkeypatch):
+        import json
+        import zipfile
+        import app.main as svc
+
+        cbz = str(tmp_path / "in.cbz")
+        with zipfile.ZipFile(cbz, "w") as zf:
+            zf.writestr("001.png", _image_bytes((800, 800)))
+            zf.writestr("002.jpg", _image_bytes((100, 100), fmt="JPEG"))
+        meta_path = str(tmp_path / "running" / "job1.json")
+        os.makedirs(os.path.dirname(meta_path))
+        with open(meta_path, "w", encoding="utf-8") as f:
+            json.dump({"jobId": "job1", "inputPath": cbz, "workDir": str(tmp_path / "work")}, f)
+        monkeypatch.setattr(svc, "NORMALIZE", True)
+        monkeypatch.setattr(svc, "NORMALIZE_MAX_MPX", 0.25)
+
+        svc.run_job(meta_path)
+
+        with open(meta_path, encoding="utf-8") as f:
+            data = json.load(f)
+        assert data["state"] == "DONE"
+        assert data["normalize"]["pages"] == 2
+        assert data["normalize"]["resized"] == 1
+
+    def test_grayscale_seul_sans_reduction(self, tmp_path, monkeypatch):
+        import app.main as svc
+
+        monkeypatch.setattr(svc, "NORMALIZE", False)
+        monkeypatch.setattr(svc, "GRAYSCALE", True)
+        norm = svc.make_normalizer()
+
+        assert norm.grayscale
+        assert norm.max_pixels == 0 and norm.max_dpi == 0 and not norm.lossless_to_jpeg
+
+
+class TestInfo:
+
+    def test_reglages_publies_quand_actifs(self, monkeypatch):
+        import app.main as svc
+
+        monkeypatch.setattr(svc, "get_tool_versions", lambda: {"7z": "x", "img2pdf": "0.6.1"})
+        monkeypatch.setattr(svc, "NORMALIZE", True)
+        monkeypatch.setattr(svc, "NORMALIZE_JPEG_QUALITY", 85)
+        monkeypatch.setattr(svc, "GRAYSCALE", True)
+
+        settings = svc.info()["settings"]["normalize"]
+
+        assert settings["jpegQuality"] == 85 and settings["grayscale"]
+        assert "workers" not in settings
+
+    def test_aucun_reglage_sans_normalisation(self, monkeypatch):
+        import app.main as svc
+
+        monkeypatch.setattr(svc, "get_tool_versions", lambda: {"7z": "x", "img2pdf": "0.6.1"})
+        monkeypatch.setattr(svc, "NORMALIZE", False)
+        monkeypatch.setattr(svc, "GRAYSCALE", False)
+
+        assert svc.info()["settings"] == {}
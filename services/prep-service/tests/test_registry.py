@@ -0,0 +1,126 @@
+"""
+Tests du registre en mémoire des jobs (``app/registry.py``) : cache validé
+par stat, relecture après modification, reconstruction au démarrage.
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import pytest
+
+import app.registry as registry_mod
+from app.registry import JobRegistry
+from app.utils import atomic_write_json
+
+
+@pytest.fixture
+def dirs(tmp_path):
+    out = {loc: str(tmp_path / loc) for loc in registry_mod.LOCATIONS}
+    for d in out.values():
+        os.makedirs(d)
+    return out
+
+
+def _write(dirs, loc, job_id, data) -> str:
+    path = os.path.join(dirs[loc], f"{job_id}.json")
+    atomic_write_json(path, data)
+    return path
+
+
+class TestLecture:
+
+    def test_etat_enregistre_servi_sans_relecture(self, dirs, mocker):
+        reg = JobRegistry(dirs)
+        path = _write(dirs, "running", "a", {"jobId": "a", "state": "RUNNING"})
+        reg.record(path, {"jobId": "a", "state": "RUNNING"})
+        spy = mocker.spy(registry_mod, "read_json")
+
+        assert reg.get("a")["state"] == "RUNNING"
+        assert reg.get("a")["state"] == "RUNNING"
+        spy.assert_not_called()
+
+    def test_fichier_modifie_ailleurs_relu(self, dirs):
+        reg = JobRegistry(dirs)
+        path = _write(dirs, "running", "a", {"jobId": "a", "state": "RUNNING"})
+        reg.record(path, {"jobId": "a", "state": "RUNNING"})
+        # Écriture par un autre processus (PREP_EXECUTOR=process)
+        _write(dirs, "running", "a", {"jobId": "a", "state": "RUNNING", "message": "img2pdf"})
+
+        assert reg.get("a")["message"] == "img2pdf"
+
+    def test_deplacement_non_enregistre_retrouve_sur_disque(self, dirs):
+        reg = JobRegistry(dirs)
+        path = _write(dirs, "running", "a", {"jobId": "a", "state": "RUNNING"})
+        reg.record(path)
+        os.replace(path, os.path.join(dirs["done"], "a.json"))
+
+        assert reg.get("a")["state"] == "RUNNING"
+        assert reg.counts()["done"] == 1
+
+    def test_job_inconnu(self, dirs):
+        reg = JobRegistry(dirs)
+        assert reg.get("zz") is None
+        assert len(reg) == 0
+
+    def test_chemin_hors_service_ignore(self, dirs, tmp_path):
+        reg = JobRegistry(dirs)
+        reg.record(str(tmp_path / "ailleurs" / "a.json"), {"jobId": "a"})
+        assert len(reg) == 0
+
+
+class TestRebuild:
+
+    def test_reconstruction_depuis_les_dossiers(self, dirs):
+        _write(dirs, "queue", "q", {"jobId": "q", "state": "QUEUED"})
+        _write(dirs, "done", "d1", {"jobId": "d1", "state": "DONE"})
+        _write(dirs, "done", "d2", {"jobId": "d2", "state": "DONE"})
+        _write(dirs, "error", "e", {"jobId": "e", "state": "ERROR"})
+        reg = JobRegistry(dirs)
+
+        assert reg.rebuild() == 4
+        assert reg.counts() == {"queue": 1, "running": 0, "done": 2, "error": 1}
+        assert reg.get("d2")["state"] == "DONE"
+
+
+class TestBorne:
+
+    def test_jobs_termines_les_plus_anciens_oublies(self, dirs):
+        reg = JobRegistry(dirs, max_finished=2)
+        path = _write(dirs, "running", "r", {"jobId": "r", "state": "RUNNING"})
+        reg.record(path, {"jobId": "r", "state": "RUNNING"})
+        for job_id in ("d1", "d2", "d3"):
+            data = {"jobId": job_id, "state": "DONE"}
+            reg.record(_write(dirs, "done", job_id, data), data)
+            if job_id == "d2":
+                reg.get("d1")  # d1 relu : d2 devient le moins récent
+
+        assert list(reg._jobs) == ["r", "d1", "d3"]
+        assert reg.counts() == {"queue": 0, "running": 1, "done": 2, "error": 0}
+        assert reg.get("r")["state"] == "RUNNING"
+        # Job oublié : retrouvé sur disque, un autre est oublié à sa place
+        assert reg.get("d2")["state"] == "DONE"
+        assert reg.counts()["done"] == 2
+
+    def test_job_resoumis_prime_sur_son_ancien_echec(self, dirs):
+        _write(dirs, "error", "j", {"jobId": "j", "state": "ERROR"})
+        _write(dirs, "queue", "j", {"jobId": "j", "state": "QUEUED"})
+        _write(dirs, "done", "k", {"jobId": "k", "state": "DONE"})
+        _write(dirs, "running", "k", {"jobId": "k", "state": "RUNNING"})
+        reg = JobRegistry(dirs)
+
+        assert reg.rebuild() == 2
+        assert reg.get("j")["state"] == "QUEUED"
+        assert reg.get("k")["state"] == "RUNNING"
+        assert reg.counts() == {"queue": 1, "running": 1, "done": 0, "error": 0}
+
+    def test_reconstruction_bornee(self, dirs):
+        _write(dirs, "queue", "q", {"jobId": "q", "state": "QUEUED"})
+        for job_id in ("d1", "d2", "d3"):
+            _write(dirs, "done", job_id, {"jobId": job_id, "state": "DONE"})
+        _write(dirs, "error", "e", {"jobId": "e", "state": "ERROR"})
+        reg = JobRegistry(dirs, max_finished=2)
+
+        assert reg.rebuild() == 3
+        assert reg.counts()["queue"] == 1
+        assert reg.get("d1")["state"] == "DONE"